@@ -2,15 +2,25 @@ import pyrealsense2 as rs
 import numpy as np
 import cv2
 import argparse
+import sys
 import os
 
-def analyze_sunlight(bag_file, output_dir):
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from src.sensors.depth_aligner import aligner_from_profile
+
+def analyze_sunlight(bag_file, output_dir, numpy_align=False):
     """
     Analyzes a bag file for sunlight/lens flare impact.
     
     Args:
         bag_file (str): Path to the .bag file.
         output_dir (str): Directory to save analysis results.
+        numpy_align (bool): Use the cached NumPy DepthAligner instead of rs.align.
+
+    Returns:
+        dict: 'frames', 'high_intensity_pixels', 'invalid_in_high_intensity' and
+              'invalid_ratio' (percent, None without high-intensity pixels).
     """
     if not os.path.exists(output_dir):
         os.makedirs(output_dir)
@@ -25,6 +35,7 @@ def analyze_sunlight(bag_file, output_dir):
 
     profile = pipeline.start(config)
     align = rs.align(rs.stream.color)
+    aligner = aligner_from_profile(profile) if numpy_align else None
 
     frame_count = 0
     total_high_intensity_pixels = 0
@@ -33,16 +44,19 @@ def analyze_sunlight(bag_file, output_dir):
     try:
         while True:
             frames = pipeline.wait_for_frames()
-            aligned_frames = align.process(frames)
+            if aligner is None:
+                frames = align.process(frames)
             
-            color_frame = aligned_frames.get_color_frame()
-            depth_frame = aligned_frames.get_depth_frame()
+            color_frame = frames.get_color_frame()
+            depth_frame = frames.get_depth_frame()
             
             if not color_frame or not depth_frame:
                 continue
                 
             color_image = np.asanyarray(color_frame.get_data())
             depth_image = np.asanyarray(depth_frame.get_data())
+            if aligner is not None:
+                depth_image = aligner.align(depth_image)
             
             # 1. Detect High Intensity Areas (Potential Flare/Sunlight)
             # Convert to grayscale
@@ -80,6 +94,7 @@ def analyze_sunlight(bag_file, output_dir):
         
     print(f"Analysis Complete for {bag_file}")
     print(f"Total Frames: {frame_count}")
+    ratio = None
     if total_high_intensity_pixels > 0:
         ratio = (total_invalid_depth_in_high_intensity / total_high_intensity_pixels) * 100
         print(f"Invalid Depth Ratio in High Intensity Areas: {ratio:.2f}%")
@@ -87,10 +102,18 @@ def analyze_sunlight(bag_file, output_dir):
     else:
         print("No significant high intensity areas detected.")
 
+    return {
+        'frames': frame_count,
+        'high_intensity_pixels': total_high_intensity_pixels,
+        'invalid_in_high_intensity': total_invalid_depth_in_high_intensity,
+        'invalid_ratio': ratio,
+    }
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Analyze Sunlight/Flare Impact in Bag File")
     parser.add_argument("bag_file", help="Path to input .bag file")
     parser.add_argument("--output", default="analysis_results", help="Output directory")
+    parser.add_argument("--numpy-align", action="store_true", help="Use the NumPy DepthAligner instead of rs.align")
     args = parser.parse_args()
     
-    analyze_sunlight(args.bag_file, args.output)
+    analyze_sunlight(args.bag_file, args.output, args.numpy_align)
@@ -0,0 +1,207 @@
+import argparse
+import concurrent.futures
+import csv
+import glob
+import importlib
+import json
+import os
+import sys
+import time
+from concurrent.futures.process import BrokenProcessPool
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+# name -> (module, function, input extensions)
+ANALYSES = {
+    'audio': ('src.analysis.evaluate_audio', 'evaluate_audio', ('.wav',)),
+    'sunlight': ('src.analysis.analyze_sunlight', 'analyze_sunlight', ('.bag',)),
+    'export': ('src.analysis.export_for_yolo', 'export_for_yolo', ('.bag',)),
+    'multimodal': ('src.analysis.multimodal_eval', 'multimodal_eval', ('.bag',)),
+}
+
+def find_inputs(pattern, extensions):
+    """Files matching a directory (searched recursively) or glob pattern, sorted by path."""
+    if os.path.isdir(pattern):
+        paths = glob.glob(os.path.join(pattern, '**', '*'), recursive=True)
+    else:
+        paths = glob.glob(pattern, recursive=True)
+    return sorted(os.path.abspath(p) for p in paths if os.path.isfile(p) and p.lower().endswith(extensions))
+
+def file_signature(path):
+    """Size and modification time; a result is up to date while both are unchanged."""
+    st = os.stat(path)
+    return {'size': st.st_size, 'mtime': st.st_mtime}
+
+def _init_worker():
+    # One process per file already uses every core; keep each worker's math libraries single-threaded
+    for var in ('OMP_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'MKL_NUM_THREADS'):
+        os.environ.setdefault(var, '1')
+
+def run_one(analysis, path, output_dir, options):
+    """
+    Runs one analysis on one file (in a worker process).
+
+    Returns:
+        dict: Summary record with 'file', 'status' ('ok' or 'error'), 'seconds', the file
+              signature, the options and the analysis result fields.
+    """
+    module_name, function_name, _ = ANALYSES[analysis]
+    record = {'file': path, 'analysis': analysis, 'options': options}
+    record.update(file_signature(path))
+    t0 = time.perf_counter()
+    try:
+        function = getattr(importlib.import_module(module_name), function_name)
+        # Every file gets its own output directory so images of different recordings never collide
+        stem = os.path.splitext(os.path.basename(path))[0]
+        if analysis == 'multimodal':
+            result = function(path, options.get('model', 'yolov8n.pt'), os.path.join(output_dir, stem),
+                              **{k: v for k, v in options.items() if k != 'model'})
+        else:
+            result = function(path, os.path.join(output_dir, stem), **options)
+        result = dict(result or {})
+        record['status'] = 'error' if 'error' in result else 'ok'
+        record.update(result)
+    except Exception as e:
+        record['status'] = 'error'
+        record['error'] = f"{type(e).__name__}: {e}"
+    record['seconds'] = time.perf_counter() - t0
+    record['file'] = path
+    return record
+
+def failure_record(analysis, path, options, error):
+    """Summary record of a file whose worker process died before returning a result."""
+    record = {'file': path, 'analysis': analysis, 'options': options, 'status': 'error', 'error': error,
+              'seconds': 0.0}
+    record.update(file_signature(path))
+    return record
+
+def load_summary(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return {record['file']: record for record in json.load(f)}
+
+def write_summary(records, json_path, csv_path):
+    """Writes the records as a JSON list and as a flat CSV (lists are ';'-joined), atomically."""
+    records = sorted(records, key=lambda r: r['file'])
+    tmp = json_path + '.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(records, f, indent=1)
+    os.replace(tmp, json_path)
+
+    columns = []
+    for record in records:
+        columns.extend(k for k in record if k not in columns and k != 'options')
+    tmp = csv_path + '.tmp'
+    with open(tmp, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=columns)
+        writer.writeheader()
+        for record in records:
+            writer.writerow({k: ';'.join(f"{x:.6g}" if isinstance(x, float) else str(x) for x in v)
+                             if isinstance(v, list) else v for k, v in record.items() if k in columns})
+    os.replace(tmp, csv_path)
+
+def batch_run(analysis, pattern, output_dir, workers=None, force=False, options=None):
+    """
+    Runs an analysis over many recordings in a process pool, with one consolidated summary.
+
+    Files whose summary record is up to date (same size, modification time and options, and
+    no error) are skipped, so re-running after new recordings were added only processes those.
+    The summary is rewritten as each file finishes, so an interrupted run keeps its progress.
+    A worker that dies (crash, out of memory) breaks the whole pool; the files that were still
+    pending are then re-run one per fresh single-worker pool, so only the culprit is recorded
+    as failed and the rest of the batch completes.
+
+    Args:
+        analysis (str): One of ANALYSES.
+        pattern (str): Directory or glob pattern of input files.
+        output_dir (str): Per-file outputs go to output_dir/<file name>/, the summary to
+                          output_dir/<analysis>_summary.json and .csv.
+        workers (int, optional): Worker processes (default: CPU count).
+        force (bool): Re-run files with up-to-date results.
+        options (dict, optional): Extra keyword arguments of the analysis function.
+
+    Returns:
+        list: Summary records of all files.
+    """
+    options = options or {}
+    extensions = ANALYSES[analysis][2]
+    os.makedirs(output_dir, exist_ok=True)
+    json_path = os.path.join(output_dir, f"{analysis}_summary.json")
+    csv_path = os.path.join(output_dir, f"{analysis}_summary.csv")
+
+    summary = load_summary(json_path)
+    inputs = find_inputs(pattern, extensions)
+    todo = []
+    for path in inputs:
+        previous = summary.get(path)
+        if not force and previous is not None and previous.get('status') == 'ok' and \
+                previous.get('options') == options and \
+                all(previous.get(k) == v for k, v in file_signature(path).items()):
+            continue
+        todo.append(path)
+
+    workers = max(1, min(workers or os.cpu_count() or 1, len(todo) or 1))
+    print(f"Batch {analysis}: {len(inputs)} files, {len(inputs) - len(todo)} up to date, "
+          f"{len(todo)} to process with {workers} workers.")
+    t0 = time.perf_counter()
+    failed = 0
+    done = 0
+
+    def finish(record):
+        nonlocal failed, done
+        summary[record['file']] = record
+        done += 1
+        if record['status'] != 'ok':
+            failed += 1
+        print(f"[{done}/{len(todo)}] {record['status']:5s} {record['seconds']:7.1f}s {record['file']}"
+              + (f" ({record['error']})" if record['status'] != 'ok' else ""))
+        write_summary(summary.values(), json_path, csv_path)
+
+    broken = []
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        futures = {pool.submit(run_one, analysis, path, output_dir, options): path for path in todo}
+        for future in concurrent.futures.as_completed(futures):
+            try:
+                finish(future.result())
+            except BrokenProcessPool:
+                broken.append(futures[future])
+
+    if broken:
+        print(f"A worker process died; re-running {len(broken)} files one at a time.")
+    for path in sorted(broken):
+        with concurrent.futures.ProcessPoolExecutor(max_workers=1, initializer=_init_worker) as pool:
+            try:
+                finish(pool.submit(run_one, analysis, path, output_dir, options).result())
+            except BrokenProcessPool as e:
+                finish(failure_record(analysis, path, options, f"BrokenProcessPool: {e}"))
+
+    if not todo:
+        write_summary(summary.values(), json_path, csv_path)
+    print(f"Processed {len(todo)} files in {time.perf_counter() - t0:.1f}s ({failed} failed). "
+          f"Summary: {json_path}, {csv_path}")
+    return [summary[path] for path in inputs]
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run an analysis over a directory of recordings in parallel")
+    parser.add_argument("analysis", choices=sorted(ANALYSES), help="Analysis to run")
+    parser.add_argument("input", help="Directory (searched recursively) or glob pattern of input files")
+    parser.add_argument("--output", default="analysis_results", help="Output directory")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--force", action="store_true", help="Re-run files with up-to-date results")
+    parser.add_argument("--model", default=None, help="YOLO model (multimodal)")
+    parser.add_argument("--interval", type=int, default=None, help="Frame interval (export)")
+    parser.add_argument("--numpy-align", action="store_true", help="Use the NumPy DepthAligner (sunlight, multimodal)")
+    parser.add_argument("--no-plot", action="store_true", help="Skip spectrogram images (audio)")
+    args = parser.parse_args()
+
+    options = {}
+    if args.model and args.analysis == 'multimodal':
+        options['model'] = args.model
+    if args.interval and args.analysis == 'export':
+        options['interval'] = args.interval
+    if args.numpy_align and args.analysis in ('sunlight', 'multimodal'):
+        options['numpy_align'] = True
+    if args.no_plot and args.analysis == 'audio':
+        options['plot'] = False
+    batch_run(args.analysis, args.input, args.output, args.workers, args.force, options)
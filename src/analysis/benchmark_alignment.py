@@ -0,0 +1,131 @@
+import pyrealsense2 as rs
+import numpy as np
+import argparse
+import time
+import sys
+import os
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from src.sensors.depth_aligner import aligner_from_profile, LazyAlignedDepthFrame
+
+def random_boxes(rng, width, height, count):
+    """Detection-sized boxes (5-20% of the image per side) used to time lazy ROI alignment."""
+    w = rng.uniform(0.05, 0.2, count) * width
+    h = rng.uniform(0.05, 0.2, count) * height
+    x1 = rng.uniform(0, width - w)
+    y1 = rng.uniform(0, height - h)
+    return np.stack([x1, y1, x1 + w, y1 + h], axis=1).astype(int)
+
+def accumulate_errors(stats, result, ref, depth_scale):
+    """Adds coverage / error statistics of one aligned image against the rs.align reference."""
+    ref_valid = ref > 0
+    both = ref_valid & (result > 0)
+    if not np.any(both):
+        return
+    diff = np.abs(result[both].astype(np.int32) - ref[both].astype(np.int32))
+    stats['coverage'].append(np.count_nonzero(result) / max(np.count_nonzero(ref_valid), 1))
+    stats['mae'].append(diff.mean() * depth_scale * 1000)
+    stats['median'].append(np.median(diff) * depth_scale * 1000)
+    stats['within_1pct'].append(np.mean(diff <= 0.01 * ref[both]))
+
+def benchmark_alignment(bag_file, max_frames=300, roi_boxes=5):
+    """
+    Compares rs.align with the NumPy DepthAligner (full and half resolution) and lazy
+    ROI-only alignment on a bag file.
+
+    For each frame every method aligns the same raw depth frame. Reported per method:
+    mean/p95 latency, and against rs.align: coverage (valid pixels relative to rs.align),
+    mean/median absolute depth error on pixels valid in both, and the share of those
+    pixels within 1% of the rs.align depth. ROI accuracy is measured inside the boxes only.
+
+    Args:
+        bag_file (str): Path to the .bag file.
+        max_frames (int): Number of frames to evaluate.
+        roi_boxes (int): Number of random detection-sized boxes per frame for the ROI mode.
+    """
+    pipeline = rs.pipeline()
+    config = rs.config()
+    rs.config.enable_device_from_file(config, bag_file, repeat_playback=False)
+    config.enable_stream(rs.stream.color)
+    config.enable_stream(rs.stream.depth)
+
+    profile = pipeline.start(config)
+    profile.get_device().as_playback().set_real_time(False)
+
+    align = rs.align(rs.stream.color)
+    aligners = {
+        'numpy': aligner_from_profile(profile, scale=1.0),
+        'numpy_half': aligner_from_profile(profile, scale=0.5),
+    }
+
+    timings = {'rs.align': [], 'numpy': [], 'numpy_half': [], 'numpy_roi': []}
+    errors = {name: {'coverage': [], 'mae': [], 'median': [], 'within_1pct': []}
+              for name in list(aligners) + ['numpy_roi']}
+    rng = np.random.default_rng(0)
+
+    frame_count = 0
+    try:
+        while frame_count < max_frames:
+            frames = pipeline.wait_for_frames()
+            frames.keep()
+            depth_frame = frames.get_depth_frame()
+            if not depth_frame or not frames.get_color_frame():
+                continue
+            raw_depth = np.asanyarray(depth_frame.get_data())
+
+            t0 = time.perf_counter()
+            aligned_frames = align.process(frames)
+            reference = np.asanyarray(aligned_frames.get_depth_frame().get_data())
+            timings['rs.align'].append(time.perf_counter() - t0)
+
+            for name, aligner in aligners.items():
+                t0 = time.perf_counter()
+                result = aligner.align(raw_depth)
+                timings[name].append(time.perf_counter() - t0)
+
+                ref = reference[::aligner.step, ::aligner.step][:result.shape[0], :result.shape[1]]
+                accumulate_errors(errors[name], result, ref, aligner.depth_scale)
+
+            # Lazy ROI alignment of a handful of detection-sized boxes
+            aligner = aligners['numpy']
+            boxes = random_boxes(rng, aligner.out_width, aligner.out_height, roi_boxes)
+            t0 = time.perf_counter()
+            canvas = LazyAlignedDepthFrame(raw_depth, aligner).align_boxes(boxes)
+            timings['numpy_roi'].append(time.perf_counter() - t0)
+
+            in_boxes = np.zeros(canvas.shape, dtype=bool)
+            for x1, y1, x2, y2 in boxes:
+                in_boxes[y1:y2, x1:x2] = True
+            accumulate_errors(errors['numpy_roi'], np.where(in_boxes, canvas, 0),
+                              np.where(in_boxes, reference, 0), aligner.depth_scale)
+
+            frame_count += 1
+
+    except RuntimeError:
+        pass # End of bag file
+    finally:
+        pipeline.stop()
+
+    print(f"=== Alignment Benchmark: {bag_file} ({frame_count} frames) ===")
+    print(f"(numpy_roi aligns {roi_boxes} random boxes per frame)")
+    for name, samples in timings.items():
+        if samples:
+            ms = np.array(samples) * 1000
+            print(f"{name:>11}: mean {ms.mean():6.2f} ms, p95 {np.percentile(ms, 95):6.2f} ms")
+
+    print("--- Accuracy vs rs.align ---")
+    for name, stats in errors.items():
+        if stats['mae']:
+            print(f"{name:>11}: coverage {np.mean(stats['coverage']) * 100:6.2f}%, "
+                  f"MAE {np.mean(stats['mae']):6.2f} mm, median {np.mean(stats['median']):6.2f} mm, "
+                  f"within 1%: {np.mean(stats['within_1pct']) * 100:6.2f}%")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark rs.align vs NumPy depth alignment")
+    parser.add_argument("bag_file", help="Path to input .bag file")
+    parser.add_argument("--frames", type=int, default=300, help="Maximum number of frames to evaluate")
+    parser.add_argument("--roi-boxes", type=int, default=5, help="Boxes per frame for lazy ROI alignment")
+    args = parser.parse_args()
+
+    benchmark_alignment(args.bag_file, args.frames, args.roi_boxes)
@@ -0,0 +1,112 @@
+import numpy as np
+import argparse
+import time
+import sys
+import os
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from src.sensors.frame_source import create_frame_source
+from src.vision.inference_backend import create_backend
+from src.vision.tracker import box_iou
+
+def load_frames(source_kind, path, max_frames):
+    """Reads up to max_frames color images from a bag file, frame directory or synthetic source."""
+    kwargs = {'num_frames': max_frames} if source_kind == 'synthetic' else {}
+    source = create_frame_source(source_kind, path, **kwargs)
+    source.start()
+    frames = []
+    try:
+        while len(frames) < max_frames and not source.exhausted:
+            color, _, _ = source.get_frames()
+            if color is not None:
+                frames.append(np.array(color))
+    finally:
+        source.stop()
+    return frames
+
+def match_detections(ref, other, iou_threshold=0.5):
+    """
+    Greedily matches two detection sets (same class, IoU >= threshold).
+
+    Returns:
+        tuple: (number of matches, list of matched IoUs)
+    """
+    ref_boxes, _, ref_cls = ref
+    boxes, _, cls = other
+    if len(ref_boxes) == 0 or len(boxes) == 0:
+        return 0, []
+    iou = box_iou(ref_boxes, boxes)
+    iou[ref_cls[:, None] != cls[None, :]] = 0
+
+    used_ref, used_other, ious = set(), set(), []
+    for flat in np.argsort(-iou, axis=None):
+        i, j = divmod(int(flat), iou.shape[1])
+        if iou[i, j] < iou_threshold:
+            break
+        if i in used_ref or j in used_other:
+            continue
+        used_ref.add(i)
+        used_other.add(j)
+        ious.append(float(iou[i, j]))
+    return len(ious), ious
+
+def benchmark_backends(frames, model_path, backends, imgsz=640, warmup=3):
+    """
+    Times each backend on the same frames and compares its detections with the first backend.
+
+    Args:
+        frames (list): BGR images.
+        model_path (str): .pt weights; exports are created/cached on first use.
+        backends (list): Backend specs such as 'torch', 'onnx', 'openvino', 'openvino-int8'.
+    """
+    results = {}
+    for spec in backends:
+        name, _, precision = spec.partition('-')
+        backend = create_backend(model_path, name, int8=(precision == 'int8'), imgsz=imgsz)
+
+        for frame in frames[:warmup]:
+            backend.predict(frame)
+
+        latencies, outputs = [], []
+        for frame in frames:
+            t0 = time.perf_counter()
+            outputs.append(backend.predict(frame))
+            latencies.append(time.perf_counter() - t0)
+        results[spec] = (np.array(latencies) * 1000, outputs)
+
+    reference_spec = backends[0]
+    reference = results[reference_spec][1]
+
+    print(f"=== Backend Benchmark: {len(frames)} frames, imgsz={imgsz} ===")
+    print(f"Agreement is measured against '{reference_spec}' (same class, IoU >= 0.5).")
+    for spec, (ms, outputs) in results.items():
+        n_ref = sum(len(r[0]) for r in reference)
+        n_out = sum(len(o[0]) for o in outputs)
+        matches, ious = 0, []
+        for r, o in zip(reference, outputs):
+            m, frame_ious = match_detections(r, o)
+            matches += m
+            ious.extend(frame_ious)
+        recall = matches / n_ref if n_ref else 1.0
+        precision = matches / n_out if n_out else 1.0
+        f1 = 2 * precision * recall / (precision + recall) if precision + recall > 0 else 0.0
+        print(f"{spec:>14}: mean {ms.mean():7.2f} ms, p50 {np.percentile(ms, 50):7.2f} ms, "
+              f"p95 {np.percentile(ms, 95):7.2f} ms ({1000 / ms.mean():5.1f} fps) | "
+              f"dets {n_out:5d}, recall {recall * 100:5.1f}%, precision {precision * 100:5.1f}%, "
+              f"F1 {f1 * 100:5.1f}%, mean IoU {np.mean(ious) if ious else 0:.3f}")
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare inference backends on recorded frames")
+    parser.add_argument("input", nargs="?", default=None, help="Path to a .bag file or frame directory")
+    parser.add_argument("--source", choices=["bag", "npz", "synthetic"], default="bag", help="Frame source type")
+    parser.add_argument("--model", default="yolov8n.pt", help="Path to YOLO model")
+    parser.add_argument("--backends", nargs="+", default=["torch", "onnx", "openvino", "openvino-int8"],
+                        help="Backends to compare; the first one is the reference")
+    parser.add_argument("--frames", type=int, default=100, help="Number of frames")
+    parser.add_argument("--imgsz", type=int, default=640, help="Inference input size")
+    args = parser.parse_args()
+
+    frames = load_frames(args.source, args.input, args.frames)
+    benchmark_backends(frames, args.model, args.backends, args.imgsz)
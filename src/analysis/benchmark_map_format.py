@@ -0,0 +1,90 @@
+import numpy as np
+import argparse
+import json
+import time
+import sys
+import os
+import tempfile
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from src.map.map_manager import MapManager
+from src.map.binary_map import BinaryMap, write_binary_map, json_to_binary, binary_to_json
+
+def make_landmarks(num_landmarks, num_classes, size, audio_ratio, rng):
+    """Random landmarks; a share of them carry a small audio signature."""
+    xs, zs = rng.uniform(0, size, num_landmarks), rng.uniform(0, size, num_landmarks)
+    ys = rng.uniform(-1.0, 0.5, num_landmarks)
+    classes = rng.integers(0, num_classes, num_landmarks)
+    with_audio = rng.random(num_landmarks) < audio_ratio
+    landmarks = []
+    for i in range(num_landmarks):
+        signature = None
+        if with_audio[i]:
+            signature = {"rms": float(rng.random()), "bands": [round(float(v), 4) for v in rng.random(8)]}
+        landmarks.append({"id": i + 1, "class": f"class_{classes[i]}",
+                          "position": [float(xs[i]), float(ys[i]), float(zs[i])],
+                          "audio_signature": signature})
+    return landmarks
+
+def timed(fn):
+    t0 = time.perf_counter()
+    result = fn()
+    return result, (time.perf_counter() - t0) * 1000
+
+def load_and_query(path, query):
+    """Cold start as the navigation loop sees it: load the map, then the first nearest-landmark query."""
+    map_manager = MapManager()
+    map_manager.load_map(path)
+    map_manager.find_nearest_landmark(query)
+    return map_manager
+
+def benchmark_map_format(sizes=(100000, 1000000), num_classes=20, size=200.0, audio_ratio=0.05, seed=0,
+                         directory=None):
+    rng = np.random.default_rng(seed)
+    directory = directory or tempfile.mkdtemp(prefix='map_format_')
+    query = [size / 2, 0.0, size / 2]
+
+    for n in sizes:
+        landmarks = make_landmarks(n, num_classes, size, audio_ratio, rng)
+        json_path = os.path.join(directory, f'map_{n}.json')
+        binary_path = os.path.join(directory, f'map_{n}.navmap')
+        _, json_write_ms = timed(lambda: json.dump({'landmarks': landmarks}, open(json_path, 'w'), indent=4))
+        _, binary_write_ms = timed(lambda: write_binary_map(binary_path, landmarks))
+
+        print(f"=== Map Format Benchmark: {n} landmarks ===")
+        print(f"File size:    JSON {os.path.getsize(json_path) / 1e6:8.1f} MB | "
+              f"binary {os.path.getsize(binary_path) / 1e6:8.1f} MB")
+        print(f"Write:        JSON {json_write_ms:8.1f} ms | binary {binary_write_ms:8.1f} ms")
+
+        _, json_parse_ms = timed(lambda: json.load(open(json_path)))
+        _, binary_open_ms = timed(lambda: BinaryMap(binary_path))
+        print(f"Open:         JSON {json_parse_ms:8.1f} ms | binary {binary_open_ms:8.1f} ms (mmap, lazy)")
+
+        json_manager, json_cold_ms = timed(lambda: load_and_query(json_path, query))
+        binary_manager, binary_cold_ms = timed(lambda: load_and_query(binary_path, query))
+        print(f"Load + first query: JSON {json_cold_ms:8.1f} ms | binary {binary_cold_ms:8.1f} ms "
+              f"({json_cold_ms / binary_cold_ms:.0f}x)")
+
+        json_nearest = json_manager.find_nearest_landmark(query)[0]
+        binary_nearest = binary_manager.find_nearest_landmark(query)[0]
+        roundtrip_path = os.path.join(directory, f'map_{n}_roundtrip.json')
+        binary_to_json(binary_path, roundtrip_path)
+        with open(roundtrip_path) as f:
+            lossless = json.load(f)['landmarks'] == landmarks
+        print(f"Same nearest landmark: {json_nearest == binary_nearest} | JSON round trip lossless: {lossless}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the JSON and binary map formats, or convert between them")
+    parser.add_argument("--sizes", type=int, nargs='+', default=[100000, 1000000], help="Landmark counts to benchmark")
+    parser.add_argument("--dir", type=str, default=None, help="Directory for the generated maps (default: temp dir)")
+    parser.add_argument("--convert", type=str, nargs=2, metavar=('SRC', 'DST'),
+                        help="Convert a map instead of benchmarking (.json <-> .navmap, by extension of DST)")
+    args = parser.parse_args()
+
+    if args.convert:
+        src, dst = args.convert
+        count = binary_to_json(src, dst) if dst.endswith('.json') else json_to_binary(src, dst)
+        print(f"Converted {count} landmarks: {src} -> {dst}")
+    else:
+        benchmark_map_format(args.sizes, directory=args.dir)
@@ -0,0 +1,100 @@
+import numpy as np
+import argparse
+import time
+import sys
+import os
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from src.sensors.frame_source import create_frame_source
+from src.vision.obstacle_map import ObstacleMap
+from src.vision.ground_plane import GroundPlaneEstimator
+
+def benchmark_obstacles(source='bag', path=None, max_frames=300, steps=(1, 2, 4, 8), camera_height=1.2):
+    """
+    Times ObstacleMap on recorded frames at several pixel decimation steps and compares the
+    per-sector nearest-obstacle distances with the full-resolution result (step 1).
+
+    Args:
+        source (str): 'bag', 'npz' or 'synthetic'.
+        path (str): .bag file or frame directory.
+        max_frames (int): Number of frames to evaluate.
+        steps (tuple): Decimation steps to compare.
+        camera_height (float): Camera height above the floor (m) during the recording.
+    """
+    kwargs = {'align_mode': 'numpy'} if source == 'bag' else {}
+    if source == 'synthetic':
+        kwargs['num_frames'] = max_frames
+    frame_source = create_frame_source(source, path, **kwargs)
+    frame_source.start()
+    intrinsics = frame_source.get_intrinsics()
+    depth_scale = frame_source.get_depth_scale()
+    maps = {step: ObstacleMap(intrinsics, depth_scale, step=step, camera_height=camera_height) for step in steps}
+    reference_step = min(steps)
+    ground = GroundPlaneEstimator(intrinsics, depth_scale)
+    ground_timings, mask_timings, camera_heights = [], [], []
+
+    timings = {step: [] for step in steps}
+    errors = {step: [] for step in steps}
+    agreement = {step: [] for step in steps}
+    nearest = []
+    frame_count = 0
+    try:
+        while frame_count < max_frames and not frame_source.exhausted:
+            color, depth, depth_frame = frame_source.get_frames()
+            if color is None:
+                continue
+            if depth is None:
+                depth = np.asanyarray(depth_frame.get_data())
+            frame_count += 1
+
+            t0 = time.perf_counter()
+            ground.update(depth)
+            t1 = time.perf_counter()
+            ground.above_ground_mask(depth)
+            ground_timings.append(t1 - t0)
+            mask_timings.append(time.perf_counter() - t1)
+            if ground.camera_height is not None:
+                camera_heights.append(ground.camera_height)
+
+            results = {}
+            for step, obstacle_map in maps.items():
+                t0 = time.perf_counter()
+                results[step] = obstacle_map.update(depth)
+                timings[step].append(time.perf_counter() - t0)
+
+            reference = results[reference_step]['sectors']
+            nearest.append(results[reference_step]['nearest'])
+            for step, result in results.items():
+                both = np.isfinite(reference) & np.isfinite(result['sectors'])
+                if np.any(both):
+                    errors[step].append(np.mean(np.abs(result['sectors'][both] - reference[both])))
+                agreement[step].append(np.mean(np.isfinite(reference) == np.isfinite(result['sectors'])))
+    finally:
+        frame_source.stop()
+
+    print(f"=== Obstacle Map Benchmark: {frame_count} frames ({intrinsics.width}x{intrinsics.height}) ===")
+    for step in steps:
+        t = np.array(timings[step]) * 1000
+        print(f"step {step}: mean {t.mean():6.2f} ms | p95 {np.percentile(t, 95):6.2f} ms | "
+              f"{1000 / t.mean():7.1f} fps | sector error vs step {reference_step}: "
+              f"{np.mean(errors[step]) if errors[step] else 0.0:.3f} m | "
+              f"blocked/clear agreement {np.mean(agreement[step]) * 100:.1f}%")
+    print(f"Ground plane: fit {np.mean(ground_timings) * 1000:.2f} ms | full-resolution mask "
+          f"{np.mean(mask_timings) * 1000:.2f} ms | camera height "
+          + (f"{np.median(camera_heights):.2f} m (std {np.std(camera_heights):.3f})" if camera_heights else "n/a"))
+    finite = np.array(nearest)[np.isfinite(nearest)]
+    if len(finite):
+        print(f"Nearest obstacle: median {np.median(finite):.2f} m, "
+              f"frames with an obstacle {len(finite) / max(frame_count, 1) * 100:.0f}%")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the obstacle occupancy grid on recorded frames")
+    parser.add_argument("--source", choices=["bag", "npz", "synthetic"], default="bag", help="Frame source")
+    parser.add_argument("--input", type=str, default=None, help="Path to the .bag file or frame directory")
+    parser.add_argument("--frames", type=int, default=300, help="Max frames to process")
+    parser.add_argument("--steps", type=int, nargs='+', default=[1, 2, 4, 8], help="Pixel decimation steps")
+    parser.add_argument("--camera-height", type=float, default=1.2, help="Camera height above the floor (m)")
+    args = parser.parse_args()
+
+    benchmark_obstacles(args.source, args.input, args.frames, tuple(args.steps), args.camera_height)
@@ -0,0 +1,116 @@
+import numpy as np
+import argparse
+import time
+import sys
+import os
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from src.map.map_manager import MapManager
+from src.navigation.localizer import Localizer
+from src.navigation.particle_filter import ParticleFilterLocalizer
+
+def make_map(num_landmarks, num_classes, size, rng):
+    """Random landmarks of a few classes spread over a size x size meter area."""
+    map_manager = MapManager()
+    for i in range(num_landmarks):
+        position = [float(rng.uniform(0, size)), float(rng.uniform(-1.0, 0.5)), float(rng.uniform(0, size))]
+        map_manager.add_landmark(f"class_{i % num_classes}", position)
+    return map_manager
+
+def make_trajectory(num_frames, size, fps=30.0, speed=1.0):
+    """Camera walking around an ellipse inside the map. Returns Nx3 (x, z, yaw)."""
+    t = np.arange(num_frames) / fps
+    radius = size * 0.35
+    angle = speed * t / radius
+    x = size / 2 + radius * np.cos(angle)
+    z = size / 2 + radius * 0.7 * np.sin(angle)
+    heading = np.arctan2(np.gradient(x), np.gradient(z))
+    return np.stack([x, z, heading], axis=1)
+
+def observe(map_manager, pose, rng, max_range=8.0, half_fov=np.radians(43), noise=0.05, range_noise=0.02,
+            miss_rate=0.1, max_detections=8):
+    """Simulated detector output: visible landmarks in camera coordinates with depth noise."""
+    x, z, yaw = pose
+    sin_y, cos_y = np.sin(yaw), np.cos(yaw)
+    detections = []
+    for lm in map_manager.landmarks:
+        dx, dy, dz = lm['position'][0] - x, lm['position'][1], lm['position'][2] - z
+        # Inverse of the camera-to-map rotation used by the filter
+        rx = cos_y * dx - sin_y * dz
+        rz = sin_y * dx + cos_y * dz
+        rng_m = np.hypot(rx, rz)
+        if rz <= 0.3 or rng_m > max_range or abs(np.arctan2(rx, rz)) > half_fov or rng.random() < miss_rate:
+            continue
+        sigma = noise + range_noise * rng_m
+        detections.append({'class': lm['class'], 'confidence': 0.9,
+                           'position': [rx + rng.normal(0, sigma), dy, rz + rng.normal(0, sigma)]})
+    rng.shuffle(detections)
+    return detections[:max_detections]
+
+def odometry_between(prev, cur, rng, noise=0.01, yaw_noise=0.005):
+    """(forward, right, dyaw) in the previous camera frame, with noise."""
+    dx, dz = cur[0] - prev[0], cur[1] - prev[1]
+    sin_y, cos_y = np.sin(prev[2]), np.cos(prev[2])
+    right = cos_y * dx - sin_y * dz
+    forward = sin_y * dx + cos_y * dz
+    dyaw = (cur[2] - prev[2] + np.pi) % (2 * np.pi) - np.pi
+    return forward + rng.normal(0, noise), right + rng.normal(0, noise), dyaw + rng.normal(0, yaw_noise)
+
+def benchmark_particle_filter(num_particles=5000, num_frames=600, num_landmarks=60, num_classes=6, size=20.0,
+                              use_odometry=True, global_init=False, warmup=60, seed=0):
+    rng = np.random.default_rng(seed)
+    map_manager = make_map(num_landmarks, num_classes, size, rng)
+    truth = make_trajectory(num_frames, size)
+    observations = [observe(map_manager, pose, rng) for pose in truth]
+    odometry = [None] + [odometry_between(truth[i - 1], truth[i], rng) for i in range(1, num_frames)]
+
+    initial_pose = None if global_init else tuple(truth[0])
+    pf = ParticleFilterLocalizer(map_manager, num_particles=num_particles, initial_pose=initial_pose, seed=seed)
+    baseline = Localizer(map_manager)
+    lsq = Localizer(map_manager, method='lsq')
+    if not global_init:
+        lsq.current_position = np.array([truth[0, 0], 0.0, truth[0, 1]])
+        lsq.current_orientation = float(np.degrees(truth[0, 2]))
+
+    times, lsq_times, pf_err, yaw_err, base_err, lsq_err = [], [], [], [], [], []
+    for i in range(num_frames):
+        t0 = time.perf_counter()
+        pos = pf.update(observations[i], odometry[i] if use_odometry else None)
+        times.append(time.perf_counter() - t0)
+        base = baseline.update(observations[i])
+        t0 = time.perf_counter()
+        fix = lsq.update(observations[i])
+        lsq_times.append(time.perf_counter() - t0)
+
+        if i >= warmup:
+            pf_err.append(np.hypot(pos[0] - truth[i, 0], pos[2] - truth[i, 1]))
+            yaw_err.append(abs((np.radians(pf.current_orientation) - truth[i, 2] + np.pi) % (2 * np.pi) - np.pi))
+            base_err.append(np.hypot(base[0] - truth[i, 0], base[2] - truth[i, 1]))
+            lsq_err.append(np.hypot(fix[0] - truth[i, 0], fix[2] - truth[i, 1]))
+
+    ms = np.array(times) * 1000
+    n_det = np.mean([len(o) for o in observations])
+    print(f"=== Particle Filter Benchmark: {num_particles} particles, {num_frames} frames, "
+          f"{num_landmarks} landmarks / {num_classes} classes, {n_det:.1f} detections per frame ===")
+    print(f"Update time: mean {ms.mean():.2f} ms, p95 {np.percentile(ms, 95):.2f} ms, "
+          f"max {ms.max():.2f} ms ({1000 / ms.mean():.0f} Hz)")
+    print(f"Particle filter: position RMSE {np.sqrt(np.mean(np.square(pf_err))):.3f} m, "
+          f"yaw error mean {np.degrees(np.mean(yaw_err)):.2f} deg, resampled {pf.resample_count} times")
+    print(f"Least-squares localizer: position RMSE {np.sqrt(np.mean(np.square(lsq_err))):.3f} m, "
+          f"update mean {np.mean(lsq_times) * 1000:.2f} ms")
+    print(f"Smoothing localizer: position RMSE {np.sqrt(np.mean(np.square(base_err))):.3f} m")
+    return ms, np.array(pf_err), np.array(base_err)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the particle filter localizer on a simulated walk")
+    parser.add_argument("--particles", type=int, default=5000, help="Number of particles")
+    parser.add_argument("--frames", type=int, default=600, help="Number of simulated frames (30 fps)")
+    parser.add_argument("--landmarks", type=int, default=60, help="Number of map landmarks")
+    parser.add_argument("--classes", type=int, default=6, help="Number of landmark classes")
+    parser.add_argument("--no-odometry", action="store_true", help="Run without motion input")
+    parser.add_argument("--global-init", action="store_true", help="Start from a uniform particle cloud")
+    args = parser.parse_args()
+
+    benchmark_particle_filter(args.particles, args.frames, args.landmarks, args.classes,
+                              use_odometry=not args.no_odometry, global_init=args.global_init)
@@ -1,66 +1,192 @@
 import argparse
 import numpy as np
-import matplotlib.pyplot as plt
 import wave
+import sys
 import os
 
-def evaluate_audio(wav_file, output_dir):
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from src.audio.wav_io import iter_wav_blocks, to_float
+from src.audio.stft import StreamingSTFT
+
+class BoundedSpectrogram:
+    """
+    Power spectrogram of a stream of any length in a fixed amount of memory.
+
+    Frames are averaged into at most `max_columns` columns. When the columns run out, every
+    pair of neighbouring columns is merged and each column covers twice as many frames, so
+    an hour-long recording ends up with the same memory (and plot width) as a short one.
+    """
+
+    def __init__(self, max_columns, channels, bins):
+        self.max_columns = max_columns - max_columns % 2
+        self.columns = np.zeros((self.max_columns, channels, bins), dtype=np.float32)
+        self.count = 0
+        self.frames_per_column = 1
+        self._partial = np.zeros((channels, bins), dtype=np.float64)
+        self._partial_frames = 0
+
+    def add(self, power):
+        """Adds frames x channels x bins power spectra."""
+        fpc = self.frames_per_column
+        i, n = 0, len(power)
+        while i < n:
+            if self._partial_frames == 0 and n - i >= fpc:
+                # Whole columns straight from the block
+                k = min((n - i) // fpc, self.max_columns - self.count)
+                if k == 0:
+                    self._halve()
+                    fpc = self.frames_per_column
+                    continue
+                self.columns[self.count:self.count + k] = power[i:i + k * fpc].reshape((k, fpc) + power.shape[1:]).mean(axis=1)
+                self.count += k
+                i += k * fpc
+                continue
+            take = min(fpc - self._partial_frames, n - i)
+            self._partial += power[i:i + take].sum(axis=0)
+            self._partial_frames += take
+            i += take
+            if self._partial_frames == fpc:
+                if self.count == self.max_columns:
+                    self._halve()
+                    fpc = self.frames_per_column
+                    # The partial column now only covers half of a wider column; keep accumulating
+                    continue
+                self.columns[self.count] = self._partial / fpc
+                self.count += 1
+                self._partial[:] = 0
+                self._partial_frames = 0
+
+    def _halve(self):
+        half = self.max_columns // 2
+        self.columns[:half] = (self.columns[0::2] + self.columns[1::2]) / 2
+        self.count = half
+        self.frames_per_column *= 2
+
+    def result(self):
+        """count x channels x bins average power per column."""
+        if self._partial_frames:
+            return np.concatenate([self.columns[:self.count], (self._partial / self._partial_frames)[None]])
+        return self.columns[:self.count]
+
+def save_spectrogram(spectrogram, framerate, duration, title, output_path):
+    """Plots one spectrogram panel per channel."""
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    channels = spectrogram.shape[1]
+    fig, axes = plt.subplots(channels, 1, figsize=(10, 2.5 * channels + 1.5), squeeze=False, sharex=True)
+    db = 10 * np.log10(spectrogram + 1e-12)
+    vmax = db.max() if db.size else 0.0
+    for ch, ax in enumerate(axes[:, 0]):
+        image = ax.imshow(db[:, ch].T, origin='lower', aspect='auto', cmap='inferno', vmin=vmax - 100, vmax=vmax,
+                          extent=[0, duration, 0, framerate / 2])
+        ax.set_ylabel(f"Ch {ch} (Hz)")
+        fig.colorbar(image, ax=ax, format='%+2.0f dB')
+    axes[0, 0].set_title(title)
+    axes[-1, 0].set_xlabel("Time (s)")
+    fig.savefig(output_path)
+    plt.close(fig)
+
+def evaluate_audio(wav_file, output_dir, chunk_seconds=1.0, nfft=1024, noverlap=512, max_columns=2000,
+                   clip_level=0.999, plot=True):
     """
     Evaluates audio quality and generates a spectrogram.
-    
+
+    The file is streamed in fixed-size chunks: RMS, peak and clipping statistics are
+    accumulated per channel (in float64, so squares of int16 samples cannot overflow), and a
+    multichannel STFT feeds a bounded spectrogram, so memory does not grow with the recording
+    length.
+
     Args:
         wav_file (str): Path to the .wav file.
         output_dir (str): Directory to save analysis results.
+        chunk_seconds (float): Seconds of audio read per chunk.
+        nfft (int): STFT frame length.
+        noverlap (int): STFT frame overlap.
+        max_columns (int): Maximum spectrogram columns kept in memory.
+        clip_level (float): Absolute sample level (full scale = 1) counted as clipped.
+        plot (bool): Save the spectrogram image.
+
+    Returns:
+        dict: Per-channel 'rms', 'rms_dbfs', 'peak', 'peak_dbfs', 'clipped' and 'clipped_ratio'
+              lists, plus 'channels', 'rate', 'frames', 'duration' and 'spectrogram' (image path),
+              or 'error' if the file could not be analysed.
     """
     if not os.path.exists(output_dir):
         os.makedirs(output_dir)
 
     try:
         with wave.open(wav_file, 'rb') as wf:
-            params = wf.getparams()
-            nchannels, sampwidth, framerate, nframes, comptype, compname = params
-            
+            nchannels, framerate, nframes = wf.getnchannels(), wf.getframerate(), wf.getnframes()
             print(f"Audio File: {wav_file}")
             print(f"Channels: {nchannels}, Rate: {framerate}, Frames: {nframes}")
-            
-            str_data = wf.readframes(nframes)
-            wave_data = np.frombuffer(str_data, dtype=np.int16)
-            
-            # Reshape if multiple channels
-            if nchannels > 1:
-                wave_data = wave_data.reshape(-1, nchannels)
-                # Analyze first channel for simplicity
-                channel_data = wave_data[:, 0]
-            else:
-                channel_data = wave_data
-                
-            # 1. Calculate RMS (Volume Level)
-            rms = np.sqrt(np.mean(channel_data**2))
-            print(f"RMS Level: {rms:.2f}")
-            
-            if rms < 100:
-                print("WARNING: Audio level is very low. Check microphone gain.")
-            
-            # 2. Generate Spectrogram
-            plt.figure(figsize=(10, 4))
-            plt.specgram(channel_data, Fs=framerate, NFFT=1024, noverlap=512, cmap='inferno')
-            plt.title(f"Spectrogram: {os.path.basename(wav_file)}")
-            plt.xlabel("Time (s)")
-            plt.ylabel("Frequency (Hz)")
-            plt.colorbar(format='%+2.0f dB')
-            
-            output_path = os.path.join(output_dir, f"{os.path.splitext(os.path.basename(wav_file))[0]}_spectrogram.png")
-            plt.savefig(output_path)
-            plt.close()
-            print(f"Saved spectrogram to {output_path}")
-            
+
+            sum_squares = np.zeros(nchannels, dtype=np.float64)
+            peak = np.zeros(nchannels, dtype=np.float64)
+            clipped = np.zeros(nchannels, dtype=np.int64)
+            total = 0
+            stft = StreamingSTFT(nfft, nfft - noverlap)
+            spectrogram = BoundedSpectrogram(max_columns, nchannels, nfft // 2 + 1)
+
+            for block in iter_wav_blocks(wf, max(int(chunk_seconds * framerate), nfft)):
+                samples = to_float(block)
+                sum_squares += np.einsum('ij,ij->j', samples, samples, dtype=np.float64)
+                magnitude = np.abs(samples)
+                peak = np.maximum(peak, magnitude.max(axis=0))
+                clipped += np.count_nonzero(magnitude >= clip_level, axis=0)
+                total += len(samples)
+                spectrogram.add(stft.power(block))
     except Exception as e:
         print(f"Error analyzing audio: {e}")
+        return {'file': wav_file, 'error': f"{type(e).__name__}: {e}"}
+
+    total = max(total, 1)
+    rms = np.sqrt(sum_squares / total)
+    rms_dbfs = 20 * np.log10(np.maximum(rms, 1e-10))
+    peak_dbfs = 20 * np.log10(np.maximum(peak, 1e-10))
+    for ch in range(nchannels):
+        print(f"Ch {ch}: RMS {rms_dbfs[ch]:6.1f} dBFS | peak {peak_dbfs[ch]:6.1f} dBFS | "
+              f"clipped {clipped[ch]} samples ({clipped[ch] / total * 100:.3f}%)")
+
+    # Same threshold as 100 (int16 units) before
+    if rms.max() < 100 / 32768:
+        print("WARNING: Audio level is very low. Check microphone gain.")
+    if clipped.max() > 0:
+        print("WARNING: Clipping detected. Reduce microphone gain.")
+
+    result = {
+        'file': wav_file,
+        'channels': nchannels,
+        'rate': framerate,
+        'frames': total,
+        'duration': total / framerate,
+        'rms': rms.tolist(),
+        'rms_dbfs': rms_dbfs.tolist(),
+        'peak': peak.tolist(),
+        'peak_dbfs': peak_dbfs.tolist(),
+        'clipped': clipped.tolist(),
+        'clipped_ratio': (clipped / total).tolist(),
+        'spectrogram': None,
+    }
+    if plot:
+        output_path = os.path.join(output_dir, f"{os.path.splitext(os.path.basename(wav_file))[0]}_spectrogram.png")
+        save_spectrogram(spectrogram.result(), framerate, total / framerate,
+                         f"Spectrogram: {os.path.basename(wav_file)}", output_path)
+        result['spectrogram'] = output_path
+        print(f"Saved spectrogram to {output_path} ({spectrogram.frames_per_column} STFT frames per column)")
+    return result
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Evaluate Audio Quality")
     parser.add_argument("wav_file", help="Path to input .wav file")
     parser.add_argument("--output", default="analysis_results", help="Output directory")
+    parser.add_argument("--chunk-seconds", type=float, default=1.0, help="Seconds of audio read per chunk")
+    parser.add_argument("--max-columns", type=int, default=2000,
+                        help="Maximum spectrogram columns kept in memory (longer files are averaged down)")
+    parser.add_argument("--no-plot", action="store_true", help="Only print statistics")
     args = parser.parse_args()
-    
-    evaluate_audio(args.wav_file, args.output)
+
+    evaluate_audio(args.wav_file, args.output, args.chunk_seconds, max_columns=args.max_columns,
+                   plot=not args.no_plot)
@@ -12,6 +12,9 @@ def export_for_yolo(bag_file, output_dir, interval=30):
         bag_file (str): Path to the .bag file.
         output_dir (str): Directory to save images.
         interval (int): Frame interval to save (e.g., every 30 frames).
+
+    Returns:
+        dict: 'frames' read and 'saved' images.
     """
     if not os.path.exists(output_dir):
         os.makedirs(output_dir)
@@ -48,6 +51,7 @@ def export_for_yolo(bag_file, output_dir, interval=30):
         pipeline.stop()
         
     print(f"Export Complete. Saved {saved_count} images to {output_dir}")
+    return {'frames': frame_count, 'saved': saved_count}
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Export Frames for YOLO Annotation")
@@ -2,10 +2,17 @@ import pyrealsense2 as rs
 import numpy as np
 import cv2
 import argparse
+import sys
 import os
-from ultralytics import YOLO
 
-def multimodal_eval(bag_file, model_path, output_dir):
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from src.sensors.depth_aligner import aligner_from_profile
+from src.sensors.frame_source import ArrayDepthFrame
+from src.vision.inference_backend import create_backend
+from src.vision.ground_plane import GroundPlaneEstimator
+
+def multimodal_eval(bag_file, model_path, output_dir, numpy_align=False, backend='torch', int8=False):
     """
     Evaluates Single Modal (RGB, Depth) vs Multi-modal Fusion.
     
@@ -13,12 +20,19 @@ def multimodal_eval(bag_file, model_path, output_dir):
         bag_file (str): Path to the .bag file.
         model_path (str): Path to YOLO model.
         output_dir (str): Directory to save analysis results.
+        numpy_align (bool): Use the cached NumPy DepthAligner instead of rs.align.
+        backend (str): Inference runtime: 'torch', 'onnx' or 'openvino'.
+        int8 (bool): Use an INT8-quantized export (onnx/openvino).
+
+    Returns:
+        dict: 'frames', 'rgb_detections', 'fusion_confirmations', 'fusion_rate' (percent, None
+              without detections), 'depth_obstacle_frames' and 'floor_only_frames'.
     """
     if not os.path.exists(output_dir):
         os.makedirs(output_dir)
 
     # Load Model
-    model = YOLO(model_path)
+    model = create_backend(model_path, backend, int8)
     
     # Setup RealSense
     pipeline = rs.pipeline()
@@ -29,7 +43,10 @@ def multimodal_eval(bag_file, model_path, output_dir):
     
     profile = pipeline.start(config)
     align = rs.align(rs.stream.color)
+    aligner = aligner_from_profile(profile) if numpy_align else None
     intrinsics = profile.get_stream(rs.stream.color).as_video_stream_profile().get_intrinsics()
+    depth_scale = profile.get_device().first_depth_sensor().get_depth_scale()
+    ground = GroundPlaneEstimator(intrinsics, depth_scale)
 
     frame_count = 0
     
@@ -37,34 +54,32 @@ def multimodal_eval(bag_file, model_path, output_dir):
     rgb_detections = 0
     fusion_confirmations = 0
     depth_only_candidates = 0 # Hypothetical (objects with depth but no RGB class)
+    floor_only_frames = 0 # Frames that only passed the pixel threshold because of the floor
     
     try:
         while True:
             frames = pipeline.wait_for_frames()
-            aligned_frames = align.process(frames)
+            if aligner is None:
+                frames = align.process(frames)
             
-            color_frame = aligned_frames.get_color_frame()
-            depth_frame = aligned_frames.get_depth_frame()
+            color_frame = frames.get_color_frame()
+            depth_frame = frames.get_depth_frame()
             
             if not color_frame or not depth_frame:
                 continue
                 
             color_image = np.asanyarray(color_frame.get_data())
             depth_image = np.asanyarray(depth_frame.get_data())
+            if aligner is not None:
+                depth_image = aligner.align(depth_image)
+                depth_frame = ArrayDepthFrame(depth_image, aligner.depth_scale)
             
             # --- 1. RGB Single Modal Eval ---
-            results = model(color_image, verbose=False)
-            
             current_frame_detections = []
             
-            for result in results:
-                for box in result.boxes:
-                    cls_id = int(box.cls[0])
-                    conf = float(box.conf[0])
-                    x1, y1, x2, y2 = map(int, box.xyxy[0])
-                    
-                    rgb_detections += 1
-                    current_frame_detections.append((x1, y1, x2, y2, conf, model.names[cls_id]))
+            for x1, y1, x2, y2, conf, cls_id in model.detect(color_image):
+                rgb_detections += 1
+                current_frame_detections.append((x1, y1, x2, y2, conf, model.names[cls_id]))
             
             # --- 2. Multi-modal Fusion Eval (RGB + Depth) ---
             # Check if detected objects have valid depth
@@ -85,10 +100,16 @@ def multimodal_eval(bag_file, model_path, output_dir):
             # Simple obstacle detection: count pixels in close range
             # This is just a proxy metric for "Depth sees something"
             depth_mask = (depth_image > 100) & (depth_image < 2000) # 10cm to 2m
+            raw_pixel_count = np.count_nonzero(depth_mask)
+            # Remove the floor so it does not count as an obstacle
+            ground.update(depth_image)
+            depth_mask &= ground.above_ground_mask(depth_image)
             depth_pixel_count = np.count_nonzero(depth_mask)
             
             if depth_pixel_count > 10000: # Arbitrary threshold for "Obstacle Present"
                 depth_only_candidates += 1
+            elif raw_pixel_count > 10000:
+                floor_only_frames += 1
             
             # Visualization
             if frame_count % 30 == 0:
@@ -108,16 +129,30 @@ def multimodal_eval(bag_file, model_path, output_dir):
     print(f"Total Frames: {frame_count}")
     print(f"RGB Detections: {rgb_detections}")
     print(f"Fusion Confirmations (Valid Depth): {fusion_confirmations}")
-    if rgb_detections > 0:
-        print(f"Fusion Confirmation Rate: {(fusion_confirmations/rgb_detections)*100:.2f}%")
-    print(f"Frames with Depth Obstacles: {depth_only_candidates}")
+    fusion_rate = (fusion_confirmations / rgb_detections) * 100 if rgb_detections > 0 else None
+    if fusion_rate is not None:
+        print(f"Fusion Confirmation Rate: {fusion_rate:.2f}%")
+    print(f"Frames with Depth Obstacles: {depth_only_candidates} "
+          f"(+{floor_only_frames} frames where only the floor was in close range)")
     print("Conclusion: Fusion filters out objects with invalid depth (potential false positives or out of range).")
 
+    return {
+        'frames': frame_count,
+        'rgb_detections': rgb_detections,
+        'fusion_confirmations': fusion_confirmations,
+        'fusion_rate': fusion_rate,
+        'depth_obstacle_frames': depth_only_candidates,
+        'floor_only_frames': floor_only_frames,
+    }
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Multimodal Evaluation")
     parser.add_argument("bag_file", help="Path to input .bag file")
     parser.add_argument("--model", default="yolov8n.pt", help="Path to YOLO model")
     parser.add_argument("--output", default="eval_results", help="Output directory")
+    parser.add_argument("--numpy-align", action="store_true", help="Use the NumPy DepthAligner instead of rs.align")
+    parser.add_argument("--backend", choices=["torch", "onnx", "openvino"], default="torch", help="Inference runtime")
+    parser.add_argument("--int8", action="store_true", help="Use an INT8-quantized model (onnx/openvino)")
     args = parser.parse_args()
     
-    multimodal_eval(args.bag_file, args.model, args.output)
+    multimodal_eval(args.bag_file, args.model, args.output, args.numpy_align, args.backend, args.int8)
@@ -0,0 +1,156 @@
+import numpy as np
+
+from src.audio.wav_io import to_float
+
+SPEED_OF_SOUND = 343.0
+
+# ReSpeaker USB Mic Array v2.0: the four raw microphones (channels 1-4 of the 6-channel
+# firmware) sit on a square with an 81.3 mm diagonal, rotated 45 degrees to the board edges
+RESPEAKER_V2_MIC_POSITIONS = 0.0406 * np.array([[np.cos(a), np.sin(a), 0.0]
+                                                for a in np.radians([45.0, 135.0, 225.0, 315.0])])
+
+def gcc_phat(spectra, pairs, n_fft, interp=1, band=None, eps=1e-12):
+    """
+    PHAT-weighted cross-correlations of all microphone pairs in one batched inverse FFT.
+
+    Args:
+        spectra (numpy.ndarray): channels x (n_fft // 2 + 1) rfft of one block.
+        pairs (numpy.ndarray): P x 2 channel indices (i, j).
+        n_fft (int): FFT size of `spectra`.
+        interp (int): Lag upsampling factor (zero-padded inverse FFT).
+        band (numpy.ndarray, optional): Boolean mask of the frequency bins to use.
+
+    Returns:
+        numpy.ndarray: P x (n_fft * interp) correlations. Index k holds lag k / interp samples
+                       of channel i behind channel j; negative lags wrap around from the end.
+    """
+    cross = spectra[pairs[:, 0]] * np.conj(spectra[pairs[:, 1]])
+    cross /= np.abs(cross) + eps
+    if band is not None:
+        cross[:, ~band] = 0
+    return np.fft.irfft(cross, n=n_fft * interp, axis=1)
+
+def tdoa_gcc_phat(block, pairs, sample_rate, max_tau=None, interp=16):
+    """
+    Time differences of arrival of microphone pairs from their GCC-PHAT peaks.
+
+    Args:
+        block (numpy.ndarray): N x channels samples.
+        pairs (array-like): P x 2 channel indices (i, j).
+        sample_rate (int): Sample rate (Hz).
+        max_tau (float, optional): Largest physically possible delay (s) to search.
+        interp (int): Lag upsampling factor.
+
+    Returns:
+        numpy.ndarray: Delay (s) of channel i behind channel j for every pair.
+    """
+    pairs = np.asarray(pairs)
+    n = len(block)
+    spectra = np.fft.rfft(to_float(block).T, n=2 * n, axis=1)
+    cc = gcc_phat(spectra, pairs, 2 * n, interp)
+    max_shift = n * interp if max_tau is None else min(int(interp * sample_rate * max_tau), n * interp)
+    lags = np.arange(-max_shift, max_shift + 1)
+    shift = lags[np.argmax(cc[:, lags], axis=1)]
+    return shift / float(interp * sample_rate)
+
+
+class DOAEstimator:
+    """
+    Azimuth of the dominant sound source from one multichannel block (SRP-PHAT).
+
+    Every block is windowed and transformed with one rfft for all channels; the PHAT-weighted
+    cross-correlations of all microphone pairs come from one batched inverse FFT (GCC-PHAT).
+    The steered response power of each candidate azimuth is the sum of the pair correlations
+    at that azimuth's expected delays, gathered with precomputed lag indices and interpolation
+    weights, so a block costs two FFTs and one gather regardless of the angular resolution.
+
+    Azimuths are in degrees in [0, 360), counter-clockwise from the array's +x axis.
+    """
+
+    def __init__(self, mic_positions=RESPEAKER_V2_MIC_POSITIONS, sample_rate=16000, n_fft=1024,
+                 resolution_deg=1.0, interp=4, min_freq=300.0, max_freq=4000.0, min_rms=1e-3,
+                 smoothing=0.5, speed_of_sound=SPEED_OF_SOUND):
+        """
+        Args:
+            mic_positions (array-like): M x 3 (or M x 2) microphone positions in meters.
+            sample_rate (int): Sample rate (Hz).
+            n_fft (int): Samples per analysed block.
+            resolution_deg (float): Spacing of the candidate azimuths.
+            interp (int): Lag upsampling factor of the cross-correlations.
+            min_freq (float): Lowest frequency (Hz) used (below it the array cannot resolve direction).
+            max_freq (float): Highest frequency (Hz) used (spatial aliasing, speech band).
+            min_rms (float): Blocks quieter than this (full scale = 1) keep the previous estimate.
+            smoothing (float): Weight of the new block in the smoothed power map (1 = no smoothing).
+            speed_of_sound (float): Speed of sound (m/s).
+        """
+        positions = np.asarray(mic_positions, dtype=np.float64)
+        if positions.shape[1] == 2:
+            positions = np.hstack([positions, np.zeros((len(positions), 1))])
+        self.mic_positions = positions
+        self.sample_rate = sample_rate
+        self.n_fft = n_fft
+        self.interp = interp
+        self.min_rms = min_rms
+        self.smoothing = smoothing
+
+        self.pairs = np.array([(i, j) for i in range(len(positions)) for j in range(i + 1, len(positions))])
+        self.window = np.hanning(n_fft).astype(np.float32)
+        freqs = np.fft.rfftfreq(2 * n_fft, 1.0 / sample_rate)
+        self.band = (freqs >= min_freq) & (freqs <= max_freq)
+
+        self.azimuths = np.arange(0.0, 360.0, resolution_deg)
+        angles = np.radians(self.azimuths)
+        directions = np.stack([np.cos(angles), np.sin(angles), np.zeros_like(angles)], axis=1)
+        # A far-field source in direction u reaches mic m (p_m . u) / c early,
+        # so channel i lags channel j by (p_j - p_i) . u / c
+        baselines = positions[self.pairs[:, 1]] - positions[self.pairs[:, 0]]
+        lags = (baselines @ directions.T) / speed_of_sound * sample_rate * interp
+        size = 2 * n_fft * interp
+        lower = np.floor(lags)
+        self._weight = (lags - lower).astype(np.float32)
+        rows = np.arange(len(self.pairs))[:, None] * size
+        self._lower = rows + np.mod(lower, size).astype(np.int64)
+        self._upper = rows + np.mod(lower + 1, size).astype(np.int64)
+        # A fully coherent pair peaks at 2 * (band bins) / size after the inverse FFT; scale that to 1
+        self._scale = size / (2.0 * max(np.count_nonzero(self.band), 1))
+
+        self.power = None
+        self.direction = None
+        self.confidence = 0.0
+        self.blocks = 0
+
+    def steered_power(self, block):
+        """SRP-PHAT power of every candidate azimuth for one N x M block (None if too quiet)."""
+        samples = to_float(block[-self.n_fft:])
+        if np.sqrt(np.mean(samples * samples)) < self.min_rms:
+            return None
+        samples = samples - samples.mean(axis=0)
+        window = self.window if len(samples) == self.n_fft else np.hanning(len(samples)).astype(np.float32)
+        spectra = np.fft.rfft(samples.T * window, n=2 * self.n_fft, axis=1)
+        cc = gcc_phat(spectra, self.pairs, 2 * self.n_fft, self.interp, self.band).ravel()
+        # Linear interpolation between the two lags around each expected delay, summed over pairs
+        power = cc[self._lower] * (1 - self._weight) + cc[self._upper] * self._weight
+        return power.sum(axis=0) * self._scale
+
+    def estimate(self, block):
+        """
+        Updates the estimate with one block.
+
+        Args:
+            block (numpy.ndarray): N x M samples of the microphones in `mic_positions` order.
+
+        Returns:
+            float: Current azimuth in degrees, or None before the first loud enough block.
+        """
+        power = self.steered_power(block)
+        if power is None:
+            return self.direction
+        if self.power is None:
+            self.power = power
+        else:
+            self.power = (1 - self.smoothing) * self.power + self.smoothing * power
+        best = int(np.argmax(self.power))
+        self.direction = float(self.azimuths[best])
+        self.confidence = float(self.power[best] / len(self.pairs))
+        self.blocks += 1
+        return self.direction
@@ -0,0 +1,111 @@
+from collections import deque
+
+import numpy as np
+
+from src.audio.stft import StreamingSTFT
+
+def hz_to_mel(hz):
+    return 2595.0 * np.log10(1.0 + np.asarray(hz) / 700.0)
+
+def mel_to_hz(mel):
+    return 700.0 * (10.0 ** (np.asarray(mel) / 2595.0) - 1.0)
+
+def mel_filterbank(sample_rate, n_fft, n_mels=40, fmin=50.0, fmax=None):
+    """
+    Triangular mel filters (HTK mel scale), each normalized to unit area.
+
+    Returns:
+        numpy.ndarray: n_mels x (n_fft // 2 + 1) float32 weights.
+    """
+    fmax = sample_rate / 2.0 if fmax is None else fmax
+    freqs = np.fft.rfftfreq(n_fft, 1.0 / sample_rate)
+    edges = mel_to_hz(np.linspace(hz_to_mel(fmin), hz_to_mel(fmax), n_mels + 2))
+    lower, center, upper = edges[:-2, None], edges[1:-1, None], edges[2:, None]
+    rising = (freqs - lower) / (center - lower)
+    falling = (upper - freqs) / (upper - center)
+    weights = np.maximum(0.0, np.minimum(rising, falling))
+    weights *= 2.0 / (upper - lower)
+    return weights.astype(np.float32)
+
+def dct_matrix(n_out, n_in):
+    """Orthonormal DCT-II matrix (n_out x n_in), so mfcc = log_mel @ dct.T."""
+    k = np.arange(n_out)[:, None]
+    n = np.arange(n_in)[None, :]
+    dct = np.cos(np.pi / n_in * (n + 0.5) * k) * np.sqrt(2.0 / n_in)
+    dct[0] /= np.sqrt(2.0)
+    return dct.astype(np.float32)
+
+
+class AudioFeatureExtractor:
+    """
+    Log-mel and MFCC features of a streaming audio signal, and a compact signature of the
+    last few seconds for matching against landmark audio signatures.
+
+    Blocks of any size are fed to a StreamingSTFT; the mel projection and the DCT are one
+    matrix product each over all frames completed by the block. The signature is the mean
+    and standard deviation of MFCCs 1..n_mfcc-1 over a sliding window (c0, the loudness, is
+    left out so the distance to the source does not matter), L2-normalized so nearest
+    neighbours can be found by a dot product.
+    """
+
+    def __init__(self, sample_rate=16000, n_fft=512, hop=256, n_mels=40, n_mfcc=13, fmin=50.0, fmax=None,
+                 channel=0, window_seconds=1.0):
+        """
+        Args:
+            sample_rate (int): Sample rate (Hz).
+            n_fft (int): STFT frame length.
+            hop (int): STFT hop.
+            n_mels (int): Mel bands.
+            n_mfcc (int): Cepstral coefficients (including c0).
+            fmin (float): Lowest mel band edge (Hz).
+            fmax (float, optional): Highest mel band edge (Hz), default Nyquist.
+            channel (int, optional): Channel to analyse (0 = the ReSpeaker's processed output);
+                                     None averages all channels.
+            window_seconds (float): Length of the signature window.
+        """
+        self.sample_rate = sample_rate
+        self.n_mfcc = n_mfcc
+        self.channel = channel
+        self.stft = StreamingSTFT(n_fft, hop)
+        self.mel = mel_filterbank(sample_rate, n_fft, n_mels, fmin, fmax)
+        self.dct = dct_matrix(n_mfcc, n_mels)
+        self._history = deque(maxlen=max(2, int(round(window_seconds * sample_rate / hop))))
+
+    @property
+    def dimension(self):
+        return 2 * (self.n_mfcc - 1)
+
+    def feed(self, block):
+        """
+        Args:
+            block (numpy.ndarray): N x channels (or N) samples.
+
+        Returns:
+            tuple: (frames x n_mels log-mel energies, frames x n_mfcc MFCCs) of the frames
+                   completed by this block.
+        """
+        block = np.asarray(block)
+        if block.ndim == 1:
+            block = block[:, None]
+        elif self.channel is not None:
+            block = block[:, self.channel:self.channel + 1]
+        power = self.stft.power(block).mean(axis=1)
+        log_mel = np.log(power @ self.mel.T + 1e-10)
+        mfcc = log_mel @ self.dct.T
+        self._history.extend(mfcc[:, 1:])
+        return log_mel, mfcc
+
+    def embedding(self):
+        """Signature of the last `window_seconds` of audio (None until two frames were seen)."""
+        if len(self._history) < 2:
+            return None
+        frames = np.array(self._history)
+        vector = np.concatenate([frames.mean(axis=0), frames.std(axis=0)])
+        return vector / max(float(np.linalg.norm(vector)), 1e-12)
+
+    def signature(self):
+        """The current embedding in the form stored as a landmark's audio_signature."""
+        vector = self.embedding()
+        if vector is None:
+            return None
+        return {'embedding': [round(float(v), 5) for v in vector], 'kind': 'mfcc_stats'}
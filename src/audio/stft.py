@@ -0,0 +1,51 @@
+import numpy as np
+
+from src.audio.wav_io import to_float
+
+class StreamingSTFT:
+    """
+    Short-time Fourier transform of a multichannel stream fed in blocks of any size.
+
+    Samples that do not yet fill a whole frame are carried over to the next block, so the
+    frames are exactly those of a single STFT over the whole stream. All frames of a block
+    and all channels are transformed with one windowed rfft over a strided frame view.
+    """
+
+    def __init__(self, n_fft=1024, hop=512, window=None):
+        """
+        Args:
+            n_fft (int): Frame length (samples).
+            hop (int): Samples between frame starts.
+            window (numpy.ndarray, optional): Analysis window (default Hann).
+        """
+        self.n_fft = n_fft
+        self.hop = hop
+        self.window = (np.hanning(n_fft) if window is None else np.asarray(window)).astype(np.float32)
+        self._tail = None
+        self.frames = 0
+
+    def feed(self, block):
+        """
+        Args:
+            block (numpy.ndarray): N x channels samples (integer PCM or float).
+
+        Returns:
+            numpy.ndarray: frames x channels x (n_fft // 2 + 1) complex spectra of the frames
+                           completed by this block (possibly zero frames).
+        """
+        samples = to_float(block)
+        if self._tail is not None and len(self._tail):
+            samples = np.concatenate([self._tail, samples])
+        count = 0 if len(samples) < self.n_fft else (len(samples) - self.n_fft) // self.hop + 1
+        self._tail = samples[count * self.hop:]
+        if count == 0:
+            return np.zeros((0, samples.shape[1], self.n_fft // 2 + 1), dtype=np.complex64)
+        # frames x channels x n_fft view, no copy
+        view = np.lib.stride_tricks.sliding_window_view(samples, self.n_fft, axis=0)[::self.hop][:count]
+        self.frames += count
+        return np.fft.rfft(view * self.window, axis=-1).astype(np.complex64)
+
+    def power(self, block):
+        """Power spectra (|X|^2) of the frames completed by `block`."""
+        spectra = self.feed(block)
+        return spectra.real ** 2 + spectra.imag ** 2
@@ -0,0 +1,54 @@
+import numpy as np
+
+# Sample width (bytes) -> NumPy dtype of the decoded samples
+SAMPLE_DTYPES = {1: np.uint8, 2: np.int16, 3: np.int32, 4: np.int32}
+
+def decode_frames(data, sampwidth, nchannels):
+    """
+    Decodes raw PCM WAV frames.
+
+    Args:
+        data (bytes): Interleaved frames as returned by wave.readframes.
+        sampwidth (int): Bytes per sample (1, 2, 3 or 4).
+        nchannels (int): Number of channels.
+
+    Returns:
+        numpy.ndarray: N x nchannels samples (24-bit samples are widened to int32).
+    """
+    if sampwidth not in SAMPLE_DTYPES:
+        raise ValueError(f"Unsupported sample width: {sampwidth} bytes")
+    if sampwidth == 3:
+        raw = np.frombuffer(data, dtype=np.uint8).reshape(-1, 3).astype(np.int32)
+        samples = raw[:, 0] | (raw[:, 1] << 8) | (raw[:, 2] << 16)
+        samples = np.where(samples >= 1 << 23, samples - (1 << 24), samples)
+        # Keep full int32 scale so to_float treats every width the same
+        samples = samples << 8
+    else:
+        samples = np.frombuffer(data, dtype=SAMPLE_DTYPES[sampwidth])
+    return samples.reshape(-1, nchannels)
+
+def to_float(samples):
+    """Samples as float32 in [-1, 1] (integer PCM is divided by its full scale)."""
+    if samples.dtype == np.uint8:
+        return (samples.astype(np.float32) - 128) / 128
+    if np.issubdtype(samples.dtype, np.integer):
+        return samples.astype(np.float32) / np.float32(-np.iinfo(samples.dtype).min)
+    return samples.astype(np.float32, copy=False)
+
+def iter_wav_blocks(wf, block_size):
+    """
+    Reads an open WAV file block by block.
+
+    Args:
+        wf (wave.Wave_read): Open WAV file.
+        block_size (int): Frames per block (the last block may be shorter).
+
+    Yields:
+        numpy.ndarray: block_size x channels decoded samples.
+    """
+    nchannels, sampwidth = wf.getnchannels(), wf.getsampwidth()
+    while True:
+        data = wf.readframes(block_size)
+        if not data:
+            return
+        yield decode_frames(data, sampwidth, nchannels)
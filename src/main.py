@@ -1,76 +1,346 @@
 import cv2
+import numpy as np
 import time
 import argparse
+import threading
 import sys
 import os
 
 # Add src to path
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 
-from src.sensors.realsense_driver import RealSenseDriver
+from src.sensors.frame_source import create_frame_source, scale_intrinsics
 from src.sensors.respeaker_driver import RespeakerDriver
 from src.vision.landmark_detector import LandmarkDetector
 from src.map.map_manager import MapManager
+from src.vision.obstacle_map import ObstacleMap
+from src.vision.ground_plane import GroundPlaneEstimator
 from src.navigation.localizer import Localizer
+from src.navigation.particle_filter import ParticleFilterLocalizer
+from src.utils.pipeline import StageWorker, SourceWorker, LatestValue, RateMeter, make_queue
+from src.utils.profiling import StageProfiler
+from src.utils.run_log import RunLogger
+from src.utils.time_sync import TimeSync
+
+# Stages shown in the latency HUD line
+HUD_STAGES = ('capture', 'align', 'detect', 'inference', 'obstacles', 'localize', 'render', 'frame')
 
 def main():
     parser = argparse.ArgumentParser(description="Multimodal Navigation System")
-    parser.add_argument("--map", type=str, default="map.json", help="Path to the map file")
+    parser.add_argument("--map", type=str, default="map.json",
+                        help="Path to the map file (.json or .navmap) or tiled map directory")
+    parser.add_argument("--tile-memory", type=float, default=64.0,
+                        help="Memory budget (MB) of resident tiles when --map is a tiled map directory")
     parser.add_argument("--model", type=str, default="yolov8n.pt", help="Path to YOLO model")
+    parser.add_argument("--source", choices=["camera", "bag", "npz", "synthetic"], default="camera",
+                        help="Frame source: live camera, .bag playback, directory of .npz frames or synthetic")
+    parser.add_argument("--input", type=str, default=None, help="Path to the .bag file or frame directory")
+    parser.add_argument("--rate", type=float, default=0,
+                        help="Replay rate in fps for recorded/synthetic sources (0 = as fast as possible)")
+    parser.add_argument("--num-frames", type=int, default=None, help="Number of frames for the synthetic source")
+    parser.add_argument("--threaded-capture", action="store_true",
+                        help="Capture and align frames on a background thread")
+    parser.add_argument("--capture-policy", choices=["latest", "all"], default="latest",
+                        help="Ring buffer policy for threaded capture")
+    parser.add_argument("--buffer-size", type=int, default=4, help="Ring buffer size for threaded capture")
+    parser.add_argument("--align", choices=["rs", "numpy", "numpy_half", "lazy"], default="rs",
+                        help="Depth-to-color alignment: rs.align, the cached NumPy reprojection, "
+                             "or lazy ROI-only alignment of the detected boxes")
+    parser.add_argument("--depth-mode", choices=["robust", "center"], default="robust",
+                        help="Landmark depth: batched median over each box, or the single center pixel")
+    parser.add_argument("--keyframe-interval", type=int, default=1,
+                        help="Run YOLO every N frames and track boxes in between (1 = every frame)")
+    parser.add_argument("--scene-change", type=float, default=None,
+                        help="Also run YOLO when the scene changes by more than this (mean abs. diff, 0-255)")
+    parser.add_argument("--backend", choices=["torch", "onnx", "openvino"], default="torch",
+                        help="Inference runtime (onnx/openvino models are exported and cached on first use)")
+    parser.add_argument("--int8", action="store_true", help="Use an INT8-quantized model (onnx/openvino)")
+    parser.add_argument("--localizer", choices=["smoothing", "lsq", "particle"], default="smoothing",
+                        help="Position estimator: per-landmark exponential smoothing, single-frame least-squares "
+                             "pose fix with global data association, or the particle filter (x, z, yaw)")
+    parser.add_argument("--particles", type=int, default=5000, help="Number of particles for --localizer particle")
+    parser.add_argument("--obstacles", action="store_true",
+                        help="Build an obstacle occupancy grid from the aligned depth and show the nearest obstacle")
+    parser.add_argument("--camera-height", type=float, default=1.2,
+                        help="Camera height above the floor (m), for obstacle detection without --ground-plane")
+    parser.add_argument("--ground-plane", action="store_true",
+                        help="Track the floor plane (RANSAC) instead of assuming a level camera at --camera-height")
+    parser.add_argument("--audio", choices=["mock", "device", "wav"], default="mock",
+                        help="DOA source: constant mock, live ReSpeaker capture, or a multichannel WAV recording")
+    parser.add_argument("--audio-input", type=str, default=None, help="Path to the WAV file for --audio wav")
+    parser.add_argument("--pipelined", action="store_true",
+                        help="Run capture, detection and localization as separate pipelined stages")
+    parser.add_argument("--profile", action="store_true",
+                        help="Time every stage and print p50/p95/p99 latencies on exit")
+    parser.add_argument("--profile-out", type=str, default=None,
+                        help="Periodically write stage latencies to this .csv (appended) or .json (snapshot) file")
+    parser.add_argument("--profile-interval", type=float, default=10.0, help="Seconds between latency dumps")
+    parser.add_argument("--hud", action="store_true", help="Show per-stage p50/p95 latencies on screen")
+    parser.add_argument("--headless", action="store_true",
+                        help="Run without any window (for CI/replay machines); combine with --source bag/npz "
+                             "and --rate (0 = as fast as possible, recording fps = real time)")
+    parser.add_argument("--log", type=str, default=None,
+                        help="Write per-frame landmarks, poses and stage timings to this .jsonl file")
     args = parser.parse_args()
 
+    profiler = StageProfiler(enabled=args.profile or args.hud or args.profile_out is not None,
+                             dump_path=args.profile_out, dump_interval=args.profile_interval)
+
     # Initialize components
-    rs_driver = RealSenseDriver()
-    audio_driver = RespeakerDriver()
-    map_manager = MapManager(args.map)
-    detector = LandmarkDetector(args.model)
-    localizer = Localizer(map_manager)
+    source_kwargs = {}
+    if args.source in ("camera", "bag"):
+        source_kwargs = dict(threaded=args.threaded_capture, buffer_size=args.buffer_size,
+                             policy=args.capture_policy, align_mode=args.align)
+    elif args.source == "synthetic":
+        source_kwargs = dict(num_frames=args.num_frames)
+    frame_source = create_frame_source(args.source, args.input, fps=args.rate or None, **source_kwargs)
+    frame_source.profiler = profiler
+    # Common clock for camera frames, raw audio and audio estimates
+    time_sync = TimeSync()
+    frame_source.time_sync = time_sync
+    audio_driver = RespeakerDriver(args.audio, args.audio_input, time_sync=time_sync)
+    map_manager = MapManager(args.map, tile_memory_mb=args.tile_memory)
+    detector = LandmarkDetector(args.model, depth_mode=args.depth_mode, keyframe_interval=args.keyframe_interval,
+                                scene_change_threshold=args.scene_change, backend=args.backend, int8=args.int8,
+                                profiler=profiler)
+    if args.localizer == "particle":
+        localizer = ParticleFilterLocalizer(map_manager, num_particles=args.particles)
+    else:
+        localizer = Localizer(map_manager, method="lsq" if args.localizer == "lsq" else "smoothing")
+    run_log = RunLogger(args.log, config=vars(args)) if args.log else None
+    if run_log is not None and args.threaded_capture and args.capture_policy == 'latest':
+        print("Warning: --log with --capture-policy latest only logs the frames the capture buffer "
+              "delivers; use --capture-policy all to log every frame.")
 
+    start_time = None
     try:
-        rs_driver.start()
+        frame_source.start()
         audio_driver.start()
         
-        intrinsics = rs_driver.get_intrinsics()
-        
-        print("System started. Press 'q' to exit.")
+        intrinsics = frame_source.get_intrinsics()
+        obstacle_map = None
+        if args.obstacles:
+            depth_scale = frame_source.get_depth_scale()
+            ground = GroundPlaneEstimator(intrinsics, depth_scale) if args.ground_plane else None
+            obstacle_map = ObstacleMap(intrinsics, depth_scale, camera_height=args.camera_height, ground_estimator=ground)
         
-        while True:
-            # 1. Capture Sensors
-            color, depth, depth_frame = rs_driver.get_frames()
-            if color is None:
-                continue
-                
-            doa = audio_driver.get_direction()
-            
-            # 2. Detect Landmarks
-            landmarks = detector.detect(color, depth_frame, intrinsics)
-            
-            # 3. Update Localization
-            current_pos = localizer.update(landmarks)
-            
-            # 4. Visualization / Feedback
-            # Draw landmarks on color image
-            for lm in landmarks:
-                x1, y1, x2, y2 = lm['bbox']
-                cv2.rectangle(color, (x1, y1), (x2, y2), (0, 255, 0), 2)
-                cv2.putText(color, f"{lm['class']} {lm['position'][2]:.2f}m", (x1, y1 - 10),
-                            cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 2)
-            
-            # Display Status
-            cv2.putText(color, f"Pos: {current_pos}", (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 255), 2)
-            cv2.putText(color, f"DOA: {doa}", (10, 60), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 0, 0), 2)
-            
-            cv2.imshow("Navigation System", color)
-            
-            if cv2.waitKey(1) & 0xFF == ord('q'):
-                break
+        print("System started. " + ("Running headless." if args.headless else "Press 'q' to exit."))
+        start_time = time.perf_counter()
+
+        run = run_pipelined if args.pipelined else run_sequential
+        run(frame_source, audio_driver, detector, localizer, intrinsics, profiler,
+            hud=args.hud, headless=args.headless, run_log=run_log, obstacle_map=obstacle_map)
                 
     except Exception as e:
         print(f"Error: {e}")
     finally:
-        rs_driver.stop()
+        elapsed = time.perf_counter() - start_time if start_time else 0.0
+        if elapsed > 0:
+            print(f"Processed {frame_source.frame_index} frames in {elapsed:.1f}s "
+                  f"({frame_source.frame_index / elapsed:.1f} fps).")
+        profiler.report()
+        profiler.dump()
+        if run_log is not None:
+            run_log.close({'latency': profiler.summary()} if profiler.enabled else None)
+        frame_source.stop()
         audio_driver.stop()
-        cv2.destroyAllWindows()
+        map_manager.close()
+        if not args.headless:
+            cv2.destroyAllWindows()
+
+def draw_overlay(color, landmarks, current_pos, doa, status=None, hud=None, obstacles=None):
+    """Draws landmarks and system status on the color image."""
+    # Draw landmarks on color image
+    for lm in landmarks:
+        x1, y1, x2, y2 = lm['bbox']
+        cv2.rectangle(color, (x1, y1), (x2, y2), (0, 255, 0), 2)
+        cv2.putText(color, f"{lm['class']} {lm['position'][2]:.2f}m", (x1, y1 - 10),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 2)
+    
+    # Display Status
+    cv2.putText(color, f"Pos: {current_pos}", (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 255), 2)
+    cv2.putText(color, f"DOA: {doa}", (10, 60), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 0, 0), 2)
+    if status:
+        cv2.putText(color, status, (10, 90), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 0), 2)
+    if hud:
+        cv2.putText(color, hud, (10, 120 if status else 90), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 255), 1)
+    if obstacles is not None and np.isfinite(obstacles['nearest']):
+        sector = int(np.argmin(obstacles['sectors']))
+        cv2.putText(color, f"Obstacle: {obstacles['nearest']:.1f}m at {obstacles['sector_angles'][sector]:+.0f}deg",
+                    (10, color.shape[0] - 20), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 255), 2)
+
+def detect_obstacles(obstacle_map, depth, depth_frame, intrinsics, profiler):
+    """Updates the obstacle grid from the aligned depth (None if obstacle detection is off)."""
+    if obstacle_map is None:
+        return None
+    with profiler.stage('obstacles'):
+        if depth is None:
+            # Lazy alignment mode: align the full frame on demand
+            depth = np.asanyarray(depth_frame.get_data())
+        # The aligned depth may be smaller than the color image (--align numpy_half)
+        depth_intrinsics = scale_intrinsics(intrinsics, getattr(depth_frame, 'pixel_scale', 1.0))
+        return obstacle_map.update(depth, depth_intrinsics)
+
+def run_sequential(frame_source, audio_driver, detector, localizer, intrinsics, profiler,
+                   hud=False, headless=False, run_log=None, obstacle_map=None):
+    """Capture, detection, localization and display one after another on the main thread."""
+    while not frame_source.exhausted:
+        t_start = time.perf_counter()
+
+        # 1. Capture Sensors
+        color, depth, depth_frame = frame_source.get_frames()
+        if color is None:
+            continue
+        t_capture = time.perf_counter()
+
+        # DOA estimated for the moment the frame was captured
+        doa = audio_driver.get_direction(frame_source.timestamp)
+        
+        # 2. Detect Landmarks
+        landmarks = detector.detect(color, depth_frame, intrinsics)
+        obstacles = detect_obstacles(obstacle_map, depth, depth_frame, intrinsics, profiler)
+        t_detect = time.perf_counter()
+        
+        # 3. Update Localization
+        current_pos = localizer.update(landmarks)
+        # Tiled maps stream in the tiles around the new position
+        localizer.map_manager.update_position(localizer.current_position)
+        localizer.map_manager.maybe_sync()
+        t_localize = time.perf_counter()
+        
+        # 4. Visualization / Feedback
+        key = -1
+        if not headless:
+            draw_overlay(color, landmarks, current_pos, doa, hud=profiler.hud_line(HUD_STAGES) if hud else None,
+                         obstacles=obstacles)
+            cv2.imshow("Navigation System", color)
+            key = cv2.waitKey(1) & 0xFF
+        t_end = time.perf_counter()
+
+        timings = {'capture': t_capture - t_start, 'detect': t_detect - t_capture,
+                   'localize': t_localize - t_detect, 'render': t_end - t_localize, 'frame': t_end - t_start}
+        if headless:
+            del timings['render']
+        for name, seconds in timings.items():
+            profiler.record(name, seconds)
+        profiler.maybe_dump()
+        if run_log is not None:
+            run_log.log_frame(frame_source.frame_index, landmarks, current_pos, timings, doa)
+
+        if key == ord('q'):
+            break
+
+def run_pipelined(frame_source, audio_driver, detector, localizer, intrinsics, profiler,
+                  hud=False, headless=False, run_log=None, obstacle_map=None):
+    """
+    Runs capture, detection and localization as separate stages connected by bounded queues.
+
+    capture -> [latest frame] -> detection -> [latest detections] -> localization
+    Every stage works on the newest item of its input; stale frames and detections are
+    dropped instead of queueing up behind a slow stage. The display runs on the main thread
+    (required by cv2.imshow) at the capture rate and always overlays the newest completed
+    detections and pose. Each stage reports its own rate;
+    'frame' latency is measured from capture to the completed pose update. In headless mode
+    nothing is displayed and the main thread only waits for the stages to finish.
+    With a run log the queues pass on every item instead (policy 'all': capture waits for
+    detection), so the log holds every frame and replays are reproducible.
+    """
+    stop_event = threading.Event()
+    policy = 'all' if run_log is not None else 'latest'
+    frames_to_detect = make_queue(capacity=1, policy=policy)
+    detections_to_localize = make_queue(capacity=1, policy=policy)
+    latest_frame = LatestValue()
+    latest_detections = LatestValue()
+    latest_pose = LatestValue()
+
+    def capture():
+        if frame_source.exhausted:
+            raise StopIteration
+        start = time.perf_counter()
+        color, depth, depth_frame = frame_source.get_frames()
+        if color is None:
+            return None
+        timings = {'capture': time.perf_counter() - start}
+        profiler.record('capture', timings['capture'])
+        return {'index': frame_source.frame_index, 'timestamp': frame_source.timestamp, 'color': color,
+                'depth': depth, 'depth_frame': depth_frame,
+                'doa': audio_driver.get_direction(frame_source.timestamp), 'start': start, 'timings': timings}
+
+    def detect(frame):
+        start = time.perf_counter()
+        frame['landmarks'] = detector.detect(frame['color'], frame['depth_frame'], intrinsics)
+        frame['obstacles'] = detect_obstacles(obstacle_map, frame['depth'], frame['depth_frame'], intrinsics, profiler)
+        frame['timings']['detect'] = time.perf_counter() - start
+        profiler.record('detect', frame['timings']['detect'])
+        return frame
+
+    def localize(frame):
+        start = time.perf_counter()
+        pose = localizer.update(frame['landmarks'])
+        localizer.map_manager.update_position(localizer.current_position)
+        localizer.map_manager.maybe_sync()
+        end = time.perf_counter()
+        timings = frame['timings']
+        timings['localize'] = end - start
+        timings['frame'] = end - frame['start']
+        profiler.record('localize', timings['localize'])
+        profiler.record('frame', timings['frame'])
+        if run_log is not None:
+            run_log.log_frame(frame['index'], frame['landmarks'], pose, timings, frame['doa'])
+        return pose
+
+    capture_stage = SourceWorker("capture", capture, [frames_to_detect, latest_frame], stop_event)
+    detection_stage = StageWorker("detection", detect, frames_to_detect,
+                                  [detections_to_localize, latest_detections], stop_event)
+    localization_stage = StageWorker("localization", localize, detections_to_localize, [latest_pose], stop_event)
+    stages = [capture_stage, detection_stage, localization_stage]
+    for stage in stages:
+        stage.start()
+
+    render_meter = RateMeter()
+    seq = 0
+    source_finished = False
+    try:
+        while not stop_event.is_set():
+            new_seq, frame = latest_frame.wait_newer(seq, timeout=0.1)
+            if new_seq == seq:
+                if latest_frame.closed:
+                    # Source exhausted: let the remaining stages drain their queues
+                    source_finished = True
+                    break
+                continue
+            seq = new_seq
+            if headless:
+                profiler.maybe_dump()
+                continue
+
+            _, detected = latest_detections.get()
+            _, current_pos = latest_pose.get()
+            landmarks = detected['landmarks'] if detected else []
+            obstacles = detected['obstacles'] if detected else None
+
+            with profiler.stage('render'):
+                # The detection stage may still be reading this frame; draw on a copy
+                color = frame['color'].copy()
+                render_meter.tick()
+                status = " | ".join(f"{stage.name} {stage.meter.get_rate():.1f}Hz" for stage in stages)
+                status += f" | render {render_meter.get_rate():.1f}Hz"
+                draw_overlay(color, landmarks, current_pos if current_pos is not None else localizer.get_position(),
+                             frame['doa'], status, profiler.hud_line(HUD_STAGES) if hud else None, obstacles)
+                cv2.imshow("Navigation System", color)
+                key = cv2.waitKey(1) & 0xFF
+
+            profiler.maybe_dump()
+            if key == ord('q'):
+                break
+    finally:
+        if not source_finished:
+            stop_event.set()
+        for stage in stages:
+            stage.join()
+        stop_event.set()
+        print("Stage rates: " + ", ".join(f"{stage.name} {stage.meter.get_rate():.1f}Hz ({stage.meter.count} items)"
+                                          for stage in stages))
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,290 @@
+import json
+import os
+import struct
+
+import numpy as np
+
+MAGIC = b'NAVMAP01'
+# magic, version, count, then (offset, length) of positions, class codes, ids, class names, side table
+_HEADER = struct.Struct('<8sIIQ' + 'QQ' * 5)
+_ALIGN = 64
+_CORE_KEYS = ('id', 'class', 'position', 'audio_signature')
+
+def _aligned(offset):
+    return (offset + _ALIGN - 1) // _ALIGN * _ALIGN
+
+def write_binary_map(path, landmarks, next_id=None):
+    """
+    Writes landmarks in the binary map format.
+
+    Layout: a fixed header followed by 64-byte aligned sections:
+        positions    N x 3 float64
+        class codes  N int32 (indices into the class name table)
+        ids          N int64
+        class names  JSON list
+        side table   JSON {'audio': {row: signature}, 'extra': {row: {key: value}}, 'ids': {row: id}}
+    Audio signatures, ids that are not integers and any additional landmark keys go to the side
+    table, so JSON -> binary -> JSON is lossless (positions are stored as float64, so integer
+    coordinates come back as floats of the same value). `next_id`, the next unused landmark id,
+    is kept in the side table so ids of removed landmarks are never handed out again.
+    """
+    n = len(landmarks)
+    positions = np.zeros((n, 3), dtype='<f8')
+    codes = np.zeros(n, dtype='<i4')
+    ids = np.zeros(n, dtype='<i8')
+    class_names, class_codes = [], {}
+    audio, extra, odd_ids = {}, {}, {}
+
+    for row, lm in enumerate(landmarks):
+        positions[row] = lm['position']
+        code = class_codes.get(lm['class'])
+        if code is None:
+            code = class_codes[lm['class']] = len(class_names)
+            class_names.append(lm['class'])
+        codes[row] = code
+
+        lm_id = lm.get('id')
+        if isinstance(lm_id, int) and not isinstance(lm_id, bool):
+            ids[row] = lm_id
+        else:
+            odd_ids[str(row)] = lm_id
+        if lm.get('audio_signature') is not None:
+            audio[str(row)] = lm['audio_signature']
+        others = {k: v for k, v in lm.items() if k not in _CORE_KEYS}
+        if others or 'audio_signature' not in lm:
+            others['_has_audio_key'] = 'audio_signature' in lm
+            extra[str(row)] = others
+
+    names_blob = json.dumps(class_names, ensure_ascii=False).encode('utf-8')
+    side = {'audio': audio, 'extra': extra, 'ids': odd_ids}
+    if next_id is not None:
+        side['next_id'] = next_id
+    side_blob = json.dumps(side, ensure_ascii=False).encode('utf-8')
+    sections = [positions.tobytes(), codes.tobytes(), ids.tobytes(), names_blob, side_blob]
+
+    offsets = []
+    offset = _aligned(_HEADER.size)
+    for blob in sections:
+        offsets.append((offset, len(blob)))
+        offset = _aligned(offset + len(blob))
+
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(_HEADER.pack(MAGIC, 1, 0, n, *[v for pair in offsets for v in pair]))
+        for (start, _), blob in zip(offsets, sections):
+            f.seek(start)
+            f.write(blob)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class BinaryMap:
+    """
+    Read-only, memory-mapped view of a binary map file.
+
+    Opening reads only the header and the class name table; the columns are np.memmap views,
+    so pages are loaded on first access and shared between processes mapping the same file.
+    The side table (audio signatures, extra keys) is parsed on first use.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            header = _HEADER.unpack(f.read(_HEADER.size))
+            magic, version, _, n = header[:4]
+            if magic != MAGIC:
+                raise ValueError(f"{path} is not a binary map file")
+            if version != 1:
+                raise ValueError(f"Unsupported binary map version {version}")
+            sections = list(zip(header[4::2], header[5::2]))
+            names_offset, names_length = sections[3]
+            f.seek(names_offset)
+            self.class_names = json.loads(f.read(names_length).decode('utf-8'))
+
+        self.count = n
+        self._sections = sections
+        self.positions = self._column(0, '<f8', (n, 3))
+        self.class_codes = self._column(1, '<i4', (n,))
+        self.ids = self._column(2, '<i8', (n,))
+        self._side = None
+
+    def _column(self, section, dtype, shape):
+        offset, length = self._sections[section]
+        if self.count == 0:
+            return np.zeros(shape, dtype=dtype)
+        return np.memmap(self.path, dtype=dtype, mode='r', offset=offset, shape=shape)
+
+    def __len__(self):
+        return self.count
+
+    @property
+    def side_table(self):
+        if self._side is None:
+            offset, length = self._sections[4]
+            with open(self.path, 'rb') as f:
+                f.seek(offset)
+                self._side = json.loads(f.read(length).decode('utf-8'))
+        return self._side
+
+    def classes(self, start=0, stop=None):
+        """Class names of rows [start, stop) as a list."""
+        names = self.class_names
+        return [names[c] for c in self.class_codes[start:stop].tolist()]
+
+    def landmark(self, row):
+        """Materializes one row as a landmark dict (same shape as the JSON map entries)."""
+        side = self.side_table
+        key = str(row)
+        lm = {
+            'id': side['ids'][key] if key in side['ids'] else int(self.ids[row]),
+            'class': self.class_names[self.class_codes[row]],
+            'position': self.positions[row].tolist(),
+        }
+        extra = side['extra'].get(key)
+        if extra is None or extra.get('_has_audio_key', True):
+            lm['audio_signature'] = side['audio'].get(key)
+        if extra:
+            lm.update({k: v for k, v in extra.items() if k != '_has_audio_key'})
+        return lm
+
+    def to_landmarks(self):
+        return [self.landmark(row) for row in range(self.count)]
+
+    @property
+    def next_id(self):
+        """Next unused landmark id (stored, or one past the largest id)."""
+        stored = self.side_table.get('next_id')
+        if stored is not None:
+            return stored
+        return int(self.ids.max()) + 1 if self.count else 1
+
+
+def landmark_columns(landmarks, names=None):
+    """
+    Positions and class codes of a list of landmark dicts.
+
+    Args:
+        landmarks (list): Landmark dicts.
+        names (list, optional): Existing class name table to extend.
+
+    Returns:
+        tuple: (Nx3 float64 positions, N int class codes, class name table)
+    """
+    names = list(names or [])
+    lookup = {name: code for code, name in enumerate(names)}
+    codes = np.empty(len(landmarks), dtype=np.int64)
+    for row, lm in enumerate(landmarks):
+        code = lookup.get(lm['class'])
+        if code is None:
+            code = lookup[lm['class']] = len(names)
+            names.append(lm['class'])
+        codes[row] = code
+    positions = np.array([lm['position'] for lm in landmarks], dtype=np.float64).reshape(-1, 3)
+    return positions, codes, names
+
+
+class MappedLandmarks:
+    """
+    List-like landmark container backed by a BinaryMap.
+
+    Rows are turned into dicts only when accessed (and then cached, so in-place edits stick);
+    appended landmarks are kept in a regular list after the mapped rows. columns() and ids()
+    read the mapped columns directly (taking only the materialized rows from their dicts), so
+    indexes can be built without creating a dict per row.
+    """
+
+    def __init__(self, binary_map):
+        self.binary_map = binary_map
+        self._rows = {}
+        self._appended = []
+
+    def __len__(self):
+        return len(self.binary_map) + len(self._appended)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        n = len(self.binary_map)
+        if i < 0:
+            i += len(self)
+        if i >= n:
+            return self._appended[i - n]
+        if not 0 <= i:
+            raise IndexError(i)
+        lm = self._rows.get(i)
+        if lm is None:
+            lm = self._rows[i] = self.binary_map.landmark(i)
+        return lm
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def __bool__(self):
+        return len(self) > 0
+
+    def append(self, landmark):
+        self._appended.append(landmark)
+
+    def columns(self, start=0):
+        """
+        Positions and classes of rows [start, len), read from the mapped columns where possible.
+
+        Returns:
+            tuple: (Nx3 float64 positions, N int class codes, list of class names the codes refer to)
+        """
+        n = len(self.binary_map)
+        names = list(self.binary_map.class_names)
+        if start < n:
+            positions = np.asarray(self.binary_map.positions[start:], dtype=np.float64)
+            codes = np.asarray(self.binary_map.class_codes[start:], dtype=np.int64)
+            edited = sorted(row for row in self._rows if row >= start)
+            if edited:
+                # Materialized rows may have been edited in place: overlay their dicts
+                edited_positions, edited_codes, names = landmark_columns([self._rows[row] for row in edited], names)
+                positions = positions.copy()
+                positions[np.array(edited) - start] = edited_positions
+                codes[np.array(edited) - start] = edited_codes
+            appended = self._appended
+        else:
+            positions = np.zeros((0, 3))
+            codes = np.zeros(0, dtype=np.int64)
+            appended = self._appended[start - n:]
+        if appended:
+            extra_positions, extra_codes, names = landmark_columns(appended, names)
+            positions = np.concatenate([positions, extra_positions])
+            codes = np.concatenate([codes, extra_codes])
+        return positions, codes, names
+
+    def ids(self):
+        """Landmark ids of all rows, in row order."""
+        ids = self.binary_map.ids.tolist()
+        for key, landmark_id in self.binary_map.side_table['ids'].items():
+            ids[int(key)] = landmark_id
+        ids.extend(lm['id'] for lm in self._appended)
+        return ids
+
+    def materialize(self):
+        """Returns all landmarks as a plain list of dicts."""
+        return list(self)
+
+
+def json_to_binary(json_path, binary_path):
+    """Converts a JSON map ({'landmarks': [...]}) to the binary format."""
+    with open(json_path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    landmarks = data.get('landmarks', [])
+    write_binary_map(binary_path, landmarks, data.get('next_id'))
+    return len(landmarks)
+
+def binary_to_json(binary_path, json_path, indent=4):
+    """Converts a binary map back to the JSON map format."""
+    binary_map = BinaryMap(binary_path)
+    landmarks = binary_map.to_landmarks()
+    data = {'landmarks': landmarks}
+    if 'next_id' in binary_map.side_table:
+        data['next_id'] = binary_map.side_table['next_id']
+    with open(json_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=indent, ensure_ascii=False)
+    return len(landmarks)
@@ -0,0 +1,101 @@
+import json
+import os
+import time
+
+def read_journal(path):
+    """
+    Reads the records of a map journal.
+
+    A record that was only partly written when the process died (the last line has no
+    newline or is not valid JSON) ends the journal.
+
+    Returns:
+        tuple: (list of records, byte length of the valid part of the file)
+    """
+    records, valid = [], 0
+    if not os.path.exists(path):
+        return records, valid
+    with open(path, 'rb') as f:
+        for line in f:
+            if not line.endswith(b'\n'):
+                break
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                break
+            valid += len(line)
+    return records, valid
+
+
+class MapJournal:
+    """
+    Append-only log of map changes (one JSON record per line).
+
+    Records:
+        {"op": "add", "landmark": {...}}
+        {"op": "update", "id": ..., "changes": {...}}
+        {"op": "remove", "id": ...}
+    Writes are buffered and made durable with one fsync per batch: after `sync_every` records
+    or `sync_interval` seconds, whichever comes first (and on sync()/close()). The interval is
+    checked on append() and maybe_sync(); call the latter periodically (e.g. once per frame) so
+    the last records of a burst do not wait for the next change. A crash loses at most the
+    unsynced batch; a torn last record is dropped on the next open.
+    """
+
+    def __init__(self, path, sync_every=32, sync_interval=1.0):
+        """
+        Args:
+            path (str): Journal file (created if missing).
+            sync_every (int): Records per fsync batch.
+            sync_interval (float): Maximum seconds a written record stays unsynced (given
+                                   append() or maybe_sync() calls).
+        """
+        self.path = path
+        self.sync_every = sync_every
+        self.sync_interval = sync_interval
+        self.records, valid = read_journal(path)
+        self._file = open(path, 'ab')
+        if self._file.tell() > valid:
+            # Cut off a torn record so new records start on a clean line
+            self._file.truncate(valid)
+            self._file.seek(valid)
+        self.count = len(self.records)
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    def append(self, record):
+        """Appends one record; fsyncs when the current batch is full or old enough."""
+        self._file.write(json.dumps(record, ensure_ascii=False).encode('utf-8') + b'\n')
+        self.count += 1
+        self._unsynced += 1
+        if self._unsynced >= self.sync_every:
+            self.sync()
+        else:
+            self.maybe_sync()
+
+    def maybe_sync(self):
+        """Syncs if records have been waiting for `sync_interval` seconds; cheap otherwise."""
+        if self._unsynced and time.monotonic() - self._last_sync >= self.sync_interval:
+            self.sync()
+
+    def sync(self):
+        """Flushes buffered records and fsyncs the journal."""
+        if self._unsynced:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    def truncate(self):
+        """Empties the journal (after its changes were compacted into the base map)."""
+        self._file.truncate(0)
+        self._file.seek(0)
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self.records = []
+        self.count = 0
+        self._unsynced = 0
+
+    def close(self):
+        self.sync()
+        self._file.close()
@@ -2,64 +2,560 @@ import json
 import os
 import numpy as np
 
+from src.map.spatial_index import SpatialIndex, SpatialHash
+from src.map.binary_map import MAGIC, BinaryMap, MappedLandmarks, landmark_columns, write_binary_map
+from src.map.tiled_map import TileCache, is_tiled_map
+from src.map.map_journal import MapJournal
+from src.map.signature_index import SignatureIndex, signature_vector
+
+BINARY_MAP_EXTENSION = '.navmap'
+
+def is_binary_map(path):
+    """True if the file starts with the binary map magic."""
+    with open(path, 'rb') as f:
+        return f.read(len(MAGIC)) == MAGIC
+
 class MapManager:
-    def __init__(self, map_path=None):
+    def __init__(self, map_path=None, cell_size=None, tile_radius=1, tile_memory_mb=64.0, merge_radius=None):
+        """
+        Args:
+            map_path (str, optional): JSON or binary (.navmap) map file, or tiled map directory, to load.
+            cell_size (float, optional): Grid cell size (m) of the spatial indexes
+                                         (None adapts it to the landmark density).
+            tile_radius (int): For tiled maps, tiles kept active around the current one.
+            tile_memory_mb (float): For tiled maps, memory budget of the resident tiles.
+            merge_radius (float, optional): Online merge mode: add_landmark() fuses an observation
+                                            into the nearest landmark of the same class within
+                                            this radius (m) instead of adding a duplicate.
+        """
+        self.cell_size = cell_size
+        self.merge_radius = merge_radius
+        self.tile_radius = tile_radius
+        self.tile_memory_mb = tile_memory_mb
+        self.tiles = None
+        self.journal = None
         self.landmarks = []
         self.map_path = map_path
         if map_path and os.path.exists(map_path):
             self.load_map(map_path)
 
+    @property
+    def landmarks(self):
+        return self._landmarks
+
+    @landmarks.setter
+    def landmarks(self, landmarks):
+        self._landmarks = landmarks
+        self._next_id = None
+        self._rows = None
+        self.invalidate_indexes()
+
+    def invalidate_indexes(self):
+        """Call after editing landmark positions or classes in place."""
+        # The indexes are rebuilt lazily on the next query
+        self._by_class = None
+        self._by_class_count = 0
+        self._merge_hash = None
+        self._index = None
+        self._class_index = {}
+        self._signatures = None
+        self._signature_count = 0
+
     def load_map(self, path):
-        """Loads landmarks from a JSON file."""
+        """
+        Loads landmarks from a JSON or binary map file.
+
+        Binary maps are memory-mapped: landmark dicts are only created for rows that are
+        accessed, and the spatial indexes are built straight from the mapped columns.
+        Tiled map directories are streamed: only the tiles around the position passed to
+        update_position() are resident, and `landmarks` holds just those.
+        """
         try:
-            with open(path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                self.landmarks = data.get('landmarks', [])
+            if is_tiled_map(path):
+                self.tiles = TileCache(path, radius=self.tile_radius, memory_budget_mb=self.tile_memory_mb)
+                self.tiles.update([0.0, 0.0, 0.0])
+                self.landmarks = self.tiles.resident_landmarks()
+                print(f"Tiled map opened from {path} with {len(self.tiles)} landmarks "
+                      f"in {len(self.tiles.manifest['tiles'])} tiles.")
+                return
+            if is_binary_map(path):
+                binary_map = BinaryMap(path)
+                self.landmarks = MappedLandmarks(binary_map)
+                self._next_id = binary_map.side_table.get('next_id')
+            else:
+                with open(path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                    self.landmarks = data.get('landmarks', [])
+                    self._next_id = data.get('next_id')
             print(f"Map loaded from {path} with {len(self.landmarks)} landmarks.")
         except Exception as e:
             print(f"Error loading map: {e}")
 
     def save_map(self, path):
-        """Saves landmarks to a JSON file."""
-        data = {'landmarks': self.landmarks}
+        """
+        Saves landmarks to a JSON file, or to a binary map if the path ends in .navmap.
+
+        A tiled map writes its edited tiles back when saved to its own directory; saving it
+        to a file exports every tile.
+        """
         try:
-            with open(path, 'w', encoding='utf-8') as f:
-                json.dump(data, f, indent=4, ensure_ascii=False)
+            self._write_map(path)
             print(f"Map saved to {path}.")
         except Exception as e:
             print(f"Error saving map: {e}")
 
+    def _write_map(self, path):
+        """Writes the map atomically (temporary file + rename); raises on failure."""
+        if self.tiles is not None:
+            if os.path.abspath(path) == os.path.abspath(self.tiles.directory):
+                self.tiles.flush()
+                return
+            landmarks, next_id = list(self.tiles.all_landmarks()), self.tiles.manifest.get('next_id')
+        else:
+            landmarks, next_id = self.landmarks, self._peek_next_id()
+        if path.endswith(BINARY_MAP_EXTENSION):
+            write_binary_map(path, landmarks, next_id)
+            return
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'landmarks': list(landmarks), 'next_id': next_id}, f, indent=4, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+    def _peek_next_id(self):
+        """Next unused id: ids are never reused, even after the landmark holding one is removed."""
+        if self._next_id is None:
+            landmarks = self._landmarks
+            if isinstance(landmarks, MappedLandmarks):
+                base, appended = landmarks.binary_map.next_id, landmarks[len(landmarks.binary_map):]
+            else:
+                base, appended = 1, landmarks
+            ids = [lm['id'] for lm in appended if isinstance(lm.get('id'), int)]
+            self._next_id = max([base - 1] + ids) + 1
+        return self._next_id
+
+    def _allocate_id(self):
+        if self.tiles is not None:
+            return self.tiles.allocate_id()
+        new_id = self._peek_next_id()
+        self._next_id = new_id + 1
+        return new_id
+
+    def _row(self, landmark_id):
+        """Row of a landmark in `landmarks` (id -> row dict kept current by insert/remove)."""
+        if self._rows is None:
+            landmarks = self._landmarks
+            ids = landmarks.ids() if hasattr(landmarks, 'ids') else [lm['id'] for lm in landmarks]
+            self._rows = {landmark_id: row for row, landmark_id in enumerate(ids)}
+        return self._rows.get(landmark_id)
+
+    def _find(self, landmark_id):
+        row = self._row(landmark_id)
+        return None if row is None else self._landmarks[row]
+
     def add_landmark(self, class_name, position, audio_signature=None):
         """Adds a new landmark to the map.
-        
+
+        In merge mode (merge_radius set) an observation within merge_radius of a landmark of
+        the same class is fused into it instead: the landmark moves to the running mean of its
+        observations and its 'observations' count grows.
+
         Args:
             class_name (str): The label of the landmark (e.g., 'vending_machine').
             position (list): [x, y, z] coordinates.
             audio_signature (dict, optional): Audio features or metadata.
+
+        Returns:
+            dict: The new (or merged) landmark; its id is unique for the lifetime of the map.
         """
-        new_id = len(self.landmarks) + 1
+        if self.merge_radius:
+            match, _ = self._get_merge_hash().nearest(class_name, position, self.merge_radius)
+            if match is not None:
+                return self._merge(match, position, audio_signature)
+
         landmark = {
-            "id": new_id,
+            "id": self._allocate_id(),
             "class": class_name,
             "position": position,
             "audio_signature": audio_signature
         }
-        self.landmarks.append(landmark)
+        if self.merge_radius:
+            landmark['observations'] = 1
+        self._insert(landmark)
+        self._log({'op': 'add', 'landmark': landmark})
+        return landmark
+
+    def _insert(self, landmark):
+        if self.tiles is not None and not self.tiles.add(landmark):
+            # Filed in a tile outside the active set: it becomes resident when that tile does
+            return
+        if self._rows is not None:
+            self._rows[landmark['id']] = len(self._landmarks)
+        self._landmarks.append(landmark)
+        if self._merge_hash is not None:
+            self._merge_hash.insert(landmark)
+        # Existing indexes pick the new landmark up incrementally on their next use
+
+    def _get_merge_hash(self):
+        if self._merge_hash is None or self._merge_hash.cell_size != self.merge_radius:
+            self._merge_hash = SpatialHash(self.merge_radius)
+            for lm in self._landmarks:
+                self._merge_hash.insert(lm)
+        return self._merge_hash
+
+    def _merge(self, landmark, position, audio_signature=None):
+        """Fuses one observation into a landmark (running mean of the observed positions)."""
+        count = landmark.get('observations', 1)
+        mean = [float(m + (p - m) / (count + 1)) for m, p in zip(landmark['position'], position)]
+        changes = {'position': mean, 'observations': count + 1}
+        if audio_signature is not None and landmark.get('audio_signature') is None:
+            changes['audio_signature'] = audio_signature
+        return self.update_landmark(landmark['id'], changes)
+
+    def _move(self, landmark, position):
+        """Moves a landmark in the spatial indexes without rebuilding them (the dict is not changed)."""
+        if self._merge_hash is not None:
+            self._merge_hash.move(landmark, position)
+        if self._index is None:
+            return
+        row = self._row(landmark['id'])
+        if row < len(self._index):
+            self._index.update([row], [position])
+            class_index = self._class_index.get(landmark['class'])
+            if class_index is not None:
+                class_index.update([row], [position])
+
+    def _update_signature(self, landmark, audio_signature):
+        """Keeps the signature index current when a landmark's audio signature changes."""
+        if self._signatures is None:
+            return
+        if signature_vector(landmark.get('audio_signature')) is not None:
+            # Replacing an indexed embedding: rebuild on the next query
+            self._signatures = None
+            return
+        row = self._row(landmark['id'])
+        vector = signature_vector(audio_signature)
+        if row < self._signature_count and vector is not None:
+            self._signatures.add([vector], [row], [landmark['class']])
+
+    def update_landmark(self, landmark_id, changes):
+        """
+        Changes fields of a landmark.
+
+        Args:
+            landmark_id: Id of the landmark.
+            changes (dict): New values, e.g. {'position': [...], 'class': ..., 'audio_signature': ...}.
+
+        Returns:
+            dict or None: The updated landmark, or None if there is no landmark with that id.
+        """
+        landmark = self._find(landmark_id)
+        if landmark is None:
+            return None
+        if self.tiles is not None:
+            # Re-filing marks the tile as edited; a new position may also move it to another tile
+            self.tiles.remove(landmark)
+        reclassified = changes.get('class', landmark['class']) != landmark['class']
+        if 'position' in changes and not reclassified:
+            self._move(landmark, changes['position'])
+        if 'audio_signature' in changes and not reclassified:
+            self._update_signature(landmark, changes['audio_signature'])
+        landmark.update(changes)
+        if reclassified:
+            self.invalidate_indexes()
+        if self.tiles is not None:
+            self.tiles.add(landmark)
+        self._log({'op': 'update', 'id': landmark_id, 'changes': changes})
+        return landmark
+
+    def remove_landmark(self, landmark_id):
+        """
+        Removes a landmark. Its id is not reused; the last landmark moves into its place in
+        `landmarks`.
+
+        Returns:
+            dict or None: The removed landmark, or None if there is no landmark with that id.
+        """
+        landmark = self._find(landmark_id)
+        if landmark is None:
+            return None
+        self._remove(landmark)
+        self._log({'op': 'remove', 'id': landmark_id})
+        return landmark
+
+    def _remove(self, landmark):
+        if not isinstance(self._landmarks, list):
+            # Mapped maps become a plain list on the first removal
+            self._landmarks = list(self._landmarks)
+        row = self._row(landmark['id'])
+        # Swap-remove: the last landmark takes over the freed row, so no other row shifts
+        last = self._landmarks.pop()
+        if row < len(self._landmarks):
+            self._landmarks[row] = last
+            self._rows[last['id']] = row
+        del self._rows[landmark['id']]
+        if self.tiles is not None:
+            self.tiles.remove(landmark)
+        self.invalidate_indexes()
+
+    def open_journal(self, path=None, sync_every=32, sync_interval=1.0, compact_every=10000):
+        """
+        Records every later add/update/remove in an append-only journal next to the map.
+
+        Changes already in the journal (from an earlier session or a crash) are replayed onto
+        the loaded map first. Each change then costs one appended line instead of a rewrite of
+        the whole map; the journal is folded into the map file by compact(), which runs
+        automatically after `compact_every` records.
+
+        Args:
+            path (str, optional): Journal file (default: map path + '.journal').
+            sync_every (int): Records per fsync batch.
+            sync_interval (float): Maximum seconds a change stays unsynced, as long as changes
+                                   or maybe_sync() calls keep coming.
+            compact_every (int): Journal records that trigger a compaction (None = never).
+        """
+        if self.tiles is not None:
+            raise ValueError("Tiled maps write edited tiles back directly and do not use a journal")
+        if path is None:
+            if not self.map_path:
+                raise ValueError("A journal path is required for maps without a map_path")
+            path = self.map_path + '.journal'
+        self.journal = MapJournal(path, sync_every, sync_interval)
+        self.compact_every = compact_every
+        for record in self.journal.records:
+            self._apply(record)
+        if self.journal.records:
+            print(f"Replayed {len(self.journal.records)} map changes from {path}.")
+        self.journal.records = []
 
-    def find_nearest_landmark(self, position):
+    def _apply(self, record):
+        """Applies a journal record. Replaying a record twice has no further effect."""
+        op = record['op']
+        if op == 'add':
+            landmark = record['landmark']
+            existing = self._find(landmark['id'])
+            if existing is not None:
+                existing.update(landmark)
+                self.invalidate_indexes()
+            else:
+                self._insert(landmark)
+            if isinstance(landmark['id'], int):
+                self._next_id = max(self._peek_next_id(), landmark['id'] + 1)
+        elif op == 'update':
+            landmark = self._find(record['id'])
+            if landmark is not None:
+                landmark.update(record['changes'])
+                self.invalidate_indexes()
+        elif op == 'remove':
+            landmark = self._find(record['id'])
+            if landmark is not None:
+                self._remove(landmark)
+
+    def _log(self, record):
+        if self.journal is None:
+            return
+        self.journal.append(record)
+        if self.compact_every and self.journal.count >= self.compact_every:
+            self.compact()
+
+    def compact(self, path=None):
+        """
+        Folds the journal into the base map: the map is rewritten atomically, then the journal
+        is emptied. A crash in between only replays already applied changes on the next open.
+        """
+        path = path or self.map_path
+        if self.journal is not None:
+            self.journal.sync()
+        self._write_map(path)
+        if self.journal is not None:
+            self.journal.truncate()
+
+    def update_position(self, position):
+        """
+        For tiled maps: makes the tiles around position resident (neighbours are prefetched in
+        the background) and refreshes `landmarks` and the indexes when the active tiles change.
+        Does nothing for maps that are fully loaded.
+
+        Returns:
+            bool: True if the resident landmarks changed.
+        """
+        if self.tiles is None or not self.tiles.update(position):
+            return False
+        self.landmarks = self.tiles.resident_landmarks()
+        return True
+
+    def maybe_sync(self):
+        """Syncs journaled changes that are older than the journal's sync interval."""
+        if self.journal is not None:
+            self.journal.maybe_sync()
+
+    def close(self):
+        """Syncs the journal, stops tile prefetching and writes edited tiles of a tiled map."""
+        if self.journal is not None:
+            self.journal.close()
+            self.journal = None
+        if self.tiles is not None:
+            self.tiles.close()
+
+    def get_candidates(self, class_name):
+        """
+        Returns the landmarks of one class (pure Python, no array work).
+
+        The class partition (rows per class) is built once and extended incrementally as
+        landmarks are appended; for a memory-mapped map only the returned rows become dicts.
+        """
+        landmarks = self._landmarks
+        if self._by_class is None or self._by_class_count > len(landmarks):
+            self._by_class = {}
+            self._by_class_count = 0
+        start = self._by_class_count
+        if start < len(landmarks):
+            if hasattr(landmarks, 'columns'):
+                _, codes, names = landmarks.columns(start)
+                classes = [names[code] for code in codes.tolist()]
+            else:
+                classes = [lm['class'] for lm in landmarks[start:]]
+            for row, landmark_class in enumerate(classes, start):
+                self._by_class.setdefault(landmark_class, []).append(row)
+        self._by_class_count = len(landmarks)
+        return [landmarks[row] for row in self._by_class.get(class_name, [])]
+
+    def get_index(self, class_name=None):
+        """
+        Returns the SpatialIndex over all landmarks, or over the landmarks of one class.
+
+        Indexes are built on first use and extended incrementally with landmarks appended since
+        the last call. Query results are indices into `landmarks`.
+
+        Returns:
+            SpatialIndex or None: None if the class has no landmarks.
+        """
+        landmarks = self._landmarks
+        if self._index is None or len(self._index) > len(landmarks):
+            self._index = SpatialIndex(self.cell_size)
+            self._class_index = {}
+        start = len(self._index)
+        if start < len(landmarks):
+            if hasattr(landmarks, 'columns'):
+                positions, codes, names = landmarks.columns(start)
+            else:
+                positions, codes, names = landmark_columns(landmarks[start:])
+            self._index.add(positions)
+
+            # Class partition: contiguous positions per class, ids pointing back into landmarks
+            ids = np.arange(start, len(landmarks))
+            order = np.argsort(codes, kind='stable')
+            bounds = np.flatnonzero(np.diff(codes[order])) + 1
+            for members in np.split(order, bounds):
+                if not len(members):
+                    continue
+                class_name_new = names[codes[members[0]]]
+                index = self._class_index.get(class_name_new)
+                if index is None:
+                    index = self._class_index[class_name_new] = SpatialIndex(self.cell_size)
+                index.add(positions[members], ids[members])
+            if start == 0:
+                self._index.build()
+                for index in self._class_index.values():
+                    index.build()
+        if class_name is None:
+            return self._index
+        return self._class_index.get(class_name)
+
+    def get_class_arrays(self, class_name):
+        """
+        Contiguous positions of all landmarks of one class, for vectorized consumers.
+
+        Returns:
+            tuple: (Nx3 float64 positions, N indices into `landmarks`)
+        """
+        index = self.get_index(class_name)
+        if index is None:
+            return np.zeros((0, 3)), np.zeros(0, dtype=np.int64)
+        return index.positions, index.ids
+
+    def get_signature_index(self):
+        """
+        Returns the SignatureIndex over the landmarks that carry an audio signature embedding.
+
+        Built on first use and extended incrementally like the spatial indexes; its ids are
+        indices into `landmarks`.
+        """
+        landmarks = self._landmarks
+        if self._signatures is None or self._signature_count > len(landmarks):
+            self._signatures = SignatureIndex()
+            self._signature_count = 0
+        vectors, rows, classes = [], [], []
+        for row in range(self._signature_count, len(landmarks)):
+            landmark = landmarks[row]
+            vector = signature_vector(landmark.get('audio_signature'))
+            if vector is not None:
+                vectors.append(vector)
+                rows.append(row)
+                classes.append(landmark['class'])
+        self._signatures.add(vectors, rows, classes)
+        self._signature_count = len(landmarks)
+        return self._signatures
+
+    def find_by_signature(self, audio_signature, k=1, class_name=None, max_distance=None):
+        """
+        Finds the landmarks whose audio signatures are most similar to the given one.
+
+        Args:
+            audio_signature: Embedding (list/array) or signature dict, e.g. from
+                             AudioFeatureExtractor.signature().
+            k (int): Number of results.
+            class_name (str, optional): Only consider landmarks of this class.
+            max_distance (float, optional): Drop matches with a larger cosine distance.
+
+        Returns:
+            list: (landmark, cosine distance) pairs, most similar first.
+        """
+        vector = signature_vector(audio_signature)
+        if vector is None:
+            return []
+        idx, dist = self.get_signature_index().query(vector, k, class_name)
+        if max_distance is not None:
+            keep = dist <= max_distance
+            idx, dist = idx[keep], dist[keep]
+        return self._results(idx, dist)
+
+    def _results(self, idx, dist):
+        return [(self._landmarks[i], float(d)) for i, d in zip(idx, dist)]
+
+    def find_k_nearest(self, position, k=1, class_name=None):
+        """
+        Finds the k landmarks closest to a position, optionally only of one class.
+
+        Returns:
+            list: (landmark, distance) pairs, nearest first.
+        """
+        index = self.get_index(class_name)
+        if index is None:
+            return []
+        idx, dist = index.query_knn(np.asarray(position, dtype=np.float64), k)
+        return self._results(idx, dist)
+
+    def find_within_radius(self, position, radius, class_name=None):
+        """
+        Finds all landmarks within `radius` meters of a position, optionally only of one class.
+
+        Returns:
+            list: (landmark, distance) pairs, nearest first.
+        """
+        index = self.get_index(class_name)
+        if index is None:
+            return []
+        idx, dist = index.query_radius(np.asarray(position, dtype=np.float64), radius)
+        return self._results(idx, dist)
+
+    def find_nearest_landmark(self, position, class_name=None):
         """Finds the nearest landmark to a given position."""
         if not self.landmarks:
             return None, float('inf')
-        
-        pos_np = np.array(position)
-        min_dist = float('inf')
-        nearest = None
-        
-        for lm in self.landmarks:
-            lm_pos = np.array(lm['position'])
-            dist = np.linalg.norm(pos_np - lm_pos)
-            if dist < min_dist:
-                min_dist = dist
-                nearest = lm
-                
-        return nearest, min_dist
+
+        nearest = self.find_k_nearest(position, 1, class_name)
+        if not nearest:
+            return None, float('inf')
+        return nearest[0]
@@ -0,0 +1,116 @@
+import numpy as np
+
+def signature_vector(audio_signature):
+    """Embedding of a stored audio_signature (a dict with an 'embedding', or a plain list), or None."""
+    if audio_signature is None:
+        return None
+    if isinstance(audio_signature, dict):
+        audio_signature = audio_signature.get('embedding')
+        if audio_signature is None:
+            return None
+    return np.asarray(audio_signature, dtype=np.float32).ravel()
+
+
+class SignatureIndex:
+    """
+    Nearest-neighbour index over landmark audio signature embeddings.
+
+    Embeddings are L2-normalized into one contiguous, geometrically grown float32 matrix, so a
+    query is a single matrix-vector product (cosine similarity) followed by argpartition; with
+    a few dozen dimensions this scans 100k signatures in a couple of milliseconds, which is cheaper
+    than maintaining a tree. Class codes per row allow restricting a query to one class.
+    """
+
+    def __init__(self, dimension=None):
+        self.dimension = dimension
+        self._vectors = np.zeros((0, dimension or 0), dtype=np.float32)
+        self._ids = np.zeros(0, dtype=np.int64)
+        self._codes = np.zeros(0, dtype=np.int32)
+        self._class_codes = {}
+        self._size = 0
+        self.skipped = 0
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def ids(self):
+        return self._ids[:self._size]
+
+    def _reserve(self, n):
+        if n <= len(self._ids):
+            return
+        capacity = max(n, 2 * len(self._ids), 64)
+        vectors = np.zeros((capacity, self.dimension), dtype=np.float32)
+        ids = np.zeros(capacity, dtype=np.int64)
+        codes = np.zeros(capacity, dtype=np.int32)
+        vectors[:self._size] = self._vectors[:self._size]
+        ids[:self._size] = self._ids[:self._size]
+        codes[:self._size] = self._codes[:self._size]
+        self._vectors, self._ids, self._codes = vectors, ids, codes
+
+    def add(self, vectors, ids, class_names):
+        """
+        Adds embeddings. Embeddings whose length differs from the index dimension (set by the
+        first one) are skipped.
+
+        Args:
+            vectors (list): Embeddings (1-D arrays).
+            ids (list): Id of each embedding (e.g. indices into MapManager.landmarks).
+            class_names (list): Class of each embedding.
+
+        Returns:
+            int: Number of embeddings indexed.
+        """
+        if not len(vectors):
+            return 0
+        if self.dimension is None:
+            self.dimension = len(vectors[0])
+            self._vectors = np.zeros((0, self.dimension), dtype=np.float32)
+        keep = [i for i, v in enumerate(vectors) if len(v) == self.dimension]
+        self.skipped += len(vectors) - len(keep)
+        if not keep:
+            return 0
+        block = np.array([vectors[i] for i in keep], dtype=np.float32)
+        block /= np.maximum(np.linalg.norm(block, axis=1, keepdims=True), 1e-12)
+        n = len(keep)
+        self._reserve(self._size + n)
+        self._vectors[self._size:self._size + n] = block
+        self._ids[self._size:self._size + n] = [ids[i] for i in keep]
+        self._codes[self._size:self._size + n] = [self._class_codes.setdefault(class_names[i], len(self._class_codes))
+                                                  for i in keep]
+        self._size += n
+        return n
+
+    def query(self, vector, k=1, class_name=None):
+        """
+        Finds the k most similar embeddings.
+
+        Args:
+            vector (array-like): Query embedding.
+            k (int): Number of results.
+            class_name (str, optional): Only consider embeddings added with this class.
+
+        Returns:
+            tuple: (ids, cosine distances in [0, 2]), most similar first.
+        """
+        empty = (np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32))
+        vector = np.asarray(vector, dtype=np.float32).ravel()
+        if self._size == 0 or len(vector) != self.dimension:
+            return empty
+        vector = vector / max(float(np.linalg.norm(vector)), 1e-12)
+        ids = self._ids[:self._size]
+        vectors = self._vectors[:self._size]
+        if class_name is not None:
+            code = self._class_codes.get(class_name)
+            if code is None:
+                return empty
+            rows = np.flatnonzero(self._codes[:self._size] == code)
+            ids, vectors = ids[rows], vectors[rows]
+        k = min(k, len(ids))
+        if k == 0:
+            return empty
+        distances = 1.0 - vectors @ vector
+        best = np.argpartition(distances, k - 1)[:k] if k < len(ids) else np.arange(len(ids))
+        best = best[np.argsort(distances[best], kind='stable')]
+        return ids[best], distances[best]
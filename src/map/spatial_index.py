@@ -0,0 +1,276 @@
+import math
+import numpy as np
+
+# Cell coordinates are packed into one int64 key (21 bits per axis), so they must stay
+# within +-_KEY_OFFSET; build() grows the cell size if the points would not fit.
+_KEY_BITS = 21
+_KEY_OFFSET = 1 << (_KEY_BITS - 1)
+_MAX_CELL = _KEY_OFFSET - 1
+
+
+class SpatialIndex:
+    """
+    Uniform-grid index over 3D landmark positions.
+
+    Positions and their ids (e.g. indices into MapManager.landmarks) live in contiguous,
+    geometrically grown arrays. The grid is stored
+    CSR-style: point indices sorted by cell key, so the points of a cell are one contiguous
+    slice found with a binary search. Points added after the last build are kept in a small
+    pending range that queries scan directly; the grid is rebuilt once that range grows
+    beyond `rebuild_ratio` of the indexed points. An id -> row dict (created on the first
+    update()) makes moving a point O(1).
+    """
+
+    def __init__(self, cell_size=None, rebuild_ratio=0.1, min_rebuild=256, points_per_cell=2.0):
+        """
+        Args:
+            cell_size (float, optional): Grid cell edge length (m). None picks it on every build
+                                         so a cell holds about `points_per_cell` points. Either
+                                         way it is enlarged if the cell coordinates of the points
+                                         would not fit in the packed keys.
+            rebuild_ratio (float): Rebuild when pending points exceed this share of the indexed ones.
+            min_rebuild (int): Never rebuild for fewer pending points than this.
+            points_per_cell (float): Target occupancy for the automatic cell size.
+        """
+        self.auto_cell_size = cell_size is None
+        self.cell_size = 1.0 if cell_size is None else float(cell_size)
+        self.points_per_cell = points_per_cell
+        self.rebuild_ratio = rebuild_ratio
+        self.min_rebuild = min_rebuild
+        self._positions = np.zeros((0, 3), dtype=np.float64)
+        self._ids = np.zeros(0, dtype=np.int64)
+        self._size = 0
+        self._indexed = 0
+        self._sorted_keys = np.zeros(0, dtype=np.int64)
+        self._order = np.zeros(0, dtype=np.int64)
+        self._moved = set()
+        self._rows = None
+        self._neighbour_deltas = {}
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def positions(self):
+        """Nx3 view of all indexed positions."""
+        return self._positions[:self._size]
+
+    @property
+    def ids(self):
+        """Ids of all indexed positions, in insertion order."""
+        return self._ids[:self._size]
+
+    def _cell_keys(self, cells):
+        c = cells.astype(np.int64) + _KEY_OFFSET
+        return (c[..., 0] << (2 * _KEY_BITS)) | (c[..., 1] << _KEY_BITS) | c[..., 2]
+
+    def _deltas(self, reach):
+        """Key offsets of all cells within `reach` cells (keys are linear in the cell coordinates)."""
+        deltas = self._neighbour_deltas.get(reach)
+        if deltas is None:
+            span = np.arange(-reach, reach + 1, dtype=np.int64)
+            ox, oy, oz = np.meshgrid(span, span, span, indexing='ij')
+            deltas = ((ox << (2 * _KEY_BITS)) + (oy << _KEY_BITS) + oz).ravel()
+            self._neighbour_deltas[reach] = deltas
+        return deltas
+
+    def _reserve(self, n):
+        if n <= len(self._positions):
+            return
+        capacity = max(n, 2 * len(self._positions), 64)
+        positions = np.zeros((capacity, 3), dtype=np.float64)
+        ids = np.zeros(capacity, dtype=np.int64)
+        positions[:self._size] = self._positions[:self._size]
+        ids[:self._size] = self._ids[:self._size]
+        self._positions, self._ids = positions, ids
+
+    def add(self, positions, ids=None):
+        """
+        Appends points.
+
+        Args:
+            positions (array-like): Nx3 positions.
+            ids (array-like, optional): N integer ids returned by queries (default: insertion index).
+        """
+        positions = np.asarray(positions, dtype=np.float64).reshape(-1, 3)
+        start = self._size
+        self._reserve(start + len(positions))
+        self._positions[start:start + len(positions)] = positions
+        self._ids[start:start + len(positions)] = np.arange(start, start + len(positions)) if ids is None else ids
+        self._size += len(positions)
+        if self._rows is not None:
+            self._rows.update(zip(self._ids[start:self._size].tolist(), range(start, self._size)))
+
+        self._maybe_rebuild()
+
+    def update(self, ids, positions):
+        """
+        Moves points to new positions.
+
+        Indexed points that moved stay in their old cell and are scanned by every query (like
+        pending points) until the next rebuild.
+
+        Args:
+            ids (array-like): Ids of the points to move.
+            positions (array-like): Their new Nx3 positions.
+        """
+        positions = np.asarray(positions, dtype=np.float64).reshape(-1, 3)
+        if self._rows is None:
+            self._rows = dict(zip(self.ids.tolist(), range(self._size)))
+        for point_id, position in zip(np.atleast_1d(ids).tolist(), positions):
+            row = self._rows.get(point_id)
+            if row is None:
+                continue
+            self._positions[row] = position
+            if row < self._indexed:
+                self._moved.add(row)
+        self._maybe_rebuild()
+
+    def _maybe_rebuild(self):
+        pending = self._size - self._indexed + len(self._moved)
+        if pending > max(self.min_rebuild, self.rebuild_ratio * self._indexed):
+            self.build()
+
+    def build(self):
+        """(Re)builds the grid over all points."""
+        if self.auto_cell_size and self._size:
+            extent = np.maximum(np.ptp(self.positions, axis=0), 1.0)
+            self.cell_size = float(np.cbrt(np.prod(extent) / self._size * self.points_per_cell))
+        if self._size:
+            # Cell coordinates beyond +-_MAX_CELL would wrap into neighbouring key fields
+            self.cell_size = max(self.cell_size, float(np.abs(self.positions).max()) / _MAX_CELL)
+        keys = self._cell_keys(np.floor(self.positions / self.cell_size))
+        self._order = np.argsort(keys, kind='stable')
+        self._sorted_keys = keys[self._order]
+        self._indexed = self._size
+        self._moved = set()
+
+    def _gather(self, center, reach):
+        """Indices of points in the cells within `reach` cells of center (plus pending points)."""
+        cell = np.floor(np.asarray(center, dtype=np.float64) / self.cell_size)
+        if (2 * reach + 1) ** 3 >= self._indexed or np.abs(cell).max() + reach > _MAX_CELL:
+            # The neighbourhood covers more cells than there are points (or leaves the key
+            # range): scan everything
+            idx = np.arange(self._size)
+        else:
+            keys = self._cell_keys(cell) + self._deltas(reach)
+            lo = np.searchsorted(self._sorted_keys, keys, 'left')
+            hi = np.searchsorted(self._sorted_keys, keys, 'right')
+            nonempty = hi > lo
+            lo, hi = lo[nonempty], hi[nonempty]
+            if len(lo):
+                lengths = hi - lo
+                # Concatenate the ranges [lo, hi) without a Python loop
+                steps = np.ones(lengths.sum(), dtype=np.int64)
+                steps[0] = lo[0]
+                ends = np.cumsum(lengths)[:-1]
+                steps[ends] = lo[1:] - hi[:-1] + 1
+                idx = self._order[np.cumsum(steps)]
+            else:
+                idx = np.zeros(0, dtype=np.int64)
+            if self._indexed < self._size:
+                idx = np.concatenate([idx, np.arange(self._indexed, self._size)])
+            if self._moved:
+                idx = np.unique(np.concatenate([idx, np.fromiter(self._moved, dtype=np.int64)]))
+        return idx
+
+    def query_radius(self, center, radius):
+        """
+        Points within `radius` of center, nearest first.
+
+        Returns:
+            tuple: (ids, distances)
+        """
+        if self._size == 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0)
+        reach = int(np.ceil(radius / self.cell_size))
+        idx = self._gather(center, reach)
+        d = np.sqrt(np.square(self._positions[idx] - center).sum(axis=1))
+        inside = d <= radius
+        idx, d = idx[inside], d[inside]
+        order = np.argsort(d)
+        return self._ids[idx[order]], d[order]
+
+    def query_knn(self, center, k=1):
+        """
+        The k nearest points to center, nearest first.
+
+        Returns:
+            tuple: (ids, distances); fewer than k if the index holds fewer points.
+        """
+        if self._size == 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0)
+        center = np.asarray(center, dtype=np.float64)
+        reach = 1
+        while True:
+            idx = self._gather(center, reach)
+            exhaustive = len(idx) == self._size
+            if len(idx) >= k or exhaustive:
+                d = np.sqrt(np.square(self._positions[idx] - center).sum(axis=1))
+                if len(idx) > k:
+                    part = np.argpartition(d, k - 1)[:k]
+                    idx, d = idx[part], d[part]
+                # Every point closer than `reach` cells is guaranteed to have been gathered
+                if exhaustive or (len(d) and d.max() <= reach * self.cell_size):
+                    order = np.argsort(d)
+                    return self._ids[idx[order]], d[order]
+            reach *= 2
+
+
+class SpatialHash:
+    """
+    Pure-Python hash grid of landmark dicts, keyed by class and cell.
+
+    Meant for online use where landmarks are inserted and moved one at a time (e.g. merging
+    repeated observations): every operation touches a handful of dict entries and no arrays
+    have to be rebuilt. With the cell size equal to the search radius, a radius query only
+    looks at the 27 cells around the query position.
+    """
+
+    def __init__(self, cell_size):
+        self.cell_size = float(cell_size)
+        self._cells = {}
+
+    def _key(self, class_name, position):
+        size = self.cell_size
+        return (class_name, math.floor(position[0] / size), math.floor(position[1] / size), math.floor(position[2] / size))
+
+    def insert(self, landmark):
+        self._cells.setdefault(self._key(landmark['class'], landmark['position']), []).append(landmark)
+
+    def remove(self, landmark):
+        key = self._key(landmark['class'], landmark['position'])
+        members = self._cells.get(key, [])
+        for i, lm in enumerate(members):
+            if lm is landmark:
+                del members[i]
+                break
+        if not members:
+            self._cells.pop(key, None)
+
+    def move(self, landmark, position):
+        """Re-files a landmark under a new position (the dict itself is not modified)."""
+        if self._key(landmark['class'], landmark['position']) != self._key(landmark['class'], position):
+            self.remove(landmark)
+            self._cells.setdefault(self._key(landmark['class'], position), []).append(landmark)
+
+    def nearest(self, class_name, position, radius):
+        """
+        The closest landmark of a class within radius (radius must not exceed the cell size).
+
+        Returns:
+            tuple: (landmark, distance) or (None, inf).
+        """
+        _, cx, cy, cz = self._key(class_name, position)
+        best, best_dist = None, float('inf')
+        for dx in (-1, 0, 1):
+            for dy in (-1, 0, 1):
+                for dz in (-1, 0, 1):
+                    for lm in self._cells.get((class_name, cx + dx, cy + dy, cz + dz), ()):
+                        p = lm['position']
+                        dist = math.sqrt((p[0] - position[0]) ** 2 + (p[1] - position[1]) ** 2 + (p[2] - position[2]) ** 2)
+                        if dist < best_dist:
+                            best, best_dist = lm, dist
+        if best_dist > radius:
+            return None, float('inf')
+        return best, best_dist
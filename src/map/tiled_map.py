@@ -0,0 +1,322 @@
+import json
+import math
+import os
+import queue
+import threading
+from collections import OrderedDict
+
+from src.map.binary_map import BinaryMap, write_binary_map
+
+MANIFEST_NAME = 'manifest.json'
+# Rough resident cost of one landmark: the dict with its position list plus its share of the
+# spatial index arrays (global and per-class)
+LANDMARK_BYTES = 600
+
+def tile_key(position, tile_size):
+    """Ground-plane (x, z) tile coordinates of a map position."""
+    return (int(math.floor(float(position[0]) / tile_size)), int(math.floor(float(position[2]) / tile_size)))
+
+def _key_name(key):
+    return f"{key[0]},{key[1]}"
+
+def _tile_file(key):
+    return f"tile_{key[0]}_{key[1]}.navmap"
+
+def is_tiled_map(path):
+    """True if path is a tiled map directory."""
+    return os.path.isdir(path) and os.path.exists(os.path.join(path, MANIFEST_NAME))
+
+def write_tiled_map(directory, landmarks, tile_size=25.0):
+    """
+    Splits landmarks into square ground-plane tiles, one binary map file per tile.
+
+    Args:
+        directory (str): Output directory (created if needed).
+        landmarks (iterable): Landmark dicts.
+        tile_size (float): Tile edge length (m) along x and z.
+
+    Returns:
+        int: Number of tiles written.
+    """
+    os.makedirs(directory, exist_ok=True)
+    tiles = {}
+    next_id = 1
+    for lm in landmarks:
+        tiles.setdefault(tile_key(lm['position'], tile_size), []).append(lm)
+        if isinstance(lm.get('id'), int):
+            next_id = max(next_id, lm['id'] + 1)
+
+    for key, members in tiles.items():
+        write_binary_map(os.path.join(directory, _tile_file(key)), members)
+    manifest = {
+        'tile_size': tile_size,
+        'next_id': next_id,
+        'tiles': {_key_name(key): {'file': _tile_file(key), 'count': len(members)} for key, members in tiles.items()},
+    }
+    _write_manifest(directory, manifest)
+    return len(tiles)
+
+def _write_manifest(directory, manifest):
+    path = os.path.join(directory, MANIFEST_NAME)
+    with open(path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=4)
+    os.replace(path + '.tmp', path)
+
+
+class TileCache:
+    """
+    Keeps the tiles around the current position of a tiled map resident.
+
+    The tiles within `radius` tiles of the current one are the active set and are loaded
+    synchronously when the position moves into a new tile (normally they are already resident).
+    The next ring of tiles is read on a background thread, so walking into a neighbouring tile
+    rarely has to wait for the disk. Tiles outside the active set are evicted in least recently
+    used order once the resident landmarks exceed the memory budget; edited tiles are written
+    back after they are dropped, outside the lock, and are served from memory until then.
+    """
+
+    def __init__(self, directory, radius=1, memory_budget_mb=64.0, prefetch=True):
+        """
+        Args:
+            directory (str): Tiled map directory (see write_tiled_map).
+            radius (int): Active tiles around the current one (1 = 3x3 tiles).
+            memory_budget_mb (float): Budget for resident tiles; the active set is never evicted.
+            prefetch (bool): Load the ring around the active set on a background thread.
+        """
+        self.directory = directory
+        with open(os.path.join(directory, MANIFEST_NAME), 'r', encoding='utf-8') as f:
+            self.manifest = json.load(f)
+        self.tile_size = float(self.manifest['tile_size'])
+        self.radius = radius
+        self.memory_budget = memory_budget_mb * 1e6
+        self.prefetch = prefetch
+
+        self._tiles = OrderedDict() # key -> landmark list, least recently used first
+        self._dirty = set()
+        self._writing = {} # key -> evicted tile whose write is in progress
+        self._lock = threading.Lock()
+        # Serializes tile/manifest writes, which run without holding _lock
+        self._write_lock = threading.Lock()
+        self._queue = queue.Queue()
+        self._thread = None
+        self.center = None
+        self.active = []
+        self.stats = {'hits': 0, 'misses': 0, 'prefetched': 0, 'evicted': 0}
+
+    def __len__(self):
+        """Total number of landmarks in the map (resident or not)."""
+        return sum(tile['count'] for tile in self.manifest['tiles'].values())
+
+    def _exists(self, key):
+        return _key_name(key) in self.manifest['tiles']
+
+    def _read_tile(self, key):
+        tile = self.manifest['tiles'].get(_key_name(key))
+        if tile is None:
+            return []
+        return BinaryMap(os.path.join(self.directory, tile['file'])).to_landmarks()
+
+    def _neighbourhood(self, key, radius):
+        return [(key[0] + dx, key[1] + dz)
+                for dx in range(-radius, radius + 1) for dz in range(-radius, radius + 1)
+                if self._exists((key[0] + dx, key[1] + dz))]
+
+    def _resident(self, key):
+        """A tile's landmarks if they are in memory (call with _lock held)."""
+        tile = self._tiles.get(key)
+        if tile is None:
+            # Evicted but not written yet: the file on disk may still be stale
+            tile = self._writing.get(key)
+            if tile is not None:
+                self._tiles[key] = tile
+        return tile
+
+    def _keep(self, key, tile):
+        """Makes tile resident unless the key already is; returns the resident list (call with _lock held)."""
+        resident = self._resident(key)
+        if resident is None:
+            self._tiles[key] = resident = tile
+        return resident
+
+    def _get(self, key):
+        """Returns a tile's landmarks, loading it synchronously if it is not resident."""
+        with self._lock:
+            tile = self._resident(key)
+            if tile is not None:
+                self._tiles.move_to_end(key)
+                self.stats['hits'] += 1
+                return tile
+        tile = self._read_tile(key)
+        with self._lock:
+            # The prefetch thread may have loaded it in the meantime
+            tile = self._keep(key, tile)
+            self._tiles.move_to_end(key)
+            self.stats['misses'] += 1
+        return tile
+
+    def update(self, position):
+        """
+        Moves the active set to the tiles around position.
+
+        Returns:
+            bool: True if the active set changed (callers should refresh their landmark list).
+        """
+        key = tile_key(position, self.tile_size)
+        if key == self.center:
+            return False
+        active = self._neighbourhood(key, self.radius)
+        with self._lock:
+            # The prefetch thread evicts concurrently and must never see a half-updated set
+            self.center = key
+            self.active = active
+        for active_key in active:
+            self._get(active_key)
+
+        if self.prefetch:
+            self._start_prefetch_thread()
+            for ring_key in self._neighbourhood(key, self.radius + 1):
+                if ring_key not in self._tiles:
+                    self._queue.put(ring_key)
+        self._evict()
+        return True
+
+    def _start_prefetch_thread(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._prefetch_loop, name="TilePrefetch", daemon=True)
+            self._thread.start()
+
+    def _prefetch_loop(self):
+        while True:
+            key = self._queue.get()
+            if key is None:
+                break
+            with self._lock:
+                if self._resident(key) is not None:
+                    continue
+            tile = self._read_tile(key)
+            with self._lock:
+                if self._resident(key) is None:
+                    self._tiles[key] = tile
+                    # Prefetched tiles are the first candidates for eviction until they are used
+                    self._tiles.move_to_end(key, last=False)
+                    self.stats['prefetched'] += 1
+            self._evict()
+
+    def memory_bytes(self):
+        """Estimated memory held by the resident tiles."""
+        with self._lock:
+            return sum(len(tile) for tile in self._tiles.values()) * LANDMARK_BYTES
+
+    def _evict(self):
+        victims = []
+        with self._lock:
+            resident = sum(len(tile) for tile in self._tiles.values()) * LANDMARK_BYTES
+            protected = set(self.active)
+            for key in list(self._tiles):
+                if resident <= self.memory_budget:
+                    break
+                if key in protected:
+                    continue
+                tile = self._tiles.pop(key)
+                if key in self._dirty:
+                    victims.append(self._take_dirty(key, tile))
+                resident -= len(tile) * LANDMARK_BYTES
+                self.stats['evicted'] += 1
+            manifest = self._manifest_snapshot() if victims else None
+        self._write_tiles(victims, manifest)
+
+    def _take_dirty(self, key, tile):
+        """Marks a dirty tile as being written and snapshots it (call with _lock held)."""
+        self._dirty.discard(key)
+        self._writing[key] = tile
+        return key, tile, list(tile)
+
+    def _manifest_snapshot(self):
+        return dict(self.manifest, tiles={name: dict(entry) for name, entry in self.manifest['tiles'].items()})
+
+    def _write_tiles(self, victims, manifest):
+        """Writes tile snapshots taken by _take_dirty and the manifest, without holding _lock."""
+        if manifest is None:
+            return
+        with self._write_lock:
+            for key, _, snapshot in victims:
+                write_binary_map(os.path.join(self.directory, _tile_file(key)), snapshot)
+            _write_manifest(self.directory, manifest)
+        with self._lock:
+            for key, tile, _ in victims:
+                if self._writing.get(key) is tile:
+                    del self._writing[key]
+
+    def resident_landmarks(self):
+        """Landmarks of the active tiles as one list (the dicts are shared with the cache)."""
+        with self._lock:
+            landmarks = []
+            for key in self.active:
+                landmarks.extend(self._tiles.get(key, []))
+            return landmarks
+
+    def allocate_id(self):
+        """Next unused landmark id of the whole map."""
+        with self._lock:
+            new_id = self.manifest.get('next_id', 1)
+            self.manifest['next_id'] = new_id + 1
+            return new_id
+
+    def add(self, landmark):
+        """
+        Adds a landmark to the tile containing it; the tile is written on eviction or flush().
+
+        Returns:
+            bool: True if the tile is in the active set (the landmark is resident).
+        """
+        key = tile_key(landmark['position'], self.tile_size)
+        tile = self._get(key)
+        with self._lock:
+            # Evicted since _get: put it back so the edit is not made to an orphaned list
+            tile = self._keep(key, tile)
+            tile.append(landmark)
+            entry = self.manifest['tiles'].setdefault(_key_name(key), {'file': _tile_file(key), 'count': 0})
+            entry['count'] += 1
+            self._dirty.add(key)
+            if key not in self.active and self.center is not None and \
+                    max(abs(key[0] - self.center[0]), abs(key[1] - self.center[1])) <= self.radius:
+                # First landmark of a new tile within the active radius
+                self.active = self.active + [key]
+            return key in self.active
+
+    def remove(self, landmark):
+        """Removes a landmark (the same dict object) from the tile containing it."""
+        key = tile_key(landmark['position'], self.tile_size)
+        tile = self._get(key)
+        with self._lock:
+            tile = self._keep(key, tile)
+            for i, lm in enumerate(tile):
+                if lm is landmark:
+                    del tile[i]
+                    self.manifest['tiles'][_key_name(key)]['count'] -= 1
+                    self._dirty.add(key)
+                    return True
+        return False
+
+    def flush(self):
+        """Writes all edited tiles and the manifest."""
+        with self._lock:
+            victims = [self._take_dirty(key, self._tiles[key]) for key in list(self._dirty)]
+            manifest = self._manifest_snapshot()
+        self._write_tiles(victims, manifest)
+
+    def all_landmarks(self):
+        """Yields every landmark of the map, reading tiles that are not resident from disk."""
+        for name in list(self.manifest['tiles']):
+            key = tuple(int(v) for v in name.split(','))
+            with self._lock:
+                tile = self._tiles.get(key)
+            yield from (tile if tile is not None else self._read_tile(key))
+
+    def close(self):
+        """Stops the prefetch thread and writes edited tiles."""
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join(timeout=2.0)
+            self._thread = None
+        self.flush()
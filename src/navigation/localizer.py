@@ -1,8 +1,25 @@
 import numpy as np
 
+from src.navigation.pose_solver import PoseSolver
+
 class Localizer:
-    def __init__(self, map_manager):
+    METHODS = ('smoothing', 'lsq')
+
+    def __init__(self, map_manager, method='smoothing', **solver_kwargs):
+        """
+        Args:
+            map_manager (MapManager): Map with the known landmarks.
+            method (str): 'smoothing' blends a per-landmark estimate into the position;
+                          'lsq' associates all detections at once and solves the pose
+                          (position and yaw) by least squares every frame (see PoseSolver).
+            **solver_kwargs: Options for PoseSolver ('lsq' only).
+        """
+        if method not in self.METHODS:
+            raise ValueError(f"Unknown method '{method}'. Expected one of {self.METHODS}.")
         self.map_manager = map_manager
+        self.method = method
+        self.solver = PoseSolver(map_manager, **solver_kwargs) if method == 'lsq' else None
+        self.last_fix = None
         self.current_position = np.array([0.0, 0.0, 0.0]) # Initial guess
         self.current_orientation = 0.0 # Yaw angle in degrees
 
@@ -17,6 +34,9 @@ class Localizer:
         if not detected_landmarks:
             return self.current_position
 
+        if self.solver is not None:
+            return self._update_lsq(detected_landmarks)
+
         # Simple approach: Find the nearest matching landmark in the map and assume we are close to it
         # minus the relative position.
         # Ideally, we would use a particle filter or least squares optimization for multiple landmarks.
@@ -27,7 +47,7 @@ class Localizer:
             # For now, we assume unique classes or nearest neighbor.
             
             # Let's try to match by class first
-            candidates = [lm for lm in self.map_manager.landmarks if lm['class'] == det_lm['class']]
+            candidates = self.map_manager.get_candidates(det_lm['class'])
             
             if candidates:
                 # Find the closest candidate to our current estimated position
@@ -55,5 +75,14 @@ class Localizer:
                 
         return self.current_position
 
+    def _update_lsq(self, detected_landmarks):
+        """Single-frame fix from all landmarks; keeps the previous pose if nothing could be matched."""
+        fix = self.solver.solve(detected_landmarks, self.current_position, np.radians(self.current_orientation))
+        if fix is not None:
+            self.last_fix = fix
+            self.current_position = fix['position']
+            self.current_orientation = float(np.degrees(fix['yaw']))
+        return self.current_position
+
     def get_position(self):
         return self.current_position
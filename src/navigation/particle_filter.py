@@ -0,0 +1,227 @@
+import numpy as np
+
+class ParticleFilterLocalizer:
+    """
+    Monte Carlo localizer estimating the ground-plane position and heading of the camera.
+
+    Map positions use the same axes as the camera frame when the camera faces north (yaw 0):
+    x to the right, y down and z forward. The state of each particle is (x, z, yaw), where
+    yaw is the heading in radians measured from the map +z axis towards +x. The vertical
+    map coordinate is not filtered; it is taken from the matched landmarks.
+
+    All particles are stored as NumPy arrays, and every update scores all detections against
+    all particles in one batched pass. A detection of class c is explained by any map landmark
+    of class c (a Gaussian mixture over the candidates plus a clutter term for false
+    detections), so the filter does not need hard data association.
+    """
+
+    def __init__(self, map_manager, num_particles=5000, initial_pose=None, initial_std=(0.5, 0.5, 0.2),
+                 position_noise=0.05, yaw_noise=0.02, measurement_std=0.15, range_std=0.05,
+                 clutter=1e-3, resample_threshold=0.5, seed=None):
+        """
+        Args:
+            map_manager (MapManager): Map with the known landmarks.
+            num_particles (int): Number of particles.
+            initial_pose (tuple, optional): (x, z, yaw) start pose. If None, particles are spread
+                                            uniformly over the map with random headings.
+            initial_std (tuple): Standard deviation of (x, z, yaw) around initial_pose.
+            position_noise (float): Process noise (m) per update for x and z.
+            yaw_noise (float): Process noise (rad) per update for yaw.
+            measurement_std (float): Landmark position noise (m) at zero range.
+            range_std (float): Additional noise per meter of range (depth error grows with distance).
+            clutter (float): Likelihood floor for detections not explained by any landmark.
+            resample_threshold (float): Resample when the effective sample size falls below
+                                        this fraction of the particles.
+            seed (int, optional): Random seed.
+        """
+        self.map_manager = map_manager
+        self.num_particles = num_particles
+        self.position_noise = position_noise
+        self.yaw_noise = yaw_noise
+        self.measurement_std = measurement_std
+        self.range_std = range_std
+        self.clutter = clutter
+        self.resample_threshold = resample_threshold
+        self.rng = np.random.default_rng(seed)
+
+        self.current_position = np.zeros(3)
+        self.current_orientation = 0.0 # Yaw angle in degrees (same unit as Localizer)
+        self.resample_count = 0
+
+        if initial_pose is not None:
+            self.reset(initial_pose, initial_std)
+        else:
+            self.reset_uniform()
+
+    def reset(self, pose, std=(0.5, 0.5, 0.2)):
+        """Draws all particles from a Gaussian around pose (x, z, yaw)."""
+        n = self.num_particles
+        self.x = self.rng.normal(pose[0], std[0], n)
+        self.z = self.rng.normal(pose[1], std[1], n)
+        self.yaw = self.rng.normal(pose[2], std[2], n)
+        self.log_weights = np.zeros(n)
+        self._update_estimate()
+
+    def reset_uniform(self, margin=2.0):
+        """Spreads all particles over the bounding box of the map (plus margin) with random headings."""
+        positions = self.map_manager.get_index().positions
+        if len(positions):
+            lo = positions[:, [0, 2]].min(axis=0) - margin
+            hi = positions[:, [0, 2]].max(axis=0) + margin
+        else:
+            lo, hi = np.full(2, -margin), np.full(2, margin)
+        n = self.num_particles
+        self.x = self.rng.uniform(lo[0], hi[0], n)
+        self.z = self.rng.uniform(lo[1], hi[1], n)
+        self.yaw = self.rng.uniform(-np.pi, np.pi, n)
+        self.log_weights = np.zeros(n)
+        self._update_estimate()
+
+    def predict(self, odometry=None):
+        """
+        Motion update.
+
+        Args:
+            odometry (tuple, optional): (forward, right, dyaw) motion since the last update in the
+                                        camera frame (meters, meters, radians). Without odometry the
+                                        particles only diffuse by the process noise.
+        """
+        n = self.num_particles
+        if odometry is not None:
+            forward, right, dyaw = odometry
+            sin_y, cos_y = np.sin(self.yaw), np.cos(self.yaw)
+            self.x += cos_y * right + sin_y * forward
+            self.z += -sin_y * right + cos_y * forward
+            self.yaw += dyaw
+        self.x += self.rng.normal(0.0, self.position_noise, n)
+        self.z += self.rng.normal(0.0, self.position_noise, n)
+        self.yaw += self.rng.normal(0.0, self.yaw_noise, n)
+
+    def update(self, detected_landmarks, odometry=None):
+        """
+        Runs one filter step (motion update, measurement update, resampling).
+
+        Args:
+            detected_landmarks (list): Landmarks from LandmarkDetector ('class' and camera-frame 'position').
+            odometry (tuple, optional): See predict().
+
+        Returns:
+            numpy.ndarray: Estimated [x, y, z] position in the map frame.
+        """
+        self.predict(odometry)
+
+        rel, candidates, owner = [], [], []
+        for det in detected_landmarks:
+            positions, _ = self.map_manager.get_class_arrays(det['class'])
+            if len(positions) == 0:
+                continue
+            owner.extend([len(rel)] * len(positions))
+            candidates.append(positions)
+            rel.append(det['position'])
+
+        if rel:
+            self._measurement_update(np.asarray(rel, dtype=np.float64), np.concatenate(candidates),
+                                     np.asarray(owner))
+            self._resample_if_needed()
+        self._update_estimate(rel, candidates)
+        return self.current_position
+
+    def _measurement_update(self, rel, candidates, owner):
+        """
+        Scores all particles against all (detection, candidate landmark) pairs at once.
+
+        Args:
+            rel (numpy.ndarray): Jx3 camera-frame detections.
+            candidates (numpy.ndarray): Tx3 map positions of the candidate landmarks.
+            owner (numpy.ndarray): T detection indices (candidates of a detection are contiguous).
+        """
+        sin_y, cos_y = np.sin(self.yaw)[:, None], np.cos(self.yaw)[:, None]
+        rx, rz = rel[None, :, 0], rel[None, :, 2]
+
+        # Where each particle expects the landmark behind each detection: N x J
+        wx = self.x[:, None] + cos_y * rx + sin_y * rz
+        wz = self.z[:, None] - sin_y * rx + cos_y * rz
+
+        sigma = self.measurement_std + self.range_std * np.hypot(rel[:, 0], rel[:, 2])
+        counts = np.bincount(owner, minlength=len(rel))
+
+        # Gate: candidates farther than 5 sigma from every particle's prediction contribute
+        # nothing, so only pairs inside the bounding box of the predictions are evaluated.
+        gate = 5.0 * sigma
+        lo_x, hi_x = wx.min(axis=0) - gate, wx.max(axis=0) + gate
+        lo_z, hi_z = wz.min(axis=0) - gate, wz.max(axis=0) + gate
+        cx, cz = candidates[:, 0], candidates[:, 2]
+        keep = (cx >= lo_x[owner]) & (cx <= hi_x[owner]) & (cz >= lo_z[owner]) & (cz <= hi_z[owner])
+        if not keep.any():
+            return
+        owner, cx, cz = owner[keep], cx[keep], cz[keep]
+
+        # N x T' squared distances between predictions and candidate landmarks
+        d2 = (wx[:, owner] - cx[None, :]) ** 2
+        d2 += (wz[:, owner] - cz[None, :]) ** 2
+        d2 *= -(0.5 / sigma ** 2)[owner][None, :]
+        lik = np.exp(d2, out=d2)
+
+        # Sum the mixture over the candidates of each detection, then combine detections.
+        # Detections without any candidate left only add the (constant) clutter term.
+        starts = np.flatnonzero(np.r_[True, owner[1:] != owner[:-1]])
+        per_detection = np.add.reduceat(lik, starts, axis=1) / counts[owner[starts]][None, :]
+        self.log_weights += np.log(per_detection + self.clutter).sum(axis=1)
+        self.log_weights -= self.log_weights.max()
+
+    def _weights(self):
+        w = np.exp(self.log_weights)
+        return w / w.sum()
+
+    def effective_sample_size(self):
+        w = self._weights()
+        return 1.0 / np.sum(w * w)
+
+    def _resample_if_needed(self):
+        if self.effective_sample_size() >= self.resample_threshold * self.num_particles:
+            return
+        # Systematic resampling: one random offset, evenly spaced pointers
+        n = self.num_particles
+        cumulative = np.cumsum(self._weights())
+        cumulative[-1] = 1.0
+        idx = np.searchsorted(cumulative, (np.arange(n) + self.rng.random()) / n)
+        self.x = self.x[idx]
+        self.z = self.z[idx]
+        self.yaw = self.yaw[idx]
+        self.log_weights = np.zeros(n)
+        self.resample_count += 1
+
+    def _update_estimate(self, rel=(), candidates=()):
+        """Weighted mean position and circular mean heading; vertical from the nearest candidates."""
+        w = self._weights()
+        x = float(np.dot(w, self.x))
+        z = float(np.dot(w, self.z))
+        yaw = float(np.arctan2(np.dot(w, np.sin(self.yaw)), np.dot(w, np.cos(self.yaw))))
+        self.yaw = (self.yaw + np.pi) % (2 * np.pi) - np.pi
+
+        y = self.current_position[1]
+        if len(rel):
+            sin_y, cos_y = np.sin(yaw), np.cos(yaw)
+            heights = []
+            for r, positions in zip(rel, candidates):
+                wx = x + cos_y * r[0] + sin_y * r[2]
+                wz = z - sin_y * r[0] + cos_y * r[2]
+                nearest = positions[np.argmin((positions[:, 0] - wx) ** 2 + (positions[:, 2] - wz) ** 2)]
+                heights.append(nearest[1] - r[1])
+            y = float(np.mean(heights))
+
+        self.current_position = np.array([x, y, z])
+        self.current_orientation = float(np.degrees(yaw))
+
+    def get_position(self):
+        return self.current_position
+
+    def get_pose(self):
+        """Returns (x, z, yaw_radians) of the current estimate."""
+        return self.current_position[0], self.current_position[2], np.radians(self.current_orientation)
+
+    def get_spread(self):
+        """Weighted standard deviation of the particle positions (m), a simple confidence measure."""
+        w = self._weights()
+        mx, mz = np.dot(w, self.x), np.dot(w, self.z)
+        return float(np.sqrt(np.dot(w, (self.x - mx) ** 2 + (self.z - mz) ** 2)))
@@ -0,0 +1,217 @@
+import numpy as np
+
+def _linear_sum_assignment():
+    """scipy's Hungarian solver if SciPy is installed, otherwise None."""
+    try:
+        from scipy.optimize import linear_sum_assignment
+    except ImportError:
+        return None
+    return linear_sum_assignment
+
+def assign(cost, max_cost, method='auto'):
+    """
+    Assigns rows (detections) to columns (landmarks) minimizing the total cost.
+
+    Args:
+        cost (numpy.ndarray): JxM cost matrix; pairs that are not allowed hold np.inf.
+        max_cost (float): Pairs above this cost are never assigned (gating).
+        method (str): 'hungarian' (optimal, needs SciPy), 'greedy' (gated nearest neighbour,
+                      cheapest pairs first) or 'auto' (Hungarian when SciPy is available).
+
+    Returns:
+        tuple: (rows, cols) index arrays of the assigned pairs.
+    """
+    gated = np.where(cost <= max_cost, cost, np.inf)
+    if gated.size == 0 or not np.isfinite(gated).any():
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+
+    solver = _linear_sum_assignment() if method in ('auto', 'hungarian') else None
+    if method == 'hungarian' and solver is None:
+        raise ImportError("method='hungarian' requires SciPy")
+
+    if solver is not None:
+        # Forbidden pairs get a cost no real assignment can reach and are dropped afterwards
+        big = max_cost * (min(gated.shape) + 1) + 1.0
+        rows, cols = solver(np.where(np.isfinite(gated), gated, big))
+        ok = np.isfinite(gated[rows, cols])
+        return rows[ok], cols[ok]
+
+    rows, cols = [], []
+    used_rows, used_cols = set(), set()
+    order = np.argsort(gated, axis=None)
+    for flat in order[:np.count_nonzero(np.isfinite(gated))]:
+        i, j = divmod(int(flat), gated.shape[1])
+        if i in used_rows or j in used_cols:
+            continue
+        used_rows.add(i)
+        used_cols.add(j)
+        rows.append(i)
+        cols.append(j)
+    return np.asarray(rows, dtype=np.int64), np.asarray(cols, dtype=np.int64)
+
+def rotate_yaw(points, yaw):
+    """Rotates Nx3 camera-frame points about the vertical (y) axis into the map frame."""
+    sin_y, cos_y = np.sin(yaw), np.cos(yaw)
+    out = np.array(points, dtype=np.float64)
+    out[:, 0] = cos_y * points[:, 0] + sin_y * points[:, 2]
+    out[:, 2] = -sin_y * points[:, 0] + cos_y * points[:, 2]
+    return out
+
+def solve_planar(rel, targets, weights, yaw=None):
+    """
+    Weighted least-squares yaw + translation that maps camera-frame points onto map points.
+
+    The rotation is about the vertical axis only (the camera is carried upright); with a single
+    correspondence the yaw cannot be observed and the given prior `yaw` is kept.
+
+    Args:
+        rel (numpy.ndarray): Nx3 camera-frame points.
+        targets (numpy.ndarray): Nx3 map points.
+        weights (numpy.ndarray): N weights.
+        yaw (float, optional): Yaw used when it cannot be estimated.
+
+    Returns:
+        tuple: (position [x, y, z], yaw in radians)
+    """
+    w = weights / weights.sum()
+    if len(rel) >= 2:
+        # Closed form: with c = z + i*x per point, map = e^(i*yaw) * camera around the centroids
+        a = rel - w @ rel
+        b = targets - w @ targets
+        a_c = a[:, 2] + 1j * a[:, 0]
+        b_c = b[:, 2] + 1j * b[:, 0]
+        yaw = float(np.angle(np.sum(w * np.conj(a_c) * b_c)))
+    elif yaw is None:
+        yaw = 0.0
+    position = w @ (targets - rotate_yaw(rel, yaw))
+    return position, yaw
+
+def solve_rigid(rel, targets, weights):
+    """
+    Weighted 3D rigid alignment (Kabsch): the rotation R and camera position t that minimize
+    sum(w * |R rel + t - target|^2). Needs at least three non-collinear correspondences.
+
+    Returns:
+        tuple: (position [x, y, z], 3x3 rotation matrix)
+    """
+    w = weights / weights.sum()
+    mu_a, mu_b = w @ rel, w @ targets
+    h = ((rel - mu_a) * w[:, None]).T @ (targets - mu_b)
+    u, _, vt = np.linalg.svd(h)
+    d = np.sign(np.linalg.det(vt.T @ u.T))
+    rotation = vt.T @ np.diag([1.0, 1.0, d]) @ u.T
+    return mu_b - rotation @ mu_a, rotation
+
+class PoseSolver:
+    """
+    Single-frame pose fix from all visible landmarks.
+
+    1. Detections are placed in the map with the prior pose and associated to map landmarks of
+       the same class by a global assignment (Hungarian, or gated nearest neighbour without SciPy).
+    2. The pose is solved in one weighted least-squares step over all correspondences
+       (planar yaw + translation, or a full 3D rigid fit).
+    3. Correspondences with large residuals are rejected one at a time and the pose is refit.
+    Association and fit are repeated `iterations` times so a rough prior still converges.
+    """
+
+    def __init__(self, map_manager, gate=2.0, max_residual=0.5, mode='planar', assignment='auto',
+                 iterations=2, measurement_std=0.15, range_std=0.05):
+        """
+        Args:
+            map_manager (MapManager): Map with the known landmarks.
+            gate (float): Maximum distance (m) between a placed detection and its landmark.
+            max_residual (float): Residual (m) above which a correspondence is an outlier.
+            mode (str): 'planar' (x, y, z + yaw) or '3d' (full rotation, needs >= 3 matches).
+            assignment (str): 'auto', 'hungarian' or 'greedy' (see assign()).
+            iterations (int): Association/fit rounds.
+            measurement_std (float): Detection noise (m) at zero range.
+            range_std (float): Additional noise per meter of range; far detections get less weight.
+        """
+        if mode not in ('planar', '3d'):
+            raise ValueError(f"Unknown mode '{mode}'. Expected 'planar' or '3d'.")
+        self.map_manager = map_manager
+        self.gate = gate
+        self.max_residual = max_residual
+        self.mode = mode
+        self.assignment = assignment
+        self.iterations = iterations
+        self.measurement_std = measurement_std
+        self.range_std = range_std
+
+    def solve(self, detected_landmarks, position, yaw=0.0):
+        """
+        Args:
+            detected_landmarks (list): Landmarks from LandmarkDetector ('class' and camera-frame 'position').
+            position (array-like): Prior [x, y, z] camera position in the map.
+            yaw (float): Prior heading in radians.
+
+        Returns:
+            dict: {'position', 'yaw', 'rotation', 'matches' [(detection index, landmark id)], 'rmse'},
+                  or None if no detection could be associated.
+        """
+        if not detected_landmarks:
+            return None
+
+        # Candidate columns: the landmarks of every detected class, as contiguous arrays
+        det_classes = [d['class'] for d in detected_landmarks]
+        column_classes, column_positions, column_index = [], [], []
+        for class_name in dict.fromkeys(det_classes):
+            class_positions, members = self.map_manager.get_class_arrays(class_name)
+            column_classes.extend([class_name] * len(members))
+            column_positions.append(class_positions)
+            column_index.append(members)
+        if not column_classes:
+            return None
+        positions = np.concatenate(column_positions)
+        column_index = np.concatenate(column_index)
+        landmarks = self.map_manager.landmarks
+
+        rel = np.array([d['position'] for d in detected_landmarks], dtype=np.float64).reshape(-1, 3)
+        same_class = np.array(det_classes, dtype=object)[:, None] == np.array(column_classes, dtype=object)[None, :]
+        sigma = self.measurement_std + self.range_std * np.linalg.norm(rel, axis=1)
+        weights_all = 1.0 / sigma ** 2
+
+        position = np.asarray(position, dtype=np.float64)
+        rotation = None
+        result = None
+        for _ in range(self.iterations):
+            placed = position + (rel @ rotation.T if rotation is not None else rotate_yaw(rel, yaw))
+            diff = placed[:, None, [0, 2]] - positions[None, :, [0, 2]]
+            cost = np.where(same_class, np.einsum('jmk,jmk->jm', diff, diff), np.inf)
+            rows, cols = assign(cost, self.gate ** 2, self.assignment)
+            if len(rows) == 0:
+                return result
+
+            fit = self._fit_with_rejection(rel[rows], positions[cols], weights_all[rows], yaw)
+            position, yaw, rotation, inliers, rmse = fit
+            result = {
+                'position': position,
+                'yaw': yaw,
+                'rotation': rotation,
+                'matches': [(int(r), landmarks[column_index[c]].get('id')) for r, c in zip(rows[inliers], cols[inliers])],
+                'rmse': rmse,
+            }
+        return result
+
+    def _fit(self, rel, targets, weights, yaw):
+        if self.mode == '3d' and len(rel) >= 3:
+            position, rotation = solve_rigid(rel, targets, weights)
+            # Heading of the camera's forward (z) axis in the map's ground plane
+            yaw = float(np.arctan2(rotation[0, 2], rotation[2, 2]))
+            return position, yaw, rotation
+        position, yaw = solve_planar(rel, targets, weights, yaw)
+        return position, yaw, None
+
+    def _fit_with_rejection(self, rel, targets, weights, yaw):
+        """Fits all correspondences, then drops the worst one while it exceeds max_residual."""
+        inliers = np.arange(len(rel))
+        while True:
+            position, new_yaw, rotation = self._fit(rel[inliers], targets[inliers], weights[inliers], yaw)
+            placed = position + (rel[inliers] @ rotation.T if rotation is not None else rotate_yaw(rel[inliers], new_yaw))
+            residuals = np.linalg.norm(placed - targets[inliers], axis=1)
+            worst = int(np.argmax(residuals))
+            if residuals[worst] <= self.max_residual or len(inliers) <= 2:
+                break
+            inliers = np.delete(inliers, worst)
+        rmse = float(np.sqrt(np.mean(residuals ** 2)))
+        return position, new_yaw, rotation, inliers, rmse
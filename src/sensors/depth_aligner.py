@@ -0,0 +1,381 @@
+import numpy as np
+
+
+def extrinsics_to_matrix(extrinsics):
+    """
+    Converts extrinsics to a (R, t) pair of numpy arrays.
+
+    Args:
+        extrinsics: rs.extrinsics (rotation is stored column-major) or a (R, t) tuple.
+
+    Returns:
+        tuple: (R (3x3 float64), t (3, float64)) mapping depth-frame points to color-frame points.
+    """
+    if isinstance(extrinsics, (tuple, list)):
+        R, t = extrinsics
+        return np.asarray(R, dtype=np.float64).reshape(3, 3), np.asarray(t, dtype=np.float64).reshape(3)
+    R = np.asarray(extrinsics.rotation, dtype=np.float64).reshape(3, 3).T
+    t = np.asarray(extrinsics.translation, dtype=np.float64)
+    return R, t
+
+
+def intrinsics_key(intrinsics):
+    """Hashable key identifying a set of intrinsics (used to cache precomputed grids)."""
+    return (int(intrinsics.width), int(intrinsics.height), float(intrinsics.fx), float(intrinsics.fy),
+            float(intrinsics.ppx), float(intrinsics.ppy), tuple(float(c) for c in intrinsics.coeffs))
+
+
+class DepthAligner:
+    """
+    NumPy replacement for rs.align(rs.stream.color) (depth -> color reprojection).
+
+    Everything that only depends on the camera calibration is computed once in the constructor:
+    the normalized ray of every depth pixel, already rotated into the color frame. Per frame the
+    work is then a multiply-add per pixel, a projection, and a scatter into the color image with
+    z-buffering (the closest depth wins when several depth pixels land on the same color pixel).
+
+    With scale=0.5 (half-resolution mode) every other depth pixel is used and the output is
+    half the color resolution, which is ~4x cheaper.
+    """
+
+    def __init__(self, depth_intrinsics, color_intrinsics, depth_to_color, depth_scale=0.001,
+                 scale=1.0, fill_holes=True):
+        """
+        Args:
+            depth_intrinsics: rs.intrinsics (or compatible) of the depth stream.
+            color_intrinsics: rs.intrinsics (or compatible) of the color stream.
+            depth_to_color: rs.extrinsics from depth to color, or an (R, t) tuple.
+            depth_scale (float): Meters per depth unit.
+            scale (float): Output scale relative to the color resolution (1.0 or 0.5).
+            fill_holes (bool): Fill isolated empty pixels from their neighbours, similar to
+                               the pixel-footprint splatting done by rs.align.
+        """
+        if scale not in (1.0, 0.5):
+            raise ValueError("scale must be 1.0 or 0.5")
+
+        self.depth_intrinsics = depth_intrinsics
+        self.color_intrinsics = color_intrinsics
+        self.depth_scale = depth_scale
+        self.scale = scale
+        self.fill_holes = fill_holes
+        self.key = (intrinsics_key(depth_intrinsics), intrinsics_key(color_intrinsics), scale)
+
+        self.R, self.t = extrinsics_to_matrix(depth_to_color)
+        self._prepare()
+
+    def _prepare(self):
+        d = self.depth_intrinsics
+        c = self.color_intrinsics
+        self.step = int(round(1.0 / self.scale))
+
+        # Normalized rays of the (possibly decimated) depth pixels
+        us = np.arange(0, d.width, self.step, dtype=np.float64)
+        vs = np.arange(0, d.height, self.step, dtype=np.float64)
+        xn = (us - d.ppx) / d.fx
+        yn = (vs - d.ppy) / d.fy
+        self._grid_width = us.size
+        self._grid_height = vs.size
+        xg, yg = np.meshgrid(xn, yn)
+        rays = np.stack([xg.ravel(), yg.ravel(), np.ones(xg.size)])
+
+        # Rotate once: P_color = (R @ ray) * z + t
+        rotated = self.R @ rays
+        self._rx = rotated[0].astype(np.float32)
+        self._ry = rotated[1].astype(np.float32)
+        self._rz = rotated[2].astype(np.float32)
+        self._t = self.t.astype(np.float32)
+
+        # Output (color) camera, scaled about pixel centres
+        self.out_width = int(c.width * self.scale)
+        self.out_height = int(c.height * self.scale)
+        self._fx = np.float32(c.fx * self.scale)
+        self._fy = np.float32(c.fy * self.scale)
+        self._ppx = np.float32((c.ppx + 0.5) * self.scale - 0.5)
+        self._ppy = np.float32((c.ppy + 0.5) * self.scale - 0.5)
+        coeffs = np.asarray(c.coeffs, dtype=np.float32)
+        self._coeffs = coeffs if np.any(coeffs != 0) else None
+
+    def _project(self, X, Y, Z):
+        """Projects color-frame points to (float) pixel coordinates of the output image."""
+        # Invalid pixels (z=0) produce inf/nan here; they are masked out by the caller
+        with np.errstate(divide='ignore', invalid='ignore'):
+            inv_z = 1.0 / Z
+            x = X * inv_z
+            y = Y * inv_z
+            if self._coeffs is not None:
+                # Brown-Conrady forward model, as applied by rs2_project_point_to_pixel
+                k1, k2, p1, p2, k3 = self._coeffs
+                r2 = x * x + y * y
+                f = 1 + k1 * r2 + k2 * r2 * r2 + k3 * r2 * r2 * r2
+                x = x * f
+                y = y * f
+                dx = x + 2 * p1 * x * y + p2 * (r2 + 2 * x * x)
+                dy = y + 2 * p2 * x * y + p1 * (r2 + 2 * y * y)
+                x, y = dx, dy
+            return x * self._fx + self._ppx, y * self._fy + self._ppy
+
+    def align(self, depth_image, out=None):
+        """
+        Reprojects a raw depth image into the color camera.
+
+        Args:
+            depth_image (numpy.ndarray): HxW uint16 depth image of the depth stream.
+            out (numpy.ndarray, optional): Preallocated uint16 output of shape
+                                           (out_height, out_width) to reuse.
+
+        Returns:
+            numpy.ndarray: uint16 depth image aligned to the color stream (0 = no data).
+        """
+        raw = depth_image[::self.step, ::self.step].reshape(-1)
+
+        flat = np.zeros(self.out_width * self.out_height + 1, dtype=np.uint16)
+        self._reproject(raw, self._rx, self._ry, self._rz, flat)
+        aligned = flat[:-1].reshape(self.out_height, self.out_width)
+
+        if self.fill_holes:
+            self._fill_holes(aligned)
+        if out is not None:
+            out[...] = aligned
+            return out
+        return aligned
+
+    def align_roi(self, depth_image, boxes, flat=None):
+        """
+        Reprojects only the depth pixels that can land inside the given color-image boxes.
+
+        Args:
+            depth_image (numpy.ndarray): HxW uint16 raw depth image (C-contiguous).
+            boxes (array-like): Nx4 [x1, y1, x2, y2] boxes in full-resolution color pixels.
+            flat (numpy.ndarray, optional): Flat uint16 canvas of size out_width*out_height + 1
+                                            to write into (pixels outside the boxes are untouched).
+
+        Returns:
+            numpy.ndarray: The flat canvas. Depth is valid inside the requested boxes.
+        """
+        if flat is None:
+            flat = np.zeros(self.out_width * self.out_height + 1, dtype=np.uint16)
+        boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+        if boxes.shape[0] == 0:
+            return flat
+
+        grid_idx = []
+        full_idx = []
+        for r1, r2, c1, c2 in self.depth_windows(boxes):
+            rows = np.arange(r1, r2)[:, None]
+            cols = np.arange(c1, c2)
+            grid_idx.append((rows * self._grid_width + cols).ravel())
+            full_idx.append((rows * (self.step * depth_image.shape[1]) + cols * self.step).ravel())
+        grid_idx = np.concatenate(grid_idx)
+        if grid_idx.size == 0:
+            return flat
+        raw = depth_image.reshape(-1)[np.concatenate(full_idx)]
+
+        # The canvas may hold depth from earlier calls (overlapping boxes): keep the nearer value
+        self._reproject(raw, self._rx[grid_idx], self._ry[grid_idx], self._rz[grid_idx], flat, keep_existing=True)
+
+        if self.fill_holes:
+            canvas = flat[:-1].reshape(self.out_height, self.out_width)
+            for x1, y1, x2, y2 in self._output_boxes(boxes):
+                # Start one pixel early so the box edge can be filled from its neighbour
+                self._fill_holes(canvas[max(y1 - 1, 0):y2, max(x1 - 1, 0):x2])
+        return flat
+
+    def depth_windows(self, boxes, min_depth=0.2, max_depth=20.0, pad=8):
+        """
+        Computes, for each color-image box, the window of the (decimated) depth grid whose
+        pixels can project into the box for any depth in [min_depth, max_depth].
+
+        The box corners are back-projected into the color frame at both depth limits,
+        transformed into the depth frame and projected; the window is the bounding box of
+        those 8 points plus `pad` pixels (which also absorbs color lens distortion).
+
+        Returns:
+            numpy.ndarray: Nx4 int array of [row1, row2, col1, col2] (end-exclusive).
+        """
+        c = self.color_intrinsics
+        d = self.depth_intrinsics
+        boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+
+        us = boxes[:, [0, 2, 0, 2]]
+        vs = boxes[:, [1, 1, 3, 3]]
+        rays = np.stack([(us - c.ppx) / c.fx, (vs - c.ppy) / c.fy, np.ones_like(us)], axis=-1)  # (N, 4, 3)
+        points = np.concatenate([rays * min_depth, rays * max_depth], axis=1)  # (N, 8, 3)
+        # Color frame -> depth frame: P_d = R^T (P_c - t)
+        points_d = (points - self.t) @ self.R
+        z = np.maximum(points_d[..., 2], 1e-6)
+        ud = points_d[..., 0] / z * d.fx + d.ppx
+        vd = points_d[..., 1] / z * d.fy + d.ppy
+
+        c1 = np.floor((ud.min(axis=1) - pad) / self.step)
+        c2 = np.ceil((ud.max(axis=1) + pad) / self.step) + 1
+        r1 = np.floor((vd.min(axis=1) - pad) / self.step)
+        r2 = np.ceil((vd.max(axis=1) + pad) / self.step) + 1
+
+        windows = np.stack([r1, r2, c1, c2], axis=1)
+        windows[:, :2] = np.clip(windows[:, :2], 0, self._grid_height)
+        windows[:, 2:] = np.clip(windows[:, 2:], 0, self._grid_width)
+        return windows.astype(np.int64)
+
+    def _output_boxes(self, boxes):
+        """Converts color-pixel boxes to clipped output-image boxes."""
+        scaled = np.asarray(boxes, dtype=np.float64).reshape(-1, 4) * self.scale
+        x1 = np.clip(np.floor(scaled[:, 0]), 0, self.out_width).astype(np.int64)
+        x2 = np.clip(np.ceil(scaled[:, 2]) + 1, 0, self.out_width).astype(np.int64)
+        y1 = np.clip(np.floor(scaled[:, 1]), 0, self.out_height).astype(np.int64)
+        y2 = np.clip(np.ceil(scaled[:, 3]) + 1, 0, self.out_height).astype(np.int64)
+        return np.stack([x1, y1, x2, y2], axis=1)
+
+    def _reproject(self, raw, rx, ry, rz, flat, keep_existing=False):
+        """
+        Projects raw depth values along their rotated rays and z-buffers them into `flat`
+        (a flattened output image with one extra trash slot at the end). With keep_existing,
+        pixels already holding depth are part of the z-buffer too.
+        """
+        z = raw.astype(np.float32)
+        z *= np.float32(self.depth_scale)
+
+        X = rx * z + self._t[0]
+        Y = ry * z + self._t[1]
+        Z = rz * z + self._t[2]
+        u, v = self._project(X, Y, Z)
+
+        # Round to the nearest pixel centre. Everything that is invalid or falls outside the
+        # color image is sent to the trash slot, which is cheaper than compressing all arrays
+        # with a boolean mask.
+        u += 0.5
+        v += 0.5
+        n_pixels = flat.size - 1
+        with np.errstate(invalid='ignore'):
+            inside = (raw > 0) & (Z > 0) & (u >= 0) & (u < self.out_width) & (v >= 0) & (v < self.out_height)
+            idx = v.astype(np.int32) * self.out_width + u.astype(np.int32)
+        idx[~inside] = n_pixels
+        values = raw * inside
+
+        self._scatter_min(flat, idx, values, keep_existing)
+
+    @staticmethod
+    def _scatter_min(flat, idx, values, keep_existing=False):
+        """
+        Z-buffered scatter: flat[idx] = min(values landing on each index), and with
+        keep_existing also min with the non-zero depth already in flat.
+
+        A plain fancy assignment keeps an arbitrary writer per pixel; only the (few) pixels
+        where a closer value lost are then fixed with the slower unbuffered np.minimum.at.
+        """
+        if keep_existing:
+            existing = flat[idx]
+            values = np.where((existing > 0) & (existing < values), existing, values)
+        flat[idx] = values
+        lost = values < flat[idx]
+        if np.any(lost):
+            np.minimum.at(flat, idx[lost], values[lost])
+
+    @staticmethod
+    def _fill_holes(img):
+        """
+        Fills empty pixels from their left/upper neighbour (one pixel at most). This closes the
+        rounding gaps that rs.align avoids by splatting whole pixel footprints.
+        """
+        np.copyto(img[:, 1:], img[:, :-1], where=img[:, 1:] == 0)
+        np.copyto(img[1:, :], img[:-1, :], where=img[1:, :] == 0)
+
+    def get_output_intrinsics(self):
+        """Returns (fx, fy, ppx, ppy, width, height) of the aligned output image."""
+        return (float(self._fx), float(self._fy), float(self._ppx), float(self._ppy),
+                self.out_width, self.out_height)
+
+
+def aligner_from_profile(profile, scale=1.0, fill_holes=True):
+    """
+    Creates a DepthAligner from a started pipeline profile (live camera or bag playback).
+
+    Args:
+        profile (rs.pipeline_profile): Result of pipeline.start().
+        scale (float): 1.0 for full color resolution, 0.5 for half resolution.
+    """
+    import pyrealsense2 as rs
+
+    depth_profile = profile.get_stream(rs.stream.depth).as_video_stream_profile()
+    color_profile = profile.get_stream(rs.stream.color).as_video_stream_profile()
+    depth_scale = profile.get_device().first_depth_sensor().get_depth_scale()
+
+    return DepthAligner(depth_profile.get_intrinsics(), color_profile.get_intrinsics(),
+                        depth_profile.get_extrinsics_to(color_profile), depth_scale=depth_scale,
+                        scale=scale, fill_holes=fill_holes)
+
+
+class LazyAlignedDepthFrame:
+    """
+    Depth frame that keeps the raw (unaligned) depth and aligns to color only on demand.
+
+    Detection only needs depth inside bounding boxes, so align_boxes() reprojects just the
+    depth pixels that can fall inside them. The full aligned image is still available through
+    get_data() (e.g. for visualization) and is computed once per frame when requested.
+    Coordinates are full-resolution color pixels, like an rs.align'ed depth frame.
+    """
+
+    def __init__(self, raw_depth_image, aligner):
+        self.raw_depth_image = np.ascontiguousarray(raw_depth_image)
+        self.aligner = aligner
+        self.depth_scale = aligner.depth_scale
+        self.pixel_scale = aligner.scale
+        self._flat = None
+        self._boxes = []
+        self._full = None
+
+    def align_boxes(self, boxes):
+        """Aligns the regions of the given boxes that were not aligned yet. Returns the canvas."""
+        if self._full is not None:
+            return self._full
+        boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+        missing = [b for b in boxes if not self._covered(b)]
+        if self._flat is None:
+            self._flat = np.zeros(self.aligner.out_width * self.aligner.out_height + 1, dtype=np.uint16)
+        if missing:
+            self.aligner.align_roi(self.raw_depth_image, missing, self._flat)
+            self._boxes.extend(missing)
+        return self.canvas
+
+    def _covered(self, box):
+        for b in self._boxes:
+            if b[0] <= box[0] and b[1] <= box[1] and b[2] >= box[2] and b[3] >= box[3]:
+                return True
+        return False
+
+    @property
+    def canvas(self):
+        """Aligned depth image; only the regions aligned so far contain data."""
+        if self._full is not None:
+            return self._full
+        if self._flat is None:
+            self._flat = np.zeros(self.aligner.out_width * self.aligner.out_height + 1, dtype=np.uint16)
+        return self._flat[:-1].reshape(self.aligner.out_height, self.aligner.out_width)
+
+    def get_distance(self, x, y):
+        """Returns the aligned distance in meters at color pixel (x, y), aligning a small ROI if needed."""
+        if self._full is None:
+            self.align_boxes([x - 2, y - 2, x + 2, y + 2])
+        u = int(x * self.aligner.scale)
+        v = int(y * self.aligner.scale)
+        canvas = self.canvas
+        if u < 0 or v < 0 or u >= canvas.shape[1] or v >= canvas.shape[0]:
+            return 0.0
+        return float(canvas[v, u]) * self.depth_scale
+
+    def get_data(self):
+        """Returns the fully aligned depth image (computed on first use)."""
+        if self._full is None:
+            self._full = self.aligner.align(self.raw_depth_image)
+        return self._full
+
+    def get_units(self):
+        return self.depth_scale
+
+    def get_width(self):
+        return self.aligner.out_width
+
+    def get_height(self):
+        return self.aligner.out_height
+
+    def __bool__(self):
+        return self.raw_depth_image is not None
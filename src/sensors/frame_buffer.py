@@ -0,0 +1,197 @@
+import threading
+from collections import deque
+
+import numpy as np
+
+
+class FrameRingBuffer:
+    """Bounded, thread-safe ring buffer between a capture thread and a consumer.
+
+    Two delivery policies are supported:
+        'latest': get() returns the newest frame set and discards anything older
+                  (the consumer never falls behind the sensor).
+        'all':    get() returns frame sets in capture order. When the buffer is full
+                  put() waits for the consumer (backpressure), so every frame set is
+                  delivered and memory stays bounded.
+
+    Every frame set that is discarded without being delivered is counted in `dropped`.
+    """
+
+    POLICIES = ('latest', 'all')
+
+    def __init__(self, capacity=4, policy='latest'):
+        if policy not in self.POLICIES:
+            raise ValueError(f"Unknown policy '{policy}'. Expected one of {self.POLICIES}.")
+        if capacity < 1:
+            raise ValueError("capacity must be >= 1")
+
+        self.capacity = capacity
+        self.policy = policy
+        self._items = deque()
+        self._cond = threading.Condition()
+        self._closed = False
+
+        # Counters
+        self.captured = 0
+        self.delivered = 0
+        self.dropped = 0
+
+    def put(self, item):
+        """
+        Adds a frame set. With policy 'latest' the producer never blocks; with 'all' it waits
+        until there is room, and the frame set is dropped if the buffer is closed meanwhile.
+
+        Returns:
+            bool: True if the frame set was buffered.
+        """
+        with self._cond:
+            self.captured += 1
+            if self.policy == 'all':
+                self._cond.wait_for(lambda: len(self._items) < self.capacity or self._closed)
+                if self._closed:
+                    self.dropped += 1
+                    return False
+            elif len(self._items) >= self.capacity:
+                self._items.popleft()
+                self.dropped += 1
+            self._items.append(item)
+            self._cond.notify_all()
+            return True
+
+    def get(self, timeout=None):
+        """
+        Waits for a frame set according to the delivery policy.
+
+        Args:
+            timeout (float, optional): Seconds to wait. None waits forever.
+
+        Returns:
+            The frame set, or None on timeout or after close().
+        """
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._items or self._closed, timeout):
+                return None
+            if not self._items:
+                return None
+
+            if self.policy == 'latest':
+                item = self._items.pop()
+                self.dropped += len(self._items)
+                self._items.clear()
+            else:
+                item = self._items.popleft()
+                # Wake a producer waiting for room
+                self._cond.notify_all()
+
+            self.delivered += 1
+            return item
+
+    def close(self):
+        """Wakes up any waiting consumer or producer and rejects further waits."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    @property
+    def closed(self):
+        return self._closed
+
+    def clear(self):
+        with self._cond:
+            self._items.clear()
+            self._cond.notify_all()
+
+    def __len__(self):
+        with self._cond:
+            return len(self._items)
+
+    def get_stats(self):
+        """Returns capture/delivery/drop counters as a dict."""
+        with self._cond:
+            return {
+                'captured': self.captured,
+                'delivered': self.delivered,
+                'dropped': self.dropped,
+                'buffered': len(self._items),
+            }
+
+
+class AudioRingBuffer:
+    """Preallocated ring of multichannel audio samples between an audio callback and a consumer.
+
+    write() copies each callback block into a fixed array (never allocates, never blocks for
+    long); samples are addressed by their absolute index since the start of the stream, so a
+    consumer can ask for exactly the window it needs and detect when it was overwritten.
+    """
+
+    def __init__(self, capacity, channels, dtype=np.int16):
+        if capacity < 1:
+            raise ValueError("capacity must be >= 1")
+        self.capacity = capacity
+        self.channels = channels
+        self._data = np.zeros((capacity, channels), dtype=dtype)
+        self.dtype = self._data.dtype
+        self._cond = threading.Condition()
+        self._closed = False
+
+        # Counters
+        self.written = 0
+        self.overrun = 0
+
+    def write(self, samples):
+        """Appends an N x channels block (only the last `capacity` samples of a larger block are kept)."""
+        n = len(samples)
+        if n > self.capacity:
+            samples = samples[-self.capacity:]
+        with self._cond:
+            start = (self.written + n - len(samples)) % self.capacity
+            first = min(len(samples), self.capacity - start)
+            self._data[start:start + first] = samples[:first]
+            self._data[:len(samples) - first] = samples[first:]
+            self.written += n
+            self._cond.notify_all()
+
+    def wait(self, total, timeout=None):
+        """
+        Waits until at least `total` samples have been written.
+
+        Returns:
+            bool: False on timeout or after close().
+        """
+        with self._cond:
+            return self._cond.wait_for(lambda: self.written >= total or self._closed, timeout) and \
+                self.written >= total
+
+    def read(self, end, n, out=None):
+        """
+        Copies samples [end - n, end) (absolute indices).
+
+        Args:
+            end (int): Absolute index one past the last sample.
+            n (int): Number of samples.
+            out (numpy.ndarray, optional): n x channels buffer to fill.
+
+        Returns:
+            numpy.ndarray: The samples, or None if they are not written yet or already overwritten.
+        """
+        if out is None:
+            out = np.empty((n, self.channels), dtype=self._data.dtype)
+        with self._cond:
+            if end > self.written or end - n < max(self.written - self.capacity, 0):
+                self.overrun += end <= self.written
+                return None
+            start = (end - n) % self.capacity
+            first = min(n, self.capacity - start)
+            out[:first] = self._data[start:start + first]
+            out[first:] = self._data[:n - first]
+        return out
+
+    def close(self):
+        """Wakes up any waiting consumer."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    @property
+    def closed(self):
+        return self._closed
@@ -0,0 +1,381 @@
+import glob
+import json
+import os
+import time
+
+import numpy as np
+
+from src.utils.profiling import NULL_PROFILER
+from src.utils.time_sync import TimeSync
+
+
+class RateLimiter:
+    """Paces a loop to a fixed rate. fps=None (or 0) means as fast as possible."""
+
+    def __init__(self, fps=None):
+        self.period = 1.0 / fps if fps else 0.0
+        self._next_time = None
+
+    def wait(self):
+        if self.period <= 0:
+            return
+        now = time.perf_counter()
+        if self._next_time is None:
+            self._next_time = now
+        delay = self._next_time - now
+        if delay > 0:
+            time.sleep(delay)
+        # Schedule against absolute time so sleep jitter does not accumulate,
+        # but never try to "catch up" more than one period after a stall.
+        self._next_time = max(self._next_time + self.period, time.perf_counter() - self.period)
+
+    def reset(self):
+        self._next_time = None
+
+
+class Intrinsics:
+    """Minimal stand-in for rs.intrinsics when pyrealsense2 is not needed/available."""
+
+    def __init__(self, width, height, fx, fy, ppx, ppy, model=None, coeffs=None):
+        self.width = width
+        self.height = height
+        self.fx = fx
+        self.fy = fy
+        self.ppx = ppx
+        self.ppy = ppy
+        self.model = model
+        self.coeffs = coeffs if coeffs is not None else [0.0] * 5
+
+    def __repr__(self):
+        return (f"Intrinsics(width={self.width}, height={self.height}, fx={self.fx}, fy={self.fy}, "
+                f"ppx={self.ppx}, ppy={self.ppy})")
+
+
+def make_intrinsics(width, height, fx, fy, ppx, ppy, coeffs=None):
+    """
+    Builds an intrinsics object. Returns a real rs.intrinsics when pyrealsense2 is installed
+    (so rs.rs2_deproject_pixel_to_point keeps working), otherwise a plain Intrinsics.
+    """
+    try:
+        import pyrealsense2 as rs
+    except ImportError:
+        return Intrinsics(width, height, fx, fy, ppx, ppy, coeffs=coeffs)
+
+    intr = rs.intrinsics()
+    intr.width = int(width)
+    intr.height = int(height)
+    intr.fx = float(fx)
+    intr.fy = float(fy)
+    intr.ppx = float(ppx)
+    intr.ppy = float(ppy)
+    intr.model = rs.distortion.none
+    intr.coeffs = list(coeffs) if coeffs is not None else [0.0] * 5
+    return intr
+
+
+def scale_intrinsics(intrinsics, scale):
+    """
+    Intrinsics of an image resampled by `scale` about pixel centres, e.g. the half-resolution
+    aligned depth (scale 0.5) of the color camera. scale 1.0 returns the intrinsics unchanged.
+    """
+    if scale == 1.0:
+        return intrinsics
+    return Intrinsics(int(intrinsics.width * scale), int(intrinsics.height * scale),
+                      intrinsics.fx * scale, intrinsics.fy * scale,
+                      (intrinsics.ppx + 0.5) * scale - 0.5, (intrinsics.ppy + 0.5) * scale - 0.5,
+                      model=getattr(intrinsics, 'model', None), coeffs=list(intrinsics.coeffs))
+
+
+def intrinsics_to_dict(intrinsics):
+    return {
+        'width': int(intrinsics.width),
+        'height': int(intrinsics.height),
+        'fx': float(intrinsics.fx),
+        'fy': float(intrinsics.fy),
+        'ppx': float(intrinsics.ppx),
+        'ppy': float(intrinsics.ppy),
+        'coeffs': [float(c) for c in intrinsics.coeffs],
+    }
+
+
+class ArrayDepthFrame:
+    """
+    Wraps a z16 depth image so it can be used wherever an rs.depth_frame is expected
+    (get_distance / get_data / get_units).
+
+    pixel_scale maps color-image coordinates onto the depth image, e.g. 0.5 for a
+    half-resolution aligned depth image.
+    """
+
+    def __init__(self, depth_image, depth_scale=0.001, pixel_scale=1.0):
+        self.depth_image = depth_image
+        self.depth_scale = depth_scale
+        self.pixel_scale = pixel_scale
+
+    def get_distance(self, x, y):
+        """Returns the distance in meters at pixel (x, y), or 0.0 outside the image."""
+        if self.pixel_scale != 1.0:
+            x = int(x * self.pixel_scale)
+            y = int(y * self.pixel_scale)
+        h, w = self.depth_image.shape[:2]
+        if x < 0 or y < 0 or x >= w or y >= h:
+            return 0.0
+        return float(self.depth_image[y, x]) * self.depth_scale
+
+    def get_data(self):
+        return self.depth_image
+
+    def get_units(self):
+        return self.depth_scale
+
+    def get_width(self):
+        return self.depth_image.shape[1]
+
+    def get_height(self):
+        return self.depth_image.shape[0]
+
+    def __bool__(self):
+        return self.depth_image is not None
+
+
+class FrameSource:
+    """
+    Interface for anything that produces color/depth frame sets for the navigation loop.
+
+    Subclasses implement _read_frames(). get_frames() applies rate control on top, so every
+    source can run at a fixed fps or as fast as possible (fps=None).
+    Finite sources set `exhausted` once no more frames are available.
+    Assign a StageProfiler to `profiler` to time the read/alignment steps of a source.
+    Every delivered frame set is stamped (value: frame_index) into the 'frames' stream of
+    `time_sync`; assign the TimeSync shared with the other sensors to fuse them by time.
+    `timestamp` is the capture time of the last frame set on that common clock (the arrival
+    time, unless the source has sensor timestamps).
+    """
+
+    def __init__(self, fps=None):
+        self.fps = fps
+        self.depth_scale = 0.001
+        self.exhausted = False
+        self.frame_index = 0
+        self.timestamp = None
+        self.profiler = NULL_PROFILER
+        self.time_sync = TimeSync()
+        self._rate = RateLimiter(fps)
+
+    def start(self):
+        self.exhausted = False
+        self.frame_index = 0
+        self.timestamp = None
+        self._rate.reset()
+
+    def get_frames(self):
+        """
+        Returns:
+            tuple: (color_image, depth_image, depth_frame), or (None, None, None) if no frame is available.
+        """
+        self._rate.wait()
+        with self.profiler.stage('read'):
+            color, depth, depth_frame = self._read_frames()
+        if color is not None:
+            self.frame_index += 1
+            self._stamp()
+        return color, depth, depth_frame
+
+    def _stamp(self, sensor_time=None, arrival=None):
+        """
+        Stamps the frame set just delivered into the 'frames' stream and sets `timestamp`.
+
+        Args:
+            sensor_time (float, optional): Sensor timestamp (s), mapped onto the common clock
+                                           by the stream's ClockMapper.
+            arrival (float, optional): Arrival time on the common clock (default: now).
+        """
+        self.timestamp = self.time_sync.stamp('frames', self.frame_index, sensor_time=sensor_time, host_time=arrival)
+
+    def _read_frames(self):
+        raise NotImplementedError
+
+    def get_intrinsics(self):
+        raise NotImplementedError
+
+    def get_depth_scale(self):
+        """Meters per depth unit."""
+        return self.depth_scale
+
+    def stop(self):
+        pass
+
+
+class NpzFrameSource(FrameSource):
+    """
+    Replays a directory of saved frames. Each frame is an .npz file with 'color' (HxWx3 uint8)
+    and 'depth' (HxW uint16) arrays; files are played in sorted order.
+    Camera parameters are read from 'intrinsics.json' in the same directory if present.
+    """
+
+    def __init__(self, directory, fps=None, loop=False, depth_scale=0.001, intrinsics=None):
+        super().__init__(fps)
+        self.directory = directory
+        self.loop = loop
+        self.depth_scale = depth_scale
+        self.intrinsics = intrinsics
+        self.files = []
+        self._pos = 0
+
+    def start(self):
+        super().start()
+        self.files = sorted(glob.glob(os.path.join(self.directory, '*.npz')))
+        if not self.files:
+            raise FileNotFoundError(f"No .npz frames found in {self.directory}")
+        self._pos = 0
+
+        meta_path = os.path.join(self.directory, 'intrinsics.json')
+        if os.path.exists(meta_path):
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            self.depth_scale = meta.get('depth_scale', self.depth_scale)
+            if self.intrinsics is None:
+                self.intrinsics = make_intrinsics(meta['width'], meta['height'], meta['fx'], meta['fy'],
+                                                  meta['ppx'], meta['ppy'], meta.get('coeffs'))
+        print(f"Frame directory opened: {self.directory} ({len(self.files)} frames).")
+
+    def _read_frames(self):
+        if self._pos >= len(self.files):
+            if not self.loop:
+                self.exhausted = True
+                return None, None, None
+            self._pos = 0
+
+        with np.load(self.files[self._pos]) as data:
+            color = data['color']
+            depth = data['depth']
+        self._pos += 1
+        return color, depth, ArrayDepthFrame(depth, self.depth_scale)
+
+    def get_intrinsics(self):
+        if self.intrinsics is None and self.files:
+            # Fall back to a generic pinhole model centred on the image
+            with np.load(self.files[0]) as data:
+                h, w = data['color'].shape[:2]
+            self.intrinsics = make_intrinsics(w, h, w * 0.5, w * 0.5, w / 2.0, h / 2.0)
+        return self.intrinsics
+
+
+class SyntheticFrameSource(FrameSource):
+    """
+    Deterministic generator of color/depth frames: a textured floor/wall scene with a few
+    boxes moving across it. Useful for load-testing the loop without a camera or recordings.
+    """
+
+    def __init__(self, width=1280, height=800, fps=None, num_frames=None, num_objects=3,
+                 depth_scale=0.001, seed=0):
+        super().__init__(fps)
+        self.width = width
+        self.height = height
+        self.num_frames = num_frames
+        self.num_objects = num_objects
+        self.depth_scale = depth_scale
+        self.seed = seed
+        self.intrinsics = make_intrinsics(width, height, 0.5 * width, 0.5 * width, width / 2.0, height / 2.0)
+        self._base_color = None
+        self._base_depth = None
+        self._objects = None
+
+    def start(self):
+        super().start()
+        rng = np.random.default_rng(self.seed)
+        h, w = self.height, self.width
+
+        # Background: vertical gradient + noise texture, depth = wall at 4 m above the horizon,
+        # floor getting closer towards the bottom of the image.
+        rows = np.linspace(0, 1, h, dtype=np.float32)[:, None]
+        gradient = (80 + 120 * rows).astype(np.uint8)
+        noise = rng.integers(0, 30, size=(h, w), dtype=np.uint8)
+        gray = gradient + noise
+        self._base_color = np.dstack([gray, gray, gray])
+
+        horizon = h // 2
+        depth = np.full((h, w), 4000, dtype=np.uint16)
+        floor_rows = np.arange(horizon, h)
+        floor_depth = 4000.0 * horizon / floor_rows
+        depth[horizon:, :] = np.clip(floor_depth, 500, 4000).astype(np.uint16)[:, None]
+        self._base_depth = depth
+
+        # Moving objects: (x, y, w, h, vx, distance_mm, color)
+        self._objects = []
+        for _ in range(self.num_objects):
+            ow = int(rng.integers(w // 16, w // 6))
+            oh = int(rng.integers(h // 8, h // 3))
+            self._objects.append({
+                'x': float(rng.integers(0, w - ow)),
+                'y': int(rng.integers(h // 4, h - oh)),
+                'w': ow,
+                'h': oh,
+                'vx': float(rng.uniform(-8, 8)),
+                'dist': int(rng.integers(800, 3500)),
+                # Textured so that optical flow / feature trackers have something to lock on to
+                'texture': np.clip(rng.integers(0, 255, size=3)[None, None, :]
+                                   + rng.integers(-40, 40, size=(oh, ow, 1)), 0, 255).astype(np.uint8),
+            })
+        print(f"Synthetic frame source started ({w}x{h}, {self.num_objects} objects).")
+
+    def _read_frames(self):
+        if self.num_frames is not None and self.frame_index >= self.num_frames:
+            self.exhausted = True
+            return None, None, None
+
+        color = self._base_color.copy()
+        depth = self._base_depth.copy()
+        for obj in self._objects:
+            obj['x'] += obj['vx']
+            if obj['x'] < 0 or obj['x'] + obj['w'] >= self.width:
+                obj['vx'] = -obj['vx']
+                obj['x'] = min(max(obj['x'], 0), self.width - obj['w'] - 1)
+            x, y = int(obj['x']), obj['y']
+            color[y:y + obj['h'], x:x + obj['w']] = obj['texture']
+            depth[y:y + obj['h'], x:x + obj['w']] = obj['dist']
+
+        return color, depth, ArrayDepthFrame(depth, self.depth_scale)
+
+    def get_intrinsics(self):
+        return self.intrinsics
+
+
+def save_npz_frame(directory, index, color_image, depth_image):
+    """Saves one frame in the layout expected by NpzFrameSource."""
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"frame_{index:06d}.npz")
+    np.savez(path, color=color_image, depth=depth_image)
+    return path
+
+
+def save_intrinsics(directory, intrinsics, depth_scale=0.001):
+    """Writes intrinsics.json next to saved frames."""
+    os.makedirs(directory, exist_ok=True)
+    meta = intrinsics_to_dict(intrinsics)
+    meta['depth_scale'] = depth_scale
+    with open(os.path.join(directory, 'intrinsics.json'), 'w', encoding='utf-8') as f:
+        json.dump(meta, f, indent=4)
+
+
+def create_frame_source(kind, path=None, fps=None, **kwargs):
+    """
+    Factory for the frame sources used by main.py.
+
+    Args:
+        kind (str): 'camera', 'bag', 'npz' or 'synthetic'.
+        path (str, optional): .bag file or frame directory.
+        fps (float, optional): Replay rate. None replays as fast as possible
+                               (ignored for the live camera, which is paced by the sensor).
+    """
+    if kind == 'camera':
+        from src.sensors.realsense_driver import RealSenseDriver
+        return RealSenseDriver(**kwargs)
+    if kind == 'bag':
+        from src.sensors.realsense_driver import BagFrameSource
+        return BagFrameSource(path, rate=fps, **kwargs)
+    if kind == 'npz':
+        return NpzFrameSource(path, fps=fps, **kwargs)
+    if kind == 'synthetic':
+        return SyntheticFrameSource(fps=fps, **kwargs)
+    raise ValueError(f"Unknown frame source '{kind}'")
@@ -1,47 +1,200 @@
+import threading
+
 import pyrealsense2 as rs
 import numpy as np
 
-class RealSenseDriver:
-    def __init__(self, width=1280, height=800, fps=30):
+from src.sensors.frame_buffer import FrameRingBuffer
+from src.sensors.frame_source import FrameSource, RateLimiter, ArrayDepthFrame
+from src.sensors.depth_aligner import aligner_from_profile, LazyAlignedDepthFrame
+from src.utils.time_sync import clock
+
+class RealSenseDriver(FrameSource):
+    ALIGN_MODES = ('rs', 'numpy', 'numpy_half', 'lazy')
+
+    def __init__(self, width=1280, height=800, fps=30, threaded=False, buffer_size=4, policy='latest',
+                 align_mode='rs'):
+        """
+        Live RealSense camera. The loop rate is set by the sensor itself.
+
+        Args:
+            width (int): Color stream width.
+            height (int): Color stream height.
+            fps (int): Stream frame rate.
+            threaded (bool): If True, capture and alignment run on a background thread
+                             and get_frames() reads from a ring buffer.
+            buffer_size (int): Number of aligned frame sets kept in the ring buffer.
+            policy (str): 'latest' (newest frame wins) or 'all' (every frame in order; capture
+                          waits while the buffer is full).
+            align_mode (str): 'rs' uses rs.align, 'numpy' the cached DepthAligner,
+                              'numpy_half' the DepthAligner at half color resolution and
+                              'lazy' keeps depth unaligned and only reprojects the regions
+                              queried through the returned depth frame.
+        """
+        if align_mode not in self.ALIGN_MODES:
+            raise ValueError(f"Unknown align_mode '{align_mode}'. Expected one of {self.ALIGN_MODES}.")
+        super().__init__(fps=None)
         self.width = width
         self.height = height
         self.fps = fps
         self.pipeline = rs.pipeline()
         self.config = rs.config()
         self.align = None
+        self.aligner = None
+        self.align_mode = align_mode
         self.profile = None
 
-    def start(self):
-        """Starts the RealSense pipeline with aligned streams."""
+        # Background capture
+        self.threaded = threaded
+        self.buffer_size = buffer_size
+        self.policy = policy
+        self.frame_buffer = None
+        self._capture_thread = None
+        self._capture_done = False
+        self._stop_event = threading.Event()
+
+    def _configure_streams(self):
         # Enforce the project standard: Color 1280x800, Depth 1280x720 -> Aligned to Color
         self.config.enable_stream(rs.stream.color, 1280, 800, rs.format.bgr8, self.fps)
         self.config.enable_stream(rs.stream.depth, 1280, 720, rs.format.z16, self.fps)
 
+    def start(self):
+        """Starts the RealSense pipeline with aligned streams."""
+        super().start()
+        self._configure_streams()
+
         self.profile = self.pipeline.start(self.config)
-        
+        self.depth_scale = self.profile.get_device().first_depth_sensor().get_depth_scale()
+
         # Create alignment object (align to color)
-        self.align = rs.align(rs.stream.color)
-        print("RealSense pipeline started. Aligned to Color (1280x800).")
+        if self.align_mode == 'rs':
+            self.align = rs.align(rs.stream.color)
+        else:
+            scale = 0.5 if self.align_mode == 'numpy_half' else 1.0
+            self.aligner = aligner_from_profile(self.profile, scale=scale)
+        print(f"RealSense pipeline started. Aligned to Color ({self.align_mode}).")
+
+        if self.threaded:
+            self._start_capture_thread()
+
+    def _start_capture_thread(self):
+        self.frame_buffer = FrameRingBuffer(self.buffer_size, self.policy)
+        self._stop_event.clear()
+        self._capture_done = False
+        self._capture_thread = threading.Thread(target=self._capture_loop, name="RealSenseCapture", daemon=True)
+        self._capture_thread.start()
+        print(f"RealSense capture thread started (policy='{self.policy}', buffer={self.buffer_size}).")
+
+    def _capture_loop(self):
+        """Waits for frames, aligns them and pushes them into the ring buffer."""
+        while not self._stop_event.is_set():
+            try:
+                with self.profiler.stage('wait_for_frames'):
+                    frames = self.pipeline.wait_for_frames(1000)
+                arrival = clock()
+            except RuntimeError:
+                if self._end_of_stream():
+                    break
+                # Timeout (e.g. sensor hiccup) - keep trying until stopped
+                continue
+
+            # Frames are recycled by the SDK pool unless explicitly kept
+            result = self._process_frames(frames, keep=True)
+            if result is not None:
+                self.frame_buffer.put((result, self._sensor_time(frames), arrival))
+
+        self._capture_done = True
+        self.frame_buffer.close()
+
+    def _end_of_stream(self):
+        """Called when wait_for_frames fails. Live cameras never run out of frames."""
+        return False
+
+    def get_frames(self, timeout=1.0):
+        """
+        Returns aligned color and depth frames. Their sensor timestamp is mapped onto the
+        common clock of `time_sync` (stream 'frames') and stored in `timestamp`.
 
-    def get_frames(self):
-        """Returns aligned color and depth frames."""
+        Args:
+            timeout (float): Seconds to wait for a buffered frame set in threaded mode.
+
+        Returns:
+            tuple: (color_image, depth_image, depth_frame), or (None, None, None) if no frame is available.
+                   In 'lazy' align mode depth_image is None; use depth_frame.get_data() for the
+                   full aligned image.
+        """
         if not self.pipeline:
-            return None, None
+            return None, None, None
+
+        if self.threaded:
+            item = self.frame_buffer.get(timeout)
+            if item is None:
+                if self._capture_done:
+                    self.exhausted = True
+                return None, None, None
+            result, sensor_time, arrival = item
+        else:
+            with self.profiler.stage('wait_for_frames'):
+                frames = self._wait_for_frames()
+            arrival = clock()
+            result = self._process_frames(frames) if frames is not None else None
+            if result is not None:
+                sensor_time = self._sensor_time(frames)
+
+        if result is None:
+            return None, None, None
+
+        self.frame_index += 1
+        self._stamp(sensor_time, arrival)
+        return result
+
+    def _sensor_time(self, frames):
+        """The frame set's timestamp in seconds (ms, hardware or global time domain), or None."""
+        try:
+            return frames.get_timestamp() / 1000.0
+        except (AttributeError, RuntimeError, TypeError):
+            return None
 
-        frames = self.pipeline.wait_for_frames()
-        aligned_frames = self.align.process(frames)
+    def _process_frames(self, frames, keep=False):
+        """Aligns a frame set and converts it to (color_image, depth_image, depth_frame)."""
+        if self.aligner is None:
+            with self.profiler.stage('align'):
+                aligned_frames = self.align.process(frames)
+            color_frame = aligned_frames.get_color_frame()
+            depth_frame = aligned_frames.get_depth_frame()
+            if not color_frame or not depth_frame:
+                return None
+            if keep:
+                aligned_frames.keep()
 
-        color_frame = aligned_frames.get_color_frame()
-        depth_frame = aligned_frames.get_depth_frame()
+            # Convert to numpy arrays
+            color_image = np.asanyarray(color_frame.get_data())
+            depth_image = np.asanyarray(depth_frame.get_data())
+            return color_image, depth_image, depth_frame # Return raw depth frame for distance queries
 
-        if not color_frame or not depth_frame:
-            return None, None
+        color_frame = frames.get_color_frame()
+        raw_depth_frame = frames.get_depth_frame()
+        if not color_frame or not raw_depth_frame:
+            return None
+        if keep:
+            frames.keep()
 
-        # Convert to numpy arrays
         color_image = np.asanyarray(color_frame.get_data())
-        depth_image = np.asanyarray(depth_frame.get_data())
+        if self.align_mode == 'lazy':
+            return color_image, None, LazyAlignedDepthFrame(np.asanyarray(raw_depth_frame.get_data()), self.aligner)
 
-        return color_image, depth_image, depth_frame # Return raw depth frame for distance queries
+        with self.profiler.stage('align'):
+            depth_image = self.aligner.align(np.asanyarray(raw_depth_frame.get_data()))
+        depth_frame = ArrayDepthFrame(depth_image, self.depth_scale, pixel_scale=self.aligner.scale)
+        return color_image, depth_image, depth_frame
+
+    def _wait_for_frames(self):
+        return self.pipeline.wait_for_frames()
+
+    def get_capture_stats(self):
+        """Returns ring buffer counters (captured / delivered / dropped) in threaded mode."""
+        if self.frame_buffer is None:
+            return None
+        return self.frame_buffer.get_stats()
 
     def get_intrinsics(self):
         """Returns the intrinsics of the color stream (which depth is aligned to)."""
@@ -51,6 +204,63 @@ class RealSenseDriver:
 
     def stop(self):
         """Stops the pipeline."""
+        if self._capture_thread is not None:
+            self._stop_event.set()
+            self.frame_buffer.close()
+            self._capture_thread.join(timeout=2.0)
+            self._capture_thread = None
+            stats = self.frame_buffer.get_stats()
+            print(f"RealSense capture thread stopped. Captured: {stats['captured']}, "
+                  f"Delivered: {stats['delivered']}, Dropped: {stats['dropped']}")
+
         if self.pipeline:
             self.pipeline.stop()
             print("RealSense pipeline stopped.")
+
+
+class BagFrameSource(RealSenseDriver):
+    """
+    Plays back a recorded .bag file through the same pipeline/alignment path as the live camera.
+
+    Playback runs in non-real-time mode so no frames are skipped; the replay rate is then
+    controlled by `rate` (fps) or left unthrottled (rate=None, as fast as possible).
+    """
+
+    def __init__(self, bag_path, rate=None, loop=False, threaded=False, buffer_size=8, policy='all',
+                 align_mode='rs'):
+        super().__init__(threaded=threaded, buffer_size=buffer_size, policy=policy, align_mode=align_mode)
+        self.bag_path = bag_path
+        self.loop = loop
+        self.playback = None
+        self._rate = RateLimiter(rate)
+
+    def _configure_streams(self):
+        rs.config.enable_device_from_file(self.config, self.bag_path, repeat_playback=self.loop)
+        # Use whatever resolution was recorded
+        self.config.enable_stream(rs.stream.color)
+        self.config.enable_stream(rs.stream.depth)
+
+    def start(self):
+        super().start()
+        self.playback = self.profile.get_device().as_playback()
+        self.playback.set_real_time(False)
+        print(f"Playing back {self.bag_path}.")
+
+    def get_frames(self, timeout=1.0):
+        self._rate.wait()
+        return super().get_frames(timeout)
+
+    def _wait_for_frames(self):
+        try:
+            return self.pipeline.wait_for_frames(1000)
+        except RuntimeError:
+            # End of bag file, or a timeout that the next call retries
+            if self._end_of_stream():
+                self.exhausted = True
+            return None
+
+    def _end_of_stream(self):
+        """A looping replay only ends if playback itself has stopped; a timeout is retried."""
+        if not self.loop:
+            return True
+        return self.playback is not None and self.playback.current_status() == rs.playback_status.stopped
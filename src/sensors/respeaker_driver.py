@@ -1,28 +1,278 @@
+import threading
 import time
-import math
+import wave
+
+import numpy as np
+
+from src.audio.doa import DOAEstimator
+from src.audio.features import AudioFeatureExtractor
+from src.audio.wav_io import SAMPLE_DTYPES, iter_wav_blocks
+from src.sensors.frame_buffer import AudioRingBuffer
+from src.utils.time_sync import TimeSync, clock
 
 class RespeakerDriver:
-    def __init__(self):
+    """
+    Direction of arrival from the ReSpeaker Mic Array v2.0 (or a multichannel WAV recording).
+
+    Audio is captured in a callback (device) or reader thread (WAV) into an AudioRingBuffer;
+    a separate DOA thread runs SRP-PHAT on the newest block every `hop_size` samples, so
+    get_direction() only reads the latest estimate and never blocks the vision loop. If it
+    falls behind it skips to the newest hop instead of queueing stale audio.
+
+    Every raw block is stamped into the 'audio' stream of a TimeSync (value: samples written
+    so far, sensor time: that count in seconds), which keeps the stream's ClockMapper from
+    sample clock to common clock current. Every estimate is stamped with the time of its block
+    centre on the common clock into the 'doa' stream, so get_direction(timestamp) returns the
+    estimate for the moment a camera frame was captured rather than whatever was computed last.
+    """
+
+    SOURCES = ('mock', 'device', 'wav')
+
+    def __init__(self, source='mock', wav_path=None, device=None, sample_rate=16000, channels=6,
+                 mic_channels=None, block_size=1024, hop_size=512, buffer_seconds=2.0, realtime=True,
+                 loop=False, estimator_kwargs=None, signatures=False, time_sync=None):
+        """
+        Args:
+            source (str): 'mock' (constant 0.0), 'device' (sounddevice capture) or 'wav'.
+            wav_path (str, optional): Multichannel WAV file for source 'wav'.
+            device (int or str, optional): Input device; by default the first device named ReSpeaker.
+            sample_rate (int): Capture sample rate (Hz); WAV files use their own rate.
+            channels (int): Captured channels (6 with the default ReSpeaker firmware); WAV files use their own.
+            mic_channels (tuple, optional): Channels of the raw microphones, in DOAEstimator
+                                            mic_positions order. Defaults to 1-4 for 6-channel
+                                            input, otherwise the first four channels; start()
+                                            raises ValueError if they do not match the
+                                            estimator's microphones.
+            block_size (int): Samples per DOA block.
+            hop_size (int): Samples between DOA updates (also the capture callback block size).
+            buffer_seconds (float): Ring buffer length.
+            realtime (bool): Feed WAV files at their sample rate (False = as fast as possible).
+            loop (bool): Restart the WAV file at its end.
+            estimator_kwargs (dict, optional): Extra DOAEstimator arguments.
+            signatures (bool): Also extract an audio signature (AudioFeatureExtractor) from
+                               every new hop, for matching landmark audio signatures.
+            time_sync (TimeSync, optional): Shared TimeSync to stamp raw blocks and estimates
+                                            into ('audio', 'doa' and 'audio_signature' streams).
+        """
+        if source not in self.SOURCES:
+            raise ValueError(f"Unknown audio source '{source}'. Expected one of {self.SOURCES}.")
+        self.source = source
+        self.wav_path = wav_path
+        self.device = device
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.mic_channels = mic_channels
+        self.block_size = block_size
+        self.hop_size = hop_size
+        self.buffer_seconds = buffer_seconds
+        self.realtime = realtime
+        self.loop = loop
+        self.estimator_kwargs = estimator_kwargs or {}
+        self.signatures = signatures
+        self.time_sync = time_sync if time_sync is not None else TimeSync()
+
         self.is_running = False
-        # In a real implementation, we would initialize PyAudio or a specific ReSpeaker library here
-        # e.g., from tuning import Tuning
-        # self.tuning = Tuning(usb_device)
+        self.exhausted = False
+        self.estimator = None
+        self.features = None
+        self.ring = None
+        self._direction = None
+        self._signature = None
+        self._stream = None
+        self._threads = []
+
+        # Counters
+        self.blocks_processed = 0
+        self.blocks_skipped = 0
+        self.callback_errors = 0
 
     def start(self):
         self.is_running = True
-        print("Respeaker driver started (Mock Mode).")
+        if self.source == 'device':
+            self._start_device()
+        elif self.source == 'wav':
+            self._start_wav()
+        if self.source == 'mock':
+            print("Respeaker driver started (Mock Mode).")
+            return
+
+        if self.mic_channels is None:
+            self.mic_channels = (1, 2, 3, 4) if self.channels >= 6 else tuple(range(min(self.channels, 4)))
+        self.mic_channels = list(self.mic_channels)
+        self.estimator = DOAEstimator(sample_rate=self.sample_rate, n_fft=self.block_size, **self.estimator_kwargs)
+        num_mics = len(self.estimator.mic_positions)
+        if len(self.mic_channels) != num_mics or not all(0 <= c < self.channels for c in self.mic_channels):
+            self.stop()
+            raise ValueError(f"DOA needs {num_mics} microphone channels out of the {self.channels} captured, "
+                             f"got mic_channels={self.mic_channels}")
+        if self.signatures:
+            self.features = AudioFeatureExtractor(self.sample_rate)
+        doa_thread = threading.Thread(target=self._run_doa, name="respeaker-doa", daemon=True)
+        doa_thread.start()
+        self._threads.append(doa_thread)
+
+    def _fallback(self, reason):
+        print(f"{reason}; falling back to mock mode.")
+        self.source = 'mock'
 
-    def get_direction(self):
+    def _make_ring(self, dtype):
+        capacity = max(int(self.buffer_seconds * self.sample_rate), 2 * self.block_size)
+        self.ring = AudioRingBuffer(capacity, self.channels, dtype)
+
+    def _start_device(self):
+        try:
+            import sounddevice as sd
+        except (ImportError, OSError) as e:
+            self._fallback(f"sounddevice not available ({e})")
+            return
+        device = self.device
+        if device is None:
+            names = [d['name'] for d in sd.query_devices()]
+            device = next((i for i, name in enumerate(names) if 'respeaker' in name.lower()), None)
+        self._make_ring(np.int16)
+        try:
+            self._stream = sd.InputStream(device=device, channels=self.channels, samplerate=self.sample_rate,
+                                          dtype='int16', blocksize=self.hop_size, callback=self._on_audio)
+            self._stream.start()
+        except Exception as e:
+            self._stream = None
+            self._fallback(f"Could not open audio input {device} ({e})")
+            return
+        print(f"Respeaker driver started (device {device}, {self.channels} ch @ {self.sample_rate} Hz).")
+
+    def _on_audio(self, indata, frames, time_info, status):
+        """sounddevice callback: copy the block into the ring buffer and return immediately."""
+        if status:
+            self.callback_errors += 1
+        self._write(indata)
+
+    def _write(self, block):
+        """Stamps the end of a block (sample clock -> common clock), then writes it to the ring buffer."""
+        end = self.ring.written + len(block)
+        self.time_sync.stamp('audio', end, sensor_time=end / self.sample_rate, host_time=clock())
+        self.ring.write(block)
+
+    def _start_wav(self):
+        try:
+            wf = wave.open(self.wav_path, 'rb')
+        except (OSError, TypeError, wave.Error) as e:
+            self._fallback(f"Could not open WAV file {self.wav_path} ({e})")
+            return
+        sampwidth = wf.getsampwidth()
+        if sampwidth not in SAMPLE_DTYPES:
+            wf.close()
+            self._fallback(f"Unsupported sample width in {self.wav_path} ({sampwidth} bytes)")
+            return
+        self.sample_rate = wf.getframerate()
+        self.channels = wf.getnchannels()
+        self._make_ring(SAMPLE_DTYPES[sampwidth])
+        reader = threading.Thread(target=self._read_wav, args=(wf,), name="respeaker-wav", daemon=True)
+        reader.start()
+        self._threads.append(reader)
+        print(f"Respeaker driver started (WAV {self.wav_path}, {self.channels} ch @ {self.sample_rate} Hz).")
+
+    def _read_wav(self, wf):
+        """Feeds the WAV file into the ring buffer in hop-sized blocks, paced like a live device."""
+        start = time.perf_counter()
+        fed = 0
+        try:
+            while self.is_running:
+                for block in iter_wav_blocks(wf, self.hop_size):
+                    if not self.is_running:
+                        return
+                    if self.realtime:
+                        delay = start + fed / self.sample_rate - time.perf_counter()
+                        if delay > 0:
+                            time.sleep(delay)
+                    self._write(block)
+                    fed += len(block)
+                if not self.loop:
+                    break
+                wf.rewind()
+        finally:
+            wf.close()
+            self.exhausted = True
+            self.ring.close()
+
+    def _run_doa(self):
+        """Runs the estimator on the newest block every hop_size samples."""
+        block = np.empty((self.block_size, self.channels), dtype=self.ring.dtype)
+        next_end = self.block_size
+        while self.is_running:
+            if not self.ring.wait(next_end, timeout=0.5):
+                if self.ring.closed:
+                    break
+                continue
+            # Skip to the newest complete hop when behind, so the estimate stays current
+            behind = (self.ring.written - next_end) // self.hop_size
+            if behind > 0:
+                self.blocks_skipped += behind
+                next_end += behind * self.hop_size
+            samples = self.ring.read(next_end, self.block_size, block)
+            center = (next_end - self.block_size / 2) / self.sample_rate
+            next_end += self.hop_size
+            if samples is None:
+                continue
+            timestamp = self.time_sync.clock_mapper('audio').to_host(center)
+            self._direction = self.estimator.estimate(samples[:, self.mic_channels])
+            self.time_sync.stamp('doa', self._direction, host_time=timestamp)
+            if self.features is not None:
+                self.features.feed(samples[-self.hop_size:])
+                self._signature = self.features.signature()
+                self.time_sync.stamp('audio_signature', self._signature, host_time=timestamp)
+            self.blocks_processed += 1
+
+    def get_direction(self, timestamp=None, max_gap=0.5):
         """
         Returns the Direction of Arrival (DOA) in degrees.
+        None before the first block loud enough for an estimate, or when the driver is stopped.
+
+        Args:
+            timestamp (float, optional): Common-clock time (e.g. FrameSource.timestamp); returns the
+                                         estimate whose block centre is closest to it instead of
+                                         the latest one.
+            max_gap (float): Seconds between `timestamp` and the closest estimate beyond which
+                             None is returned.
         """
         if not self.is_running:
             return None
-        
-        # Mock implementation: Return a random direction or a fixed one for testing
-        # In real usage: return self.tuning.direction
-        return 0.0
+        if self.source == 'mock':
+            return 0.0
+        if timestamp is None:
+            return self._direction
+        sample = self.time_sync.nearest('doa', timestamp, max_gap)
+        return sample[1] if sample is not None else None
+
+    def get_signature(self):
+        """
+        Returns the audio signature of the last second (see AudioFeatureExtractor.signature),
+        or None without signatures=True or before enough audio was seen.
+        """
+        return self._signature if self.is_running else None
+
+    def get_stats(self):
+        """Returns DOA and capture counters as a dict."""
+        return {
+            'blocks': self.blocks_processed,
+            'skipped': self.blocks_skipped,
+            'callback_errors': self.callback_errors,
+            'overrun': self.ring.overrun if self.ring else 0,
+            'confidence': self.estimator.confidence if self.estimator else 0.0,
+        }
 
     def stop(self):
         self.is_running = False
-        print("Respeaker driver stopped.")
+        if self._stream is not None:
+            self._stream.stop()
+            self._stream.close()
+            self._stream = None
+        if self.ring is not None:
+            self.ring.close()
+        for thread in self._threads:
+            thread.join(timeout=2.0)
+        self._threads = []
+        if self.source == 'mock':
+            print("Respeaker driver stopped.")
+        else:
+            stats = self.get_stats()
+            print(f"Respeaker driver stopped ({stats['blocks']} DOA blocks, {stats['skipped']} skipped).")
@@ -0,0 +1,152 @@
+import threading
+import time
+import traceback
+
+from src.sensors.frame_buffer import FrameRingBuffer
+
+
+class RateMeter:
+    """Measures how often a stage completes, as an exponentially smoothed rate (Hz)."""
+
+    def __init__(self, smoothing=0.9):
+        self.smoothing = smoothing
+        self.count = 0
+        self.rate = 0.0
+        self._last = None
+        self._lock = threading.Lock()
+
+    def tick(self):
+        now = time.perf_counter()
+        with self._lock:
+            if self._last is not None:
+                dt = now - self._last
+                if dt > 0:
+                    inst = 1.0 / dt
+                    self.rate = inst if self.count <= 1 else self.smoothing * self.rate + (1 - self.smoothing) * inst
+            self._last = now
+            self.count += 1
+
+    def get_rate(self):
+        with self._lock:
+            return self.rate
+
+
+class LatestValue:
+    """Thread-safe slot holding the newest result of a stage, with a sequence number."""
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._value = None
+        self._seq = 0
+        self._closed = False
+
+    def set(self, value):
+        with self._cond:
+            self._value = value
+            self._seq += 1
+            self._cond.notify_all()
+
+    def get(self):
+        """Returns (seq, value) without waiting."""
+        with self._cond:
+            return self._seq, self._value
+
+    def wait_newer(self, seq, timeout=None):
+        """Waits until a value newer than `seq` is available. Returns (seq, value)."""
+        with self._cond:
+            self._cond.wait_for(lambda: self._seq > seq or self._closed, timeout)
+            return self._seq, self._value
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    @property
+    def closed(self):
+        return self._closed
+
+
+class StageWorker(threading.Thread):
+    """
+    Runs `process(item)` on a background thread for every item taken from `inputs`.
+
+    Results that are not None are pushed to every output: FrameRingBuffers (bounded queues
+    towards the next stage) or LatestValue slots (newest result for readers that only care
+    about the most recent one). When the input is closed and drained the outputs are closed
+    too, so shutdown propagates down the pipeline. A stage that stops for any other reason
+    (stop_event, an exception in `process`) also closes its input, which releases an upstream
+    stage waiting to put into a full 'all' queue.
+    """
+
+    def __init__(self, name, process, inputs, outputs=(), stop_event=None):
+        super().__init__(name=name, daemon=True)
+        self.process = process
+        self.inputs = inputs
+        self.outputs = list(outputs)
+        self.stop_event = stop_event or threading.Event()
+        self.meter = RateMeter()
+        self.error = None
+
+    def run(self):
+        try:
+            while not self.stop_event.is_set():
+                item = self.inputs.get(timeout=0.1)
+                if item is None:
+                    if self.inputs_closed():
+                        break
+                    continue
+                result = self.process(item)
+                self.meter.tick()
+                if result is not None:
+                    self._emit(result)
+        except Exception as e:
+            self.error = e
+            traceback.print_exc()
+            self.stop_event.set()
+        finally:
+            self.inputs.close()
+            for out in self.outputs:
+                out.close()
+
+    def _emit(self, result):
+        for out in self.outputs:
+            if isinstance(out, LatestValue):
+                out.set(result)
+            else:
+                out.put(result)
+
+    def inputs_closed(self):
+        return self.inputs.closed and len(self.inputs) == 0
+
+
+class SourceWorker(StageWorker):
+    """First stage of a pipeline: polls `produce()` until it raises StopIteration or is stopped."""
+
+    def __init__(self, name, produce, outputs=(), stop_event=None):
+        super().__init__(name, None, None, outputs, stop_event)
+        self.produce = produce
+
+    def run(self):
+        try:
+            while not self.stop_event.is_set():
+                try:
+                    result = self.produce()
+                except StopIteration:
+                    break
+                if result is None:
+                    continue
+                self.meter.tick()
+                self._emit(result)
+        except Exception as e:
+            self.error = e
+            traceback.print_exc()
+            self.stop_event.set()
+        finally:
+            for out in self.outputs:
+                out.close()
+
+
+def make_queue(capacity=1, policy='latest'):
+    """Bounded queue between two stages (see FrameRingBuffer for the policies)."""
+    return FrameRingBuffer(capacity, policy)
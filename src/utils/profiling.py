@@ -0,0 +1,196 @@
+import bisect
+import csv
+import json
+import math
+import os
+import threading
+import time
+from collections import deque
+
+# Histogram bucket upper edges in milliseconds (the last bucket collects everything slower)
+BUCKET_EDGES_MS = (0.1, 0.2, 0.5, 1, 2, 5, 10, 20, 33, 50, 100, 200, 500, 1000)
+
+
+class LatencyHistogram:
+    """
+    Latency statistics for one stage.
+
+    Percentiles are computed over a rolling window of the most recent samples so they follow
+    the current behaviour of the system; the bucket counts cover the whole run.
+    """
+
+    def __init__(self, window=1000):
+        self.samples = deque(maxlen=window)
+        self.counts = [0] * (len(BUCKET_EDGES_MS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, ms):
+        self.samples.append(ms)
+        self.counts[bisect.bisect_left(BUCKET_EDGES_MS, ms)] += 1
+        self.count += 1
+        self.total += ms
+        if ms > self.max:
+            self.max = ms
+
+    def percentile(self, q, ordered=None):
+        """Nearest-rank percentile (0-100) of the rolling window, in ms."""
+        ordered = ordered if ordered is not None else sorted(self.samples)
+        if not ordered:
+            return 0.0
+        rank = min(len(ordered) - 1, max(0, math.ceil(q / 100.0 * len(ordered)) - 1))
+        return ordered[rank]
+
+    def summary(self):
+        ordered = sorted(self.samples)
+        return {
+            'count': self.count,
+            'mean_ms': self.total / self.count if self.count else 0.0,
+            'p50_ms': self.percentile(50, ordered),
+            'p95_ms': self.percentile(95, ordered),
+            'p99_ms': self.percentile(99, ordered),
+            'max_ms': self.max,
+        }
+
+
+class _Probe:
+    """Context manager returned by StageProfiler.stage()."""
+
+    __slots__ = ('profiler', 'name', 'start')
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.profiler.record(self.name, time.perf_counter() - self.start)
+        return False
+
+
+class _NullProbe:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_PROBE = _NullProbe()
+
+
+class StageProfiler:
+    """
+    Low-overhead timing probes for the stages of the navigation loop.
+
+    Usage:
+        with profiler.stage('detect'):
+            landmarks = detector.detect(...)
+
+    Stages are reported in the order they were first recorded. The profiler is thread-safe,
+    so the pipelined runtime can record from every stage thread. A disabled profiler hands out
+    a shared no-op probe, which lets components keep their probes in place at negligible cost.
+    """
+
+    def __init__(self, enabled=True, window=1000, dump_path=None, dump_interval=10.0):
+        """
+        Args:
+            enabled (bool): Record timings. When False every probe is a no-op.
+            window (int): Number of recent samples per stage used for the percentiles.
+            dump_path (str, optional): Periodically write the statistics to this file.
+                                       '.csv' appends one row per stage and dump,
+                                       '.json' overwrites a snapshot including the histograms.
+            dump_interval (float): Seconds between dumps.
+        """
+        self.enabled = enabled
+        self.window = window
+        self.dump_path = dump_path
+        self.dump_interval = dump_interval
+        self.histograms = {}
+        self._lock = threading.Lock()
+        self._last_dump = time.perf_counter()
+
+    def stage(self, name):
+        """Returns a context manager that records the time spent inside it under `name`."""
+        if not self.enabled:
+            return _NULL_PROBE
+        return _Probe(self, name)
+
+    def record(self, name, seconds):
+        """Adds a duration (in seconds) to a stage."""
+        if not self.enabled:
+            return
+        with self._lock:
+            hist = self.histograms.get(name)
+            if hist is None:
+                hist = self.histograms[name] = LatencyHistogram(self.window)
+            hist.add(seconds * 1000.0)
+
+    def summary(self):
+        """Returns {stage: {'count', 'mean_ms', 'p50_ms', 'p95_ms', 'p99_ms', 'max_ms'}}."""
+        with self._lock:
+            return {name: hist.summary() for name, hist in self.histograms.items()}
+
+    def hud_line(self, stages=None):
+        """Compact 'stage p50/p95 ms' status line for the on-screen overlay."""
+        summary = self.summary()
+        names = stages if stages is not None else list(summary)
+        return " | ".join(f"{name} {summary[name]['p50_ms']:.1f}/{summary[name]['p95_ms']:.1f}ms"
+                          for name in names if name in summary)
+
+    def maybe_dump(self):
+        """Writes the statistics to dump_path if dump_interval has passed since the last dump."""
+        if self.dump_path is None or not self.enabled:
+            return
+        now = time.perf_counter()
+        if now - self._last_dump >= self.dump_interval:
+            self._last_dump = now
+            self.dump()
+
+    def dump(self, path=None):
+        """Writes the current statistics as CSV (appending) or JSON (snapshot)."""
+        path = path or self.dump_path
+        if path is None:
+            return
+        summary = self.summary()
+        timestamp = time.time()
+
+        if path.endswith('.json'):
+            with self._lock:
+                histograms = {name: list(hist.counts) for name, hist in self.histograms.items()}
+            for name, stats in summary.items():
+                stats['histogram'] = histograms[name]
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump({'time': timestamp, 'bucket_edges_ms': list(BUCKET_EDGES_MS), 'stages': summary},
+                          f, indent=2)
+            return
+
+        fields = ['time', 'stage', 'count', 'mean_ms', 'p50_ms', 'p95_ms', 'p99_ms', 'max_ms']
+        new_file = not os.path.exists(path) or os.path.getsize(path) == 0
+        with open(path, 'a', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=fields)
+            if new_file:
+                writer.writeheader()
+            for name, stats in summary.items():
+                writer.writerow(dict(time=f"{timestamp:.3f}", stage=name,
+                                     **{k: (v if k == 'count' else round(v, 3)) for k, v in stats.items()}))
+
+    def report(self):
+        """Prints a latency table for all stages."""
+        summary = self.summary()
+        if not summary:
+            return
+        print(f"{'stage':>16} {'count':>7} {'mean':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8}  (ms)")
+        for name, s in summary.items():
+            print(f"{name:>16} {s['count']:7d} {s['mean_ms']:8.2f} {s['p50_ms']:8.2f} "
+                  f"{s['p95_ms']:8.2f} {s['p99_ms']:8.2f} {s['max_ms']:8.2f}")
+
+
+# Shared disabled profiler used by components that were not given one
+NULL_PROFILER = StageProfiler(enabled=False)
@@ -0,0 +1,114 @@
+import json
+import time
+
+
+def _round_list(values, digits):
+    return [round(float(v), digits) for v in values]
+
+
+class RunLogger:
+    """
+    Writes a compact JSON-lines log of a navigation run.
+
+    The first line is a header ({"type": "header", ...}) with the run configuration, then one
+    line per processed frame and a final {"type": "summary", ...} line. Frame lines use short
+    keys to keep long runs small:
+        i   frame index
+        t   seconds since the start of the run
+        doa direction of arrival (degrees) or null
+        pose [x, y, z] position estimate (m)
+        lm  landmarks as [class, confidence, x1, y1, x2, y2, x, y, z] (+ track id in keyframe mode)
+        ms  per-stage latencies of this frame in milliseconds
+    """
+
+    def __init__(self, path, config=None, flush_every=100):
+        """
+        Args:
+            path (str): Output .jsonl file (overwritten).
+            config (dict, optional): Run configuration stored in the header line.
+            flush_every (int): Flush the file every N frames.
+        """
+        self.path = path
+        self.flush_every = flush_every
+        self.frames = 0
+        self._start = time.perf_counter()
+        self._file = open(path, 'w', encoding='utf-8')
+        self._write({'type': 'header', 'time': time.time(), 'config': config or {}})
+
+    def _write(self, record):
+        self._file.write(json.dumps(record, separators=(',', ':')) + '\n')
+
+    def log_frame(self, frame_index, landmarks, pose, timings=None, doa=None):
+        """
+        Args:
+            frame_index (int): Index of the frame in the source.
+            landmarks (list): Landmark dicts from LandmarkDetector.detect().
+            pose (array-like): Position estimate after this frame.
+            timings (dict, optional): {stage: seconds}.
+            doa (float, optional): Audio direction of arrival.
+        """
+        compact = []
+        for lm in landmarks:
+            entry = [lm['class'], round(float(lm['confidence']), 3)]
+            entry += [int(v) for v in lm['bbox']]
+            entry += _round_list(lm['position'], 3)
+            if 'track_id' in lm:
+                entry.append(lm['track_id'])
+            compact.append(entry)
+
+        record = {
+            'i': frame_index,
+            't': round(time.perf_counter() - self._start, 4),
+            'doa': doa,
+            'pose': _round_list(pose, 3) if pose is not None else None,
+            'lm': compact,
+        }
+        if timings:
+            record['ms'] = {name: round(seconds * 1000.0, 2) for name, seconds in timings.items()}
+        self._write(record)
+
+        self.frames += 1
+        if self.frames % self.flush_every == 0:
+            self._file.flush()
+
+    def close(self, summary=None):
+        """Writes the summary line (frame count, duration and any extra fields) and closes the file."""
+        if self._file is None:
+            return
+        elapsed = time.perf_counter() - self._start
+        record = {'type': 'summary', 'frames': self.frames, 'elapsed_s': round(elapsed, 3),
+                  'fps': round(self.frames / elapsed, 2) if elapsed > 0 else 0.0}
+        record.update(summary or {})
+        self._write(record)
+        self._file.close()
+        self._file = None
+        print(f"Run log written to {self.path} ({self.frames} frames).")
+
+
+def read_run_log(path):
+    """
+    Reads a log written by RunLogger. A partial last line (a run killed while the file was
+    being written) is ignored.
+
+    Returns:
+        tuple: (header dict, list of frame dicts, summary dict or None if the run was interrupted)
+    """
+    header, frames, summary = None, [], None
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                if line.endswith('\n'):
+                    raise
+                break
+            kind = record.get('type')
+            if kind == 'header':
+                header = record
+            elif kind == 'summary':
+                summary = record
+            else:
+                frames.append(record)
+    return header, frames, summary
@@ -0,0 +1,214 @@
+import bisect
+import threading
+import time
+from collections import deque
+
+# Common monotonic clock of every stream (the same clock the profiler uses)
+clock = time.perf_counter
+
+
+class ClockMapper:
+    """
+    Maps a sensor clock (camera hardware/global timestamps, audio sample counts) onto `clock`.
+
+    Every sample arrives some non-negative transport delay after its sensor time, so the
+    offset host - sensor is estimated as the minimum over the last `window` samples: jitter
+    only ever adds delay, and the sliding minimum follows slow drift between the clocks.
+    A sensor clock that jumps (device reset, bag loop) restarts the estimate.
+    """
+
+    def __init__(self, window=100, max_jump=1.0):
+        """
+        Args:
+            window (int): Samples in the sliding minimum.
+            max_jump (float): Change (s) of the offset that is treated as a clock reset.
+        """
+        self.window = window
+        self.max_jump = max_jump
+        self.offset = None
+        self._count = 0
+        # (sample number, offset) pairs with increasing offsets: the front is the window minimum
+        self._minimum = deque()
+
+    def update(self, sensor_time, host_time=None):
+        """
+        Adds one observation.
+
+        Args:
+            sensor_time (float): Sensor timestamp in seconds.
+            host_time (float, optional): Arrival time on `clock` (default: now).
+
+        Returns:
+            float: The sensor time mapped onto `clock`.
+        """
+        host_time = clock() if host_time is None else host_time
+        offset = host_time - sensor_time
+        if self.offset is not None and abs(offset - self.offset) > self.max_jump:
+            self._minimum.clear()
+        while self._minimum and self._minimum[-1][1] >= offset:
+            self._minimum.pop()
+        self._minimum.append((self._count, offset))
+        if self._minimum[0][0] <= self._count - self.window:
+            self._minimum.popleft()
+        self._count += 1
+        self.offset = self._minimum[0][1]
+        return sensor_time + self.offset
+
+    def to_host(self, sensor_time):
+        """Sensor time on `clock` (None before the first update)."""
+        return None if self.offset is None else sensor_time + self.offset
+
+
+class StreamBuffer:
+    """
+    Bounded, time-ordered buffer of (timestamp, value) samples of one stream.
+
+    Timestamps live in a plain sorted list, so nearest-sample and range queries are binary
+    searches (O(log n)). Old samples are dropped from the front lazily: the list is only
+    compacted once the dropped prefix is as long as the capacity, which keeps appends O(1)
+    amortized. Thread-safe: one producer thread and any number of readers.
+    """
+
+    def __init__(self, capacity=1000):
+        if capacity < 1:
+            raise ValueError("capacity must be >= 1")
+        self.capacity = capacity
+        self._times = []
+        self._values = []
+        self._start = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._times) - self._start
+
+    def add(self, timestamp, value):
+        """Adds a sample; out-of-order samples are inserted at their place."""
+        with self._lock:
+            if not self._times or timestamp >= self._times[-1]:
+                self._times.append(timestamp)
+                self._values.append(value)
+            else:
+                i = bisect.bisect_right(self._times, timestamp, self._start)
+                self._times.insert(i, timestamp)
+                self._values.insert(i, value)
+            if len(self._times) - self._start > self.capacity:
+                self._start += 1
+                if self._start >= self.capacity:
+                    del self._times[:self._start]
+                    del self._values[:self._start]
+                    self._start = 0
+
+    def latest(self):
+        """Newest (timestamp, value), or None if empty."""
+        with self._lock:
+            if len(self._times) == self._start:
+                return None
+            return self._times[-1], self._values[-1]
+
+    def nearest(self, timestamp, max_gap=None):
+        """
+        Sample closest in time to `timestamp`.
+
+        Args:
+            timestamp (float): Query time.
+            max_gap (float, optional): Return None if the closest sample is further away.
+
+        Returns:
+            tuple or None: (timestamp, value).
+        """
+        with self._lock:
+            times = self._times
+            i = bisect.bisect_left(times, timestamp, self._start)
+            candidates = [j for j in (i - 1, i) if self._start <= j < len(times)]
+            if not candidates:
+                return None
+            j = min(candidates, key=lambda j: abs(times[j] - timestamp))
+            if max_gap is not None and abs(times[j] - timestamp) > max_gap:
+                return None
+            return times[j], self._values[j]
+
+    def range(self, start, end):
+        """All (timestamp, value) samples with start <= timestamp <= end, in time order."""
+        with self._lock:
+            lo = bisect.bisect_left(self._times, start, self._start)
+            hi = bisect.bisect_right(self._times, end, lo)
+            return list(zip(self._times[lo:hi], self._values[lo:hi]))
+
+
+class TimeSync:
+    """
+    Per-stream StreamBuffers on one common clock, plus a ClockMapper per sensor clock.
+
+    Producers stamp their samples (with their own sensor timestamps where they have them);
+    consumers ask for the sample of another stream that is closest to, or within a window
+    around, the time of the sample they are processing, so streams running at different
+    rates (30 fps video, 30 Hz DOA, ...) can be fused at matching times.
+    """
+
+    def __init__(self, capacity=1000):
+        """
+        Args:
+            capacity (int): Samples kept per stream.
+        """
+        self.capacity = capacity
+        self.streams = {}
+        self.clocks = {}
+        self._lock = threading.Lock()
+
+    def stream(self, name):
+        """The StreamBuffer of a stream (created on first use)."""
+        buffer = self.streams.get(name)
+        if buffer is None:
+            with self._lock:
+                buffer = self.streams.setdefault(name, StreamBuffer(self.capacity))
+        return buffer
+
+    def clock_mapper(self, name):
+        """The ClockMapper of a stream's sensor clock (created on first use)."""
+        mapper = self.clocks.get(name)
+        if mapper is None:
+            with self._lock:
+                mapper = self.clocks.setdefault(name, ClockMapper())
+        return mapper
+
+    def stamp(self, name, value, sensor_time=None, host_time=None):
+        """
+        Adds a sample to a stream.
+
+        Args:
+            name (str): Stream name.
+            value: Sample (kept by reference).
+            sensor_time (float, optional): Sensor timestamp (s), mapped onto the common clock.
+            host_time (float, optional): Common-clock time; default is the arrival time (now).
+
+        Returns:
+            float: The sample's common-clock timestamp.
+        """
+        if sensor_time is not None:
+            timestamp = self.clock_mapper(name).update(sensor_time, host_time)
+        else:
+            timestamp = clock() if host_time is None else host_time
+        self.stream(name).add(timestamp, value)
+        return timestamp
+
+    def nearest(self, name, timestamp, max_gap=None):
+        """(timestamp, value) of a stream closest to `timestamp`, or None."""
+        return self.stream(name).nearest(timestamp, max_gap)
+
+    def range(self, name, start, end):
+        """(timestamp, value) samples of a stream within [start, end]."""
+        return self.stream(name).range(start, end)
+
+    def align(self, timestamp, names, max_gap=None):
+        """
+        Values of several streams at one time.
+
+        Returns:
+            dict: name -> value of the closest sample (None if there is none within max_gap).
+        """
+        aligned = {}
+        for name in names:
+            sample = self.nearest(name, timestamp, max_gap)
+            aligned[name] = sample[1] if sample is not None else None
+        return aligned
@@ -0,0 +1,163 @@
+import threading
+
+import numpy as np
+
+from src.sensors.depth_aligner import intrinsics_key
+
+# Ray grids are immutable once built, so one cache serves every Deprojector (and thread)
+_ray_cache = {}
+_ray_cache_lock = threading.Lock()
+
+def _distortion_model(intrinsics):
+    model = str(getattr(intrinsics, 'model', '') or '').lower()
+    coeffs = [float(c) for c in getattr(intrinsics, 'coeffs', None) or []]
+    if not any(coeffs):
+        return None, coeffs
+    if 'inverse_brown_conrady' in model:
+        return 'inverse_brown_conrady', coeffs
+    if 'brown_conrady' in model and 'modified' not in model:
+        return 'brown_conrady', coeffs
+    return None, coeffs
+
+def _undistort(x, y, model, coeffs):
+    """Same corrections as rs2_deproject_pixel_to_point, applied once per grid."""
+    k1, k2, p1, p2, k3 = coeffs[:5]
+    if model == 'inverse_brown_conrady':
+        r2 = x * x + y * y
+        f = 1 + k1 * r2 + k2 * r2 * r2 + k3 * r2 * r2 * r2
+        return (x * f + 2 * p1 * x * y + p2 * (r2 + 2 * x * x),
+                y * f + 2 * p2 * x * y + p1 * (r2 + 2 * y * y))
+    # brown_conrady: invert the forward model iteratively
+    ux, uy = x.copy(), y.copy()
+    for _ in range(10):
+        r2 = ux * ux + uy * uy
+        icdist = 1 / (1 + ((k3 * r2 + k2) * r2 + k1) * r2)
+        dx = 2 * p1 * ux * uy + p2 * (r2 + 2 * ux * ux)
+        dy = 2 * p2 * ux * uy + p1 * (r2 + 2 * uy * uy)
+        ux = (x - dx) * icdist
+        uy = (y - dy) * icdist
+    return ux, uy
+
+def ray_grid(intrinsics, step=1):
+    """
+    Normalized rays (x/z, y/z) of every `step`-th pixel, computed once per intrinsics and step.
+
+    Returns:
+        tuple: (ray_x, ray_y) float32 arrays of shape (ceil(height/step), ceil(width/step)).
+               They are shared and must not be modified.
+    """
+    key = (intrinsics_key(intrinsics), step)
+    rays = _ray_cache.get(key)
+    if rays is None:
+        us = np.arange(0, intrinsics.width, step, dtype=np.float64)
+        vs = np.arange(0, intrinsics.height, step, dtype=np.float64)
+        x, y = np.meshgrid((us - intrinsics.ppx) / intrinsics.fx, (vs - intrinsics.ppy) / intrinsics.fy)
+        model, coeffs = _distortion_model(intrinsics)
+        if model is not None:
+            x, y = _undistort(x, y, model, coeffs)
+        rays = (x.astype(np.float32), y.astype(np.float32))
+        for ray in rays:
+            ray.flags.writeable = False
+        with _ray_cache_lock:
+            rays = _ray_cache.setdefault(key, rays)
+    return rays
+
+
+class Deprojector:
+    """
+    Depth pixels to camera-frame XYZ (meters) with cached ray grids and reused output buffers.
+
+    The ray grid of an intrinsics/stride pair is built once (including the lens undistortion
+    rs2_deproject_pixel_to_point would apply per pixel); per frame the work is one scaling and
+    two multiplications into a preallocated buffer. Returned arrays are views of that buffer and
+    are overwritten by the next call on the same Deprojector, so copy them to keep them, and
+    give every thread its own Deprojector.
+    """
+
+    def __init__(self):
+        self._frame_buffers = {}
+        self._points = np.empty((0, 3), dtype=np.float32)
+        self._raw = np.empty(0, dtype=np.uint16)
+        self._rays = np.empty((2, 0), dtype=np.float32)
+
+    def deproject(self, depth_image, intrinsics, depth_scale=0.001, step=1):
+        """
+        Point cloud of a full frame, or of every `step`-th pixel in x and y.
+
+        Args:
+            depth_image (numpy.ndarray): HxW depth image in depth units (aligned to `intrinsics`).
+            intrinsics: Intrinsics of the depth image.
+            depth_scale (float): Meters per depth unit.
+            step (int): Pixel stride.
+
+        Returns:
+            numpy.ndarray: 3 x (H/step) x (W/step) float32 planes, so `x, y, z = deproject(...)`;
+                           invalid pixels have z = 0.
+        """
+        ray_x, ray_y = ray_grid(intrinsics, step)
+        out = self._frame_buffers.get(ray_x.shape)
+        if out is None:
+            out = self._frame_buffers[ray_x.shape] = np.empty((3,) + ray_x.shape, dtype=np.float32)
+        # Planar layout: every multiplication writes one contiguous plane
+        np.multiply(depth_image[::step, ::step], np.float32(depth_scale), out=out[2])
+        np.multiply(out[2], ray_x, out=out[0])
+        np.multiply(out[2], ray_y, out=out[1])
+        return out
+
+    def _point_buffer(self, n):
+        if len(self._points) < n:
+            self._points = np.empty((max(n, 2 * len(self._points), 64), 3), dtype=np.float32)
+        return self._points[:n]
+
+    def _gather_buffers(self, n, dtype):
+        """Buffers for n gathered depth values and their two ray components."""
+        if len(self._raw) < n or self._raw.dtype != dtype:
+            self._raw = np.empty(max(n, 2 * len(self._raw), 64), dtype=dtype)
+        if self._rays.shape[1] < n:
+            self._rays = np.empty((2, max(n, 2 * self._rays.shape[1], 64)), dtype=np.float32)
+        return self._raw[:n], self._rays[0, :n], self._rays[1, :n]
+
+    def deproject_indices(self, depth_image, intrinsics, indices, depth_scale=0.001):
+        """
+        Points of an arbitrary set of pixels.
+
+        Args:
+            indices (array-like): Flat pixel indices (v * width + u), inside the image.
+
+        Returns:
+            numpy.ndarray: Nx3 float32 XYZ.
+        """
+        ray_x, ray_y = ray_grid(intrinsics, 1)
+        indices = np.asarray(indices, dtype=np.int64)
+        n = len(indices)
+        raw, rx, ry = self._gather_buffers(n, depth_image.dtype)
+        # Gather straight into the reused buffers (mode='clip' lets np.take write to out directly)
+        np.take(depth_image.ravel(), indices, out=raw, mode='clip')
+        np.take(ray_x.ravel(), indices, out=rx, mode='clip')
+        np.take(ray_y.ravel(), indices, out=ry, mode='clip')
+        out = self._point_buffer(n)
+        np.multiply(raw, np.float32(depth_scale), out=out[:, 2])
+        np.multiply(out[:, 2], rx, out=out[:, 0])
+        np.multiply(out[:, 2], ry, out=out[:, 1])
+        return out
+
+    def deproject_pixels(self, intrinsics, us, vs, depths):
+        """
+        Points of pixels (rounded to the nearest pixel) at given depths, e.g. bounding box centres.
+
+        Args:
+            us, vs (array-like): Pixel coordinates.
+            depths (array-like): Depths in meters.
+
+        Returns:
+            numpy.ndarray: Nx3 float32 XYZ.
+        """
+        ray_x, ray_y = ray_grid(intrinsics, 1)
+        height, width = ray_x.shape
+        u = np.clip(np.rint(us), 0, width - 1).astype(np.int64)
+        v = np.clip(np.rint(vs), 0, height - 1).astype(np.int64)
+        out = self._point_buffer(len(u))
+        out[:, 2] = depths
+        np.multiply(out[:, 2], ray_x[v, u], out=out[:, 0])
+        np.multiply(out[:, 2], ray_y[v, u], out=out[:, 1])
+        return out
@@ -0,0 +1,177 @@
+import numpy as np
+
+from src.sensors.depth_aligner import intrinsics_key
+from src.vision.deprojection import Deprojector, ray_grid
+
+# Up in camera coordinates (y points down)
+_UP = np.array([0.0, -1.0, 0.0])
+
+class GroundPlaneEstimator:
+    """
+    Floor plane from the aligned depth image, tracked over frames.
+
+    The depth image is subsampled and back-projected by a Deprojector. All RANSAC hypotheses
+    (plane through three random points) are built and scored at once: one K x 3 cross product
+    for the normals and one (points x K) distance matrix over a random scoring subset. The best
+    hypothesis is refined by a least-squares fit to all its inliers and blended with the
+    previous frame's plane, which also enters the next RANSAC round as a hypothesis.
+
+    The plane is n . p + d = 0 in camera coordinates with the unit normal n pointing up, so
+    n . p + d is the height of p above the floor and d is the camera height.
+    """
+
+    def __init__(self, intrinsics, depth_scale=0.001, step=8, num_hypotheses=128, score_points=1500,
+                 inlier_threshold=0.03, min_range=0.3, max_range=6.0, max_tilt_deg=35.0,
+                 min_camera_height=0.3, min_inlier_ratio=0.1, smoothing=0.5, seed=0):
+        """
+        Args:
+            intrinsics: Intrinsics of the aligned depth image (color camera).
+            depth_scale (float): Meters per depth unit.
+            step (int): Pixel subsampling for the fit.
+            num_hypotheses (int): RANSAC hypotheses per frame.
+            score_points (int): Points used to score the hypotheses.
+            inlier_threshold (float): Point-to-plane distance (m) of an inlier.
+            min_range (float): Depth range (m) used for the fit.
+            max_range (float): Depth range (m) used for the fit.
+            max_tilt_deg (float): Largest angle between a hypothesis normal and the expected up
+                                  direction (the previous normal, or -y before the first fit).
+            min_camera_height (float): Planes closer than this to the camera are not the floor.
+            min_inlier_ratio (float): Share of scoring points a plane must explain to be accepted.
+            smoothing (float): Weight of the new fit when blending with the previous plane (1 = no smoothing).
+            seed (int): Random seed.
+        """
+        self.depth_scale = depth_scale
+        self.step = step
+        self.num_hypotheses = num_hypotheses
+        self.score_points = score_points
+        self.inlier_threshold = inlier_threshold
+        self.min_range = min_range
+        self.max_range = max_range
+        self.min_cos_tilt = np.cos(np.radians(max_tilt_deg))
+        self.min_camera_height = min_camera_height
+        self.min_inlier_ratio = min_inlier_ratio
+        self.smoothing = smoothing
+        self.rng = np.random.default_rng(seed)
+
+        self.normal = None
+        self.offset = None
+        self.inlier_ratio = 0.0
+        self.lost_frames = 0
+        self.deprojector = Deprojector()
+        self._key = None
+        self._prepare_rays(intrinsics)
+
+    @property
+    def plane(self):
+        """(normal, offset) of the current floor estimate, or None before the first fit."""
+        return None if self.normal is None else (self.normal, self.offset)
+
+    @property
+    def camera_height(self):
+        return self.offset
+
+    def _prepare_rays(self, intrinsics):
+        key = intrinsics_key(intrinsics)
+        if key == self._key:
+            return
+        self._key = key
+        self.intrinsics = intrinsics
+        # Full-resolution rays for the per-pixel height queries
+        self._ray_x, self._ray_y = ray_grid(intrinsics)
+
+    def update(self, depth_image, intrinsics=None):
+        """
+        Fits the floor in one depth frame.
+
+        Returns:
+            tuple: (normal, offset) of the tracked plane, or None if no floor was found yet.
+        """
+        if intrinsics is not None:
+            self._prepare_rays(intrinsics)
+        cloud = self.deprojector.deproject(depth_image, self.intrinsics, self.depth_scale, self.step)
+        z = cloud[2]
+        points = cloud[:, (z > self.min_range) & (z < self.max_range)].T
+        if len(points) < 3:
+            self.lost_frames += 1
+            return self.plane
+
+        fit = self._ransac(points)
+        if fit is None:
+            self.lost_frames += 1
+            return self.plane
+        normal, offset = self._refine(points, *fit)
+
+        if self.normal is not None:
+            normal = (1 - self.smoothing) * self.normal + self.smoothing * normal
+            normal /= np.linalg.norm(normal)
+            offset = (1 - self.smoothing) * self.offset + self.smoothing * offset
+        self.normal, self.offset = normal, float(offset)
+        self.lost_frames = 0
+        return self.plane
+
+    def _ransac(self, points):
+        """Best of all hypotheses (and the previous plane) by inlier count on a scoring subset."""
+        m = len(points)
+        subset = points[self.rng.integers(0, m, min(m, self.score_points))]
+        samples = points[self.rng.integers(0, m, (self.num_hypotheses, 3))]
+        normals = np.cross(samples[:, 1] - samples[:, 0], samples[:, 2] - samples[:, 0])
+        norms = np.linalg.norm(normals, axis=1)
+        ok = norms > 1e-9
+        normals = normals[ok] / norms[ok, None]
+        # Orient every normal upwards
+        normals *= np.where(normals @ _UP < 0, -1.0, 1.0)[:, None]
+        offsets = -np.einsum('ij,ij->i', normals, samples[ok, 0])
+
+        expected_up = self.normal if self.normal is not None else _UP
+        plausible = (normals @ expected_up >= self.min_cos_tilt) & (offsets >= self.min_camera_height)
+        normals, offsets = normals[plausible], offsets[plausible]
+        if self.normal is not None:
+            normals = np.vstack([normals, self.normal])
+            offsets = np.append(offsets, self.offset)
+        if len(normals) == 0:
+            return None
+
+        distances = np.abs(subset @ normals.T + offsets)
+        counts = np.count_nonzero(distances < self.inlier_threshold, axis=0)
+        best = int(np.argmax(counts))
+        self.inlier_ratio = counts[best] / len(subset)
+        if self.inlier_ratio < self.min_inlier_ratio:
+            return None
+        return normals[best], offsets[best]
+
+    def _refine(self, points, normal, offset):
+        """Least-squares plane through all inliers of the RANSAC plane."""
+        inliers = points[np.abs(points @ normal + offset) < self.inlier_threshold]
+        if len(inliers) < 3:
+            return normal, offset
+        centroid = inliers.mean(axis=0)
+        _, vectors = np.linalg.eigh(np.cov((inliers - centroid).T))
+        refined = vectors[:, 0]
+        if refined @ normal < 0:
+            refined = -refined
+        return refined, -float(refined @ centroid)
+
+    def height_map(self, depth_image):
+        """Height (m) above the floor of every pixel (NaN where the depth is invalid or no plane is known)."""
+        z = depth_image.astype(np.float32) * np.float32(self.depth_scale)
+        if self.normal is None:
+            return np.full(z.shape, np.nan, dtype=np.float32)
+        nx, ny, nz = self.normal.astype(np.float32)
+        height = z * (nx * self._ray_x + ny * self._ray_y + nz) + np.float32(self.offset)
+        height[z <= 0] = np.nan
+        return height
+
+    def above_ground_mask(self, depth_image, min_height=0.05):
+        """
+        Per-pixel mask of valid depth points more than min_height above the floor.
+        Before the first fit every valid pixel counts as above ground.
+        """
+        if self.normal is None:
+            return depth_image > 0
+        # height > min_height  <=>  depth * (n . ray) * scale > min_height - offset
+        nx, ny, nz = (self.normal * self.depth_scale).astype(np.float32)
+        slope = nx * self._ray_x
+        slope += ny * self._ray_y
+        slope += nz
+        slope *= depth_image
+        return (slope > np.float32(min_height - self.offset)) & (depth_image > 0)
@@ -0,0 +1,128 @@
+import os
+import shutil
+
+import numpy as np
+
+BACKENDS = ('torch', 'onnx', 'openvino')
+
+class InferenceBackend:
+    """
+    Object detector behind a common interface.
+
+    predict() returns plain NumPy arrays so callers do not depend on the framework that
+    runs the model. `names` maps class ids to labels (same as ultralytics' model.names).
+    """
+
+    def __init__(self, names):
+        self.names = names
+
+    def predict(self, image):
+        """
+        Args:
+            image (numpy.ndarray): BGR image.
+
+        Returns:
+            tuple: (boxes Nx4 float32 [x1, y1, x2, y2], scores N float32, class_ids N int64)
+        """
+        raise NotImplementedError
+
+    def detect(self, image):
+        """Returns (x1, y1, x2, y2, conf, cls_id) tuples, the format used by LandmarkDetector."""
+        boxes, scores, class_ids = self.predict(image)
+        return [(int(b[0]), int(b[1]), int(b[2]), int(b[3]), float(s), int(c))
+                for b, s, c in zip(boxes, scores, class_ids)]
+
+class UltralyticsBackend(InferenceBackend):
+    """
+    Runs a model through ultralytics.YOLO. Besides .pt weights (PyTorch), ultralytics loads
+    exported .onnx files (ONNX Runtime) and *_openvino_model directories (OpenVINO) directly.
+    """
+
+    def __init__(self, model_path, imgsz=640, conf=0.25):
+        from ultralytics import YOLO
+
+        self.model = YOLO(model_path, task='detect')
+        self.imgsz = imgsz
+        self.conf = conf
+        self.model_path = model_path
+        super().__init__(self.model.names)
+
+    def predict(self, image):
+        results = self.model(image, imgsz=self.imgsz, conf=self.conf, verbose=False)
+        if not results:
+            return np.zeros((0, 4), np.float32), np.zeros(0, np.float32), np.zeros(0, np.int64)
+        boxes = results[0].boxes.cpu().numpy()
+        return (boxes.xyxy.astype(np.float32), boxes.conf.astype(np.float32), boxes.cls.astype(np.int64))
+
+def artifact_path(model_path, backend, int8=False, imgsz=640, cache_dir='models/exported'):
+    """Location of the cached export for a model/backend/precision/input-size combination."""
+    stem = os.path.splitext(os.path.basename(model_path))[0]
+    suffix = f"{stem}_{imgsz}{'_int8' if int8 else ''}"
+    if backend == 'onnx':
+        return os.path.join(cache_dir, f"{suffix}.onnx")
+    if backend == 'openvino':
+        return os.path.join(cache_dir, f"{suffix}_openvino_model")
+    raise ValueError(f"No export artifact for backend '{backend}'")
+
+def export_model(model_path, backend, int8=False, imgsz=640, cache_dir='models/exported',
+                 calibration_data='coco8.yaml', force=False):
+    """
+    Exports a .pt model once to ONNX or OpenVINO and caches the artifact.
+
+    The cached artifact is reused as long as it is newer than the source weights, or when the
+    weights are not on disk (e.g. a hub name like 'yolov8n.pt' that ultralytics downloads on demand).
+    INT8: OpenVINO uses ultralytics' post-training quantization with `calibration_data`;
+    for ONNX the FP32 export is quantized with ONNX Runtime dynamic (weight) quantization.
+
+    Returns:
+        str: Path of the exported model (file or OpenVINO directory).
+    """
+    target = artifact_path(model_path, backend, int8, imgsz, cache_dir)
+    if not force and os.path.exists(target) and (not os.path.exists(model_path)
+                                                 or os.path.getmtime(target) >= os.path.getmtime(model_path)):
+        return target
+
+    from ultralytics import YOLO
+
+    os.makedirs(cache_dir, exist_ok=True)
+    print(f"Exporting {model_path} to {backend}{' (INT8)' if int8 else ''}...")
+
+    if backend == 'onnx':
+        exported = YOLO(model_path).export(format='onnx', imgsz=imgsz, simplify=True)
+        if int8:
+            from onnxruntime.quantization import quantize_dynamic, QuantType
+            quantize_dynamic(exported, target, weight_type=QuantType.QUInt8)
+        else:
+            shutil.copyfile(exported, target)
+    elif backend == 'openvino':
+        kwargs = dict(format='openvino', imgsz=imgsz)
+        if int8:
+            kwargs.update(int8=True, data=calibration_data)
+        exported = YOLO(model_path).export(**kwargs)
+        if os.path.exists(target):
+            shutil.rmtree(target)
+        shutil.copytree(exported, target)
+    else:
+        raise ValueError(f"Unknown backend '{backend}'. Expected one of {BACKENDS}.")
+
+    print(f"Exported model cached at {target}.")
+    return target
+
+def create_backend(model_path='yolov8n.pt', backend='torch', int8=False, imgsz=640, cache_dir='models/exported'):
+    """
+    Creates a detector for the requested runtime, exporting the model on first use.
+
+    Args:
+        model_path (str): .pt weights (or an already exported artifact).
+        backend (str): 'torch', 'onnx' or 'openvino'.
+        int8 (bool): Use an INT8-quantized export (onnx/openvino only).
+        imgsz (int): Inference input size (fixed for exported models).
+        cache_dir (str): Where exported artifacts are kept.
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend '{backend}'. Expected one of {BACKENDS}.")
+    if backend == 'torch' or not model_path.endswith('.pt'):
+        if int8 and backend == 'torch':
+            print("INT8 is only available for the onnx/openvino backends; using FP32 PyTorch.")
+        return UltralyticsBackend(model_path, imgsz=imgsz)
+    return UltralyticsBackend(export_model(model_path, backend, int8, imgsz, cache_dir), imgsz=imgsz)
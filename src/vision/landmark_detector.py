@@ -1,11 +1,102 @@
-from ultralytics import YOLO
 import numpy as np
-import pyrealsense2 as rs
+
+from src.vision.deprojection import Deprojector
+from src.vision.inference_backend import create_backend
+from src.vision.tracker import BoxTracker, make_thumbnail, scene_change
+from src.utils.profiling import NULL_PROFILER
+
+def sample_box_depths(depth_image, boxes, depth_scale=0.001, pixel_scale=1.0, samples=16, inner=0.5,
+                      percentile=20):
+    """
+    Computes robust depth statistics for many bounding boxes in one vectorized pass.
+
+    A samples x samples grid is placed over the central `inner` fraction of every box (to stay
+    off the background at the box edges) and gathered with a single fancy index. Invalid (zero)
+    depths are pushed to the end by sorting, so median and percentile only use valid samples.
+
+    Args:
+        depth_image (numpy.ndarray): HxW z16 depth image aligned to color.
+        boxes (numpy.ndarray): Nx4 [x1, y1, x2, y2] boxes in color pixels.
+        depth_scale (float): Meters per depth unit.
+        pixel_scale (float): Depth image resolution relative to the color image.
+        samples (int): Grid samples per box side.
+        inner (float): Fraction of the box width/height that is sampled.
+        percentile (float): Additional (near-side) percentile to report.
+
+    Returns:
+        dict: 'median', 'percentile' (meters, 0 where no valid sample) and 'valid_ratio', each of shape (N,).
+    """
+    boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4) * pixel_scale
+    n = boxes.shape[0]
+    if n == 0:
+        empty = np.zeros(0, dtype=np.float32)
+        return {'median': empty, 'percentile': empty, 'valid_ratio': empty}
+
+    h, w = depth_image.shape[:2]
+    margin = (1.0 - inner) / 2.0
+    frac = margin + inner * (np.arange(samples, dtype=np.float32) + 0.5) / samples
+
+    x1, y1, x2, y2 = boxes.T
+    xs = (x1[:, None] + (x2 - x1)[:, None] * frac).astype(np.int32).clip(0, w - 1)
+    ys = (y1[:, None] + (y2 - y1)[:, None] * frac).astype(np.int32).clip(0, h - 1)
+    values = depth_image[ys[:, :, None], xs[:, None, :]].reshape(n, -1)
+
+    valid_count = np.count_nonzero(values, axis=1)
+    # Sort with invalid samples (0) moved past every valid one
+    ordered = np.sort(np.where(values > 0, values, np.iinfo(np.int32).max).astype(np.int32), axis=1)
+
+    last = np.maximum(valid_count - 1, 0)
+    lo = last // 2
+    hi = last - lo
+    rows = np.arange(n)
+    median = (ordered[rows, lo].astype(np.float32) + ordered[rows, hi]) * 0.5
+    pct = ordered[rows, np.round(last * percentile / 100.0).astype(np.int64)].astype(np.float32)
+
+    has_depth = valid_count > 0
+    return {
+        'median': np.where(has_depth, median * depth_scale, 0.0).astype(np.float32),
+        'percentile': np.where(has_depth, pct * depth_scale, 0.0).astype(np.float32),
+        'valid_ratio': valid_count / float(values.shape[1]),
+    }
 
 class LandmarkDetector:
-    def __init__(self, model_path='yolov8n.pt'):
-        self.model = YOLO(model_path)
+    DEPTH_MODES = ('robust', 'center')
+
+    def __init__(self, model_path='yolov8n.pt', depth_mode='robust', min_valid_ratio=0.1,
+                 keyframe_interval=1, scene_change_threshold=None, backend='torch', int8=False, profiler=None):
+        """
+        Args:
+            model_path (str): Path to the YOLO model.
+            depth_mode (str): 'robust' uses batched median depth over each box,
+                              'center' queries the single center pixel.
+            min_valid_ratio (float): Minimum share of valid depth samples in a box ('robust' mode).
+            keyframe_interval (int): Run the model every N frames and track boxes in between
+                                     (1 = run the model on every frame).
+            scene_change_threshold (float, optional): Also run the model when the mean absolute
+                                                      thumbnail difference (0-255) to the last
+                                                      keyframe exceeds this value.
+            backend (str): Inference runtime: 'torch', 'onnx' or 'openvino' (exported and
+                           cached on first use).
+            int8 (bool): Use an INT8-quantized export (onnx/openvino).
+            profiler (StageProfiler, optional): Records 'inference', 'track' and 'depth' timings.
+        """
+        if depth_mode not in self.DEPTH_MODES:
+            raise ValueError(f"Unknown depth_mode '{depth_mode}'. Expected one of {self.DEPTH_MODES}.")
+        self.model = create_backend(model_path, backend, int8)
         self.classes = self.model.names
+        self.depth_mode = depth_mode
+        self.min_valid_ratio = min_valid_ratio
+        self.deprojector = Deprojector()
+        self.profiler = profiler or NULL_PROFILER
+
+        # Keyframe mode
+        self.keyframe_interval = max(1, int(keyframe_interval))
+        self.scene_change_threshold = scene_change_threshold
+        self.tracker = BoxTracker() if self.keyframe_interval > 1 or scene_change_threshold is not None else None
+        self._frames_since_keyframe = 0
+        self._keyframe_thumb = None
+        self.keyframe_count = 0
+        self.frame_count = 0
 
     def detect(self, color_image, depth_frame, intrinsics):
         """
@@ -19,36 +110,112 @@ class LandmarkDetector:
         Returns:
             list: List of detected landmarks with format:
                   {'class': str, 'confidence': float, 'bbox': [x1, y1, x2, y2], 'position': [x, y, z]}
+                  In 'robust' mode each landmark also carries 'depth_valid_ratio'.
+                  In keyframe mode each landmark also carries 'track_id' and 'tracked'
+                  (False on keyframes, True for boxes propagated by the tracker).
         """
-        results = self.model(color_image, verbose=False)
+        self.frame_count += 1
+        if self.tracker is None:
+            detections = self._run_model(color_image)
+        elif self._is_keyframe(color_image):
+            detections = self._run_model(color_image)
+            with self.profiler.stage('track'):
+                detections = self.tracker.reset(color_image, detections)
+        else:
+            with self.profiler.stage('track'):
+                detections = self.tracker.propagate(color_image)
+            self._frames_since_keyframe += 1
+
+        if not detections:
+            return []
+
+        with self.profiler.stage('depth'):
+            # Lazily aligned depth frames only reproject the regions we are going to query
+            depth_image = None
+            if hasattr(depth_frame, 'align_boxes'):
+                depth_image = depth_frame.align_boxes([d[:4] for d in detections])
+
+            if self.depth_mode == 'robust':
+                return self._landmarks_robust(detections, depth_frame, intrinsics, depth_image)
+            return self._landmarks_center(detections, depth_frame, intrinsics)
+
+    def _run_model(self, color_image):
+        """Runs the detector and returns (x1, y1, x2, y2, conf, cls_id) tuples."""
+        with self.profiler.stage('inference'):
+            return self.model.detect(color_image)
+
+    def _is_keyframe(self, color_image):
+        """Decides whether to run the model: every N frames, or when the scene changed a lot."""
+        thumb = make_thumbnail(color_image) if self.scene_change_threshold is not None else None
+        due = self.keyframe_count == 0 or self._frames_since_keyframe + 1 >= self.keyframe_interval
+        if not due and thumb is not None:
+            due = scene_change(self._keyframe_thumb, thumb) > self.scene_change_threshold
+        if due:
+            self._frames_since_keyframe = 0
+            self._keyframe_thumb = thumb
+            self.keyframe_count += 1
+        return due
+
+    def _annotate(self, landmark, detection):
+        """Adds tracker information to a landmark dict when running in keyframe mode."""
+        if len(detection) > 6:
+            landmark['track_id'] = detection[6]
+            landmark['tracked'] = self._frames_since_keyframe > 0
+        return landmark
+
+    def _landmarks_center(self, detections, depth_frame, intrinsics):
+        centers, dists = [], []
+        for detection in detections:
+            x1, y1, x2, y2 = detection[:4]
+            # Calculate center of the bbox
+            cx = (x1 + x2) // 2
+            cy = (y1 + y2) // 2
+            centers.append((cx, cy))
+            # Get distance at the center point
+            dists.append(depth_frame.get_distance(cx, cy))
+
+        # Deproject all centers at once
+        us, vs = zip(*centers)
+        points = self.deprojector.deproject_pixels(intrinsics, us, vs, dists)
+
         landmarks = []
+        for i, detection in enumerate(detections):
+            if dists[i] > 0:
+                x1, y1, x2, y2, conf, cls_id = detection[:6]
+                landmarks.append(self._annotate({
+                    'class': self.classes[cls_id],
+                    'confidence': conf,
+                    'bbox': [x1, y1, x2, y2],
+                    'position': points[i].tolist()
+                }, detection))
 
-        for result in results:
-            boxes = result.boxes
-            for box in boxes:
-                # Bounding Box
-                x1, y1, x2, y2 = map(int, box.xyxy[0])
-                conf = float(box.conf[0])
-                cls_id = int(box.cls[0])
-                class_name = self.classes[cls_id]
-
-                # Calculate center of the bbox
-                cx = (x1 + x2) // 2
-                cy = (y1 + y2) // 2
-
-                # Get distance at the center point
-                # Note: In a real application, we might want to take the median of a small region
-                dist = depth_frame.get_distance(cx, cy)
-
-                if dist > 0:
-                    # Deproject pixel to 3D point
-                    point_3d = rs.rs2_deproject_pixel_to_point(intrinsics, [cx, cy], dist)
-                    
-                    landmarks.append({
-                        'class': class_name,
-                        'confidence': conf,
-                        'bbox': [x1, y1, x2, y2],
-                        'position': point_3d
-                    })
+        return landmarks
+
+    def _landmarks_robust(self, detections, depth_frame, intrinsics, depth_image=None):
+        """
+        Batched path: one NumPy pass for depth statistics and one for deprojection.
+        `depth_image` is the canvas already aligned for these boxes (lazy alignment mode).
+        """
+        boxes = np.asarray([d[:4] for d in detections], dtype=np.float32)
 
+        if depth_image is None:
+            depth_image = np.asanyarray(depth_frame.get_data())
+        stats = sample_box_depths(depth_image, boxes, depth_frame.get_units(),
+                                  getattr(depth_frame, 'pixel_scale', 1.0))
+
+        cx = (boxes[:, 0] + boxes[:, 2]) * 0.5
+        cy = (boxes[:, 1] + boxes[:, 3]) * 0.5
+        points = self.deprojector.deproject_pixels(intrinsics, cx, cy, stats['median'])
+
+        keep = (stats['median'] > 0) & (stats['valid_ratio'] >= self.min_valid_ratio)
+        landmarks = []
+        for i in np.flatnonzero(keep):
+            x1, y1, x2, y2, conf, cls_id = detections[i][:6]
+            landmarks.append(self._annotate({
+                'class': self.classes[cls_id],
+                'confidence': conf,
+                'bbox': [x1, y1, x2, y2],
+                'position': points[i].tolist(),
+                'depth_valid_ratio': float(stats['valid_ratio'][i])
+            }, detections[i]))
         return landmarks
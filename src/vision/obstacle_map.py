@@ -0,0 +1,142 @@
+import numpy as np
+
+from src.sensors.depth_aligner import intrinsics_key
+from src.vision.deprojection import Deprojector
+
+class ObstacleMap:
+    """
+    Obstacles in front of the user from the aligned depth image.
+
+    Every frame the depth image is decimated, back-projected by a Deprojector and quantized into voxels; a single np.bincount over the voxel grid removes duplicate points
+    (voxel downsampling), and a ground-plane cell counts as occupied when enough voxels of its
+    column lie between `min_height` and `max_height` above the floor. The occupancy grid is
+    then reduced to the nearest obstacle per angular sector with precomputed per-cell
+    distances and sector indices, so no per-frame step depends on anything but array sizes.
+
+    Grid axes follow the camera: x to the right, z forward, with the camera at x = 0, z = 0.
+    Heights are measured from the floor plane tracked by `ground_estimator` when one is given,
+    otherwise from a level floor `camera_height` below the camera.
+    """
+
+    def __init__(self, intrinsics, depth_scale=0.001, step=4, cell_size=0.1, voxel_height=0.1,
+                 max_range=4.0, half_width=2.0, camera_height=1.2, min_height=0.1, max_height=2.0,
+                 min_voxels=2, num_sectors=9, ground_estimator=None):
+        """
+        Args:
+            intrinsics: Intrinsics of the aligned depth image (color camera).
+            depth_scale (float): Meters per depth unit.
+            step (int): Pixel decimation (4 = every 4th pixel in x and y).
+            cell_size (float): Ground-plane cell size (m) of the grid and the voxels.
+            voxel_height (float): Vertical voxel size (m).
+            max_range (float): Grid depth (m) in front of the camera.
+            half_width (float): Grid extent (m) to each side.
+            camera_height (float): Height of the camera above the floor (m).
+            min_height (float): Points lower than this above the floor are floor/noise.
+            max_height (float): Points higher than this are overhead and do not block.
+            min_voxels (int): Occupied voxels needed in a column to mark its cell occupied.
+            num_sectors (int): Angular sectors across the horizontal field of view.
+            ground_estimator (GroundPlaneEstimator, optional): Updated with every frame; its
+                                                              plane replaces the level-floor assumption.
+        """
+        self.depth_scale = depth_scale
+        self.step = step
+        self.cell_size = cell_size
+        self.voxel_height = voxel_height
+        self.max_range = max_range
+        self.half_width = half_width
+        self.camera_height = camera_height
+        self.min_height = min_height
+        self.max_height = max_height
+        self.min_voxels = min_voxels
+        self.num_sectors = num_sectors
+        self.ground_estimator = ground_estimator
+
+        self.nx = int(np.ceil(2 * half_width / cell_size))
+        self.nz = int(np.ceil(max_range / cell_size))
+        self.nh = int(np.ceil((max_height - min_height) / voxel_height))
+        self.deprojector = Deprojector()
+        self._key = None
+        self._prepare_rays(intrinsics)
+        self._prepare_sectors()
+
+    def _prepare_rays(self, intrinsics):
+        """Tracks the intrinsics of the incoming frames; returns True if they changed."""
+        key = intrinsics_key(intrinsics)
+        if key == self._key:
+            return False
+        self._key = key
+        self.intrinsics = intrinsics
+        self.fov = 2 * np.arctan(intrinsics.width / 2 / intrinsics.fx)
+        return True
+
+    def _prepare_sectors(self):
+        """Distance and sector of every grid cell centre, and the cells ordered by sector."""
+        xs = (np.arange(self.nx) + 0.5) * self.cell_size - self.half_width
+        zs = (np.arange(self.nz) + 0.5) * self.cell_size
+        cx, cz = np.meshgrid(xs, zs)
+        self._cell_distance = np.hypot(cx, cz).ravel()
+        angle = np.arctan2(cx, cz).ravel()
+        sector = np.floor((angle + self.fov / 2) / self.fov * self.num_sectors).astype(np.int64)
+        inside = (sector >= 0) & (sector < self.num_sectors)
+        cells = np.flatnonzero(inside)
+        order = np.argsort(sector[cells], kind='stable')
+        self._sector_cells = cells[order]
+        sorted_sectors = sector[cells][order]
+        # Empty sectors get a valid (arbitrary) start and are masked to inf after the reduction
+        self._sector_starts = np.minimum(np.searchsorted(sorted_sectors, np.arange(self.num_sectors)),
+                                         max(len(cells) - 1, 0))
+        self._sector_empty = np.bincount(sorted_sectors, minlength=self.num_sectors) == 0
+        self.sector_angles = np.degrees((np.arange(self.num_sectors) + 0.5) / self.num_sectors * self.fov - self.fov / 2)
+
+    def update(self, depth_image, intrinsics=None):
+        """
+        Args:
+            depth_image (numpy.ndarray): Aligned depth image in depth units.
+            intrinsics (optional): Intrinsics of the image, if they may have changed.
+
+        Returns:
+            dict: {'occupancy': nz x nx bool grid (row 0 nearest the camera),
+                   'sectors': nearest obstacle distance (m) per sector (inf if clear),
+                   'sector_angles': sector centres in degrees (negative = left),
+                   'nearest': nearest obstacle distance (m), 'points': valid depth points used,
+                   'ground_plane': (normal, offset) used for the heights, or None}
+        """
+        if intrinsics is not None and self._prepare_rays(intrinsics):
+            self._prepare_sectors()
+        plane = self.ground_estimator.update(depth_image, intrinsics) if self.ground_estimator else None
+
+        x, y, z = self.deprojector.deproject(depth_image, self.intrinsics, self.depth_scale, self.step)
+        if plane is not None:
+            normal, offset = plane
+            nx, ny, nz = normal.astype(np.float32)
+            height = nx * x + ny * y + nz * z + np.float32(offset)
+        else:
+            height = self.camera_height - y
+        valid = (z > 0) & (z < self.max_range) & (np.abs(x) < self.half_width) & \
+                (height >= self.min_height) & (height < self.max_height)
+
+        ix = ((x[valid] + self.half_width) / self.cell_size).astype(np.int64)
+        iz = (z[valid] / self.cell_size).astype(np.int64)
+        ih = ((height[valid] - self.min_height) / self.voxel_height).astype(np.int64)
+        # float32 rounding can push points on the far edges one bin out
+        np.clip(ix, 0, self.nx - 1, out=ix)
+        np.clip(iz, 0, self.nz - 1, out=iz)
+        np.clip(ih, 0, self.nh - 1, out=ih)
+        cells = iz * self.nx + ix
+
+        # Voxel downsampling: each voxel counts once however many points fall into it
+        voxels = np.bincount(cells * self.nh + ih, minlength=self.nz * self.nx * self.nh)
+        column_voxels = (voxels.reshape(-1, self.nh) > 0).sum(axis=1)
+        occupied = column_voxels >= self.min_voxels
+
+        distance = np.where(occupied, self._cell_distance, np.inf)
+        sectors = np.minimum.reduceat(distance[self._sector_cells], self._sector_starts)
+        sectors[self._sector_empty] = np.inf
+        return {
+            'occupancy': occupied.reshape(self.nz, self.nx),
+            'sectors': sectors,
+            'sector_angles': self.sector_angles,
+            'nearest': float(sectors.min()) if len(sectors) else float('inf'),
+            'points': int(np.count_nonzero(valid)),
+            'ground_plane': plane,
+        }
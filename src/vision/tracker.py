@@ -0,0 +1,183 @@
+import warnings
+
+import cv2
+import numpy as np
+
+def box_iou(a, b):
+    """
+    Pairwise IoU between two sets of boxes.
+
+    Args:
+        a (numpy.ndarray): Nx4 [x1, y1, x2, y2].
+        b (numpy.ndarray): Mx4 [x1, y1, x2, y2].
+
+    Returns:
+        numpy.ndarray: NxM IoU matrix.
+    """
+    a = np.asarray(a, dtype=np.float32).reshape(-1, 4)
+    b = np.asarray(b, dtype=np.float32).reshape(-1, 4)
+    ix1 = np.maximum(a[:, None, 0], b[None, :, 0])
+    iy1 = np.maximum(a[:, None, 1], b[None, :, 1])
+    ix2 = np.minimum(a[:, None, 2], b[None, :, 2])
+    iy2 = np.minimum(a[:, None, 3], b[None, :, 3])
+    inter = np.clip(ix2 - ix1, 0, None) * np.clip(iy2 - iy1, 0, None)
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    union = area_a[:, None] + area_b[None, :] - inter
+    return np.where(union > 0, inter / np.maximum(union, 1e-6), 0.0)
+
+class BoxTracker:
+    """
+    Lightweight 2D tracker used between detector keyframes.
+
+    On a keyframe, new detections are matched to the existing tracks by IoU (so track ids
+    survive across keyframes). In between, every box is propagated by sparse Lucas-Kanade
+    optical flow: a small grid of points per box is tracked in one cv2.calcOpticalFlowPyrLK
+    call, and the box is shifted by the median point motion and rescaled by the median
+    change of the points' spread around the box center.
+    """
+
+    def __init__(self, iou_threshold=0.3, grid=5, flow_scale=0.5, min_points=4):
+        """
+        Args:
+            iou_threshold (float): Minimum IoU to keep a track id across keyframes.
+            grid (int): Tracked points per box side (grid x grid points per box).
+            flow_scale (float): Image scale used for optical flow (smaller is faster).
+            min_points (int): Boxes with fewer successfully tracked points (e.g. textureless
+                              objects) keep their previous position until the next keyframe.
+        """
+        self.iou_threshold = iou_threshold
+        self.grid = grid
+        self.flow_scale = flow_scale
+        self.min_points = min_points
+        self.lk_params = dict(winSize=(15, 15), maxLevel=2,
+                              criteria=(cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 10, 0.03))
+
+        self.boxes = np.zeros((0, 4), dtype=np.float32)
+        self.scores = np.zeros(0, dtype=np.float32)
+        self.class_ids = np.zeros(0, dtype=np.int64)
+        self.track_ids = np.zeros(0, dtype=np.int64)
+        self._next_id = 1
+        self._prev_gray = None
+
+    def _prepare_gray(self, color_image):
+        gray = cv2.cvtColor(color_image, cv2.COLOR_BGR2GRAY)
+        if self.flow_scale != 1.0:
+            gray = cv2.resize(gray, None, fx=self.flow_scale, fy=self.flow_scale, interpolation=cv2.INTER_AREA)
+        return gray
+
+    def reset(self, color_image, detections):
+        """
+        Starts tracking a fresh set of detections (called on keyframes).
+
+        Args:
+            color_image (numpy.ndarray): BGR keyframe.
+            detections (list): (x1, y1, x2, y2, conf, cls_id) tuples from the detector.
+
+        Returns:
+            list: The detections with their track id appended.
+        """
+        det = np.asarray(detections, dtype=np.float32).reshape(-1, 6)
+        boxes = det[:, :4]
+        class_ids = det[:, 5].astype(np.int64)
+
+        # Keep track ids of boxes that overlap a previous track of the same class
+        track_ids = np.zeros(len(det), dtype=np.int64)
+        if len(det) and len(self.boxes):
+            iou = box_iou(boxes, self.boxes)
+            iou[class_ids[:, None] != self.class_ids[None, :]] = 0
+            # Greedy matching, best IoU first
+            for flat in np.argsort(-iou, axis=None):
+                i, j = divmod(int(flat), iou.shape[1])
+                if iou[i, j] < self.iou_threshold:
+                    break
+                if track_ids[i] == 0 and self.track_ids[j] not in track_ids:
+                    track_ids[i] = self.track_ids[j]
+        for i in np.flatnonzero(track_ids == 0):
+            track_ids[i] = self._next_id
+            self._next_id += 1
+
+        self.boxes = boxes.copy()
+        self.scores = det[:, 4].copy()
+        self.class_ids = class_ids
+        self.track_ids = track_ids
+        self._prev_gray = self._prepare_gray(color_image)
+        return [tuple(d) + (int(t),) for d, t in zip(detections, track_ids)]
+
+    def _box_points(self, boxes):
+        """Grid of points inside each box, in flow-image coordinates. Returns (N, P, 2)."""
+        frac = (np.arange(self.grid, dtype=np.float32) + 0.5) / self.grid
+        frac = 0.2 + 0.6 * frac # stay inside the object
+        b = boxes * self.flow_scale
+        xs = b[:, 0:1] + (b[:, 2:3] - b[:, 0:1]) * frac
+        ys = b[:, 1:2] + (b[:, 3:4] - b[:, 1:2]) * frac
+        px = np.repeat(xs[:, None, :], self.grid, axis=1)
+        py = np.repeat(ys[:, :, None], self.grid, axis=2)
+        return np.stack([px, py], axis=-1).reshape(len(boxes), -1, 2)
+
+    def propagate(self, color_image):
+        """
+        Moves all tracked boxes to the new frame.
+
+        Returns:
+            list: (x1, y1, x2, y2, conf, cls_id, track_id) tuples of the surviving tracks.
+        """
+        gray = self._prepare_gray(color_image)
+        if len(self.boxes) == 0 or self._prev_gray is None:
+            self._prev_gray = gray
+            return []
+
+        points = self._box_points(self.boxes)
+        n, p, _ = points.shape
+        new_points, status, _ = cv2.calcOpticalFlowPyrLK(self._prev_gray, gray, points.reshape(-1, 1, 2),
+                                                         None, **self.lk_params)
+        self._prev_gray = gray
+        new_points = new_points.reshape(n, p, 2)
+        ok = status.reshape(n, p).astype(bool)
+
+        with warnings.catch_warnings():
+            # Boxes without any tracked point produce all-NaN slices; they are dropped below
+            warnings.simplefilter('ignore', RuntimeWarning)
+
+            # Median translation per box over successfully tracked points
+            motion = np.where(ok[..., None], new_points - points, np.nan)
+            shift = np.nanmedian(motion, axis=1) / self.flow_scale
+
+            # Median scale change of the point spread around the box centre
+            old_center = np.nanmean(np.where(ok[..., None], points, np.nan), axis=1, keepdims=True)
+            new_center = np.nanmean(np.where(ok[..., None], new_points, np.nan), axis=1, keepdims=True)
+            old_spread = np.linalg.norm(points - old_center, axis=2)
+            new_spread = np.linalg.norm(new_points - new_center, axis=2)
+            ratio = np.where(ok & (old_spread > 1e-3), new_spread / np.maximum(old_spread, 1e-3), np.nan)
+            scale = np.clip(np.nan_to_num(np.nanmedian(ratio, axis=1), nan=1.0), 0.8, 1.25)
+
+        tracked = ok.sum(axis=1) >= self.min_points
+        shift[~tracked] = 0
+        scale[~tracked] = 1.0
+        centers = (self.boxes[:, :2] + self.boxes[:, 2:]) * 0.5 + np.nan_to_num(shift)
+        half = (self.boxes[:, 2:] - self.boxes[:, :2]) * 0.5 * scale[:, None]
+        boxes = np.concatenate([centers - half, centers + half], axis=1)
+
+        h, w = color_image.shape[:2]
+        boxes[:, [0, 2]] = boxes[:, [0, 2]].clip(0, w - 1)
+        boxes[:, [1, 3]] = boxes[:, [1, 3]].clip(0, h - 1)
+        alive = (boxes[:, 2] - boxes[:, 0] > 2) & (boxes[:, 3] - boxes[:, 1] > 2)
+
+        self.boxes = boxes[alive].astype(np.float32)
+        self.scores = self.scores[alive]
+        self.class_ids = self.class_ids[alive]
+        self.track_ids = self.track_ids[alive]
+
+        return [(int(b[0]), int(b[1]), int(b[2]), int(b[3]), float(s), int(c), int(t))
+                for b, s, c, t in zip(self.boxes, self.scores, self.class_ids, self.track_ids)]
+
+def scene_change(prev_thumb, thumb):
+    """Mean absolute difference (0-255) between two grayscale thumbnails."""
+    if prev_thumb is None or prev_thumb.shape != thumb.shape:
+        return float('inf')
+    return float(np.mean(cv2.absdiff(prev_thumb, thumb)))
+
+def make_thumbnail(color_image, size=(80, 50)):
+    """Small grayscale version of a frame used for cheap scene-change checks."""
+    gray = cv2.cvtColor(color_image, cv2.COLOR_BGR2GRAY)
+    return cv2.resize(gray, size, interpolation=cv2.INTER_AREA)
@@ -0,0 +1,91 @@
+import unittest
+import tempfile
+import wave
+import sys
+import os
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from src.analysis.evaluate_audio import BoundedSpectrogram, evaluate_audio
+from src.audio.stft import StreamingSTFT
+from src.audio.wav_io import decode_frames
+
+def reference_columns(power, frames_per_column):
+    """Mean of every group of frames_per_column frames, plus the mean of the leftover frames."""
+    full = len(power) // frames_per_column
+    columns = [power[i * frames_per_column:(i + 1) * frames_per_column].mean(axis=0) for i in range(full)]
+    if len(power) % frames_per_column:
+        columns.append(power[full * frames_per_column:].mean(axis=0))
+    return np.array(columns)
+
+class TestBoundedSpectrogram(unittest.TestCase):
+    def test_matches_grouped_means(self):
+        rng = np.random.default_rng(0)
+        power = rng.random((1000, 2, 5))
+        for block_sizes in ([1000], [1], [7, 3, 64], [33]):
+            spectrogram = BoundedSpectrogram(max_columns=16, channels=2, bins=5)
+            i, k = 0, 0
+            while i < len(power):
+                n = block_sizes[k % len(block_sizes)]
+                spectrogram.add(power[i:i + n])
+                i, k = i + n, k + 1
+            # 1000 frames in at most 16 columns: 64 frames per column (15 full columns + 40 frames)
+            self.assertEqual(spectrogram.frames_per_column, 64)
+            result = spectrogram.result()
+            self.assertEqual(len(result), 16)
+            np.testing.assert_allclose(result, reference_columns(power, 64), rtol=1e-5)
+
+    def test_short_stream_keeps_every_frame(self):
+        power = np.arange(30, dtype=np.float32).reshape(10, 1, 3)
+        spectrogram = BoundedSpectrogram(max_columns=11, channels=1, bins=3)
+        spectrogram.add(power)
+        self.assertEqual(spectrogram.max_columns, 10)
+        np.testing.assert_array_equal(spectrogram.result(), power)
+        self.assertEqual(BoundedSpectrogram(8, 1, 3).result().shape, (0, 1, 3))
+
+
+class TestStreamingSTFT(unittest.TestCase):
+    def test_blocks_match_single_stft(self):
+        rng = np.random.default_rng(1)
+        samples = rng.normal(size=(5000, 2)).astype(np.float32)
+        whole = StreamingSTFT(256, 128).feed(samples)
+        stft = StreamingSTFT(256, 128)
+        parts = [stft.feed(samples[i:i + n]) for i, n in zip(range(0, 5000, 300), [300] * 17)]
+        np.testing.assert_allclose(np.concatenate(parts), whole, atol=1e-4)
+        self.assertEqual(stft.frames, (5000 - 256) // 128 + 1)
+        self.assertEqual(len(StreamingSTFT(256, 128).feed(samples[:100])), 0)
+
+
+class TestEvaluateAudio(unittest.TestCase):
+    def test_levels_and_clipping(self):
+        rate = 8000
+        t = np.arange(3 * rate) / rate
+        left = (0.5 * 32767 * np.sin(2 * np.pi * 440 * t)).astype(np.int16)
+        right = np.clip(1.5 * 32767 * np.sin(2 * np.pi * 440 * t), -32768, 32767).astype(np.int16)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'tone.wav')
+            with wave.open(path, 'wb') as wf:
+                wf.setnchannels(2)
+                wf.setsampwidth(2)
+                wf.setframerate(rate)
+                wf.writeframes(np.stack([left, right], axis=1).tobytes())
+            result = evaluate_audio(path, os.path.join(tmp, 'out'), chunk_seconds=0.3, plot=False)
+        self.assertEqual((result['channels'], result['frames'], result['duration']), (2, 3 * rate, 3.0))
+        self.assertAlmostEqual(result['rms'][0], 0.5 / np.sqrt(2), places=3)
+        self.assertEqual(result['clipped'][0], 0)
+        self.assertGreater(result['clipped_ratio'][1], 0.3)
+
+    def test_missing_file(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            self.assertIn('error', evaluate_audio(os.path.join(tmp, 'missing.wav'), tmp, plot=False))
+
+    def test_24_bit_decoding(self):
+        values = np.array([-(1 << 23), -1, 0, 1, (1 << 23) - 1])
+        data = b''.join(int(v).to_bytes(3, 'little', signed=True) for v in values)
+        np.testing.assert_array_equal(decode_frames(data, 3, 1)[:, 0], values << 8)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,109 @@
+import unittest
+import sys
+import os
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from src.audio.features import AudioFeatureExtractor
+from src.map.map_manager import MapManager
+from src.map.signature_index import SignatureIndex, signature_vector
+
+SAMPLE_RATE = 16000
+KINDS = ['vending_machine', 'crossing_signal', 'fountain', 'escalator']
+
+def synthesize(kind, seconds, rng):
+    """Stand-ins for typical audio landmarks, with random level and background noise."""
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    if kind == 'vending_machine':
+        # Mains hum with harmonics and a compressor rattle
+        f0 = rng.choice([50.0, 60.0])
+        signal = sum(np.sin(2 * np.pi * f0 * h * t + rng.uniform(0, 6)) / h for h in range(1, 8))
+        signal += 0.3 * rng.normal(size=len(t)) * (np.sin(2 * np.pi * 7 * t) > 0)
+    elif kind == 'crossing_signal':
+        # Chirping tone, on for 0.15 s every 0.3 s
+        sweep = 2500 + 400 * np.sin(2 * np.pi * 3 * t)
+        signal = np.sin(2 * np.pi * np.cumsum(sweep) / SAMPLE_RATE) * ((t % 0.3) < 0.15)
+    elif kind == 'fountain':
+        signal = np.convolve(rng.normal(size=len(t)), np.ones(3) / 3, mode='same')
+    else:  # 'escalator': low rumble with periodic clicks
+        signal = np.convolve(rng.normal(size=len(t)), np.ones(40) / 40, mode='same') * 4
+        signal[(np.arange(len(t)) % int(SAMPLE_RATE * 0.25)) == 0] += 5
+    signal = signal / np.abs(signal).max() * rng.uniform(0.05, 0.5)
+    signal += rng.normal(size=len(t)) * 0.005
+    return (signal * 32767).astype(np.int16)[:, None]
+
+def extract(audio, block_size=512):
+    extractor = AudioFeatureExtractor(SAMPLE_RATE)
+    for start in range(0, len(audio), block_size):
+        extractor.feed(audio[start:start + block_size])
+    return extractor.signature()
+
+class TestSignatureIndex(unittest.TestCase):
+    def test_matches_brute_force_cosine(self):
+        rng = np.random.default_rng(0)
+        vectors = rng.normal(size=(300, 24))
+        classes = [KINDS[i % 4] for i in range(300)]
+        index = SignatureIndex()
+        # Added in uneven batches so the storage has to grow
+        for start, stop in ((0, 1), (1, 70), (70, 300)):
+            index.add(list(vectors[start:stop]), list(range(start, stop)), classes[start:stop])
+        normalized = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+        for query in rng.normal(size=(20, 24)):
+            distances = 1.0 - normalized @ (query / np.linalg.norm(query))
+            ids, dist = index.query(query * 3.0, k=5)
+            self.assertEqual(ids.tolist(), np.argsort(distances)[:5].tolist())
+            np.testing.assert_allclose(dist, np.sort(distances)[:5], atol=1e-5)
+
+            ids, _ = index.query(query, k=3, class_name='fountain')
+            fountain = np.flatnonzero(np.array(classes) == 'fountain')
+            self.assertEqual(ids.tolist(), fountain[np.argsort(distances[fountain])[:3]].tolist())
+
+    def test_mismatched_and_empty_queries(self):
+        index = SignatureIndex()
+        self.assertEqual(len(index.query([1.0, 0.0])[0]), 0)
+        self.assertEqual(index.add([[1.0, 0.0], [1.0, 0.0, 0.0], [0.0, 2.0]], [5, 6, 7], ['a', 'a', 'b']), 2)
+        self.assertEqual((len(index), index.skipped), (2, 1))
+        self.assertEqual(len(index.query([1.0, 0.0, 0.0])[0]), 0)
+        self.assertEqual(len(index.query([1.0, 0.0], class_name='unknown')[0]), 0)
+        self.assertEqual(index.query([0.1, 1.0], k=10)[0].tolist(), [7, 5])
+
+    def test_signature_vector(self):
+        self.assertIsNone(signature_vector(None))
+        self.assertIsNone(signature_vector({'kind': 'mfcc_stats'}))
+        np.testing.assert_array_equal(signature_vector({'embedding': [1, 2]}), [1.0, 2.0])
+        self.assertEqual(signature_vector([[1, 2], [3, 4]]).shape, (4,))
+
+
+class TestAudioSignatures(unittest.TestCase):
+    def test_streaming_is_independent_of_block_size(self):
+        audio = synthesize('fountain', 1.5, np.random.default_rng(1))
+        np.testing.assert_allclose(extract(audio, 512)['embedding'], extract(audio, 1000)['embedding'], atol=1e-4)
+        self.assertIsNone(AudioFeatureExtractor(SAMPLE_RATE).signature())
+
+    def test_new_recordings_retrieve_their_sound_class(self):
+        rng = np.random.default_rng(0)
+        map_manager = MapManager()
+        for kind in KINDS:
+            for _ in range(5):
+                map_manager.add_landmark(kind, rng.uniform(0, 50, 3).tolist(), extract(synthesize(kind, 1.0, rng)))
+        map_manager.add_landmark('door', [0.0, 0.0, 0.0])  # no signature: not indexed
+        self.assertEqual(len(map_manager.get_signature_index()), 20)
+
+        correct, trials = 0, 16
+        for i in range(trials):
+            kind = KINDS[i % len(KINDS)]
+            matches = map_manager.find_by_signature(extract(synthesize(kind, 1.0, rng)), k=3)
+            self.assertEqual(len(matches), 3)
+            correct += matches[0][0]['class'] == kind
+        self.assertGreaterEqual(correct / trials, 0.9)
+
+        # Signatures added later are picked up incrementally
+        late = map_manager.add_landmark('bell', [1.0, 1.0, 1.0], [1.0] + [0.0] * 23)
+        self.assertIs(map_manager.find_by_signature([1.0] + [0.0] * 23, class_name='bell')[0][0], late)
+        self.assertEqual(map_manager.find_by_signature([0.0] * 23 + [1.0], max_distance=0.0), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
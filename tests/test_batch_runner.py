@@ -0,0 +1,85 @@
+import unittest
+from unittest.mock import patch
+import tempfile
+import wave
+import sys
+import os
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from src.analysis import batch_runner
+from src.analysis.batch_runner import batch_run, load_summary
+
+def crash_on_marker(path, output_dir):
+    """Test analysis: kills its worker process for files named crash*, like a segfault would."""
+    if os.path.basename(path).startswith('crash'):
+        os._exit(1)
+    return {'size_checked': os.path.getsize(path)}
+
+def write_wav(path, seconds=0.2, rate=8000):
+    samples = (1000 * np.sin(np.arange(int(seconds * rate)) * 0.1)).astype(np.int16)
+    with wave.open(path, 'wb') as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(rate)
+        wf.writeframes(samples.tobytes())
+
+class TestBatchRunner(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.inputs = os.path.join(self.tmp.name, 'recordings')
+        self.output = os.path.join(self.tmp.name, 'results')
+        os.makedirs(os.path.join(self.inputs, 'day2'))
+        self.paths = [os.path.join(self.inputs, name) for name in ('a.wav', 'b.wav', os.path.join('day2', 'c.wav'))]
+        for path in self.paths:
+            write_wav(path)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_up_to_date_files_are_skipped(self):
+        options = {'plot': False}
+        first = batch_run('audio', self.inputs, self.output, workers=1, options=options)
+        self.assertEqual([r['file'] for r in first], sorted(self.paths))
+        self.assertTrue(all(r['status'] == 'ok' for r in first))
+        self.assertTrue(os.path.exists(os.path.join(self.output, 'audio_summary.csv')))
+
+        # Nothing changed: every record is reused as is
+        self.assertEqual(batch_run('audio', self.inputs, self.output, workers=1, options=options), first)
+
+        # A re-recorded file is processed again, the others are not
+        write_wav(self.paths[0], seconds=0.3)
+        third = batch_run('audio', self.inputs, self.output, workers=1, options=options)
+        self.assertEqual(third[0]['frames'], 2400)
+        self.assertEqual(third[1:], first[1:])
+
+        # Different options or force re-run everything
+        fourth = batch_run('audio', self.inputs, self.output, workers=1, options={'plot': False, 'nfft': 512})
+        self.assertTrue(all(a['seconds'] != b['seconds'] for a, b in zip(fourth[1:], first[1:])))
+        forced = batch_run('audio', self.inputs, self.output, workers=1, force=True, options={'plot': False, 'nfft': 512})
+        self.assertNotEqual(forced[1]['seconds'], fourth[1]['seconds'])
+
+    def test_failed_files_are_retried(self):
+        with open(os.path.join(self.inputs, 'broken.wav'), 'wb') as f:
+            f.write(b'not a wav file')
+        records = batch_run('audio', self.inputs, self.output, workers=1, options={'plot': False})
+        self.assertEqual([r['status'] for r in records], ['ok', 'ok', 'error', 'ok'])
+        write_wav(os.path.join(self.inputs, 'broken.wav'))
+        records = batch_run('audio', self.inputs, self.output, workers=1, options={'plot': False})
+        self.assertTrue(all(r['status'] == 'ok' for r in records))
+
+    def test_dead_worker_does_not_abort_batch(self):
+        write_wav(os.path.join(self.inputs, 'crash.wav'))
+        analyses = {'crashy': (__name__, 'crash_on_marker', ('.wav',))}
+        with patch.dict(batch_runner.ANALYSES, analyses):
+            records = batch_run('crashy', self.inputs, self.output, workers=2)
+        statuses = {os.path.basename(r['file']): r['status'] for r in records}
+        self.assertEqual(statuses, {'a.wav': 'ok', 'b.wav': 'ok', 'c.wav': 'ok', 'crash.wav': 'error'})
+        summary = load_summary(os.path.join(self.output, 'crashy_summary.json'))
+        self.assertIn('BrokenProcessPool', summary[os.path.join(self.inputs, 'crash.wav')]['error'])
+
+
+if __name__ == '__main__':
+    unittest.main()
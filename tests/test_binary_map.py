@@ -0,0 +1,105 @@
+import unittest
+import tempfile
+import json
+import sys
+import os
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from src.map.binary_map import BinaryMap, MappedLandmarks, binary_to_json, json_to_binary, write_binary_map
+from src.map.map_manager import MapManager
+
+LANDMARKS = [
+    {'id': 1, 'class': 'door', 'position': [0.5, -1.25, 3.0], 'audio_signature': None},
+    {'id': 2, 'class': 'señal', 'position': [1.0, 2.0, 3.0], 'audio_signature': [0.1, 0.2, 0.3]},
+    {'id': 'legacy-7', 'class': 'door', 'position': [-4.0, 0.0, 1e-3], 'audio_signature': None, 'floor': 2},
+    {'id': 5, 'class': 'chair', 'position': [7.0, 8.0, 9.0]},
+]
+
+class TestBinaryMap(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def path(self, name):
+        return os.path.join(self.tmp.name, name)
+
+    def test_json_binary_json_round_trip(self):
+        with open(self.path('map.json'), 'w', encoding='utf-8') as f:
+            json.dump({'landmarks': LANDMARKS, 'next_id': 12}, f)
+        self.assertEqual(json_to_binary(self.path('map.json'), self.path('map.navmap')), len(LANDMARKS))
+        self.assertEqual(binary_to_json(self.path('map.navmap'), self.path('back.json')), len(LANDMARKS))
+        with open(self.path('back.json'), encoding='utf-8') as f:
+            data = json.load(f)
+        self.assertEqual(data, {'landmarks': LANDMARKS, 'next_id': 12})
+
+    def test_columns_are_memory_mapped(self):
+        write_binary_map(self.path('map.navmap'), LANDMARKS)
+        binary_map = BinaryMap(self.path('map.navmap'))
+        self.assertIsInstance(binary_map.positions, np.memmap)
+        np.testing.assert_array_equal(binary_map.positions, [lm['position'] for lm in LANDMARKS])
+        self.assertEqual(binary_map.classes(), [lm['class'] for lm in LANDMARKS])
+        # No stored next_id: one past the largest integer id
+        self.assertEqual(binary_map.next_id, 6)
+
+    def test_empty_map(self):
+        write_binary_map(self.path('empty.navmap'), [])
+        binary_map = BinaryMap(self.path('empty.navmap'))
+        self.assertEqual((len(binary_map), binary_map.to_landmarks(), binary_map.next_id), (0, [], 1))
+
+    def test_rejects_other_files(self):
+        with open(self.path('map.json'), 'wb') as f:
+            f.write(b'{"landmarks": []}' + b' ' * 200)
+        with self.assertRaises(ValueError):
+            BinaryMap(self.path('map.json'))
+
+    def test_mapped_landmarks_edits_and_appends(self):
+        write_binary_map(self.path('map.navmap'), LANDMARKS)
+        landmarks = MappedLandmarks(BinaryMap(self.path('map.navmap')))
+        landmarks.append({'id': 9, 'class': 'sign', 'position': [1.0, 1.0, 1.0], 'audio_signature': None})
+        positions, codes, names = landmarks.columns()
+        self.assertEqual([names[c] for c in codes], ['door', 'señal', 'door', 'chair', 'sign'])
+        landmarks[0]['position'] = [9.0, 9.0, 9.0]
+        self.assertEqual(landmarks[0]['position'], [9.0, 9.0, 9.0])
+        np.testing.assert_array_equal(landmarks.columns()[0][0], [9.0, 9.0, 9.0])
+        self.assertEqual(len(landmarks.materialize()), 5)
+
+    def test_columns_after_access_stay_mapped(self):
+        write_binary_map(self.path('map.navmap'), LANDMARKS)
+        landmarks = MappedLandmarks(BinaryMap(self.path('map.navmap')))
+        landmarks[3]['class'] = 'stool'
+        landmarks[3]['position'] = [0.0, 0.0, 1.0]
+        positions, codes, names = landmarks.columns(1)
+        self.assertEqual([names[c] for c in codes], ['señal', 'door', 'stool'])
+        np.testing.assert_array_equal(positions[2], [0.0, 0.0, 1.0])
+        self.assertEqual(landmarks.ids(), [1, 2, 'legacy-7', 5])
+        # Only the row that was accessed became a dict
+        self.assertEqual(list(landmarks._rows), [3])
+
+    def test_map_manager_materializes_only_returned_rows(self):
+        write_binary_map(self.path('map.navmap'), LANDMARKS)
+        map_manager = MapManager(self.path('map.navmap'))
+        doors = map_manager.get_candidates('door')
+        self.assertEqual([lm['id'] for lm in doors], [1, 'legacy-7'])
+        self.assertEqual(sorted(map_manager.landmarks._rows), [0, 2])
+        self.assertEqual(map_manager._find(5)['class'], 'chair')
+        self.assertEqual(sorted(map_manager.landmarks._rows), [0, 2, 3])
+        map_manager.get_index('door')
+        self.assertEqual(sorted(map_manager.landmarks._rows), [0, 2, 3])
+
+    def test_map_manager_save_and_load(self):
+        map_manager = MapManager()
+        for lm in LANDMARKS[:2]:
+            map_manager.add_landmark(lm['class'], lm['position'], lm.get('audio_signature'))
+        map_manager.save_map(self.path('map.navmap'))
+        loaded = MapManager(self.path('map.navmap'))
+        self.assertEqual(list(loaded.landmarks), list(map_manager.landmarks))
+        self.assertEqual(loaded.add_landmark('door', [0, 0, 0])['id'], 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
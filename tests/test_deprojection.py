@@ -0,0 +1,83 @@
+import unittest
+import sys
+import os
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from src.sensors.frame_source import Intrinsics
+from src.vision.deprojection import Deprojector, ray_grid
+
+INTRINSICS = Intrinsics(848, 480, 610.0, 605.0, 424.5, 238.0)
+
+def deproject_pixel(intrinsics, u, v, depth):
+    """rs2_deproject_pixel_to_point for the distortion models the Deprojector handles."""
+    x = (u - intrinsics.ppx) / intrinsics.fx
+    y = (v - intrinsics.ppy) / intrinsics.fy
+    k1, k2, p1, p2, k3 = intrinsics.coeffs
+    if intrinsics.model == 'inverse_brown_conrady':
+        r2 = x * x + y * y
+        f = 1 + k1 * r2 + k2 * r2 * r2 + k3 * r2 * r2 * r2
+        x, y = x * f + 2 * p1 * x * y + p2 * (r2 + 2 * x * x), y * f + 2 * p2 * x * y + p1 * (r2 + 2 * y * y)
+    return [depth * x, depth * y, depth]
+
+class TestDeprojector(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.depth = rng.integers(0, 6000, (480, 848)).astype(np.uint16)
+        self.indices = rng.integers(0, 848 * 480, 500)
+        self.deprojector = Deprojector()
+
+    def reference(self, intrinsics, indices):
+        vs, us = np.divmod(indices, intrinsics.width)
+        return np.array([deproject_pixel(intrinsics, u, v, self.depth[v, u] * 0.001) for u, v in zip(us, vs)])
+
+    def test_full_frame_and_strides(self):
+        for step in (1, 2, 4, 8):
+            x, y, z = self.deprojector.deproject(self.depth, INTRINSICS, 0.001, step)
+            vs, us = np.mgrid[0:480:step, 0:848:step]
+            indices = (vs * 848 + us).ravel()[::97]
+            cloud = np.stack([x.ravel(), y.ravel(), z.ravel()], axis=1)[::97]
+            np.testing.assert_allclose(cloud, self.reference(INTRINSICS, indices), atol=1e-5)
+
+    def test_indices_and_pixels(self):
+        reference = self.reference(INTRINSICS, self.indices)
+        np.testing.assert_allclose(self.deprojector.deproject_indices(self.depth, INTRINSICS, self.indices),
+                                   reference, atol=1e-5)
+        vs, us = np.divmod(self.indices, 848)
+        points = self.deprojector.deproject_pixels(INTRINSICS, us + 0.2, vs - 0.3, self.depth[vs, us] * 0.001)
+        np.testing.assert_allclose(points, reference, atol=1e-5)
+        self.assertEqual(self.deprojector.deproject_indices(self.depth, INTRINSICS, []).shape, (0, 3))
+
+    def test_buffers_are_reused(self):
+        first = self.deprojector.deproject_indices(self.depth, INTRINSICS, self.indices)
+        second = self.deprojector.deproject_indices(self.depth, INTRINSICS, self.indices[:100])
+        self.assertTrue(np.shares_memory(first, second))
+        self.assertIs(self.deprojector.deproject(self.depth, INTRINSICS), self.deprojector.deproject(self.depth, INTRINSICS))
+        # A float depth image gets its own gather buffer dtype
+        points = self.deprojector.deproject_indices(self.depth.astype(np.float32), INTRINSICS, self.indices)
+        np.testing.assert_allclose(points, self.reference(INTRINSICS, self.indices), atol=1e-5)
+
+    def test_distortion_models(self):
+        distorted = Intrinsics(848, 480, 610.0, 605.0, 424.5, 238.0, model='inverse_brown_conrady',
+                               coeffs=[0.05, -0.02, 0.001, -0.002, 0.003])
+        np.testing.assert_allclose(self.deprojector.deproject_indices(self.depth, distorted, self.indices),
+                                   self.reference(distorted, self.indices), atol=1e-5)
+
+        # brown_conrady undoes the forward model: distorting the rays again gives the pixel rays
+        forward = Intrinsics(848, 480, 610.0, 605.0, 424.5, 238.0, model='brown_conrady',
+                             coeffs=[0.05, -0.02, 0.001, -0.002, 0.003])
+        ux, uy = ray_grid(forward, step=16)
+        k1, k2, p1, p2, k3 = forward.coeffs
+        r2 = ux * ux + uy * uy
+        f = 1 + k1 * r2 + k2 * r2 * r2 + k3 * r2 * r2 * r2
+        dx = ux * f + 2 * p1 * ux * uy + p2 * (r2 + 2 * ux * ux)
+        dy = uy * f + 2 * p2 * ux * uy + p1 * (r2 + 2 * uy * uy)
+        px, py = ray_grid(INTRINSICS, step=16)
+        np.testing.assert_allclose(dx, px, atol=1e-5)
+        np.testing.assert_allclose(dy, py, atol=1e-5)
+
+
+if __name__ == '__main__':
+    unittest.main()
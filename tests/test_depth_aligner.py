@@ -0,0 +1,116 @@
+import unittest
+import sys
+import os
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from src.sensors.depth_aligner import DepthAligner, LazyAlignedDepthFrame
+from src.sensors.frame_source import make_intrinsics
+
+def rotation_y(degrees):
+    a = np.radians(degrees)
+    return np.array([[np.cos(a), 0, np.sin(a)], [0, 1, 0], [-np.sin(a), 0, np.cos(a)]])
+
+def brute_force_align(depth_image, depth_intr, color_intr, R, t, depth_scale):
+    """Reference: reprojects every depth pixel on its own and keeps the closest depth per color pixel."""
+    aligned = np.zeros((color_intr.height, color_intr.width), dtype=np.uint16)
+    for v in range(depth_image.shape[0]):
+        for u in range(depth_image.shape[1]):
+            raw = int(depth_image[v, u])
+            if raw == 0:
+                continue
+            z = raw * depth_scale
+            point = np.array([(u - depth_intr.ppx) / depth_intr.fx * z, (v - depth_intr.ppy) / depth_intr.fy * z, z])
+            x, y, zc = R @ point + t
+            if zc <= 0:
+                continue
+            uc = int(np.floor(x / zc * color_intr.fx + color_intr.ppx + 0.5))
+            vc = int(np.floor(y / zc * color_intr.fy + color_intr.ppy + 0.5))
+            if 0 <= uc < color_intr.width and 0 <= vc < color_intr.height:
+                if aligned[vc, uc] == 0 or raw < aligned[vc, uc]:
+                    aligned[vc, uc] = raw
+    return aligned
+
+class TestDepthAligner(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.depth_intr = make_intrinsics(64, 48, 40.0, 40.0, 31.5, 23.5)
+        self.color_intr = make_intrinsics(80, 50, 55.0, 55.0, 40.2, 24.7)
+        self.R = rotation_y(2.0)
+        self.t = np.array([0.015, 0.002, 0.0])
+        # Wall at 2 m with a closer box, a few holes
+        depth = np.full((48, 64), 2000, dtype=np.uint16)
+        depth[10:30, 20:40] = 900
+        depth[rng.integers(0, 48, 40), rng.integers(0, 64, 40)] = 0
+        self.depth = depth
+
+    def make_aligner(self, **kwargs):
+        return DepthAligner(self.depth_intr, self.color_intr, (self.R, self.t), depth_scale=0.001, **kwargs)
+
+    def test_matches_brute_force_reprojection(self):
+        expected = brute_force_align(self.depth, self.depth_intr, self.color_intr, self.R, self.t, 0.001)
+        aligned = self.make_aligner(fill_holes=False).align(self.depth)
+        self.assertEqual(aligned.shape, expected.shape)
+        # float32 rounding may move a handful of pixels that sit exactly between two color pixels
+        self.assertLess(np.mean(aligned != expected), 0.005)
+
+    def test_fill_holes_only_fills_empty_pixels(self):
+        plain = self.make_aligner(fill_holes=False).align(self.depth)
+        filled = self.make_aligner().align(self.depth)
+        np.testing.assert_array_equal(filled[plain > 0], plain[plain > 0])
+        self.assertLess(np.count_nonzero(filled == 0), np.count_nonzero(plain == 0))
+
+    def test_half_resolution(self):
+        aligner = self.make_aligner(scale=0.5)
+        aligned = aligner.align(self.depth)
+        self.assertEqual(aligned.shape, (25, 40))
+        fx, fy, ppx, ppy, width, height = aligner.get_output_intrinsics()
+        self.assertEqual((fx, width, height), (27.5, 40, 25))
+
+    def test_roi_alignment_equals_full_alignment_inside_boxes(self):
+        boxes = np.array([[10, 5, 30, 20], [45, 12, 78, 48], [0, 0, 4, 4]])
+        for fill_holes in (False, True):
+            for scale in (1.0, 0.5):
+                aligner = self.make_aligner(fill_holes=fill_holes, scale=scale)
+                full = aligner.align(self.depth)
+                canvas = aligner.align_roi(self.depth, boxes)[:-1].reshape(full.shape)
+                for x1, y1, x2, y2 in (boxes * scale).astype(int):
+                    np.testing.assert_array_equal(canvas[y1:y2, x1:x2], full[y1:y2, x1:x2])
+
+    def test_roi_calls_keep_nearer_depth_on_shared_canvas(self):
+        aligner = self.make_aligner(fill_holes=False)
+        full = aligner.align(self.depth)
+        boxes = [[10, 5, 45, 30], [30, 15, 70, 45]]
+        for order in (boxes, boxes[::-1]):
+            flat = None
+            for box in order:
+                flat = aligner.align_roi(self.depth, [box], flat)
+            canvas = flat[:-1].reshape(full.shape)
+            for x1, y1, x2, y2 in boxes:
+                np.testing.assert_array_equal(canvas[y1:y2, x1:x2], full[y1:y2, x1:x2])
+
+        # Depth left by an earlier call wins where it is nearer, and only there
+        flat = np.zeros(full.size + 1, dtype=np.uint16)
+        canvas = flat[:-1].reshape(full.shape)
+        canvas[10:20, 10:20] = 500
+        canvas[20:30, 10:20] = 5000
+        aligner.align_roi(self.depth, [[10, 10, 20, 30]], flat)
+        self.assertTrue(np.all(canvas[10:20, 10:20] == 500))
+        covered = full[20:30, 10:20] > 0
+        np.testing.assert_array_equal(canvas[20:30, 10:20][covered], full[20:30, 10:20][covered])
+
+    def test_lazy_frame_aligns_only_requested_regions(self):
+        aligner = self.make_aligner()
+        full = aligner.align(self.depth)
+        frame = LazyAlignedDepthFrame(self.depth, aligner)
+        canvas = frame.align_boxes([[20, 10, 40, 30]])
+        np.testing.assert_array_equal(canvas[10:30, 20:40], full[10:30, 20:40])
+        self.assertEqual(np.count_nonzero(canvas[:, 60:]), 0)
+        self.assertAlmostEqual(frame.get_distance(30, 20), full[20, 30] * 0.001)
+        np.testing.assert_array_equal(frame.get_data(), full)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,101 @@
+import unittest
+import threading
+import sys
+import os
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from src.sensors.frame_buffer import FrameRingBuffer, AudioRingBuffer
+
+class TestFrameRingBuffer(unittest.TestCase):
+    def test_latest_policy_returns_newest_and_drops_older(self):
+        buffer = FrameRingBuffer(capacity=4, policy='latest')
+        for i in range(3):
+            buffer.put(i)
+        self.assertEqual(buffer.get(timeout=0), 2)
+        self.assertEqual(len(buffer), 0)
+        self.assertEqual(buffer.get_stats(), {'captured': 3, 'delivered': 1, 'dropped': 2, 'buffered': 0})
+
+    def test_all_policy_blocks_producer_instead_of_dropping(self):
+        buffer = FrameRingBuffer(capacity=3, policy='all')
+        producer = threading.Thread(target=lambda: [buffer.put(i) for i in range(5)])
+        producer.start()
+        producer.join(timeout=0.1)
+        # Full: the producer waits for the consumer
+        self.assertTrue(producer.is_alive())
+        self.assertEqual(len(buffer), 3)
+        self.assertEqual([buffer.get(timeout=1.0) for _ in range(5)], [0, 1, 2, 3, 4])
+        producer.join(timeout=1.0)
+        self.assertFalse(producer.is_alive())
+        self.assertIsNone(buffer.get(timeout=0))
+        stats = buffer.get_stats()
+        self.assertEqual((stats['captured'], stats['delivered'], stats['dropped']), (5, 5, 0))
+
+    def test_close_releases_blocked_producer(self):
+        buffer = FrameRingBuffer(capacity=1, policy='all')
+        self.assertTrue(buffer.put(0))
+        result = []
+        producer = threading.Thread(target=lambda: result.append(buffer.put(1)))
+        producer.start()
+        buffer.close()
+        producer.join(timeout=1.0)
+        self.assertFalse(producer.is_alive())
+        self.assertEqual(result, [False])
+        self.assertEqual(buffer.get_stats()['dropped'], 1)
+
+    def test_get_times_out_and_close_wakes_consumer(self):
+        buffer = FrameRingBuffer(capacity=2)
+        self.assertIsNone(buffer.get(timeout=0.01))
+        result = []
+        consumer = threading.Thread(target=lambda: result.append(buffer.get(timeout=5.0)))
+        consumer.start()
+        buffer.close()
+        consumer.join(timeout=1.0)
+        self.assertFalse(consumer.is_alive())
+        self.assertEqual(result, [None])
+        self.assertTrue(buffer.closed)
+
+    def test_consumer_thread_receives_items_in_order(self):
+        buffer = FrameRingBuffer(capacity=100, policy='all')
+        received = []
+
+        def consume():
+            while True:
+                item = buffer.get(timeout=1.0)
+                if item is None:
+                    return
+                received.append(item)
+
+        consumer = threading.Thread(target=consume)
+        consumer.start()
+        for i in range(50):
+            buffer.put(i)
+        while len(buffer):
+            threading.Event().wait(0.001)
+        buffer.close()
+        consumer.join(timeout=2.0)
+        self.assertEqual(received, list(range(50)))
+
+    def test_invalid_arguments(self):
+        with self.assertRaises(ValueError):
+            FrameRingBuffer(policy='oldest')
+        with self.assertRaises(ValueError):
+            FrameRingBuffer(capacity=0)
+
+
+class TestAudioRingBuffer(unittest.TestCase):
+    def test_read_by_absolute_index_across_wraparound(self):
+        ring = AudioRingBuffer(capacity=8, channels=2)
+        samples = np.arange(24, dtype=np.int16).reshape(12, 2)
+        ring.write(samples[:5])
+        ring.write(samples[5:])
+        self.assertEqual(ring.written, 12)
+        np.testing.assert_array_equal(ring.read(12, 6), samples[6:12])
+        # Samples 0-3 were overwritten
+        self.assertIsNone(ring.read(6, 6))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,139 @@
+import unittest
+from unittest.mock import MagicMock, patch
+import tempfile
+import time
+import sys
+import os
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from src.sensors.frame_source import (RateLimiter, NpzFrameSource, SyntheticFrameSource, create_frame_source,
+                                      make_intrinsics, save_npz_frame, save_intrinsics)
+
+# The camera sources are driven through a mocked SDK
+with patch.dict(sys.modules, {'pyrealsense2': MagicMock()}):
+    from src.sensors import realsense_driver
+    from src.sensors.realsense_driver import BagFrameSource
+
+class TestRateLimiter(unittest.TestCase):
+    def test_paces_to_fps(self):
+        limiter = RateLimiter(100)
+        start = time.perf_counter()
+        for _ in range(6):
+            limiter.wait()
+        self.assertGreaterEqual(time.perf_counter() - start, 0.05 - 0.002)
+
+    def test_does_not_catch_up_after_stall(self):
+        limiter = RateLimiter(50)
+        limiter.wait()
+        time.sleep(0.1)
+        start = time.perf_counter()
+        for _ in range(5):
+            limiter.wait()
+        # At most one period is made up for: only the first calls after the stall return at once
+        self.assertGreaterEqual(time.perf_counter() - start, 0.04 - 0.002)
+
+    def test_unlimited(self):
+        limiter = RateLimiter(None)
+        start = time.perf_counter()
+        for _ in range(1000):
+            limiter.wait()
+        self.assertLess(time.perf_counter() - start, 0.05)
+
+
+class TestSyntheticFrameSource(unittest.TestCase):
+    def test_exhausts_after_num_frames(self):
+        source = SyntheticFrameSource(width=64, height=40, num_frames=3, num_objects=2)
+        source.start()
+        shapes = []
+        while True:
+            color, depth, depth_frame = source.get_frames()
+            if color is None:
+                break
+            shapes.append((color.shape, depth.shape, depth.dtype))
+            self.assertIsNotNone(source.timestamp)
+        self.assertTrue(source.exhausted)
+        self.assertEqual(source.frame_index, 3)
+        self.assertEqual(shapes, [((40, 64, 3), (40, 64), np.uint16)] * 3)
+
+    def test_restart_is_deterministic(self):
+        source = SyntheticFrameSource(width=64, height=40, num_frames=2, seed=3)
+        source.start()
+        first = source.get_frames()[1]
+        source.start()
+        np.testing.assert_array_equal(source.get_frames()[1], first)
+        self.assertFalse(source.exhausted)
+
+
+class TestNpzFrameSource(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        for i in range(3):
+            save_npz_frame(self.tmp.name, i, np.full((4, 6, 3), i, dtype=np.uint8),
+                           np.full((4, 6), 1000 + i, dtype=np.uint16))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_replays_in_order_and_exhausts(self):
+        source = create_frame_source('npz', self.tmp.name)
+        source.start()
+        depths = []
+        while not source.exhausted:
+            color, depth, depth_frame = source.get_frames()
+            if color is not None:
+                depths.append(depth_frame.get_distance(0, 0))
+        np.testing.assert_allclose(depths, [1.0, 1.001, 1.002])
+        # Without intrinsics.json a centred pinhole model is used
+        intrinsics = source.get_intrinsics()
+        self.assertEqual((intrinsics.width, intrinsics.height, intrinsics.ppx), (6, 4, 3.0))
+
+    def test_loop_and_intrinsics_file(self):
+        save_intrinsics(self.tmp.name, make_intrinsics(6, 4, 5.0, 5.0, 2.5, 1.5), depth_scale=0.002)
+        source = NpzFrameSource(self.tmp.name, loop=True)
+        source.start()
+        values = [int(source.get_frames()[0][0, 0, 0]) for _ in range(5)]
+        self.assertEqual(values, [0, 1, 2, 0, 1])
+        self.assertFalse(source.exhausted)
+        self.assertEqual(source.get_depth_scale(), 0.002)
+        self.assertEqual(source.get_intrinsics().fx, 5.0)
+
+    def test_empty_directory(self):
+        with tempfile.TemporaryDirectory() as empty:
+            with self.assertRaises(FileNotFoundError):
+                NpzFrameSource(empty).start()
+
+    def test_unknown_kind(self):
+        with self.assertRaises(ValueError):
+            create_frame_source('video')
+
+
+class TestBagFrameSource(unittest.TestCase):
+    def make_source(self, loop):
+        source = BagFrameSource('recording.bag', loop=loop)
+        source.pipeline = MagicMock()
+        source.pipeline.wait_for_frames.side_effect = RuntimeError("Frame didn't arrive within 1000")
+        source.playback = MagicMock()
+        return source
+
+    def test_timeout_ends_single_replay(self):
+        source = self.make_source(loop=False)
+        self.assertIsNone(source._wait_for_frames())
+        self.assertTrue(source.exhausted)
+
+    def test_timeout_is_retried_when_looping(self):
+        source = self.make_source(loop=True)
+        self.assertIsNone(source._wait_for_frames())
+        self.assertFalse(source.exhausted)
+
+    def test_looping_replay_ends_when_playback_stopped(self):
+        source = self.make_source(loop=True)
+        source.playback.current_status.return_value = realsense_driver.rs.playback_status.stopped
+        self.assertIsNone(source._wait_for_frames())
+        self.assertTrue(source.exhausted)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,85 @@
+import unittest
+import sys
+import os
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from src import main
+from src.sensors.frame_source import ArrayDepthFrame, Intrinsics, scale_intrinsics
+from src.utils.profiling import StageProfiler
+from src.vision.deprojection import ray_grid
+from src.vision.ground_plane import GroundPlaneEstimator
+from src.vision.obstacle_map import ObstacleMap
+
+INTRINSICS = Intrinsics(640, 480, 600.0, 600.0, 319.5, 239.5)
+
+def floor_up(pitch):
+    """Floor normal in camera coordinates (y down) for a camera pitched down by `pitch` radians."""
+    return np.array([0.0, -np.cos(pitch), -np.sin(pitch)])
+
+def render_floor(intrinsics, camera_height, pitch, noise=0.0, clutter=0, rng=None):
+    """Depth image (mm) of a flat floor, optionally with noise and random outlier pixels."""
+    ray_x, ray_y = ray_grid(intrinsics)
+    up = floor_up(pitch)
+    facing = -(up[0] * ray_x + up[1] * ray_y + up[2])
+    with np.errstate(divide='ignore'):
+        depth = np.where(facing > 0, camera_height / facing, 0.0)
+    depth[depth > 8.0] = 0
+    if noise:
+        depth += rng.normal(0, noise, depth.shape) * (depth > 0)
+    if clutter:
+        rows, cols = rng.integers(0, depth.shape[0], clutter), rng.integers(0, depth.shape[1], clutter)
+        depth[rows, cols] = rng.uniform(0.5, 5.0, clutter)
+    return (depth * 1000).astype(np.uint16)
+
+class TestGroundPlaneEstimator(unittest.TestCase):
+    def test_fits_tilted_floor_with_outliers(self):
+        rng = np.random.default_rng(0)
+        pitch = np.radians(20)
+        estimator = GroundPlaneEstimator(INTRINSICS, step=4, smoothing=1.0)
+        normal, offset = estimator.update(render_floor(INTRINSICS, 1.4, pitch, noise=0.005, clutter=5000, rng=rng))
+        np.testing.assert_allclose(normal, floor_up(pitch), atol=0.01)
+        self.assertAlmostEqual(offset, 1.4, delta=0.02)
+        self.assertAlmostEqual(estimator.camera_height, offset)
+        self.assertGreater(estimator.inlier_ratio, 0.5)
+
+        depth = render_floor(INTRINSICS, 1.4, pitch)
+        heights = estimator.height_map(depth)
+        self.assertLess(np.nanmax(np.abs(heights)), 0.03)
+        self.assertTrue(np.all(np.isnan(heights[depth == 0])))
+        self.assertFalse(estimator.above_ground_mask(depth, min_height=0.05).any())
+
+    def test_tracks_plane_over_frames(self):
+        rng = np.random.default_rng(1)
+        estimator = GroundPlaneEstimator(INTRINSICS, step=8)
+        for pitch in np.radians([10, 11, 12, 13]):
+            estimator.update(render_floor(INTRINSICS, 1.2, pitch, noise=0.005, rng=rng))
+        np.testing.assert_allclose(estimator.normal, floor_up(np.radians(12.5)), atol=0.02)
+        self.assertEqual(estimator.lost_frames, 0)
+
+    def test_no_floor(self):
+        estimator = GroundPlaneEstimator(INTRINSICS)
+        self.assertIsNone(estimator.update(np.zeros((480, 640), dtype=np.uint16)))
+        self.assertEqual(estimator.lost_frames, 1)
+        # A wall straight ahead is too steep to be the floor
+        self.assertIsNone(estimator.update(np.full((480, 640), 2000, dtype=np.uint16)))
+        self.assertTrue(np.all(np.isnan(estimator.height_map(np.full((480, 640), 2000, dtype=np.uint16)))))
+
+    def test_half_resolution_depth(self):
+        half_intrinsics = scale_intrinsics(INTRINSICS, 0.5)
+        depth = render_floor(half_intrinsics, 1.3, np.radians(15))
+        ground = GroundPlaneEstimator(INTRINSICS, step=4)
+        obstacle_map = ObstacleMap(INTRINSICS, ground_estimator=ground)
+        result = main.detect_obstacles(obstacle_map, depth, ArrayDepthFrame(depth, pixel_scale=0.5),
+                                       INTRINSICS, StageProfiler(enabled=False))
+        normal, offset = result['ground_plane']
+        np.testing.assert_allclose(normal, floor_up(np.radians(15)), atol=0.01)
+        self.assertAlmostEqual(offset, 1.3, delta=0.02)
+        self.assertEqual(ground.height_map(depth).shape, depth.shape)
+        self.assertEqual(result['nearest'], float('inf'))
+
+
+if __name__ == '__main__':
+    unittest.main()
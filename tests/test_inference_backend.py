@@ -0,0 +1,58 @@
+import unittest
+from unittest.mock import MagicMock, patch
+import tempfile
+import time
+import sys
+import os
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from src.vision.inference_backend import artifact_path, export_model
+
+class TestExportModel(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache_dir = os.path.join(self.tmp.name, 'exported')
+        os.makedirs(self.cache_dir)
+        # ultralytics is only imported when an export is actually needed
+        self.ultralytics = MagicMock()
+        self.modules = patch.dict(sys.modules, {'ultralytics': self.ultralytics})
+        self.modules.start()
+
+    def tearDown(self):
+        self.modules.stop()
+        self.tmp.cleanup()
+
+    def write(self, path):
+        with open(path, 'w') as f:
+            f.write('x')
+        return path
+
+    def test_cached_export_is_reused_when_weights_are_not_on_disk(self):
+        target = self.write(artifact_path('yolov8n.pt', 'onnx', cache_dir=self.cache_dir))
+        self.assertEqual(export_model('yolov8n.pt', 'onnx', cache_dir=self.cache_dir), target)
+        self.ultralytics.YOLO.assert_not_called()
+
+    def test_stale_export_is_rebuilt(self):
+        target = self.write(artifact_path('model.pt', 'onnx', cache_dir=self.cache_dir))
+        weights = self.write(os.path.join(self.tmp.name, 'model.pt'))
+        os.utime(target, (time.time() - 60, time.time() - 60))
+        exported = self.write(os.path.join(self.tmp.name, 'model.onnx'))
+        self.ultralytics.YOLO.return_value.export.return_value = exported
+
+        self.assertEqual(export_model(weights, 'onnx', cache_dir=self.cache_dir), target)
+        self.ultralytics.YOLO.assert_called_once_with(weights)
+        self.assertGreaterEqual(os.path.getmtime(target), os.path.getmtime(weights))
+        # Up to date now: no second export
+        export_model(weights, 'onnx', cache_dir=self.cache_dir)
+        self.assertEqual(self.ultralytics.YOLO.call_count, 1)
+
+    def test_artifact_names(self):
+        self.assertTrue(artifact_path('w/yolov8n.pt', 'onnx', int8=True).endswith('yolov8n_640_int8.onnx'))
+        self.assertTrue(artifact_path('yolov8n.pt', 'openvino', imgsz=320).endswith('yolov8n_320_openvino_model'))
+        with self.assertRaises(ValueError):
+            artifact_path('yolov8n.pt', 'torch')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,104 @@
+import unittest
+from unittest.mock import MagicMock, patch
+import sys
+import os
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from src.sensors.depth_aligner import DepthAligner, LazyAlignedDepthFrame
+from src.sensors.frame_source import ArrayDepthFrame, make_intrinsics
+from src.vision import landmark_detector
+from src.vision.landmark_detector import LandmarkDetector, sample_box_depths
+
+def make_detector(detections, **kwargs):
+    model = MagicMock()
+    model.names = {0: 'door', 1: 'sign'}
+    model.detect.return_value = detections
+    with patch.object(landmark_detector, 'create_backend', return_value=model):
+        return LandmarkDetector(**kwargs)
+
+class TestSampleBoxDepths(unittest.TestCase):
+    def test_median_and_percentile_ignore_invalid_samples(self):
+        depth = np.zeros((40, 40), dtype=np.uint16)
+        # Left half of the box at 1 m, right half at 3 m, one invalid quarter
+        depth[:, :20] = 1000
+        depth[:, 20:] = 3000
+        depth[20:, 20:] = 0
+        stats = sample_box_depths(depth, [[0, 0, 40, 40]], depth_scale=0.001, samples=8, inner=1.0)
+        self.assertAlmostEqual(stats['valid_ratio'][0], 0.75)
+        # 32 samples at 1 m and 16 at 3 m
+        self.assertAlmostEqual(float(stats['median'][0]), 1.0)
+        self.assertAlmostEqual(float(stats['percentile'][0]), 1.0)
+
+    def test_inner_region_skips_box_edges(self):
+        depth = np.full((40, 40), 4000, dtype=np.uint16)
+        depth[10:30, 10:30] = 1200
+        stats = sample_box_depths(depth, [[0, 0, 40, 40]], inner=0.5)
+        self.assertAlmostEqual(float(stats['median'][0]), 1.2, places=5)
+
+    def test_matches_per_box_reference(self):
+        rng = np.random.default_rng(1)
+        depth = rng.integers(500, 5000, size=(60, 80)).astype(np.uint16)
+        depth[rng.random((60, 80)) < 0.2] = 0
+        boxes = np.array([[0, 0, 20, 30], [10, 5, 70, 55], [60, 40, 80, 60], [30, 30, 31, 31]])
+        stats = sample_box_depths(depth, boxes, samples=16, inner=0.5, percentile=20)
+        frac = 0.25 + 0.5 * (np.arange(16) + 0.5) / 16
+        for i, (x1, y1, x2, y2) in enumerate(boxes):
+            xs = np.clip((x1 + (x2 - x1) * frac).astype(np.float32).astype(np.int32), 0, 79)
+            ys = np.clip((y1 + (y2 - y1) * frac).astype(np.float32).astype(np.int32), 0, 59)
+            values = depth[np.ix_(ys, xs)].ravel()
+            valid = np.sort(values[values > 0])
+            self.assertAlmostEqual(stats['valid_ratio'][i], len(valid) / values.size)
+            self.assertAlmostEqual(float(stats['median'][i]), np.median(valid) * 0.001, places=5)
+            self.assertAlmostEqual(float(stats['percentile'][i]),
+                                   valid[int(round((len(valid) - 1) * 0.2))] * 0.001, places=5)
+
+    def test_half_resolution_depth_and_empty_input(self):
+        depth = np.full((20, 20), 2500, dtype=np.uint16)
+        stats = sample_box_depths(depth, [[0, 0, 40, 40]], pixel_scale=0.5)
+        self.assertAlmostEqual(float(stats['median'][0]), 2.5, places=5)
+        self.assertEqual(len(sample_box_depths(depth, np.zeros((0, 4)))['median']), 0)
+
+
+class TestLandmarkDetector(unittest.TestCase):
+    def setUp(self):
+        self.intrinsics = make_intrinsics(64, 48, 50.0, 50.0, 32.0, 24.0)
+        self.depth = np.full((48, 64), 3000, dtype=np.uint16)
+        self.depth[8:24, 8:24] = 1500
+        self.color = np.zeros((48, 64, 3), dtype=np.uint8)
+
+    def test_robust_positions(self):
+        detector = make_detector([(8, 8, 24, 24, 0.9, 0), (40, 30, 60, 46, 0.8, 1)])
+        landmarks = detector.detect(self.color, ArrayDepthFrame(self.depth), self.intrinsics)
+        self.assertEqual([lm['class'] for lm in landmarks], ['door', 'sign'])
+        # Box centre (16, 16) at 1.5 m: x = (16 - 32) / 50 * 1.5
+        np.testing.assert_allclose(landmarks[0]['position'], [-0.48, -0.24, 1.5], atol=1e-5)
+        self.assertAlmostEqual(landmarks[1]['position'][2], 3.0, places=5)
+        self.assertEqual(landmarks[0]['depth_valid_ratio'], 1.0)
+
+    def test_center_mode_matches_robust_on_flat_boxes(self):
+        detections = [(8, 8, 24, 24, 0.9, 0)]
+        robust = make_detector(detections).detect(self.color, ArrayDepthFrame(self.depth), self.intrinsics)
+        center = make_detector(detections, depth_mode='center').detect(self.color, ArrayDepthFrame(self.depth),
+                                                                        self.intrinsics)
+        np.testing.assert_allclose(center[0]['position'], robust[0]['position'], atol=1e-5)
+
+    def test_boxes_without_depth_are_dropped(self):
+        self.depth[30:48, 40:64] = 0
+        detector = make_detector([(40, 30, 60, 46, 0.8, 1)])
+        self.assertEqual(detector.detect(self.color, ArrayDepthFrame(self.depth), self.intrinsics), [])
+
+    def test_lazy_depth_frame_is_aligned_once_per_frame(self):
+        aligner = DepthAligner(self.intrinsics, self.intrinsics, (np.eye(3), np.zeros(3)))
+        frame = LazyAlignedDepthFrame(self.depth, aligner)
+        detector = make_detector([(8, 8, 24, 24, 0.9, 0), (40, 30, 60, 46, 0.8, 1)])
+        with patch.object(frame, 'align_boxes', wraps=frame.align_boxes) as align_boxes:
+            landmarks = detector.detect(self.color, frame, self.intrinsics)
+        self.assertEqual(align_boxes.call_count, 1)
+        self.assertAlmostEqual(landmarks[0]['position'][2], 1.5, places=5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+import unittest
+import sys
+import os
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from src.map.map_manager import MapManager
+
+def make_objects(num_objects, num_classes, size, rng):
+    """Real objects, at least 1.5 m apart, so a 0.5 m merge radius never fuses two of them."""
+    positions = []
+    while len(positions) < num_objects:
+        candidate = np.array([rng.uniform(0, size), rng.uniform(-1.0, 0.5), rng.uniform(0, size)])
+        if all(np.linalg.norm(candidate - p) >= 1.5 for p in positions):
+            positions.append(candidate)
+    return np.array(positions), rng.integers(0, num_classes, num_objects)
+
+class TestLandmarkMerge(unittest.TestCase):
+    def test_repeated_observations_merge_into_one_landmark(self):
+        rng = np.random.default_rng(0)
+        objects, classes = make_objects(100, 5, 40.0, rng)
+        noise = 0.05
+        map_manager = MapManager(merge_radius=0.5)
+        seen = set()
+        for _ in range(100):
+            for i in rng.choice(len(objects), 6, replace=False):
+                seen.add(int(i))
+                map_manager.add_landmark(f"class_{classes[i]}", (objects[i] + rng.normal(0, noise, 3)).tolist())
+            # Localization queries the map every frame, so the index is updated incrementally
+            map_manager.find_nearest_landmark(objects[rng.integers(len(objects))].tolist())
+
+        self.assertEqual(len(map_manager.landmarks), len(seen))
+        self.assertEqual(sum(lm['observations'] for lm in map_manager.landmarks), 600)
+        errors = [np.min(np.linalg.norm(objects[classes == int(lm['class'].split('_')[1])] - lm['position'], axis=1))
+                  for lm in map_manager.landmarks]
+        # Averaging several observations beats a single one
+        self.assertLess(np.mean(errors), noise * np.sqrt(3))
+
+        positions = np.array([lm['position'] for lm in map_manager.landmarks])
+        mismatches = 0
+        for query in rng.uniform(0, 40.0, (100, 3)):
+            nearest, _ = map_manager.find_nearest_landmark(query.tolist())
+            mismatches += nearest is not map_manager.landmarks[int(np.argmin(np.linalg.norm(positions - query, axis=1)))]
+        self.assertEqual(mismatches, 0)
+
+    def test_merge_requires_same_class_within_radius(self):
+        map_manager = MapManager(merge_radius=0.5)
+        door = map_manager.add_landmark('door', [0.0, 0.0, 2.0])
+        self.assertIs(map_manager.add_landmark('door', [0.2, 0.0, 2.0], [1.0]), door)
+        np.testing.assert_allclose(door['position'], [0.1, 0.0, 2.0])
+        self.assertEqual((door['observations'], door['audio_signature']), (2, [1.0]))
+        self.assertIsNot(map_manager.add_landmark('chair', [0.1, 0.0, 2.0]), door)
+        self.assertIsNot(map_manager.add_landmark('door', [1.0, 0.0, 2.0]), door)
+        self.assertEqual(len(map_manager.landmarks), 3)
+
+
+class TestLandmarkRows(unittest.TestCase):
+    def test_remove_and_update_keep_rows_consistent(self):
+        rng = np.random.default_rng(1)
+        map_manager = MapManager()
+        ids = [map_manager.add_landmark(f"class_{i % 3}", rng.uniform(0, 10, 3).tolist())['id'] for i in range(50)]
+        map_manager.find_k_nearest([0, 0, 0], 1)
+        map_manager.find_k_nearest([0, 0, 0], 1, 'class_1')
+        for i in range(40):
+            if i % 2:
+                removed = ids.pop(int(rng.integers(len(ids))))
+                self.assertEqual(map_manager.remove_landmark(removed)['id'], removed)
+                self.assertIsNone(map_manager.remove_landmark(removed))
+            else:
+                map_manager.update_landmark(ids[int(rng.integers(len(ids)))], {'position': rng.uniform(0, 10, 3).tolist()})
+            map_manager.find_k_nearest([5, 5, 5], 1)
+        self.assertEqual(sorted(lm['id'] for lm in map_manager.landmarks), sorted(ids))
+        for row, lm in enumerate(map_manager.landmarks):
+            self.assertEqual(map_manager._row(lm['id']), row)
+
+        positions = np.array([lm['position'] for lm in map_manager.landmarks])
+        for query in rng.uniform(0, 10, (20, 3)):
+            found = map_manager.find_k_nearest(query.tolist(), 3)
+            expected = np.sort(np.linalg.norm(positions - query, axis=1))[:3]
+            np.testing.assert_allclose([d for _, d in found], expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,114 @@
+import unittest
+import sys
+import os
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from src.map.map_manager import MapManager
+from src.navigation.localizer import Localizer
+from src.navigation.particle_filter import ParticleFilterLocalizer
+from src.navigation.pose_solver import PoseSolver, assign, rotate_yaw
+
+LANDMARKS = [('door', [0.0, 0.0, 8.0]), ('door', [6.0, 0.0, 8.0]), ('sign', [3.0, -1.0, 10.0]),
+             ('chair', [1.0, 0.5, 5.0]), ('chair', [5.0, 0.5, 6.0]), ('fire_extinguisher', [-2.0, 0.0, 6.0])]
+
+def make_map():
+    map_manager = MapManager()
+    for class_name, position in LANDMARKS:
+        map_manager.add_landmark(class_name, position)
+    return map_manager
+
+def observe(position, yaw, noise=0.0, rng=None):
+    """Camera-frame detections of every map landmark seen from pose (position, yaw)."""
+    world = np.array([p for _, p in LANDMARKS]) - position
+    rel = rotate_yaw(world, -yaw)
+    if noise:
+        rel = rel + rng.normal(0, noise, rel.shape)
+    return [{'class': c, 'position': r.tolist()} for (c, _), r in zip(LANDMARKS, rel)]
+
+class TestParticleFilterLocalizer(unittest.TestCase):
+    def test_converges_from_uniform_start(self):
+        rng = np.random.default_rng(0)
+        true_position, true_yaw = np.array([2.0, 0.0, 3.5]), 0.3
+        # Particles start spread over the map bounding box with random headings
+        pf = ParticleFilterLocalizer(make_map(), num_particles=4000, seed=0)
+        for _ in range(15):
+            pf.update(observe(true_position, true_yaw, noise=0.05, rng=rng))
+        x, z, yaw = pf.get_pose()
+        self.assertLess(np.hypot(x - 2.0, z - 3.5), 0.2)
+        self.assertLess(abs(yaw - true_yaw), 0.05)
+        self.assertAlmostEqual(pf.get_position()[1], 0.0, delta=0.1)
+        self.assertLess(pf.get_spread(), 0.3)
+        self.assertGreater(pf.resample_count, 0)
+
+    def test_tracks_motion_with_odometry(self):
+        pf = ParticleFilterLocalizer(make_map(), num_particles=2000, initial_pose=(2.0, 1.0, 0.0), seed=1)
+        position = np.array([2.0, 0.0, 1.0])
+        for _ in range(10):
+            # Walk 0.3 m forward (+z at yaw 0) per step
+            position[2] += 0.3
+            pf.update(observe(position, 0.0), odometry=(0.3, 0.0, 0.0))
+        x, z, _ = pf.get_pose()
+        self.assertLess(np.hypot(x - position[0], z - position[2]), 0.1)
+
+    def test_unknown_classes_leave_weights_unchanged(self):
+        pf = ParticleFilterLocalizer(make_map(), num_particles=500, initial_pose=(0.0, 0.0, 0.0), seed=2,
+                                     position_noise=0.0, yaw_noise=0.0)
+        before = pf.get_position().copy()
+        pf.update([{'class': 'unknown', 'position': [0.0, 0.0, 1.0]}])
+        np.testing.assert_allclose(pf.get_position(), before)
+
+
+
+class TestPoseSolver(unittest.TestCase):
+    def setUp(self):
+        self.map_manager = make_map()
+        self.ids = [lm['id'] for lm in self.map_manager.landmarks]
+
+    def test_converges_from_rough_prior(self):
+        rng = np.random.default_rng(0)
+        detections = observe(np.array([2.0, 0.0, 1.0]), 0.25, noise=0.02, rng=rng)
+        fix = PoseSolver(self.map_manager, assignment='greedy', iterations=3).solve(detections, [2.6, 0.0, 0.5], 0.1)
+        np.testing.assert_allclose(fix['position'], [2.0, 0.0, 1.0], atol=0.05)
+        self.assertAlmostEqual(fix['yaw'], 0.25, delta=0.01)
+        # Repeated classes (two doors, two chairs) are associated to the right instances
+        self.assertEqual(sorted(fix['matches']), list(zip(range(len(LANDMARKS)), self.ids)))
+        self.assertLess(fix['rmse'], 0.05)
+
+    def test_rejects_outlier(self):
+        detections = observe(np.array([1.0, 0.0, 2.0]), 0.0)
+        detections[2]['position'][0] += 1.2
+        fix = PoseSolver(self.map_manager, assignment='greedy').solve(detections, [1.0, 0.0, 2.0], 0.0)
+        self.assertNotIn(2, [i for i, _ in fix['matches']])
+        np.testing.assert_allclose(fix['position'], [1.0, 0.0, 2.0], atol=1e-6)
+
+    def test_3d_mode_recovers_rotation(self):
+        detections = observe(np.array([0.5, -0.2, 1.5]), -0.4)
+        fix = PoseSolver(self.map_manager, mode='3d', assignment='greedy').solve(detections, [0.5, 0.0, 1.5], -0.3)
+        np.testing.assert_allclose(fix['position'], [0.5, -0.2, 1.5], atol=1e-6)
+        self.assertAlmostEqual(fix['yaw'], -0.4, places=6)
+
+    def test_no_match(self):
+        solver = PoseSolver(self.map_manager)
+        self.assertIsNone(solver.solve([], [0, 0, 0]))
+        self.assertIsNone(solver.solve([{'class': 'unknown', 'position': [0, 0, 1]}], [0, 0, 0]))
+
+    def test_greedy_assignment_respects_gate_and_uniqueness(self):
+        cost = np.array([[1.0, 0.5, np.inf], [0.2, 3.0, 9.0], [np.inf, 0.4, 0.3]])
+        rows, cols = assign(cost, max_cost=2.0, method='greedy')
+        self.assertEqual(sorted(zip(rows.tolist(), cols.tolist())), [(0, 1), (1, 0), (2, 2)])
+        rows, cols = assign(np.array([[5.0]]), max_cost=2.0, method='greedy')
+        self.assertEqual(len(rows), 0)
+
+    def test_localizer_lsq(self):
+        localizer = Localizer(self.map_manager, method='lsq', assignment='greedy')
+        localizer.current_position = np.array([1.8, 0.0, 1.2])
+        position = localizer.update(observe(np.array([2.0, 0.0, 1.0]), 0.1))
+        np.testing.assert_allclose(position, [2.0, 0.0, 1.0], atol=1e-6)
+        self.assertAlmostEqual(localizer.current_orientation, np.degrees(0.1), places=4)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+import unittest
+from unittest.mock import patch
+import tempfile
+import json
+import sys
+import os
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from src.map import map_journal
+from src.map.map_journal import MapJournal, read_journal
+from src.map.map_manager import MapManager
+
+def apply_changes(map_manager, num_changes, rng):
+    """Adds, moves and removes landmarks in a 2:1:1 mix, as during online map building."""
+    ids = [lm['id'] for lm in map_manager.landmarks]
+    for i in range(num_changes):
+        kind = i % 4
+        if kind < 2:
+            ids.append(map_manager.add_landmark("class_0", rng.uniform(0, 20, 3).tolist())['id'])
+        elif kind == 2:
+            map_manager.update_landmark(ids[rng.integers(len(ids))], {'position': rng.uniform(0, 20, 3).tolist()})
+        else:
+            map_manager.remove_landmark(ids.pop(rng.integers(len(ids))))
+
+class TestMapJournal(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'map.json')
+        self.rng = np.random.default_rng(0)
+        map_manager = MapManager(self.path)
+        for _ in range(20):
+            map_manager.add_landmark("class_1", self.rng.uniform(0, 20, 3).tolist())
+        map_manager.save_map(self.path)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_replay_after_crash(self):
+        map_manager = MapManager(self.path)
+        map_manager.open_journal(compact_every=None)
+        apply_changes(map_manager, 40, self.rng)
+        map_manager.journal.sync()
+        expected = list(map_manager.landmarks)
+        # No close(): the process "dies" with the journal holding every change
+        replayed = MapManager(self.path)
+        replayed.open_journal(compact_every=None)
+        self.assertEqual(list(replayed.landmarks), expected)
+        self.assertEqual(replayed.add_landmark('door', [0, 0, 0])['id'], map_manager.add_landmark('door', [0, 0, 0])['id'])
+
+    def test_torn_trailing_record_is_dropped(self):
+        journal = MapJournal(self.path + '.journal')
+        journal.append({'op': 'remove', 'id': 1})
+        journal.close()
+        with open(self.path + '.journal', 'ab') as f:
+            f.write(b'{"op": "remove", "id"')
+        records, valid = read_journal(self.path + '.journal')
+        self.assertEqual(records, [{'op': 'remove', 'id': 1}])
+
+        journal = MapJournal(self.path + '.journal')
+        self.assertEqual(os.path.getsize(self.path + '.journal'), valid)
+        journal.append({'op': 'remove', 'id': 2})
+        journal.close()
+        self.assertEqual([r['id'] for r in read_journal(self.path + '.journal')[0]], [1, 2])
+
+    def test_compaction_folds_journal_into_map(self):
+        map_manager = MapManager(self.path)
+        map_manager.open_journal(compact_every=25)
+        apply_changes(map_manager, 30, self.rng)
+        self.assertEqual(map_manager.journal.count, 5)
+        map_manager.compact()
+        self.assertEqual(os.path.getsize(self.path + '.journal'), 0)
+        with open(self.path, encoding='utf-8') as f:
+            self.assertEqual(json.load(f)['landmarks'], list(map_manager.landmarks))
+        map_manager.close()
+
+    def test_maybe_sync_honours_interval(self):
+        clock = [100.0]
+        with patch.object(map_journal.time, 'monotonic', side_effect=lambda: clock[0]):
+            journal = MapJournal(self.path + '.journal', sync_every=100, sync_interval=1.0)
+            journal.append({'op': 'remove', 'id': 1})
+            journal.maybe_sync()
+            self.assertEqual(journal._unsynced, 1)
+            clock[0] += 1.5
+            journal.maybe_sync()
+            self.assertEqual(journal._unsynced, 0)
+            journal.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+import unittest
+import sys
+import os
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from src import main
+from src.sensors.frame_source import ArrayDepthFrame, Intrinsics, scale_intrinsics
+from src.utils.profiling import StageProfiler
+from src.vision.deprojection import ray_grid
+from src.vision.obstacle_map import ObstacleMap
+
+INTRINSICS = Intrinsics(640, 480, 600.0, 600.0, 319.5, 239.5)
+CAMERA_HEIGHT = 1.2
+
+def render_scene(intrinsics, box=(0.3, 0.7, 2.0, 1.0)):
+    """
+    Depth image (mm) of a level floor CAMERA_HEIGHT below the camera and a box front face.
+
+    box is (x_left, x_right, z, height above the floor) of a face parallel to the image plane.
+    """
+    ray_x, ray_y = ray_grid(intrinsics)
+    with np.errstate(divide='ignore'):
+        depth = np.where(ray_y > 0, CAMERA_HEIGHT / ray_y, np.inf)
+    depth[depth > 10.0] = np.inf
+    x1, x2, z, height = box
+    hit = (ray_x * z >= x1) & (ray_x * z <= x2) & (ray_y * z >= CAMERA_HEIGHT - height) & (ray_y * z <= CAMERA_HEIGHT)
+    depth[hit & (z < depth)] = z
+    return np.where(np.isfinite(depth), depth * 1000, 0).astype(np.uint16)
+
+class TestObstacleMap(unittest.TestCase):
+    def test_box_occupies_its_sector(self):
+        obstacle_map = ObstacleMap(INTRINSICS, camera_height=CAMERA_HEIGHT)
+        result = obstacle_map.update(render_scene(INTRINSICS))
+        sector = int(np.argmin(np.abs(result['sector_angles'] - np.degrees(np.arctan2(0.5, 2.0)))))
+        self.assertAlmostEqual(result['nearest'], 2.0, delta=0.15)
+        self.assertEqual(int(np.argmin(result['sectors'])), sector)
+        # Only the sectors the box spans (8.5 to 19.3 degrees) are blocked; the floor is not an obstacle
+        blocked = result['sector_angles'][np.isfinite(result['sectors'])]
+        self.assertTrue(np.all(np.abs(blocked - 14.0) < 9.0))
+        occupied_z, occupied_x = np.nonzero(result['occupancy'])
+        np.testing.assert_allclose((occupied_z + 0.5) * obstacle_map.cell_size, 2.0, atol=0.1)
+        x = (occupied_x + 0.5) * obstacle_map.cell_size - obstacle_map.half_width
+        self.assertTrue(np.all((x > 0.2) & (x < 0.8)))
+
+    def test_clear_floor(self):
+        result = ObstacleMap(INTRINSICS, camera_height=CAMERA_HEIGHT).update(render_scene(INTRINSICS, box=(0, 0, 20.0, 0)))
+        self.assertEqual(result['nearest'], float('inf'))
+        self.assertFalse(result['occupancy'].any())
+
+    def test_half_resolution_depth(self):
+        full = ObstacleMap(INTRINSICS, camera_height=CAMERA_HEIGHT).update(render_scene(INTRINSICS))
+        half_intrinsics = scale_intrinsics(INTRINSICS, 0.5)
+        self.assertEqual((half_intrinsics.width, half_intrinsics.height, half_intrinsics.fx, half_intrinsics.ppx),
+                         (320, 240, 300.0, 159.5))
+        half_depth = render_scene(half_intrinsics)
+        obstacle_map = ObstacleMap(INTRINSICS, camera_height=CAMERA_HEIGHT)
+        # What the main loop does with the half-resolution aligned depth of --align numpy_half
+        half = main.detect_obstacles(obstacle_map, half_depth, ArrayDepthFrame(half_depth, pixel_scale=0.5),
+                                     INTRINSICS, StageProfiler(enabled=False))
+        np.testing.assert_array_equal(np.isfinite(half['sectors']), np.isfinite(full['sectors']))
+        self.assertAlmostEqual(half['nearest'], full['nearest'], delta=0.15)
+
+
+if __name__ == '__main__':
+    unittest.main()
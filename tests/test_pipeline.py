@@ -0,0 +1,175 @@
+import unittest
+import threading
+import time
+import sys
+import os
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from src.main import run_pipelined
+from src.map.map_manager import MapManager
+from src.navigation.localizer import Localizer
+from src.sensors.frame_source import SyntheticFrameSource
+from src.utils.pipeline import LatestValue, RateMeter, SourceWorker, StageWorker, make_queue
+from src.utils.profiling import StageProfiler
+
+def counter(limit=None):
+    """produce() for a SourceWorker: 0, 1, 2, ... up to limit (exclusive), then StopIteration."""
+    state = {'next': 0}
+    def produce():
+        if limit is not None and state['next'] >= limit:
+            raise StopIteration
+        state['next'] += 1
+        return state['next'] - 1
+    return produce
+
+def join_all(stages, timeout=2.0):
+    for stage in stages:
+        stage.join(timeout)
+    return [stage.name for stage in stages if stage.is_alive()]
+
+class TestLatestValue(unittest.TestCase):
+    def test_newest_value_wins(self):
+        slot = LatestValue()
+        self.assertEqual(slot.get(), (0, None))
+        for value in ('a', 'b', 'c'):
+            slot.set(value)
+        self.assertEqual(slot.get(), (3, 'c'))
+        self.assertEqual(slot.wait_newer(1, timeout=0), (3, 'c'))
+        # Nothing newer: returns the current value after the timeout
+        self.assertEqual(slot.wait_newer(3, timeout=0.01), (3, 'c'))
+
+    def test_close_wakes_waiter(self):
+        slot = LatestValue()
+        result = []
+        waiter = threading.Thread(target=lambda: result.append(slot.wait_newer(0, timeout=5.0)))
+        waiter.start()
+        slot.close()
+        waiter.join(timeout=1.0)
+        self.assertFalse(waiter.is_alive())
+        self.assertEqual(result, [(0, None)])
+        self.assertTrue(slot.closed)
+
+
+class TestRateMeter(unittest.TestCase):
+    def test_rate(self):
+        meter = RateMeter()
+        for _ in range(5):
+            meter.tick()
+            time.sleep(0.01)
+        self.assertEqual(meter.count, 5)
+        self.assertGreater(meter.get_rate(), 10.0)
+        self.assertLess(meter.get_rate(), 110.0)
+
+
+class TestStages(unittest.TestCase):
+    def test_shutdown_propagates_and_every_item_is_processed(self):
+        stop_event = threading.Event()
+        to_double, to_collect = make_queue(1, 'all'), make_queue(1, 'all')
+        latest, collected = LatestValue(), []
+        stages = [SourceWorker("source", counter(50), [to_double], stop_event),
+                  StageWorker("double", lambda x: 2 * x, to_double, [to_collect, latest], stop_event),
+                  StageWorker("collect", collected.append, to_collect, (), stop_event)]
+        for stage in stages:
+            stage.start()
+        self.assertEqual(join_all(stages), [])
+        self.assertEqual(collected, [2 * i for i in range(50)])
+        self.assertEqual(latest.get(), (50, 98))
+        self.assertTrue(to_double.closed and to_collect.closed and latest.closed)
+        self.assertFalse(stop_event.is_set())
+        self.assertEqual([stage.meter.count for stage in stages], [50, 50, 50])
+
+    def test_latest_queue_drops_stale_items(self):
+        stop_event = threading.Event()
+        queue, seen = make_queue(1, 'latest'), []
+        def slow(item):
+            time.sleep(0.02)
+            seen.append(item)
+        consumer = StageWorker("slow", slow, queue, (), stop_event)
+        consumer.start()
+        for i in range(20):
+            queue.put(i)
+            time.sleep(0.002)
+        queue.close()
+        self.assertEqual(join_all([consumer]), [])
+        # The slow stage skipped ahead to newer items, and the last one always gets through
+        self.assertLess(len(seen), 20)
+        self.assertEqual(seen, sorted(seen))
+        self.assertEqual(seen[-1], 19)
+        self.assertGreater(queue.get_stats()['dropped'], 0)
+
+    def test_exception_stops_pipeline(self):
+        stop_event = threading.Event()
+        to_stage, to_sink = make_queue(1, 'all'), make_queue(1, 'all')
+        def fail_at_three(item):
+            if item == 3:
+                raise ValueError("bad item")
+            return item
+        # The source never runs out: it is blocked putting into the full queue when the stage fails
+        stages = [SourceWorker("source", counter(), [to_stage], stop_event),
+                  StageWorker("failing", fail_at_three, to_stage, [to_sink], stop_event),
+                  StageWorker("sink", lambda item: None, to_sink, (), stop_event)]
+        for stage in stages:
+            stage.start()
+        self.assertEqual(join_all(stages), [])
+        self.assertIsInstance(stages[1].error, ValueError)
+        self.assertTrue(stop_event.is_set())
+        self.assertIsNone(stages[0].error)
+
+    def test_stop_event_joins_cleanly(self):
+        stop_event = threading.Event()
+        queue, latest = make_queue(4, 'all'), LatestValue()
+        stages = [SourceWorker("source", counter(), [queue], stop_event),
+                  StageWorker("stage", lambda item: item, queue, [latest], stop_event)]
+        for stage in stages:
+            stage.start()
+        latest.wait_newer(10, timeout=2.0)
+        stop_event.set()
+        self.assertEqual(join_all(stages), [])
+        self.assertTrue(queue.closed and latest.closed)
+        self.assertEqual([stage.error for stage in stages], [None, None])
+
+
+class FailingDetector:
+    def __init__(self, fail_at):
+        self.fail_at = fail_at
+        self.calls = 0
+
+    def detect(self, color, depth_frame, intrinsics):
+        self.calls += 1
+        if self.calls == self.fail_at:
+            raise RuntimeError("inference failed")
+        return []
+
+
+class StaticAudio:
+    def get_direction(self, timestamp=None):
+        return 0.0
+
+
+class TestRunPipelined(unittest.TestCase):
+    def run_headless(self, detector, num_frames=None):
+        source = SyntheticFrameSource(width=160, height=100, num_frames=num_frames)
+        source.start()
+        localizer = Localizer(MapManager())
+        runner = threading.Thread(target=run_pipelined, args=(source, StaticAudio(), detector, localizer,
+                                                               source.get_intrinsics(), StageProfiler()),
+                                  kwargs={'headless': True}, daemon=True)
+        runner.start()
+        runner.join(timeout=5.0)
+        source.stop()
+        return runner, source
+
+    def test_source_end_finishes_run(self):
+        runner, source = self.run_headless(FailingDetector(fail_at=None), num_frames=20)
+        self.assertFalse(runner.is_alive())
+        self.assertEqual(source.frame_index, 20)
+
+    def test_stage_exception_ends_run(self):
+        # An endless source: only the failing detection stage can end the run
+        runner, _ = self.run_headless(FailingDetector(fail_at=3))
+        self.assertFalse(runner.is_alive())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+import unittest
+import tempfile
+import json
+import csv
+import sys
+import os
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from src.utils.profiling import BUCKET_EDGES_MS, LatencyHistogram, StageProfiler
+
+class TestLatencyHistogram(unittest.TestCase):
+    def test_nearest_rank_percentiles(self):
+        hist = LatencyHistogram()
+        for ms in range(100, 0, -1):
+            hist.add(float(ms))
+        summary = hist.summary()
+        self.assertEqual((summary['p50_ms'], summary['p95_ms'], summary['p99_ms']), (50.0, 95.0, 99.0))
+        self.assertEqual(summary['max_ms'], 100.0)
+        self.assertAlmostEqual(summary['mean_ms'], 50.5)
+        self.assertEqual(hist.percentile(0), 1.0)
+        self.assertEqual(hist.percentile(100), 100.0)
+
+    def test_window_and_buckets(self):
+        hist = LatencyHistogram(window=10)
+        for _ in range(90):
+            hist.add(1000.0)
+        for _ in range(10):
+            hist.add(0.05)
+        # Percentiles follow the recent window, counts and max cover the whole run
+        self.assertEqual(hist.percentile(99), 0.05)
+        self.assertEqual(hist.summary()['max_ms'], 1000.0)
+        self.assertEqual(hist.counts[0], 10)
+        self.assertEqual(hist.counts[BUCKET_EDGES_MS.index(1000)], 90)
+        self.assertEqual(sum(hist.counts), 100)
+
+    def test_empty(self):
+        self.assertEqual(LatencyHistogram().summary()['p95_ms'], 0.0)
+
+
+class TestStageProfiler(unittest.TestCase):
+    def test_records_stages_in_order(self):
+        profiler = StageProfiler()
+        for seconds in (0.001, 0.002, 0.003):
+            profiler.record('detect', seconds)
+        with profiler.stage('capture'):
+            pass
+        summary = profiler.summary()
+        self.assertEqual(list(summary), ['detect', 'capture'])
+        self.assertAlmostEqual(summary['detect']['p50_ms'], 2.0)
+        self.assertEqual(profiler.hud_line(['detect', 'missing']), "detect 2.0/3.0ms")
+
+    def test_disabled_profiler_records_nothing(self):
+        profiler = StageProfiler(enabled=False)
+        with profiler.stage('detect'):
+            pass
+        profiler.record('detect', 0.01)
+        self.assertEqual(profiler.summary(), {})
+
+    def test_dump_csv_and_json(self):
+        profiler = StageProfiler()
+        profiler.record('detect', 0.004)
+        with tempfile.TemporaryDirectory() as tmp:
+            csv_path = os.path.join(tmp, 'latency.csv')
+            profiler.dump(csv_path)
+            profiler.dump(csv_path)
+            with open(csv_path, newline='') as f:
+                rows = list(csv.DictReader(f))
+            self.assertEqual(len(rows), 2)
+            self.assertEqual((rows[0]['stage'], float(rows[0]['p50_ms'])), ('detect', 4.0))
+
+            json_path = os.path.join(tmp, 'latency.json')
+            profiler.dump(json_path)
+            with open(json_path) as f:
+                snapshot = json.load(f)
+            self.assertEqual(snapshot['bucket_edges_ms'], list(BUCKET_EDGES_MS))
+            self.assertEqual(sum(snapshot['stages']['detect']['histogram']), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,106 @@
+import unittest
+import tempfile
+import time
+import sys
+import os
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from src.main import run_pipelined, run_sequential
+from src.map.map_manager import MapManager
+from src.navigation.localizer import Localizer
+from src.sensors.frame_source import SyntheticFrameSource
+from src.utils.profiling import StageProfiler
+from src.utils.run_log import RunLogger, read_run_log
+
+CHAIR = {'class': 'chair', 'confidence': 0.91234, 'bbox': [10, 20, 50, 80], 'position': [0.51234, 0.0, 2.98765]}
+
+class SlowDetector:
+    """Detector stand-in that takes a few ms per frame, so a pipelined run falls behind capture."""
+
+    def detect(self, color, depth_frame, intrinsics):
+        time.sleep(0.005)
+        return [dict(CHAIR)]
+
+
+class StaticAudio:
+    def get_direction(self, timestamp=None):
+        return 45.0
+
+
+class TestRunLogger(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'run.jsonl')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_round_trip(self):
+        log = RunLogger(self.path, config={'source': 'synthetic'})
+        log.log_frame(1, [CHAIR], [1.0, 0.0, 2.0], {'detect': 0.0123}, doa=45.0)
+        log.log_frame(2, [dict(CHAIR, track_id=7)], None)
+        log.close({'note': 'done'})
+        header, frames, summary = read_run_log(self.path)
+        self.assertEqual(header['config'], {'source': 'synthetic'})
+        self.assertEqual([f['i'] for f in frames], [1, 2])
+        self.assertEqual(frames[0]['lm'], [['chair', 0.912, 10, 20, 50, 80, 0.512, 0.0, 2.988]])
+        self.assertEqual((frames[0]['pose'], frames[0]['doa'], frames[0]['ms']), ([1.0, 0.0, 2.0], 45.0, {'detect': 12.3}))
+        self.assertEqual(frames[1]['lm'][0][-1], 7)
+        self.assertIsNone(frames[1]['pose'])
+        self.assertNotIn('ms', frames[1])
+        self.assertEqual((summary['frames'], summary['note']), (2, 'done'))
+
+    def test_interrupted_run_with_torn_last_line(self):
+        log = RunLogger(self.path)
+        for i in range(3):
+            log.log_frame(i, [], [0.0, 0.0, 0.0])
+        log._file.flush()
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write('{"i":3,"t":0.1,"do')
+        header, frames, summary = read_run_log(self.path)
+        self.assertIsNotNone(header)
+        self.assertEqual([f['i'] for f in frames], [0, 1, 2])
+        self.assertIsNone(summary)
+        log._file.close()
+
+    def test_corrupt_line_in_the_middle_raises(self):
+        with open(self.path, 'w', encoding='utf-8') as f:
+            f.write('{"type":"header"}\n{"i":\n{"i":1}\n')
+        with self.assertRaises(ValueError):
+            read_run_log(self.path)
+
+
+class TestHeadlessRunLog(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def run_logged(self, run, num_frames=40):
+        path = os.path.join(self.tmp.name, run.__name__ + '.jsonl')
+        log = RunLogger(path)
+        source = SyntheticFrameSource(width=160, height=100, num_frames=num_frames)
+        source.start()
+        run(source, StaticAudio(), SlowDetector(), Localizer(MapManager()), source.get_intrinsics(),
+            StageProfiler(), headless=True, run_log=log)
+        source.stop()
+        log.close()
+        return read_run_log(path)
+
+    def test_sequential_logs_every_frame(self):
+        _, frames, summary = self.run_logged(run_sequential)
+        self.assertEqual([f['i'] for f in frames], list(range(1, 41)))
+        self.assertEqual(summary['frames'], 40)
+        self.assertEqual(frames[0]['doa'], 45.0)
+
+    def test_pipelined_logs_every_frame(self):
+        _, frames, summary = self.run_logged(run_pipelined)
+        self.assertEqual([f['i'] for f in frames], list(range(1, 41)))
+        self.assertEqual(summary['frames'], 40)
+        self.assertEqual(frames[-1]['lm'][0][0], 'chair')
+
+
+if __name__ == '__main__':
+    unittest.main()
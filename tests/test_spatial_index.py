@@ -0,0 +1,95 @@
+import unittest
+import sys
+import os
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from src.map.map_manager import MapManager
+from src.map.spatial_index import SpatialIndex, _MAX_CELL
+
+def brute_knn(positions, center, k):
+    d = np.linalg.norm(positions - center, axis=1)
+    return np.argsort(d, kind='stable')[:k], np.sort(d)[:k]
+
+class TestSpatialIndex(unittest.TestCase):
+    def setUp(self):
+        self.rng = np.random.default_rng(0)
+        self.positions = self.rng.uniform(0, 50, (2000, 3))
+        self.index = SpatialIndex()
+        self.index.add(self.positions)
+        self.index.build()
+
+    def check_queries(self, positions, num_queries=50):
+        for center in self.rng.uniform(-5, 55, (num_queries, 3)):
+            ids, d = self.index.query_knn(center, k=5)
+            _, expected = brute_knn(positions, center, 5)
+            np.testing.assert_allclose(d, expected)
+            np.testing.assert_allclose(np.linalg.norm(positions[ids] - center, axis=1), d)
+
+            ids, d = self.index.query_radius(center, 4.0)
+            all_d = np.linalg.norm(positions - center, axis=1)
+            self.assertEqual(sorted(ids.tolist()), np.flatnonzero(all_d <= 4.0).tolist())
+            self.assertTrue(np.all(np.diff(d) >= 0))
+
+    def test_matches_brute_force(self):
+        self.check_queries(self.positions)
+
+    def test_pending_and_moved_points(self):
+        # Few enough changes to stay below the rebuild threshold: queries scan them directly
+        extra = self.rng.uniform(0, 50, (50, 3))
+        self.index.add(extra)
+        moved = self.rng.choice(len(self.positions), 50, replace=False)
+        new_positions = self.rng.uniform(0, 50, (50, 3))
+        self.index.update(moved, new_positions)
+        positions = np.concatenate([self.positions, extra])
+        positions[moved] = new_positions
+        self.assertLess(self.index._indexed, len(positions))
+        self.check_queries(positions)
+
+    def test_custom_ids(self):
+        index = SpatialIndex()
+        index.add([[0, 0, 0], [10, 0, 0]], ids=[7, 3])
+        index.update([3], [[1, 0, 0]])
+        index.update([99], [[5, 5, 5]]) # unknown ids are ignored
+        index.add([[2, 0, 0]], ids=[11])
+        index.update([11], [[0.5, 0, 0]])
+        ids, d = index.query_knn([0.6, 0, 0], k=3)
+        self.assertEqual(ids.tolist(), [11, 3, 7])
+        np.testing.assert_allclose(d, [0.1, 0.4, 0.6])
+
+    def test_cell_keys_fit_large_extent(self):
+        # A dense cluster next to a far-away point used to pick a cell size whose cell
+        # coordinates overflowed the packed keys
+        positions = np.concatenate([self.rng.uniform(0, 1e-3, (1000, 3)), [[5e4, 0, 0], [-5e4, 0, 0]]])
+        index = SpatialIndex(cell_size=1e-4)
+        index.add(positions)
+        index.build()
+        self.assertLessEqual(np.abs(np.floor(positions / index.cell_size)).max(), _MAX_CELL)
+        for center in ([5e4, 1, 0], [-4.9e4, 0, 0], [0, 0, 0], [1e9, 0, 0]):
+            _, d = index.query_knn(center, k=3)
+            np.testing.assert_allclose(d, brute_knn(positions, np.array(center, dtype=float), 3)[1])
+
+
+class TestMapManagerQueries(unittest.TestCase):
+    def test_nearest_landmark_matches_loop(self):
+        rng = np.random.default_rng(1)
+        map_manager = MapManager()
+        for x, y, z, c in zip(*rng.uniform(0, 40, (3, 500)), rng.integers(0, 4, 500)):
+            map_manager.add_landmark(f"class_{c}", [float(x), float(y), float(z)])
+        positions = np.array([lm['position'] for lm in map_manager.landmarks])
+        classes = np.array([lm['class'] for lm in map_manager.landmarks])
+        mismatches = 0
+        for query in rng.uniform(0, 40, (100, 3)):
+            nearest, dist = map_manager.find_nearest_landmark(query.tolist())
+            d = np.linalg.norm(positions - query, axis=1)
+            mismatches += nearest is not map_manager.landmarks[int(np.argmin(d))]
+            self.assertAlmostEqual(dist, d.min())
+            within = map_manager.find_within_radius(query.tolist(), 5.0, 'class_2')
+            self.assertEqual(len(within), int(np.sum((d <= 5.0) & (classes == 'class_2'))))
+        self.assertEqual(mismatches, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -3,6 +3,16 @@ from unittest.mock import MagicMock, patch
 import sys
 import os
 
+# The mocks below only apply to the modules imported by this file: remember the real modules,
+# and set aside src modules other test files already imported so they are re-imported against the mocks.
+MOCKED_MODULES = ('numpy', 'pyrealsense2', 'ultralytics', 'cv2')
+real_modules = {name: sys.modules.get(name) for name in MOCKED_MODULES}
+
+def pop_src_modules():
+    return {name: sys.modules.pop(name) for name in list(sys.modules) if name == 'src' or name.startswith('src.')}
+
+real_src_modules = pop_src_modules()
+
 # Mock numpy before importing modules that use it
 mock_np = MagicMock()
 # Setup basic numpy behavior needed for the code
@@ -25,6 +35,15 @@ from src.map.map_manager import MapManager
 from src.navigation.localizer import Localizer
 from src.vision.landmark_detector import LandmarkDetector
 
+# Restore the real modules for the other test files; the classes imported above keep the mocks.
+pop_src_modules()
+sys.modules.update(real_src_modules)
+for name, module in real_modules.items():
+    if module is None:
+        sys.modules.pop(name, None)
+    else:
+        sys.modules[name] = module
+
 class TestNavigationSystem(unittest.TestCase):
     def setUp(self):
         # Mock MapManager
@@ -46,6 +65,14 @@ class TestNavigationSystem(unittest.TestCase):
         self.assertEqual(len(self.map_manager.landmarks), 1)
         self.assertEqual(self.map_manager.landmarks[0]['class'], 'test_obj')
 
+    def test_landmark_ids_are_not_reused(self):
+        second = self.map_manager.add_landmark('door', [1.0, 0.0, 1.0])
+        self.map_manager.remove_landmark(second['id'])
+        third = self.map_manager.add_landmark('door', [2.0, 0.0, 2.0])
+        self.assertEqual(second['id'], 2)
+        self.assertEqual(third['id'], 3)
+        self.assertEqual([lm['id'] for lm in self.map_manager.landmarks], [1, 3])
+
     def test_localizer_logic(self):
         # Since we mocked numpy, the vector math in Localizer will fail if we don't mock it precisely.
         # Instead of complex numpy mocking, let's verify the logic by patching the math or 
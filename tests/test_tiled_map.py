@@ -0,0 +1,161 @@
+import unittest
+from unittest.mock import patch
+import tempfile
+import sys
+import os
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from src.map.map_manager import MapManager
+from src.map import tiled_map
+from src.map.tiled_map import LANDMARK_BYTES, TileCache, tile_key, write_tiled_map
+
+TILE_SIZE = 10.0
+PER_TILE = 20
+
+def grid_landmarks(tiles=6):
+    """PER_TILE landmarks in each tile of a tiles x tiles grid."""
+    landmarks = []
+    for tx in range(tiles):
+        for tz in range(tiles):
+            for i in range(PER_TILE):
+                landmarks.append({'id': len(landmarks) + 1, 'class': f"class_{i % 3}",
+                                  'position': [tx * TILE_SIZE + 0.4 * i + 0.5, 0.0, tz * TILE_SIZE + 5.0],
+                                  'audio_signature': None})
+    return landmarks
+
+class TestTileCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.directory = os.path.join(self.tmp.name, 'tiles')
+        self.assertEqual(write_tiled_map(self.directory, grid_landmarks(), TILE_SIZE), 36)
+        # Room for 12 tiles: the 3x3 active set plus a few recently used ones
+        self.budget_mb = 12 * PER_TILE * LANDMARK_BYTES / 1e6
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_eviction_keeps_active_set(self):
+        cache = TileCache(self.directory, radius=1, memory_budget_mb=self.budget_mb, prefetch=False)
+        for x in range(5, 60, 10):
+            for z in (5, 25, 45):
+                self.assertTrue(cache.update([x, 0.0, z]))
+                self.assertTrue(set(cache.active) <= set(cache._tiles))
+                self.assertLessEqual(cache.memory_bytes(), cache.memory_budget)
+                self.assertEqual(len(cache.resident_landmarks()), len(cache.active) * PER_TILE)
+        self.assertFalse(cache.update([55.5, 0.0, 45.5]))
+        self.assertGreater(cache.stats['evicted'], 0)
+        cache.close()
+
+    def test_active_set_exceeding_budget_is_not_evicted(self):
+        cache = TileCache(self.directory, radius=1, memory_budget_mb=PER_TILE * LANDMARK_BYTES / 1e6,
+                          prefetch=False)
+        cache.update([25.0, 0.0, 25.0])
+        self.assertEqual(len(cache._tiles), 9)
+        cache.close()
+
+    def test_edited_tile_is_written_back_on_eviction(self):
+        cache = TileCache(self.directory, radius=0, memory_budget_mb=self.budget_mb / 6, prefetch=False)
+        cache.update([5.0, 0.0, 5.0])
+        cache.add({'id': cache.allocate_id(), 'class': 'new', 'position': [1.0, 0.0, 1.0], 'audio_signature': None})
+        for x in range(15, 60, 10):
+            cache.update([x, 0.0, 5.0])
+        self.assertNotIn((0, 0), cache._tiles)
+        reloaded = TileCache(self.directory, prefetch=False)
+        reloaded.update([5.0, 0.0, 5.0])
+        self.assertEqual([lm['class'] for lm in reloaded.resident_landmarks()].count('new'), 1)
+        self.assertEqual(len(reloaded), 36 * PER_TILE + 1)
+
+    def test_eviction_writes_outside_lock(self):
+        cache = TileCache(self.directory, radius=0, memory_budget_mb=self.budget_mb / 6, prefetch=False)
+        cache.update([5.0, 0.0, 5.0])
+        cache.add({'id': cache.allocate_id(), 'class': 'new', 'position': [1.0, 0.0, 1.0], 'audio_signature': None})
+        locked = []
+        write = tiled_map.write_binary_map
+        def checked_write(path, landmarks):
+            locked.append(cache._lock.locked())
+            write(path, landmarks)
+        with patch.object(tiled_map, 'write_binary_map', checked_write):
+            for x in range(15, 60, 10):
+                cache.update([x, 0.0, 5.0])
+        self.assertEqual(locked, [False])
+        self.assertEqual(cache._writing, {})
+
+    def test_add_to_tile_evicted_concurrently(self):
+        cache = TileCache(self.directory, radius=0, prefetch=False)
+        cache.update([5.0, 0.0, 5.0])
+        get = cache._get
+        def get_then_evict(key):
+            # The prefetch thread evicts the tile right after the lookup
+            tile = get(key)
+            with cache._lock:
+                cache._tiles.pop(key)
+            return tile
+        with patch.object(cache, '_get', get_then_evict):
+            cache.add({'id': cache.allocate_id(), 'class': 'new', 'position': [25.0, 0.0, 5.0], 'audio_signature': None})
+        cache.flush()
+        reloaded = TileCache(self.directory, prefetch=False)
+        reloaded.update([25.0, 0.0, 5.0])
+        self.assertEqual([lm['class'] for lm in reloaded.resident_landmarks()].count('new'), 1)
+
+    def test_add_creates_tile_in_active_radius(self):
+        cache = TileCache(self.directory, radius=1, prefetch=False)
+        cache.update([55.0, 0.0, 55.0])
+        self.assertTrue(cache.add({'id': cache.allocate_id(), 'class': 'door', 'position': [65.0, 0.0, 55.0],
+                                   'audio_signature': None}))
+        self.assertIn((6, 5), cache.active)
+        self.assertFalse(cache.add({'id': cache.allocate_id(), 'class': 'door', 'position': [75.0, 0.0, 55.0],
+                                    'audio_signature': None}))
+        cache.close()
+
+    def test_prefetch_loads_next_ring(self):
+        cache = TileCache(self.directory, radius=1, memory_budget_mb=64.0)
+        cache.update([25.0, 0.0, 25.0])
+        cache.close()
+        self.assertEqual(len(cache._tiles), 25)
+        self.assertEqual(cache.stats['prefetched'], 16)
+
+
+class TestTiledMapManager(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.directory = os.path.join(self.tmp.name, 'tiles')
+        write_tiled_map(self.directory, grid_landmarks(), TILE_SIZE)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_landmarks_follow_position(self):
+        map_manager = MapManager(self.directory)
+        self.assertEqual(len(map_manager.landmarks), 4 * PER_TILE) # corner tile: 2x2 neighbourhood
+        self.assertTrue(map_manager.update_position([25.0, 0.0, 25.0]))
+        self.assertEqual(len(map_manager.landmarks), 9 * PER_TILE)
+        nearest, _ = map_manager.find_nearest_landmark([25.0, 0.0, 25.0])
+        self.assertEqual(tile_key(nearest['position'], TILE_SIZE), (2, 2))
+        map_manager.close()
+
+    def test_add_outside_active_tiles(self):
+        map_manager = MapManager(self.directory)
+        resident = len(map_manager.landmarks)
+        inside = map_manager.add_landmark('door', [1.0, 0.0, 1.0])
+        outside = map_manager.add_landmark('door', [55.0, 0.0, 55.0])
+        self.assertEqual(len(map_manager.landmarks), resident + 1)
+        self.assertIs(map_manager.find_nearest_landmark([1.0, 0.0, 1.0], 'door')[0], inside)
+        self.assertIs(map_manager.find_nearest_landmark([55.0, 0.0, 55.0], 'door')[0], inside)
+        map_manager.update_position([55.0, 0.0, 55.0])
+        self.assertEqual(map_manager.find_nearest_landmark([55.0, 0.0, 55.0], 'door')[0]['id'], outside['id'])
+        map_manager.close()
+
+    def test_add_in_new_tile_is_resident_and_merged(self):
+        map_manager = MapManager(self.directory, merge_radius=0.5)
+        map_manager.update_position([55.0, 0.0, 55.0])
+        for _ in range(5):
+            door = map_manager.add_landmark('door', [65.0, 0.0, 51.0])
+        self.assertEqual(door['observations'], 5)
+        self.assertIs(map_manager.find_nearest_landmark([65.0, 0.0, 51.0], 'door')[0], door)
+        map_manager.close()
+        self.assertEqual(map_manager.tiles.manifest['tiles']['6,5']['count'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
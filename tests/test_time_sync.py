@@ -0,0 +1,96 @@
+import unittest
+import sys
+import os
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from src.sensors.frame_source import SyntheticFrameSource
+from src.utils.time_sync import ClockMapper, StreamBuffer, TimeSync
+
+class TestClockMapper(unittest.TestCase):
+    def test_minimum_offset_ignores_jitter(self):
+        mapper = ClockMapper()
+        # Host clock is 100 s ahead, every sample arrives 0-9 ms late
+        for i in range(50):
+            mapper.update(i * 0.033, 100.0 + i * 0.033 + (i % 10) * 0.001)
+        self.assertAlmostEqual(mapper.offset, 100.0)
+        self.assertAlmostEqual(mapper.to_host(2.0), 102.0)
+
+    def test_window_follows_drift(self):
+        mapper = ClockMapper(window=10)
+        for i in range(10):
+            mapper.update(float(i), 100.0 + i)
+        for i in range(10, 30):
+            mapper.update(float(i), 100.5 + i)
+        self.assertAlmostEqual(mapper.offset, 100.5)
+
+    def test_jump_restarts_estimate(self):
+        mapper = ClockMapper(max_jump=1.0)
+        self.assertIsNone(mapper.to_host(1.0))
+        mapper.update(50.0, 100.0)
+        # Sensor clock reset: the old offset must not linger as the window minimum
+        self.assertAlmostEqual(mapper.update(0.0, 101.0), 101.0)
+        self.assertAlmostEqual(mapper.offset, 101.0)
+
+
+class TestStreamBuffer(unittest.TestCase):
+    def test_nearest_and_range(self):
+        buffer = StreamBuffer()
+        for i in range(10):
+            buffer.add(i * 0.1, i)
+        self.assertEqual(buffer.nearest(0.34)[1], 3)
+        self.assertEqual(buffer.nearest(0.36)[1], 4)
+        self.assertEqual(buffer.nearest(-5.0)[1], 0)
+        self.assertIsNone(buffer.nearest(5.0, max_gap=0.5))
+        self.assertEqual([v for _, v in buffer.range(0.25, 0.55)], [3, 4, 5])
+        self.assertEqual(buffer.latest()[1], 9)
+
+    def test_capacity_and_out_of_order(self):
+        buffer = StreamBuffer(capacity=5)
+        for i in range(23):
+            buffer.add(float(i), i)
+        self.assertEqual(len(buffer), 5)
+        self.assertEqual([v for _, v in buffer.range(0.0, 100.0)], [18, 19, 20, 21, 22])
+        buffer.add(20.5, 'late')
+        self.assertEqual([v for _, v in buffer.range(20.0, 21.0)], [20, 'late', 21])
+        self.assertEqual(len(buffer), 5)
+        self.assertIsNone(StreamBuffer().latest())
+        with self.assertRaises(ValueError):
+            StreamBuffer(capacity=0)
+
+
+class TestTimeSync(unittest.TestCase):
+    def test_nearest_beats_latest(self):
+        # A direction sweeping at 90 deg/s, estimated at 30 Hz; a frame captured 80 ms ago
+        sync = TimeSync()
+        for i in range(30):
+            sync.stamp('doa', i * 3.0, host_time=i / 30.0)
+        frame_time = 29 / 30.0 - 0.08
+        self.assertEqual(sync.nearest('doa', frame_time)[1], 81.0)
+        self.assertEqual(sync.stream('doa').latest()[1], 87.0)
+
+    def test_stamp_maps_sensor_time_per_stream(self):
+        sync = TimeSync()
+        self.assertAlmostEqual(sync.stamp('audio', 1, sensor_time=0.5, host_time=10.5), 10.5)
+        self.assertAlmostEqual(sync.stamp('audio', 2, sensor_time=1.0, host_time=11.003), 11.0)
+        self.assertAlmostEqual(sync.stamp('frames', 1, sensor_time=1000.0, host_time=11.0), 11.0)
+        self.assertIs(sync.clock_mapper('audio'), sync.clock_mapper('audio'))
+        self.assertAlmostEqual(sync.clock_mapper('audio').to_host(2.0), 12.0)
+        self.assertEqual(sync.align(11.0, ['audio', 'frames', 'doa'], max_gap=0.1),
+                         {'audio': 2, 'frames': 1, 'doa': None})
+
+    def test_frame_source_stamps_frames(self):
+        sync = TimeSync()
+        source = SyntheticFrameSource(width=64, height=40, num_frames=3)
+        source.time_sync = sync
+        source.start()
+        timestamps = []
+        while source.get_frames()[0] is not None:
+            timestamps.append(source.timestamp)
+        source.stop()
+        stamps = sync.range('frames', float('-inf'), float('inf'))
+        self.assertEqual(stamps, list(zip(timestamps, [1, 2, 3])))
+
+
+if __name__ == '__main__':
+    unittest.main()
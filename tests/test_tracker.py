@@ -0,0 +1,72 @@
+import unittest
+import sys
+import os
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from src.vision.tracker import BoxTracker, box_iou, make_thumbnail, scene_change
+
+def textured_frame(offset=(0, 0), size=(240, 320), box=(100, 60, 180, 140), seed=0):
+    """Gray background with a random-textured square whose top-left corner is box + offset."""
+    rng = np.random.default_rng(seed)
+    frame = np.full(size + (3,), 90, dtype=np.uint8)
+    x1, y1, x2, y2 = box
+    texture = rng.integers(0, 255, size=(y2 - y1, x2 - x1, 1), dtype=np.uint8)
+    dx, dy = offset
+    frame[y1 + dy:y2 + dy, x1 + dx:x2 + dx] = texture
+    return frame
+
+class TestBoxIou(unittest.TestCase):
+    def test_known_overlaps(self):
+        iou = box_iou([[0, 0, 10, 10]], [[0, 0, 10, 10], [5, 0, 15, 10], [20, 20, 30, 30]])
+        np.testing.assert_allclose(iou, [[1.0, 50 / 150, 0.0]], rtol=1e-6)
+        self.assertEqual(box_iou(np.zeros((0, 4)), [[0, 0, 1, 1]]).shape, (0, 1))
+
+
+class TestBoxTracker(unittest.TestCase):
+    def test_propagate_follows_moving_texture(self):
+        tracker = BoxTracker()
+        tracker.reset(textured_frame(), [(100, 60, 180, 140, 0.9, 2)])
+        boxes = tracker.propagate(textured_frame(offset=(6, 4)))
+        self.assertEqual(len(boxes), 1)
+        x1, y1, x2, y2, conf, cls_id, track_id = boxes[0]
+        self.assertLessEqual(abs(x1 - 106), 2)
+        self.assertLessEqual(abs(y1 - 64), 2)
+        self.assertLessEqual(abs((x2 - x1) - 80), 3)
+        self.assertEqual((conf, cls_id, track_id), (np.float32(0.9), 2, 1))
+
+    def test_textureless_box_keeps_position(self):
+        flat = np.full((240, 320, 3), 90, dtype=np.uint8)
+        tracker = BoxTracker()
+        tracker.reset(flat, [(100, 60, 180, 140, 0.9, 0)])
+        self.assertEqual(tracker.propagate(flat)[0][:4], (100, 60, 180, 140))
+
+    def test_track_ids_survive_keyframes(self):
+        tracker = BoxTracker()
+        first = tracker.reset(textured_frame(), [(100, 60, 180, 140, 0.9, 0), (10, 10, 50, 50, 0.8, 1)])
+        self.assertEqual([d[6] for d in first], [1, 2])
+        # Same objects slightly moved, the second one now detected as another class, plus a new one
+        second = tracker.reset(textured_frame(), [(12, 12, 52, 52, 0.8, 1), (104, 62, 184, 142, 0.9, 0),
+                                                  (200, 150, 260, 200, 0.7, 1)])
+        self.assertEqual([d[6] for d in second], [2, 1, 3])
+        third = tracker.reset(textured_frame(), [(12, 12, 52, 52, 0.8, 3)])
+        self.assertEqual(third[0][6], 4)
+
+    def test_propagate_without_tracks(self):
+        tracker = BoxTracker()
+        self.assertEqual(tracker.propagate(textured_frame()), [])
+
+
+class TestSceneChange(unittest.TestCase):
+    def test_scene_change(self):
+        a = make_thumbnail(textured_frame())
+        self.assertEqual(scene_change(a, a), 0.0)
+        self.assertLess(scene_change(a, make_thumbnail(textured_frame(offset=(2, 0)))), 5)
+        self.assertGreater(scene_change(a, make_thumbnail(np.full((240, 320, 3), 200, dtype=np.uint8))), 50)
+        self.assertEqual(scene_change(None, a), float('inf'))
+
+
+if __name__ == '__main__':
+    unittest.main()